@@ -0,0 +1,317 @@
+# lol_app_LTA_2/api.py
+"""
+JSON API for the analytics views.
+
+Every /api/<view> endpoint takes the same query args as its HTML page and
+returns the data behind it without server-built icon HTML: aggregators run
+under scrims_logic.skip_icon_html(), and champion icons are replaced by a
+single top-level `champions` map {champion name: Data Dragon key}, and JSON-string blobs (e.g. start position timelines) are
+returned as real JSON. Responses carry an ETag derived from the data
+generation and the filter args (see http_cache), so an unchanged view
+answers 304 before any aggregation runs.
+"""
+
+import json
+import traceback
+
+from flask import Blueprint, request, jsonify
+
+from scrims_logic import log_message, get_champion_data, get_champion_key, skip_icon_html
+from database import get_db_connection, get_tournaments
+from http_cache import compute_etag, etag_matches, not_modified_response, get_request_data_generation
+from tournament_logic import (
+    aggregate_tournament_data,
+    get_all_wards_data,
+    get_proximity_data,
+    get_team_registry,
+    resolve_tournament_arg
+)
+from soloq_logic import TEAM_ROSTERS, aggregate_soloq_roster_data, get_soloq_activity_data
+from start_positions_logic import get_start_positions_data
+from jng_clear_logic import get_jng_clear_data
+from objects_logic import get_objects_data
+from swap_logic import get_swap_data
+from champion_logic import get_champion_stats
+from ward_density import get_ward_density_data
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+# Поля с HTML иконками, которые не попадают в API
+_ICON_FIELDS = {"icon_html", "icon1_html", "icon2_html", "icon", "player_icons"}
+# Поля, значение которых - имя чемпиона
+_CHAMPION_FIELDS = {
+    "champion", "Champion", "champ1", "champ2", "championName", "champion_name",
+    "Champion_Name", "our_jungler_champ", "enemy_jungler_champ"
+}
+# Поля, которые логика отдаёт как json.dumps строку
+_JSON_STRING_FIELDS = {"timeline"}
+
+
+def _compact(value, champion_names):
+    """Рекурсивно убирает поля иконок и собирает имена чемпионов для карты ключей."""
+    if isinstance(value, dict):
+        has_icon = not _ICON_FIELDS.isdisjoint(value.keys())
+        compacted = {}
+        for key, item in value.items():
+            if key in _ICON_FIELDS:
+                continue
+            if key in _JSON_STRING_FIELDS and isinstance(item, str):
+                try:
+                    item = json.loads(item)
+                except ValueError:
+                    pass
+            if isinstance(item, str) and (key in _CHAMPION_FIELDS or (has_icon and key == "name")):
+                champion_names.add(item)
+            # {champ_name: {..., 'icon_html': ...}} - ключ словаря и есть чемпион
+            if isinstance(item, dict) and isinstance(key, str) and not _ICON_FIELDS.isdisjoint(item.keys()) \
+                    and _CHAMPION_FIELDS.isdisjoint(item.keys()):
+                champion_names.add(key)
+            compacted[str(key)] = _compact(item, champion_names)
+        return compacted
+    if isinstance(value, (list, tuple)):
+        return [_compact(item, champion_names) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_compact(item, champion_names) for item in value)
+    return value
+
+
+def _champion_keys(champion_names):
+    champion_data = get_champion_data()
+    keys = {}
+    for name in sorted(champion_names):
+        if name and name != "N/A" and not name.startswith("ID:"):
+            keys[name] = get_champion_key(name, champion_data)
+    return keys
+
+
+def _conditional_json(build_payload):
+    """Отдаёт 304 без пересчёта, если If-None-Match совпадает с текущим ETag."""
+    generation = get_request_data_generation()
+    etag = compute_etag()
+    matched_etag = etag_matches(etag)
+    if matched_etag:
+        return not_modified_response(matched_etag)
+
+    try:
+        # Поля иконок остаются (по ним _compact находит чемпионов), но HTML не строится
+        with skip_icon_html():
+            payload = build_payload()
+    except Exception as e:
+        log_message(f"Error in {request.path}: {e}", level="error")
+        log_message(traceback.format_exc(), level="error")
+        return jsonify({"error": f"Failed to load data: {e}"}), 500
+
+    champion_names = set()
+    payload = _compact(payload, champion_names)
+    payload["champions"] = _champion_keys(champion_names)
+    payload["generation"] = generation
+
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@api_bp.route('/tournaments')
+def api_tournaments():
+    def build():
+        conn = get_db_connection()
+        if not conn:
+            return {"tournaments": [], "error": "Database connection failed"}
+        try:
+            return {"tournaments": get_tournaments(conn)}
+        finally:
+            conn.close()
+    return _conditional_json(build)
+
+
+@api_bp.route('/teams')
+def api_teams():
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+
+    def build():
+        conn = get_db_connection(tournament_id)
+        if not conn:
+            return {"teams": [], "error": "Database connection failed"}
+        try:
+            teams_display, _ = get_team_registry(conn, tournament_id)
+        finally:
+            conn.close()
+        return {"tournament": tournament_id, "teams": teams_display}
+    return _conditional_json(build)
+
+
+@api_bp.route('/tournament')
+def api_tournament():
+    selected_team = request.args.get('team') or None
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+    side_filter = request.args.get('side_filter', 'all')
+    if side_filter not in ("all", "blue", "red"):
+        side_filter = 'all'
+
+    def build():
+        all_teams, stats, grouped_matches, all_game_details = aggregate_tournament_data(
+            selected_team_full_name=selected_team, side_filter=side_filter, tournament_id=tournament_id
+        )
+        return {"teams": all_teams, "filters": {"tournament": tournament_id, "team": selected_team, "side_filter": side_filter},
+                "stats": stats, "matches": grouped_matches, "games": all_game_details}
+    return _conditional_json(build)
+
+
+@api_bp.route('/jng_clear')
+def api_jng_clear():
+    selected_team = request.args.get('team')
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+    selected_champion = request.args.get('champion', 'All')
+    selected_event = request.args.get('event', '')
+    selected_before = request.args.get('before', type=int)
+
+    def build():
+        all_teams, stats, available_champions = get_jng_clear_data(
+            selected_team_full_name=selected_team, selected_champion=selected_champion, tournament_id=tournament_id,
+            event_filter=selected_event, event_before_min=selected_before
+        )
+        return {"teams": all_teams, "filters": {"tournament": tournament_id, "team": selected_team, "champion": selected_champion,
+                                                "event": selected_event, "before": selected_before},
+                "stats": stats, "available_champions": available_champions}
+    return _conditional_json(build)
+
+
+@api_bp.route('/objects')
+def api_objects():
+    selected_team = request.args.get('team')
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+
+    def build():
+        all_teams, stats = get_objects_data(selected_team_full_name=selected_team, tournament_id=tournament_id)
+        return {"teams": all_teams, "filters": {"tournament": tournament_id, "team": selected_team}, "stats": stats}
+    return _conditional_json(build)
+
+
+@api_bp.route('/wards')
+def api_wards():
+    selected_team = request.args.get('team')
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+    selected_role = request.args.get('role', 'All')
+    games_filter = request.args.get('games_filter', '20')
+    selected_champion = request.args.get('champion', 'All')
+
+    def build():
+        all_teams, wards_by_interval, stats, available_champions = get_all_wards_data(
+            selected_team_full_name=selected_team, selected_role=selected_role,
+            games_filter=games_filter, selected_champion=selected_champion, tournament_id=tournament_id
+        )
+        return {"teams": all_teams,
+                "filters": {"tournament": tournament_id, "team": selected_team, "role": selected_role,
+                            "games_filter": games_filter, "champion": selected_champion},
+                "wards_by_interval": wards_by_interval, "stats": stats,
+                "available_champions": available_champions}
+    return _conditional_json(build)
+
+
+@api_bp.route('/wards_density')
+def api_wards_density():
+    selected_team = request.args.get('team')
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+    selected_role = request.args.get('role', 'All')
+    games_filter = request.args.get('games_filter', '20')
+    selected_champion = request.args.get('champion', 'All')
+
+    def build():
+        all_teams, intervals, stats, available_champions = get_ward_density_data(
+            selected_team_full_name=selected_team, selected_role=selected_role,
+            games_filter=games_filter, selected_champion=selected_champion, include_cells=True,
+            tournament_id=tournament_id
+        )
+        return {"teams": all_teams,
+                "filters": {"tournament": tournament_id, "team": selected_team, "role": selected_role,
+                            "games_filter": games_filter, "champion": selected_champion},
+                "intervals": intervals, "stats": stats, "available_champions": available_champions}
+    return _conditional_json(build)
+
+
+@api_bp.route('/proximity')
+def api_proximity():
+    selected_team = request.args.get('team')
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+    selected_role = request.args.get('role', 'JUNGLE')
+    games_filter = request.args.get('games_filter', '20')
+
+    def build():
+        all_teams, stats, players_in_role = get_proximity_data(
+            selected_team_full_name=selected_team, selected_role=selected_role, games_filter=games_filter,
+            tournament_id=tournament_id
+        )
+        return {"teams": all_teams,
+                "filters": {"tournament": tournament_id, "team": selected_team, "role": selected_role, "games_filter": games_filter},
+                "stats": stats, "players_in_role": players_in_role}
+    return _conditional_json(build)
+
+
+@api_bp.route('/start_positions')
+def api_start_positions():
+    selected_team = request.args.get('team')
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+    selected_champion = request.args.get('champion', 'All')
+    games_filter = request.args.get('games_filter', '10')
+
+    def build():
+        all_teams, stats, available_champions = get_start_positions_data(
+            selected_team_full_name=selected_team, selected_champion=selected_champion, games_filter=games_filter,
+            tournament_id=tournament_id
+        )
+        return {"teams": all_teams,
+                "filters": {"tournament": tournament_id, "team": selected_team, "champion": selected_champion, "games_filter": games_filter},
+                "stats": stats, "available_champions": available_champions}
+    return _conditional_json(build)
+
+
+@api_bp.route('/soloq')
+def api_soloq():
+    selected_time_filter = request.args.get('time_filter', 'All Time')
+    date_from_str = request.args.get('date_from')
+    date_to_str = request.args.get('date_to')
+    selected_agg_type = request.args.get('agg_type', 'Day')
+    target_team_roster_key = 'Gamespace'
+
+    def build():
+        players = list(TEAM_ROSTERS.get(target_team_roster_key, {}).keys())
+        player_stats_all = aggregate_soloq_roster_data(
+            target_team_roster_key, selected_time_filter, date_from_str, date_to_str
+        )
+        selected_player_viz = request.args.get('viz_player', players[0] if players else None)
+        activity_data = get_soloq_activity_data(selected_player_viz, selected_agg_type) if selected_player_viz else {}
+        return {"players": players,
+                "filters": {"time_filter": selected_time_filter, "date_from": date_from_str, "date_to": date_to_str,
+                            "viz_player": selected_player_viz, "agg_type": selected_agg_type},
+                "player_stats": player_stats_all, "activity": activity_data}
+    return _conditional_json(build)
+
+
+@api_bp.route('/swap')
+def api_swap():
+    selected_team = request.args.get('team')
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+    selected_champion = request.args.get('champion', 'All')
+    games_filter = request.args.get('games_filter', '10')
+
+    def build():
+        all_teams, stats, available_champions = get_swap_data(
+            selected_team_full_name=selected_team, selected_champion=selected_champion, games_filter=games_filter,
+            tournament_id=tournament_id
+        )
+        return {"teams": all_teams,
+                "filters": {"tournament": tournament_id, "team": selected_team, "champion": selected_champion, "games_filter": games_filter},
+                "stats": stats, "available_champions": available_champions}
+    return _conditional_json(build)
+
+
+@api_bp.route('/champion/<path:champion_name>')
+def api_champion(champion_name):
+    tournament_id = resolve_tournament_arg(request.args.get('tournament'))
+
+    def build():
+        available_champions, stats = get_champion_stats(champion_name, tournament_id=tournament_id)
+        return {"filters": {"tournament": tournament_id, "champion": stats.get("champion") or champion_name},
+                "stats": stats, "available_champions": available_champions}
+    return _conditional_json(build)
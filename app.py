@@ -1,5 +1,8 @@
 # lol_app_LTA_2/app.py
 # lol_app_LTA/app.py
+import time
+_import_started = time.perf_counter()
+
 from dotenv import load_dotenv
 import os
 import sys
@@ -18,28 +21,31 @@ if os.path.exists(dotenv_path):
     log_message(f"Loading .env file from: {dotenv_path}")
     load_dotenv(dotenv_path=dotenv_path)
 else:
-    log_message(f"WARNING: .env file not found at expected path: {dotenv_path}. API keys might not be loaded.")
+    log_message(f".env file not found at expected path: {dotenv_path}. API keys might not be loaded.", level="warning")
 
-from flask import Flask, render_template, request, redirect, url_for, flash
-from datetime import datetime, date
-from database import get_db_connection, init_db
+from flask import Flask, Response, render_template, request, redirect, url_for, flash
+from datetime import datetime, date, timezone
+from database import init_db, get_cached_tournaments
 import json
 import sqlite3
 
 from scrims_logic import get_champion_icon_html, get_champion_data, get_latest_patch_version
 from tournament_logic import (
     fetch_and_store_tournament_data,
-    TARGET_TOURNAMENT_NAME_FOR_DB,
+    TARGET_TOURNAMENT_ID,
+    TOURNAMENTS,
+    resolve_tournament_arg,
     aggregate_tournament_data,
     TEAM_TAG_TO_FULL_NAME,
     ICON_SIZE_DRAFTS,
     get_all_wards_data,
-    get_proximity_data
+    get_proximity_data,
+    get_zone_index
 )
 from soloq_logic import (
     TEAM_ROSTERS,
-    aggregate_soloq_data_from_db,
-    fetch_and_store_soloq_data,
+    aggregate_soloq_roster_data,
+    fetch_and_store_soloq_roster,
     get_soloq_activity_data
 )
 from start_positions_logic import get_start_positions_data
@@ -47,14 +53,36 @@ from jng_clear_logic import get_jng_clear_data
 from objects_logic import get_objects_data
 from config import config
 from swap_logic import get_swap_data
+from champion_logic import get_champion_stats
+from ward_density import WARD_CATEGORIES, get_ward_density_data, get_ward_heatmap_png
+from api import api_bp
+from http_cache import init_http_cache, get_request_data_generation
+from request_timing import init_request_timing
+from profiler import init_profiling
+from ingest_metrics import get_ingest_runs, get_ingest_run
 
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = config.flask.secret_key
 app.jinja_env.globals.update(min=min, max=max)
+app.register_blueprint(api_bp)
+# До http_cache: тайминг открывается первым и закрывается последним (включая сжатие)
+init_request_timing(app)
+init_http_cache(app)
+init_profiling(app)
 
 with app.app_context(): init_db()
 
+if not config.startup.fast_startup:
+    # Без fast startup полигоны зон строятся сразу (например, до fork при gunicorn --preload)
+    get_zone_index()
+
+_startup_ms = (time.perf_counter() - _import_started) * 1000
+if _startup_ms > config.startup.import_time_budget_ms:
+    log_message(f"App import took {_startup_ms:.0f} ms, over the {config.startup.import_time_budget_ms} ms budget.", level="warning")
+else:
+    log_message(f"App import took {_startup_ms:.0f} ms (budget {config.startup.import_time_budget_ms} ms).")
+
 @app.context_processor
 def inject_now():
     return {'now': datetime.utcnow()}
@@ -73,6 +101,17 @@ def inject_utility_processor():
         get_latest_patch_version=get_latest_patch_version
     )
 
+@app.context_processor
+def inject_tournament_processor():
+    tournaments = get_cached_tournaments(get_request_data_generation())
+    # tournament_arg - значение ?tournament= для ссылок/форм (None - турнир по умолчанию)
+    return dict(
+        tournaments=tournaments,
+        tournament_arg=request.args.get('tournament') or None,
+        selected_tournament_id=resolve_tournament_arg(request.args.get('tournament')) or 'all',
+        default_tournament_id=TARGET_TOURNAMENT_ID
+    )
+
 @app.route('/')
 def index():
     return redirect(url_for('tournament'))
@@ -89,13 +128,14 @@ def tournament():
     try:
         all_teams_display, team_or_overall_stats, grouped_matches, all_game_details_list = aggregate_tournament_data(
             selected_team_full_name=selected_team_full_name if selected_team_full_name else None,
-            side_filter=selected_side_filter
+            side_filter=selected_side_filter,
+            tournament_id=resolve_tournament_arg(request.args.get('tournament'))
         )
         all_game_details = all_game_details_list
     except Exception as e:
-        log_message(f"Error in /tournament data aggregation: {e}")
+        log_message(f"Error in /tournament data aggregation: {e}", level="error")
         import traceback
-        log_message(traceback.format_exc())
+        log_message(traceback.format_exc(), level="error")
         flash(f"Error loading tournament data: {e}", "error")
         all_teams_display, team_or_overall_stats, grouped_matches, all_game_details = [], {"error": "Failed to load tournament data."}, {}, []
 
@@ -103,12 +143,12 @@ def tournament():
 
 @app.route('/update_hll', methods=['POST'])
 def update_hll_route():
-    log_message("Updating HLL tournament data...")
-    tournament_name_for_flash = TARGET_TOURNAMENT_NAME_FOR_DB
+    log_message("Updating tournament data...")
+    tournament_name_for_flash = ", ".join(name for _, name in TOURNAMENTS)
     try:
         added_games = fetch_and_store_tournament_data()
     except Exception as e:
-        log_message(f"Error during HLL tournament update: {e}")
+        log_message(f"Error during HLL tournament update: {e}", level="error")
         flash(f"Error updating {tournament_name_for_flash}: {e}", "error")
         added_games = -1
 
@@ -120,17 +160,22 @@ def update_hll_route():
 def jng_clear():
     selected_team = request.args.get('team')
     selected_champion = request.args.get('champion', 'All')
+    selected_event = request.args.get('event', '')
+    selected_before = request.args.get('before', type=int)
 
     all_teams, stats, available_champions = [], {}, []
     try:
         all_teams, stats, available_champions = get_jng_clear_data(
             selected_team_full_name=selected_team,
-            selected_champion=selected_champion
+            selected_champion=selected_champion,
+            tournament_id=resolve_tournament_arg(request.args.get('tournament')),
+            event_filter=selected_event,
+            event_before_min=selected_before
         )
     except Exception as e:
-        log_message(f"Error in /jng_clear data aggregation: {e}")
+        log_message(f"Error in /jng_clear data aggregation: {e}", level="error")
         import traceback
-        log_message(traceback.format_exc())
+        log_message(traceback.format_exc(), level="error")
         flash(f"Error loading jungle clear data: {e}", "error")
         stats = {"error": "Failed to load jungle clear data."}
 
@@ -140,6 +185,8 @@ def jng_clear():
         selected_team=selected_team,
         available_champions=available_champions,
         selected_champion=selected_champion,
+        selected_event=selected_event,
+        selected_before=selected_before,
         stats=stats
     )
 
@@ -148,11 +195,14 @@ def objects():
     selected_team = request.args.get('team')
     all_teams, stats = [], {}
     try:
-        all_teams, stats = get_objects_data(selected_team_full_name=selected_team)
+        all_teams, stats = get_objects_data(
+            selected_team_full_name=selected_team,
+            tournament_id=resolve_tournament_arg(request.args.get('tournament'))
+        )
     except Exception as e:
-        log_message(f"Error in /objects data aggregation: {e}")
+        log_message(f"Error in /objects data aggregation: {e}", level="error")
         import traceback
-        log_message(traceback.format_exc())
+        log_message(traceback.format_exc(), level="error")
         flash(f"Error loading object data: {e}", "error")
         stats = {"error": "Failed to load object data."}
     
@@ -168,22 +218,36 @@ def wards():
     selected_role = request.args.get('role', 'All')
     games_filter = request.args.get('games_filter', '20')
     selected_champion = request.args.get('champion', 'All')
+    # heatmap - PNG плотности по интервалам (по умолчанию), points - каждый вард отдельно
+    selected_view = request.args.get('view', 'heatmap')
+    if selected_view not in ("heatmap", "points"):
+        selected_view = 'heatmap'
 
     roles = ["All", "TOP", "JGL", "MID", "BOT", "SUP"]
     games_filters = ["5", "10", "20", "30", "50", "All"]
     
-    all_teams, wards_by_interval, stats_or_error, available_champions = [], {}, {}, []
+    all_teams, wards_by_interval, density_intervals, stats_or_error, available_champions = [], {}, [], {}, []
     try:
-        all_teams, wards_by_interval, stats_or_error, available_champions = get_all_wards_data(
-            selected_team_full_name=selected_team,
-            selected_role=selected_role,
-            games_filter=games_filter,
-            selected_champion=selected_champion
-        )
+        if selected_view == 'heatmap':
+            all_teams, density_intervals, stats_or_error, available_champions = get_ward_density_data(
+                selected_team_full_name=selected_team,
+                selected_role=selected_role,
+                games_filter=games_filter,
+                selected_champion=selected_champion,
+                tournament_id=resolve_tournament_arg(request.args.get('tournament'))
+            )
+        else:
+            all_teams, wards_by_interval, stats_or_error, available_champions = get_all_wards_data(
+                selected_team_full_name=selected_team,
+                selected_role=selected_role,
+                games_filter=games_filter,
+                selected_champion=selected_champion,
+                tournament_id=resolve_tournament_arg(request.args.get('tournament'))
+            )
     except Exception as e:
-        log_message(f"Error in /wards data aggregation: {e}")
+        log_message(f"Error in /wards data aggregation: {e}", level="error")
         import traceback
-        log_message(traceback.format_exc())
+        log_message(traceback.format_exc(), level="error")
         flash(f"Error loading ward data: {e}", "error")
         stats_or_error = {"error": "Failed to load ward data."}
 
@@ -196,11 +260,29 @@ def wards():
         games_filters=games_filters,
         selected_games_filter=games_filter,
         wards_by_interval=wards_by_interval,
+        density_intervals=density_intervals,
+        selected_view=selected_view,
+        ward_types=WARD_CATEGORIES,
         stats=stats_or_error,
         available_champions=available_champions,
         selected_champion=selected_champion
     )
 
+@app.route('/wards/heatmap.png')
+def wards_heatmap():
+    png_bytes = get_ward_heatmap_png(
+        selected_team_full_name=request.args.get('team'),
+        selected_role=request.args.get('role', 'All'),
+        games_filter=request.args.get('games_filter', '20'),
+        selected_champion=request.args.get('champion', 'All'),
+        bucket=request.args.get('bucket', type=int),
+        ward_type=request.args.get('ward_type', 'All'),
+        tournament_id=resolve_tournament_arg(request.args.get('tournament'))
+    )
+    if png_bytes is None:
+        return Response(status=404)
+    return Response(png_bytes, mimetype='image/png')
+
 @app.route('/proximity')
 def proximity():
     selected_team = request.args.get('team')
@@ -215,12 +297,13 @@ def proximity():
         all_teams, proximity_stats, players_in_role = get_proximity_data(
             selected_team_full_name=selected_team,
             selected_role=selected_role,
-            games_filter=games_filter
+            games_filter=games_filter,
+            tournament_id=resolve_tournament_arg(request.args.get('tournament'))
         )
     except Exception as e:
-        log_message(f"Error in /proximity data aggregation: {e}")
+        log_message(f"Error in /proximity data aggregation: {e}", level="error")
         import traceback
-        log_message(traceback.format_exc())
+        log_message(traceback.format_exc(), level="error")
         flash(f"Error loading proximity data: {e}", "error")
         proximity_stats = {"error": "Failed to load proximity data."}
 
@@ -249,12 +332,13 @@ def start_positions():
         all_teams, stats, available_champions = get_start_positions_data(
             selected_team_full_name=selected_team,
             selected_champion=selected_champion,
-            games_filter=games_filter
+            games_filter=games_filter,
+            tournament_id=resolve_tournament_arg(request.args.get('tournament'))
         )
     except Exception as e:
-        log_message(f"Error in /start_positions data aggregation: {e}")
+        log_message(f"Error in /start_positions data aggregation: {e}", level="error")
         import traceback
-        log_message(traceback.format_exc())
+        log_message(traceback.format_exc(), level="error")
         flash(f"Error loading start position data: {e}", "error")
         stats = {"error": "Failed to load start position data."}
 
@@ -289,15 +373,14 @@ def soloq():
         flash(f"Team '{target_team_roster_key}' not found in SoloQ rosters configuration.", "error")
     else:
         players = list(TEAM_ROSTERS[target_team_roster_key].keys())
-        for player in players:
-            try:
-                player_stats_all[player] = aggregate_soloq_data_from_db(
-                    player, selected_time_filter, date_from_str, date_to_str
-                )
-            except Exception as e:
-                log_message(f"Error aggregating SoloQ data for {player}: {e}")
-                flash(f"Could not load SoloQ stats for {player}: {e}", "warning")
-                player_stats_all[player] = []
+        try:
+            player_stats_all = aggregate_soloq_roster_data(
+                target_team_roster_key, selected_time_filter, date_from_str, date_to_str
+            )
+        except Exception as e:
+            log_message(f"Error aggregating SoloQ roster data for {target_team_roster_key}: {e}", level="error")
+            flash(f"Could not load SoloQ stats for {target_team_roster_key}: {e}", "warning")
+            player_stats_all = {player: [] for player in players}
 
     selected_player_viz = request.args.get('viz_player', players[0] if players else None)
     selected_agg_type = request.args.get('agg_type', 'Day')
@@ -306,7 +389,7 @@ def soloq():
         try:
             activity_data = get_soloq_activity_data(selected_player_viz, selected_agg_type)
         except Exception as e:
-            log_message(f"Error getting SoloQ activity for {selected_player_viz}: {e}")
+            log_message(f"Error getting SoloQ activity for {selected_player_viz}: {e}", level="error")
             flash(f"Could not load activity data for {selected_player_viz}: {e}", "warning")
 
     return render_template(
@@ -326,7 +409,7 @@ def update_soloq_route():
     log_message("Получен запрос на обновление данных SoloQ...")
     api_key = os.getenv("RIOT_API_KEY")
     if not api_key:
-        log_message("Update SoloQ failed: RIOT_API_KEY is not set in environment.")
+        log_message("Update SoloQ failed: RIOT_API_KEY is not set in environment.", level="error")
         flash("Error: Riot API Key is not configured.", "error")
         return redirect(url_for('soloq'))
 
@@ -335,20 +418,29 @@ def update_soloq_route():
         flash(f"Team '{target_team_roster_key}' not found in SoloQ rosters.", "error")
         return redirect(url_for('soloq'))
 
-    players = list(TEAM_ROSTERS[target_team_roster_key].keys())
+    # Опциональный backfill: листаем историю назад до указанной даты вместо синхронизации по watermark
+    backfill_from_ts = None
+    backfill_from_str = request.form.get('backfill_from')
+    if backfill_from_str:
+        try:
+            backfill_from_ts = int(datetime.strptime(backfill_from_str, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            flash(f"Invalid backfill date '{backfill_from_str}'. Use YYYY-MM-DD.", "error")
+            return redirect(request.referrer or url_for('soloq'))
+
     total_added_count = 0
     update_errors = 0
-    for player in players:
-        try:
-            added_count = fetch_and_store_soloq_data(player)
+    try:
+        added_by_player = fetch_and_store_soloq_roster(target_team_roster_key, backfill_from_ts=backfill_from_ts)
+        for player, added_count in added_by_player.items():
             if added_count == -1: update_errors += 1
             elif added_count > 0: total_added_count += added_count
-        except Exception as e:
-            update_errors += 1
-            log_message(f"Error during SoloQ update for player {player}: {e}")
-            import traceback
-            log_message(traceback.format_exc())
-            flash(f"Failed to update SoloQ data for {player}: {e}", "error")
+    except Exception as e:
+        update_errors += 1
+        log_message(f"Error during SoloQ update for {target_team_roster_key}: {e}", level="error")
+        import traceback
+        log_message(traceback.format_exc(), level="error")
+        flash(f"Failed to update SoloQ data for {target_team_roster_key}: {e}", "error")
 
     if update_errors == 0:
         if total_added_count > 0: flash(f"Successfully added {total_added_count} new SoloQ game(s)!", "success")
@@ -371,12 +463,13 @@ def swap():
         all_teams, stats, available_champions = get_swap_data(
             selected_team_full_name=selected_team,
             selected_champion=selected_champion,
-            games_filter=games_filter
+            games_filter=games_filter,
+            tournament_id=resolve_tournament_arg(request.args.get('tournament'))
         )
     except Exception as e:
-        log_message(f"Error in /swap data aggregation: {e}")
+        log_message(f"Error in /swap data aggregation: {e}", level="error")
         import traceback
-        log_message(traceback.format_exc())
+        log_message(traceback.format_exc(), level="error")
         flash(f"Error loading swap data: {e}", "error")
         stats = {"error": "Failed to load swap data."}
 
@@ -392,6 +485,42 @@ def swap():
     )
 # --- КОНЕЦ НОВОГО МАРШРУТА ---
 
+@app.route('/champion')
+@app.route('/champion/<path:champion_name>')
+def champion(champion_name=None):
+    # Форма выбора отправляет ?champion=, страница чемпиона живёт по /champion/<name>
+    if request.args.get('champion'):
+        return redirect(url_for('champion', champion_name=request.args['champion'], tournament=request.args.get('tournament') or None))
+
+    available_champions, stats = [], {}
+    try:
+        available_champions, stats = get_champion_stats(
+            champion_name,
+            tournament_id=resolve_tournament_arg(request.args.get('tournament'))
+        )
+    except Exception as e:
+        log_message(f"Error in /champion data aggregation: {e}", level="error")
+        import traceback
+        log_message(traceback.format_exc(), level="error")
+        flash(f"Error loading champion data: {e}", "error")
+        stats = {"error": "Failed to load champion data."}
+
+    return render_template('champion.html', available_champions=available_champions,
+                           selected_champion=stats.get("champion") or champion_name, stats=stats)
+
+@app.route('/ingest/runs')
+def ingest_runs():
+    """Отчёт по прогонам ingest: где тратится время обновления (GRID API, парсинг, SQLite)."""
+    tournament_arg = request.args.get('tournament')
+    runs = get_ingest_runs(limit=50, tournament_id=tournament_arg if tournament_arg and tournament_arg != 'all' else None)
+    selected_run = None
+    run_arg = request.args.get('run', type=int)
+    if run_arg is not None:
+        selected_run = get_ingest_run(run_arg)
+    elif runs:
+        selected_run = get_ingest_run(runs[0]["run_id"])
+    return render_template('ingest_runs.html', runs=runs, selected_run=selected_run)
+
 if __name__ == '__main__':
     port = int(os.getenv("PORT", 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,589 @@
+# lol_app_LTA_2/benchmark.py
+"""
+Воспроизводимый бенчмарк: синтетический турнир (summary + multi-MB livestats) и замеры
+всех экстракторов, save_* функций и функций страниц на 50 / 500 / 5000 играх.
+
+Запуск:
+    python benchmark.py                          # размеры 50,500,5000, результат в benchmark_results/
+    python benchmark.py --sizes 50,500 --repeat 5
+    python benchmark.py --compare benchmark_results/<старый>.json
+
+Экстракторы гоняются на пуле из --pool сгенерированных livestats (не зависят от размера турнира).
+Для наполнения БД результаты экстракции пула переиспользуются: игроки/чемпионы/game_id в них -
+плейсхолдеры, которые подменяются на значения конкретной игры, поэтому save_* пишут в базу
+столько же строк, сколько при реальном ingest. Страницы замеряются "холодными": перед каждым
+вызовом поднимается data generation, что сбрасывает кэши реестра команд и плотности вардов.
+Данные Data Dragon подставляются из фикстуры, сеть не используется.
+
+Объём: при --stats-interval 1.0 одна игра даёт ~19k строк player_positions_timeline (~3 MB базы),
+так что 5000 игр требуют ~15 GB диска в --workdir; для быстрых прогонов - --sizes 50,500.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+
+import database
+import scrims_logic
+import tournament_logic as tl
+from database import bump_data_generation, init_db
+from error_handler import AppLogger
+from jng_clear_logic import get_jng_clear_data
+from objects_logic import get_objects_data
+from start_positions_logic import get_start_positions_data
+from swap_logic import get_swap_data
+from ward_density import get_ward_density_data, get_ward_heatmap_png
+
+_basedir = os.path.abspath(os.path.dirname(__file__))
+
+DEFAULT_SIZES = (50, 500, 5000)
+RESULTS_DIR = os.path.join(_basedir, "benchmark_results")
+# Во сколько раз медиана должна вырасти, чтобы --compare пометил регрессию
+REGRESSION_RATIO = 1.2
+
+CHAMPIONS = {
+    "Aatrox": 266, "Ahri": 103, "Akali": 84, "Alistar": 12, "Ashe": 22, "Azir": 268, "Bard": 432,
+    "Braum": 201, "Caitlyn": 51, "Camille": 164, "Corki": 42, "Ezreal": 81, "Gnar": 150, "Gragas": 79,
+    "Gwen": 887, "Jax": 24, "Jayce": 126, "Jinx": 222, "Kai'Sa": 145, "Kalista": 429, "Karma": 43,
+    "K'Sante": 897, "Kindred": 203, "Lee Sin": 64, "Leona": 89, "Lulu": 117, "Lucian": 236, "Maokai": 57,
+    "Nautilus": 111, "Nidalee": 76, "Orianna": 61, "Poppy": 78, "Rakan": 497, "Renekton": 58,
+    "Rell": 526, "Rumble": 68, "Sejuani": 113, "Skarner": 72, "Syndra": 134, "Taliyah": 163,
+    "Thresh": 412, "Varus": 110, "Vi": 254, "Viego": 234, "Wukong": 62, "Xayah": 498, "Xin Zhao": 5,
+    "Yone": 777, "Zeri": 221, "Ziggs": 115
+}
+ROLES = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+# Опорные точки ролей (синяя сторона; красная - зеркально 14800 - x, 14800 - z)
+_ROLE_ANCHORS = {"TOP": (1800, 11500), "MIDDLE": (6500, 6800), "BOTTOM": (11500, 1800), "UTILITY": (11000, 2400)}
+_BLUE_CAMPS = [
+    ("blueCamp", 3800, 7900), ("gromp", 2100, 8400), ("wolf", 3800, 6500),
+    ("raptor", 6900, 5400), ("redCamp", 7800, 4100), ("krug", 8400, 2700)
+]
+_SCUTTLES = [(4400, 9600), (10500, 5100)]
+_DRAGON_PIT, _BARON_PIT = (9800, 4400), (5000, 10400)
+_DRAGON_TYPES = ["fire", "water", "earth", "air", "hextech", "chemtech"]
+_WARD_TYPES = [("yellowTrinket", 0.6), ("control", 0.25), ("blueTrinket", 0.15)]
+_TURRETS = [(lane, tier) for lane in ("top", "mid", "bot") for tier in ("outer", "inner", "inhibitor")]
+
+
+def _mirror(x, z, team_id):
+    return (x, z) if team_id == 100 else (14800 - x, 14800 - z)
+
+
+def _clamp(value):
+    return max(300, min(14500, int(value)))
+
+
+# --- Синтетические данные ---
+def make_participants_template():
+    """Участники пула livestats: puuid/имя/чемпион - плейсхолдеры, см. rebind()."""
+    return [{
+        "participantId": pid, "puuid": f"@P{pid}@", "riotIdGameName": f"@N{pid}@",
+        "championName": f"@C{pid}@", "teamId": 100 if pid <= 5 else 200
+    } for pid in range(1, 11)]
+
+
+def make_livestats(rng, game_seconds, stats_interval=1.0, stats_fields=40):
+    """
+    JSONL livestats одной игры: stats_update каждые stats_interval секунд (позиции 10 игроков
+    и stats_fields статов у каждого), ward_placed, epic_monster_kill (кэмпы лесников и эпики),
+    building_destroyed, channeling_started (recall) и champion_kill.
+    """
+    events = []
+    junglers = {2: 100, 7: 200}
+
+    # Лесники: first clear из 6 кэмпов своей стороны + recall, дальше кэмпы/скаттлы/эпики с recall'ами
+    for pid, team_id in junglers.items():
+        clock = 90.0
+        for name, x, z in rng.sample(_BLUE_CAMPS, len(_BLUE_CAMPS)):
+            x, z = _mirror(x, z, team_id)
+            events.append((clock, {"rfc461Schema": "epic_monster_kill", "killer": pid, "killerTeamId": team_id, "monsterType": name, "position": {"x": x, "z": z}}))
+            clock += rng.uniform(14, 24)
+        events.append((clock, {"rfc461Schema": "channeling_started", "channelingType": "recall", "participantID": pid}))
+        clock += rng.uniform(20, 40)
+        while clock < game_seconds - 30:
+            roll = rng.random()
+            if roll < 0.7:
+                name, x, z = rng.choice(_BLUE_CAMPS)
+                x, z = _mirror(x, z, team_id if rng.random() < 0.8 else 300 - team_id)
+                events.append((clock, {"rfc461Schema": "epic_monster_kill", "killer": pid, "killerTeamId": team_id, "monsterType": name, "position": {"x": x, "z": z}}))
+            elif roll < 0.85:
+                x, z = rng.choice(_SCUTTLES)
+                events.append((clock, {"rfc461Schema": "epic_monster_kill", "killer": pid, "killerTeamId": team_id, "monsterType": "ScuttleCrab", "position": {"x": x, "z": z}}))
+            else:
+                events.append((clock, {"rfc461Schema": "channeling_started", "channelingType": "recall", "participantID": pid}))
+            clock += rng.uniform(25, 70)
+
+    # Эпики: гриби, драконы, барон
+    for grub_time in (360, 365, 370, 600, 605, 610):
+        pid = rng.choice(list(junglers))
+        events.append((grub_time + rng.uniform(0, 20), {"rfc461Schema": "epic_monster_kill", "killer": pid, "killerTeamId": junglers[pid], "monsterType": "VoidGrub", "position": {"x": _BARON_PIT[0], "z": _BARON_PIT[1]}}))
+    for dragon_time in range(300, game_seconds - 60, 330):
+        pid = rng.choice(list(junglers))
+        events.append((dragon_time + rng.uniform(0, 60), {"rfc461Schema": "epic_monster_kill", "killer": pid, "killerTeamId": junglers[pid], "monsterType": "dragon", "dragonType": rng.choice(_DRAGON_TYPES), "position": {"x": _DRAGON_PIT[0], "z": _DRAGON_PIT[1]}}))
+    if game_seconds > 1300:
+        pid = rng.choice(list(junglers))
+        events.append((rng.uniform(1250, game_seconds - 30), {"rfc461Schema": "epic_monster_kill", "killer": pid, "killerTeamId": junglers[pid], "monsterType": "baron", "position": {"x": _BARON_PIT[0], "z": _BARON_PIT[1]}}))
+
+    # Башни: внешние раньше внутренних
+    for index, (lane, tier) in enumerate(rng.sample(_TURRETS, rng.randint(5, len(_TURRETS)))):
+        owner = rng.choice((100, 200))
+        tier_offset = {"outer": 0, "inner": 300, "inhibitor": 600}[tier]
+        events.append((min(game_seconds - 5, 600 + tier_offset + rng.uniform(0, 600)), {
+            "rfc461Schema": "building_destroyed", "buildingType": "turret", "lane": lane, "turretTier": tier,
+            "teamID": owner, "lastHitter": rng.randint(1, 5) if owner == 200 else rng.randint(6, 10)
+        }))
+
+    # Варды: ~8 на игрока за 10 минут
+    for pid in range(1, 11):
+        team_id = 100 if pid <= 5 else 200
+        for _ in range(int(game_seconds / 75)):
+            ward_type = rng.choices([w for w, _ in _WARD_TYPES], [p for _, p in _WARD_TYPES])[0]
+            x, z = _mirror(rng.uniform(2500, 12300), rng.uniform(2500, 12300), team_id)
+            events.append((rng.uniform(20, game_seconds), {"rfc461Schema": "ward_placed", "placer": pid, "wardType": ward_type, "position": {"x": _clamp(x), "z": _clamp(z)}}))
+
+    # Recall'ы и убийства остальных игроков
+    for pid in (1, 3, 4, 5, 6, 8, 9, 10):
+        for recall_time in range(240, game_seconds, rng.randint(180, 300)):
+            events.append((recall_time + rng.uniform(0, 30), {"rfc461Schema": "channeling_started", "channelingType": "recall", "participantID": pid}))
+    for _ in range(int(game_seconds / 60)):
+        killer = rng.randint(1, 10)
+        events.append((rng.uniform(120, game_seconds), {"rfc461Schema": "champion_kill", "killer": killer, "victim": rng.randint(6, 10) if killer <= 5 else rng.randint(1, 5)}))
+
+    # stats_update: случайное блуждание вокруг опорной точки роли, лесник - по джунглям
+    positions = {}
+    for pid in range(1, 11):
+        team_id = 100 if pid <= 5 else 200
+        role = ROLES[(pid - 1) % 5]
+        anchor = (4500, 6000) if role == "JUNGLE" else _ROLE_ANCHORS[role]
+        positions[pid] = list(_mirror(anchor[0], anchor[1], team_id))
+    base_positions = {pid: tuple(pos) for pid, pos in positions.items()}
+    tick = 0.0
+    while tick <= game_seconds:
+        participants = []
+        for pid in range(1, 11):
+            pos = positions[pid]
+            base_x, base_z = base_positions[pid]
+            pos[0] = _clamp(pos[0] + rng.uniform(-350, 350) + (base_x - pos[0]) * 0.05)
+            pos[1] = _clamp(pos[1] + rng.uniform(-350, 350) + (base_z - pos[1]) * 0.05)
+            participants.append({
+                "participantID": pid, "puuid": f"@P{pid}@", "championName": f"@C{pid}@", "teamId": 100 if pid <= 5 else 200,
+                "level": min(18, 1 + int(tick // 100)), "totalGold": int(500 + tick * 7), "currentHealth": 1000,
+                "position": {"x": pos[0], "z": pos[1]},
+                "stats": [{"name": f"STAT_{k}", "value": rng.randint(0, 5000)} for k in range(stats_fields)]
+            })
+        events.append((tick, {"rfc461Schema": "stats_update", "participants": participants}))
+        tick += stats_interval
+
+    events.sort(key=lambda item: item[0])
+    lines = []
+    for seconds, event in events:
+        # gameTime 0 у первого stats_update экстракторы трактуют как отсутствие времени
+        event["gameTime"] = max(int(seconds * 1000), 1)
+        lines.append(json.dumps(event, separators=(",", ":")))
+    return "\n".join(lines)
+
+
+def make_game_summary(game_id, game_index, blue_tag, red_tag, rosters, champions, blue_wins, game_seconds):
+    participants = []
+    for index in range(10):
+        tag = blue_tag if index < 5 else red_tag
+        role = ROLES[index % 5]
+        participants.append({
+            "participantId": index + 1, "puuid": rosters[tag][role], "riotIdGameName": f"{tag} {role.title()}",
+            "championName": champions[index], "teamId": 100 if index < 5 else 200
+        })
+    ban_ids = list(CHAMPIONS.values())
+    return {
+        "esportsGameId": game_id, "gameId": game_id, "participants": participants,
+        "gameDuration": game_seconds, "gameCreation": 1735689600000 + game_index * 3600 * 1000,
+        "gameVersion": f"15.{1 + game_index % 20}.1",
+        "teams": [
+            {"teamId": 100, "win": blue_wins, "bans": [{"championId": ban_ids[(game_index + k) % len(ban_ids)], "pickTurn": k + 1} for k in range(5)]},
+            {"teamId": 200, "win": not blue_wins, "bans": [{"championId": ban_ids[(game_index + 7 + k) % len(ban_ids)], "pickTurn": k + 1} for k in range(5)]}
+        ]
+    }
+
+
+def make_draft_actions(rng, champions):
+    """20 действий драфта: баны 1-6 и 13-16, пики в порядке турнирного драфта."""
+    bans = rng.sample([name for name in CHAMPIONS if name not in champions], 10)
+    pick_order = [0, 5, 6, 1, 2, 7, 8, 3, 4, 9]
+    actions, ban_index, pick_index = [], 0, 0
+    for sequence in range(1, 21):
+        is_ban = sequence in (1, 2, 3, 4, 5, 6, 13, 14, 15, 16)
+        blue_turn = sequence % 2 == 1
+        if is_ban:
+            name = bans[ban_index]; ban_index += 1
+        else:
+            slot = pick_order[pick_index]; pick_index += 1
+            name = champions[slot]
+            blue_turn = slot < 5
+        actions.append({
+            "sequenceNumber": sequence, "type": "ban" if is_ban else "pick", "id": f"a{sequence}",
+            "drafter": {"id": "blue" if blue_turn else "red"}, "draftable": {"name": name, "id": str(CHAMPIONS[name])}
+        })
+    return actions
+
+
+def rebind(value, mapping):
+    """Копия результата экстракции с плейсхолдерами (@P1@, @GAME@, ...), заменёнными по mapping."""
+    if isinstance(value, dict):
+        return {mapping.get(key, key): rebind(item, mapping) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rebind(item, mapping) for item in value]
+    if isinstance(value, str):
+        return mapping.get(value, value)
+    return value
+
+
+# --- Замеры ---
+class Timings:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.bytes = defaultdict(int)
+
+    @contextmanager
+    def measure(self, name, size=0):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - started)
+            self.bytes[name] += size
+
+    def summary(self):
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            total = sum(ordered)
+            stats = {
+                "calls": len(ordered),
+                "total_s": round(total, 4),
+                "mean_ms": round(total / len(ordered) * 1000, 3),
+                "median_ms": round(statistics.median(ordered) * 1000, 3),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+            if self.bytes[name] and total > 0:
+                stats["mb_per_s"] = round(self.bytes[name] / total / 1e6, 2)
+            result[name] = stats
+        return result
+
+
+_devnull = None
+
+
+@contextmanager
+def _silenced():
+    """print внутри замеряемого кода - в /dev/null, логгер приложения выключен (прогресс бенчмарка пишется в stderr)."""
+    global _devnull
+    if _devnull is None:
+        _devnull = open(os.devnull, "w")
+    app_logger = AppLogger.get_logger()
+    level = app_logger.level
+    app_logger.setLevel(logging.CRITICAL + 1)
+    try:
+        with redirect_stdout(_devnull):
+            yield
+    finally:
+        app_logger.setLevel(level)
+
+
+def _progress(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+EXTRACTORS = (
+    ("extract_objective_events", lambda content, summary: tl.extract_objective_events(content, "@GAME@", summary)),
+    ("extract_player_positions_timeline", lambda content, summary: tl.extract_player_positions_timeline(content, "@GAME@")),
+    ("extract_jungle_timelines", lambda content, summary: tl.extract_jungle_timelines(content, "@GAME@", summary)),
+    ("extract_jungle_paths", lambda content, summary: tl.extract_jungle_paths(content, "@GAME@", summary)),
+    ("extract_player_positions", lambda content, summary: tl.extract_player_positions(content, "@GAME@", tl.TARGET_POSITION_TIMESTAMPS_SEC, tl.TIMESTAMP_TOLERANCE_SEC)),
+    ("extract_first_ward_data", lambda content, summary: tl.extract_first_ward_data(content, "@GAME@", summary)),
+    ("extract_all_ward_data", lambda content, summary: tl.extract_all_ward_data(content, "@GAME@", summary)),
+)
+
+
+def benchmark_extractors(pool, repeat):
+    """Каждый экстрактор на каждом livestats пула; возвращает замеры и результаты последнего прогона."""
+    timings = Timings()
+    summary = make_participants_template()
+    extracted = [{} for _ in pool]
+    for _ in range(repeat):
+        for index, content in enumerate(pool):
+            size = len(content.encode("utf-8"))
+            for name, extractor in EXTRACTORS:
+                with _silenced(), timings.measure(name, size):
+                    extracted[index][name] = extractor(content, summary)
+    return timings.summary(), extracted
+
+
+def populate_database(size, extracted_pool, rng, teams, game_seconds_pool):
+    """Заполняет БД size играми, замеряя parse_and_store_tournament_game, каждую save_* и commit."""
+    timings = Timings()
+    tags = [f"T{index:02d}" for index in range(1, teams + 1)]
+    rosters = {tag: {role: f"{tag}-{role.lower()}-puuid" for role in ROLES} for tag in tags}
+    champion_names = list(CHAMPIONS)
+    with _silenced():
+        conn = database.get_db_connection()
+        cursor = conn.cursor()
+        tl.save_tournament(cursor, tl.TARGET_TOURNAMENT_ID, "Benchmark")
+        conn.commit()
+    for game_index in range(size):
+        blue_tag = tags[game_index % teams]
+        red_tag = tags[(game_index + 1 + (game_index // teams) % (teams - 1)) % teams]
+        champions = rng.sample(champion_names, 10)
+        game_id = f"BENCH-{game_index:05d}"
+        pool_index = game_index % len(extracted_pool)
+        summary = make_game_summary(game_id, game_index, blue_tag, red_tag, rosters, champions,
+                                    rng.random() < 0.5, game_seconds_pool[pool_index])
+        series_info = {"id": f"S{game_index // 3}", "sequenceNumber": game_index % 3 + 1}
+        mapping = {"@GAME@": game_id}
+        for participant in summary["participants"]:
+            pid = participant["participantId"]
+            mapping[f"@P{pid}@"] = participant["puuid"]
+            mapping[f"@N{pid}@"] = participant["riotIdGameName"]
+            mapping[f"@C{pid}@"] = participant["championName"]
+        extracted = extracted_pool[pool_index]
+
+        with _silenced():
+            with timings.measure("parse_and_store_tournament_game"):
+                tl.parse_and_store_tournament_game(cursor, summary, series_info, make_draft_actions(rng, champions),
+                                                   "Benchmark", tl.TARGET_TOURNAMENT_ID)
+            objective_events = rebind(extracted["extract_objective_events"], mapping)
+            with timings.measure("save_objective_events"):
+                tl.save_objective_events(conn, game_id, objective_events)
+            timeline_positions = rebind(extracted["extract_player_positions_timeline"], mapping)
+            with timings.measure("save_player_positions_timeline"):
+                tl.save_player_positions_timeline(conn, game_id, timeline_positions)
+            for puuid, timeline in rebind(extracted["extract_jungle_timelines"], mapping).items():
+                with timings.measure("save_jungle_timeline"):
+                    tl.save_jungle_timeline(conn, game_id, puuid, timeline["team_side"], timeline["events"], timeline["first_clear_length"])
+                with timings.measure("save_jungle_path"):
+                    tl.save_jungle_path(conn, game_id, puuid, timeline["events"][:timeline["first_clear_length"]])
+            for timestamp_sec, positions in rebind(extracted["extract_player_positions"], mapping).items():
+                with timings.measure("save_position_snapshot"):
+                    tl.save_position_snapshot(conn, game_id, timestamp_sec, positions)
+            first_wards = rebind(extracted["extract_first_ward_data"], mapping)
+            with timings.measure("save_first_ward_data"):
+                tl.save_first_ward_data(conn, game_id, first_wards)
+            all_wards = rebind(extracted["extract_all_ward_data"], mapping)
+            with timings.measure("save_all_ward_data"):
+                tl.save_all_ward_data(conn, game_id, all_wards)
+            with timings.measure("commit"):
+                bump_data_generation(cursor)
+                conn.commit()
+        if (game_index + 1) % 500 == 0:
+            _progress(f"  populated {game_index + 1}/{size} games")
+    conn.close()
+    return timings.summary(), tags
+
+
+def benchmark_views(team, repeat):
+    """Функции страниц с фильтрами по умолчанию из app.py; перед каждым вызовом - новая data generation."""
+    tournament_id = tl.TARGET_TOURNAMENT_ID
+    views = (
+        ("aggregate_tournament_data[overall]", lambda: tl.aggregate_tournament_data(None, "all", tournament_id=tournament_id)),
+        ("aggregate_tournament_data[team]", lambda: tl.aggregate_tournament_data(team, "all", tournament_id=tournament_id)),
+        ("get_proximity_data", lambda: tl.get_proximity_data(team, "JUNGLE", "20", tournament_id=tournament_id)),
+        ("get_all_wards_data", lambda: tl.get_all_wards_data(team, "All", "20", "All", tournament_id=tournament_id)),
+        ("get_ward_density_data", lambda: get_ward_density_data(team, "All", "20", "All", tournament_id=tournament_id)),
+        ("get_ward_heatmap_png", lambda: get_ward_heatmap_png(team, "All", "20", "All", 0, tournament_id=tournament_id)),
+        ("get_jng_clear_data", lambda: get_jng_clear_data(team, "All", tournament_id=tournament_id)),
+        ("get_objects_data", lambda: get_objects_data(team, tournament_id=tournament_id)),
+        ("get_swap_data", lambda: get_swap_data(team, "All", "10", tournament_id=tournament_id)),
+        ("get_start_positions_data", lambda: get_start_positions_data(team, "All", "10", tournament_id=tournament_id)),
+    )
+    timings = Timings()
+    errors = {}
+    for name, view in views:
+        for _ in range(repeat):
+            with _silenced():
+                conn = database.get_db_connection()
+                bump_data_generation(conn)
+                conn.commit()
+                conn.close()
+                try:
+                    with timings.measure(name):
+                        view()
+                except Exception as e:
+                    errors[name] = f"{type(e).__name__}: {e}"
+    return timings.summary(), errors
+
+
+def _table_row_counts(db_path):
+    conn = database.sqlite3.connect(db_path)
+    try:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in sorted(tables)}
+    finally:
+        conn.close()
+
+
+def _git_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=_basedir, capture_output=True, text=True, timeout=30).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=_basedir,
+                                    capture_output=True, text=True, timeout=60).stdout.strip())
+        return commit or None, dirty
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+
+
+def _seed_champion_data():
+    """Фикстура Data Dragon вместо сетевого запроса (иконки строятся из неё)."""
+    id_map = {str(champion_id): name for name, champion_id in CHAMPIONS.items()}
+    name_map = {name: scrims_logic.normalize_champion_name_for_ddragon(name) for name in CHAMPIONS}
+    now = time.time()
+    scrims_logic._champion_data_cache["champion_data"] = {"data": {"id_map": id_map, "name_map": name_map}, "timestamp": now}
+    scrims_logic._latest_patch_cache = "15.1.1"
+    scrims_logic._patch_cache_time = now
+
+
+def run_benchmark(sizes, repeat=3, pool_size=8, teams=10, seed=42, stats_interval=1.0, workdir=None, keep_db=False):
+    rng = random.Random(seed)
+    _seed_champion_data()
+    commit, dirty = _git_info()
+    result = {
+        "meta": {
+            "commit": commit, "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "sizes": list(sizes), "repeat": repeat, "pool": pool_size, "teams": teams,
+            "seed": seed, "stats_interval": stats_interval,
+        },
+        "livestats": {},
+        "extractors": {},
+        "sizes": {},
+    }
+
+    _progress(f"Generating {pool_size} livestats files...")
+    game_seconds_pool = [rng.randint(25 * 60, 38 * 60) for _ in range(pool_size)]
+    pool = [make_livestats(rng, seconds, stats_interval) for seconds in game_seconds_pool]
+    pool_bytes = [len(content.encode("utf-8")) for content in pool]
+    result["livestats"] = {
+        "files": pool_size, "mean_mb": round(sum(pool_bytes) / len(pool_bytes) / 1e6, 2),
+        "max_mb": round(max(pool_bytes) / 1e6, 2), "mean_lines": round(sum(content.count("\n") + 1 for content in pool) / pool_size)
+    }
+
+    _progress("Timing extractors...")
+    result["extractors"], extracted_pool = benchmark_extractors(pool, repeat)
+    del pool
+
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="lol_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    original_db_path = database.DATABASE_PATH
+    try:
+        for size in sizes:
+            db_path = os.path.join(workdir, f"bench_{size}.db")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            database.DATABASE_PATH = db_path
+            with _silenced():
+                init_db(force=True)
+            _progress(f"Populating {size} games...")
+            started = time.perf_counter()
+            save_stats, tags = populate_database(size, extracted_pool, random.Random(seed + size), teams, game_seconds_pool)
+            populate_seconds = time.perf_counter() - started
+            _progress(f"Timing views at {size} games...")
+            view_stats, view_errors = benchmark_views(tags[0], repeat)
+            result["sizes"][str(size)] = {
+                "populate_s": round(populate_seconds, 2),
+                "db_mb": round(os.path.getsize(db_path) / 1e6, 2),
+                "rows": _table_row_counts(db_path),
+                "save": save_stats,
+                "views": view_stats,
+                "view_errors": view_errors,
+            }
+            if not keep_db:
+                os.remove(db_path)
+    finally:
+        database.DATABASE_PATH = original_db_path
+        if own_workdir and not keep_db:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def compare_results(current, previous, threshold=REGRESSION_RATIO):
+    """Строки сравнения медиан (текущий / предыдущий) для общих замеров; регрессии помечены '!'."""
+    lines = []
+
+    def compare_section(label, current_stats, previous_stats):
+        for name, stats in current_stats.items():
+            old = previous_stats.get(name)
+            if not old or not old.get("median_ms"):
+                continue
+            ratio = stats["median_ms"] / old["median_ms"]
+            marker = "!" if ratio >= threshold else " "
+            lines.append(f"{marker} {label:<14} {name:<40} {old['median_ms']:>10.2f} -> {stats['median_ms']:>10.2f} ms  x{ratio:.2f}")
+
+    compare_section("extractors", current.get("extractors", {}), previous.get("extractors", {}))
+    for size, size_stats in current.get("sizes", {}).items():
+        previous_size = previous.get("sizes", {}).get(size, {})
+        compare_section(f"save@{size}", size_stats.get("save", {}), previous_size.get("save", {}))
+        compare_section(f"views@{size}", size_stats.get("views", {}), previous_size.get("views", {}))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic tournament benchmark for extractors, save_* and view functions.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES), help="Comma separated game counts (default: 50,500,5000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per extractor/view (default: 3)")
+    parser.add_argument("--pool", type=int, default=8, help="Distinct synthetic livestats files (default: 8)")
+    parser.add_argument("--teams", type=int, default=10, help="Teams in the synthetic tournament (default: 10)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stats-interval", type=float, default=1.0, help="Seconds between stats_update events (default: 1.0)")
+    parser.add_argument("--output", help="Result JSON path (default: benchmark_results/<UTC time>_<commit>.json)")
+    parser.add_argument("--compare", help="Previous result JSON to compare medians against")
+    parser.add_argument("--workdir", help="Directory for benchmark databases (default: temporary)")
+    parser.add_argument("--keep-db", action="store_true", help="Keep the generated databases")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    result = run_benchmark(sizes, repeat=args.repeat, pool_size=args.pool, teams=args.teams, seed=args.seed,
+                           stats_interval=args.stats_interval, workdir=args.workdir, keep_db=args.keep_db)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{(result['meta']['commit'] or 'nogit')[:8]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    _progress(f"Results written to {output}")
+
+    for size, size_stats in result["sizes"].items():
+        _progress(f"{size} games: populate {size_stats['populate_s']}s, db {size_stats['db_mb']} MB")
+        for name, stats in size_stats["views"].items():
+            _progress(f"  {name:<40} median {stats['median_ms']:>10.2f} ms")
+        for name, error in size_stats["view_errors"].items():
+            _progress(f"  {name:<40} ERROR {error}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        lines = compare_results(result, previous)
+        _progress(f"Compared with {args.compare} ({previous.get('meta', {}).get('commit')}):")
+        for line in lines:
+            _progress(line)
+        return 1 if any(line.startswith("!") for line in lines) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# lol_app_LTA_2/champion_logic.py
+"""
+Страница чемпиона поверх индекса champion_games.
+
+champion_games - строка на чемпиона в игре: пик (с ролью) или бан стороны, плюс исход для
+этой стороны. Пишется при ingest рядом с tournament_games, кластеризован по чемпиону
+(WITHOUT ROWID, PRIMARY KEY начинается с champion), поэтому выборка "все игры чемпиона X"
+- это один диапазон индекса и lookup по Game_ID, а не скан 20 колонок каждой игры.
+Пики хранятся по имени, баны - по ключу Riot (как в tournament_games).
+"""
+
+import sqlite3
+import traceback
+from collections import defaultdict
+
+from database import get_db_connection
+from draft_analytics import PICK, ROLES, ROLE_ABBR, SIDES, get_draft_table
+from request_timing import traced
+from scrims_logic import get_champion_data, get_champion_icon_html, log_message
+
+RECENT_GAMES_LIMIT = 20
+
+
+def _present(value):
+    return value is not None and value != "" and value != "N/A"
+
+
+def _win_rate(wins, games):
+    return round(wins / games * 100, 1) if games else 0.0
+
+
+# --- Таблица champion_games ---
+def champion_game_columns():
+    """Колонки tournament_games, из которых строится индекс."""
+    lineup = [f"{side}_{ROLE_ABBR[role]}_Champ" for side in SIDES for role in ROLES]
+    bans = [f"{side}_Ban_{i}_ID" for side in SIDES for i in range(1, 6)]
+    return ["Game_ID", "Winner_Side", *lineup, *bans]
+
+
+def champion_game_rows(game):
+    """Строка tournament_games (dict/Row с колонками champion_game_columns) -> строки champion_games."""
+    game_id, winner = game["Game_ID"], game["Winner_Side"]
+    rows = []
+    for side in SIDES:
+        win = int(winner == side) if winner in SIDES else None
+        for role in ROLES:
+            champ = game[f"{side}_{ROLE_ABBR[role]}_Champ"]
+            if _present(champ):
+                rows.append((str(champ), str(game_id), side, "pick", role, win))
+        for i in range(1, 6):
+            ban = game[f"{side}_Ban_{i}_ID"]
+            if _present(ban):
+                rows.append((str(ban), str(game_id), side, "ban", None, win))
+    return rows
+
+
+_INSERT_CHAMPION_GAMES_SQL = """
+    INSERT OR REPLACE INTO {schema}.champion_games (champion, game_id, side, action, role, win)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def save_champion_games(cursor, game):
+    """Перезаписывает строки индекса для одной игры; возвращает число строк."""
+    rows = champion_game_rows(game)
+    cursor.execute("DELETE FROM champion_games WHERE game_id = ?", (str(game["Game_ID"]),))
+    if rows:
+        cursor.executemany(_INSERT_CHAMPION_GAMES_SQL.format(schema="main"), rows)
+    return len(rows)
+
+
+def backfill_champion_games(cursor, schema="main"):
+    """Заполняет пустую champion_games из tournament_games (игры, сохранённые до индекса)."""
+    if cursor.execute(f"SELECT 1 FROM {schema}.champion_games LIMIT 1").fetchone():
+        return 0
+    columns = champion_game_columns()
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    rows = []
+    for game in cursor.execute(f"SELECT {quoted} FROM {schema}.tournament_games").fetchall():
+        game = dict(zip(columns, game))
+        if game["Game_ID"]:
+            rows.extend(champion_game_rows(game))
+    if rows:
+        cursor.executemany(_INSERT_CHAMPION_GAMES_SQL.format(schema=schema), rows)
+    return len(rows)
+
+
+def champion_games_filter_sql(roles=None):
+    """SQL-условие "в игре взят чемпион ?" по индексу champion_games (для фильтров swap/start positions)."""
+    role_sql = f" AND role IN ({', '.join(repr(role) for role in roles)})" if roles else ""
+    return f' AND "Game_ID" IN (SELECT game_id FROM champion_games WHERE champion = ? AND action = \'pick\'{role_sql})'
+
+
+# --- Страница чемпиона ---
+def _available_champions(conn, tournament_id):
+    """Имена взятых чемпионов турнира - из кэшированной DraftTable, без отдельного запроса."""
+    table = get_draft_table(conn, tournament_id)
+    picked = set(table.champ[table.action == PICK].tolist())
+    return sorted((table.champions[code] for code in picked), key=str.casefold), table.games
+
+
+def _resolve_champion(champion_name, available_champions):
+    """Точное имя, иначе совпадение без учёта регистра (URL /champion/kaisa)."""
+    if not champion_name or champion_name in available_champions:
+        return champion_name
+    folded = champion_name.casefold()
+    return next((name for name in available_champions if name.casefold() == folded), champion_name)
+
+
+def _ban_key(champion_name, champion_data):
+    """Ключ Riot чемпиона (баны в tournament_games хранятся по нему); None - Data Dragon недоступен."""
+    for key, name in (champion_data or {}).get("id_map", {}).items():
+        if name == champion_name:
+            return key
+    return None
+
+
+@traced("aggregate")
+def get_champion_stats(champion_name, tournament_id=None):
+    """
+    Статистика чемпиона по индексу champion_games: пики/победы/баны, присутствие,
+    разрезы по стороне, роли и команде, последние игры. Возвращает (available_champions, stats).
+    """
+    conn = get_db_connection(tournament_id)
+    if not conn:
+        return [], {"error": "Database connection failed"}
+
+    available_champions = []
+    stats = {"error": None, "message": None, "champion": champion_name}
+    try:
+        available_champions, total_games = _available_champions(conn, tournament_id)
+        if not champion_name:
+            stats["message"] = "Please select a champion."
+            return available_champions, stats
+        champion_name = stats["champion"] = _resolve_champion(champion_name, available_champions)
+
+        champion_data = get_champion_data()
+        keys = [champion_name]
+        ban_key = _ban_key(champion_name, champion_data)
+        if ban_key:
+            keys.append(ban_key)
+        # tournament_logic пишет индекс при ingest и импортирует этот модуль - условие турнира здесь
+        scope_sql, scope_params = (' AND g."Tournament_ID" = ?', (str(tournament_id),)) if tournament_id else ("", ())
+        rows = conn.execute(f"""
+            SELECT c.side, c.action, c.role, c.win, g."Game_ID", g."Date", g."Patch",
+                   g."Blue_Team_Name", g."Red_Team_Name"
+            FROM champion_games c JOIN tournament_games g ON g."Game_ID" = c.game_id
+            WHERE c.champion IN ({', '.join('?' * len(keys))}){scope_sql}
+            ORDER BY g."Date" DESC
+        """, (*keys, *scope_params)).fetchall()
+
+        if not rows:
+            stats["message"] = f"No games found for {champion_name}."
+            return available_champions, stats
+
+        picks = wins = bans = 0
+        by_side = {side: {"picks": 0, "wins": 0, "bans": 0} for side in SIDES}
+        by_role = defaultdict(lambda: {"picks": 0, "wins": 0})
+        by_team = defaultdict(lambda: {"picks": 0, "wins": 0, "bans": 0})
+        by_patch = defaultdict(lambda: {"picks": 0, "wins": 0, "bans": 0})
+        recent_games = []
+        for row in rows:
+            side = row["side"]
+            team = row["Blue_Team_Name"] if side == "Blue" else row["Red_Team_Name"]
+            counters = (by_side[side], by_team[team], by_patch[row["Patch"] or "N/A"])
+            if row["action"] == "ban":
+                bans += 1
+                for counter in counters:
+                    counter["bans"] += 1
+                continue
+            win = 1 if row["win"] == 1 else 0
+            picks += 1
+            wins += win
+            for counter in (*counters, by_role[row["role"]]):
+                counter["picks"] += 1
+                counter["wins"] += win
+            if len(recent_games) < RECENT_GAMES_LIMIT:
+                recent_games.append({
+                    "game_id": row["Game_ID"], "date": row["Date"], "patch": row["Patch"],
+                    "side": side, "role": row["role"], "team": team,
+                    "opponent": row["Red_Team_Name"] if side == "Blue" else row["Blue_Team_Name"],
+                    "result": "Win" if row["win"] == 1 else ("Loss" if row["win"] == 0 else "N/A"),
+                })
+
+        def with_rates(counters, sort_key):
+            result = []
+            for name, counter in counters.items():
+                result.append({"name": name, **counter, "win_rate": _win_rate(counter["wins"], counter["picks"])})
+            return sorted(result, key=sort_key)
+
+        stats.update({
+            "icon_html": get_champion_icon_html(champion_name, champion_data, width=48, height=48),
+            "total_games": total_games,
+            "picks": picks, "wins": wins, "losses": picks - wins, "bans": bans,
+            "win_rate": _win_rate(wins, picks),
+            "presence": round((picks + bans) / total_games * 100, 1) if total_games else 0.0,
+            "by_side": with_rates(by_side, lambda item: SIDES.index(item["name"])),
+            "by_role": with_rates(by_role, lambda item: ROLES.index(item["name"]) if item["name"] in ROLES else len(ROLES)),
+            "by_team": with_rates(by_team, lambda item: (-item["picks"], -item["bans"], item["name"])),
+            "by_patch": with_rates(by_patch, lambda item: [-int(part) if part.isdigit() else 0 for part in item["name"].split(".")]),
+            "recent_games": recent_games,
+        })
+    except sqlite3.Error as e:
+        log_message(f"Database error in get_champion_stats: {e}", level="error")
+        stats["error"] = f"Database error: {e}"
+    except Exception as e:
+        log_message(f"CRITICAL Error in get_champion_stats: {e}\n{traceback.format_exc()}", level="error")
+        stats["error"] = "A critical error occurred."
+    finally:
+        conn.close()
+
+    return available_champions, stats
@@ -7,7 +7,7 @@ All environment variables and configuration constants are defined here.
 import os
 import json
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 
@@ -28,6 +28,11 @@ class DatabaseConfig:
 
         return db_path
 
+    @property
+    def archive_dir(self) -> str:
+        """Directory for archived tournaments (one attached SQLite file per tournament)"""
+        return os.path.join(self.base_dir, 'data', 'archive')
+
 
 @dataclass
 class APIConfig:
@@ -36,7 +41,10 @@ class APIConfig:
     riot_api_key: str = field(default_factory=lambda: os.getenv("RIOT_API_KEY", ""))
 
     # API Configuration
-    grid_base_url: str = "https://api.grid.gg/"
+    # Base URLs can point at a local stand-in (python mock_api_server.py) for offline ingest runs
+    grid_base_url: str = field(default_factory=lambda: os.getenv("GRID_BASE_URL", "https://api.grid.gg/").rstrip("/") + "/")
+    # {region} is filled with the routing region (europe, americas, ...); a mock URL may omit it
+    riot_base_url: str = field(default_factory=lambda: os.getenv("RIOT_BASE_URL", "https://{region}.api.riotgames.com").rstrip("/"))
     api_request_delay: float = 0.5  # Seconds between requests
 
     def validate(self) -> bool:
@@ -52,6 +60,8 @@ class TournamentConfig:
     tournament_id: str = field(default_factory=lambda: os.getenv("TOURNAMENT_ID", "827201"))
     tournament_name: str = field(default_factory=lambda: os.getenv("TOURNAMENT_NAME", "HLL Split 3"))
     match_start_date_filter: str = "2025-04-03T00:00:00Z"
+    # Additional tournaments to ingest: "id:name,id:name" (the default tournament is always included)
+    extra_tournaments: str = field(default_factory=lambda: os.getenv("TOURNAMENTS", ""))
 
     # Team mappings file path
     _team_mappings_cache: Optional[Dict[str, str]] = None
@@ -60,7 +70,18 @@ class TournamentConfig:
     def team_mappings_file(self) -> str:
         """Path to team mappings JSON file"""
         base_dir = os.path.abspath(os.path.dirname(__file__))
-        return os.path.join(base_dir, 'config', 'config/team_mappings.json')
+        return os.path.join(base_dir, 'config', 'team_mappings.json')
+
+    @property
+    def tournaments(self) -> List[Tuple[str, str]]:
+        """All configured tournaments as (tournament_id, name), default tournament first"""
+        result = [(self.tournament_id, self.tournament_name)]
+        for entry in self.extra_tournaments.split(','):
+            tournament_id, _, name = entry.strip().partition(':')
+            tournament_id = tournament_id.strip()
+            if tournament_id and tournament_id not in {tid for tid, _ in result}:
+                result.append((tournament_id, name.strip() or tournament_id))
+        return result
 
     @property
     def team_tag_to_full_name(self) -> Dict[str, str]:
@@ -198,6 +219,9 @@ class AnalyticsConfig:
     # Ward analysis
     ward_vision_radius_game_units: int = 900
 
+    # Objects page backend: "python" (events indexed in memory) or "sql" (window-function aggregates)
+    objects_backend: str = field(default_factory=lambda: os.getenv("OBJECTS_BACKEND", "python").lower())
+
 
 @dataclass
 class FlaskConfig:
@@ -209,6 +233,67 @@ class FlaskConfig:
     port: int = field(default_factory=lambda: int(os.getenv("PORT", "8080")))
 
 
+@dataclass
+class HttpCacheConfig:
+    """HTTP caching / compression configuration"""
+    enabled: bool = field(default_factory=lambda: os.getenv("HTTP_CACHE_ENABLED", "True").lower() == "true")
+    compress_min_size: int = 1024  # Bytes; smaller responses are sent as-is
+    gzip_level: int = 6
+    brotli_quality: int = 5
+    static_max_age: int = 31536000  # One year; static URLs are versioned by file mtime
+
+
+@dataclass
+class TimingConfig:
+    """Request timing / metrics configuration"""
+    enabled: bool = field(default_factory=lambda: os.getenv("REQUEST_TIMING_ENABLED", "True").lower() == "true")
+    server_timing_header: bool = field(default_factory=lambda: os.getenv("SERVER_TIMING_HEADER", "True").lower() == "true")
+    metrics_endpoint: bool = field(default_factory=lambda: os.getenv("METRICS_ENDPOINT_ENABLED", "True").lower() == "true")
+    # Метрики ingest: одна строка в ingest_runs на прогон, хранятся последние ingest_runs_keep
+    ingest_metrics: bool = field(default_factory=lambda: os.getenv("INGEST_METRICS_ENABLED", "True").lower() == "true")
+    ingest_runs_keep: int = field(default_factory=lambda: int(os.getenv("INGEST_RUNS_KEEP", "200")))
+
+
+@dataclass
+class LoggingConfig:
+    """Application logging (error_handler.AppLogger)"""
+    level: str = field(default_factory=lambda: os.getenv("LOG_LEVEL", "INFO").upper())
+    # text - "2025-01-01 12:00:00 UTC INFO :: message key=value", json - одна JSON строка на запись
+    format: str = field(default_factory=lambda: os.getenv("LOG_FORMAT", "text").lower())
+    file: str = field(default_factory=lambda: os.getenv(
+        "LOG_FILE", os.path.join(os.path.abspath(os.path.dirname(__file__)), 'logs', 'app.log')))
+    # Ротация файла лога: размер одного файла и число старых копий (app.log.1 ...)
+    file_max_bytes: int = field(default_factory=lambda: int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024))))
+    file_backup_count: int = field(default_factory=lambda: int(os.getenv("LOG_FILE_BACKUPS", "5")))
+    # Запись в stdout/файл в отдельном потоке (QueueHandler + QueueListener)
+    async_queue: bool = field(default_factory=lambda: os.getenv("LOG_ASYNC", "True").lower() == "true")
+    # Сообщения с sample=<ключ>: выводится первое и каждое N-е по ключу
+    sample_every: int = field(default_factory=lambda: int(os.getenv("LOG_SAMPLE_EVERY", "100")))
+
+
+@dataclass
+class ProfilingConfig:
+    """Opt-in sampling profiler (per request via ?_profile= / X-Profile, per ingest job via profile_ingest)"""
+    enabled: bool = field(default_factory=lambda: os.getenv("PROFILING_ENABLED", "False").lower() == "true")
+    # Обязателен для профилирования запросов и админ-страницы; без него включается только ingest
+    token: str = field(default_factory=lambda: os.getenv("PROFILING_TOKEN", ""))
+    directory: str = field(default_factory=lambda: os.getenv(
+        "PROFILES_DIR", os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data', 'profiles')))
+    interval_ms: float = field(default_factory=lambda: float(os.getenv("PROFILE_INTERVAL_MS", "5")))
+    max_seconds: float = field(default_factory=lambda: float(os.getenv("PROFILE_MAX_SECONDS", "300")))
+    keep: int = field(default_factory=lambda: int(os.getenv("PROFILES_KEEP", "50")))
+    # Профилировать каждый фоновый ingest (турнир, варды, soloq, скримы)
+    profile_ingest: bool = field(default_factory=lambda: os.getenv("PROFILE_INGEST", "False").lower() == "true")
+
+
+@dataclass
+class StartupConfig:
+    """Worker boot configuration"""
+    # Fast mode: schema DDL is skipped when PRAGMA user_version matches, zone geometry is built on first use
+    fast_startup: bool = field(default_factory=lambda: os.getenv("FAST_STARTUP", "True").lower() == "true")
+    import_time_budget_ms: int = field(default_factory=lambda: int(os.getenv("IMPORT_TIME_BUDGET_MS", "500")))
+
+
 class Config:
     """Main configuration class that aggregates all sub-configurations"""
 
@@ -220,6 +305,11 @@ class Config:
         self.soloq = SoloQConfig()
         self.analytics = AnalyticsConfig()
         self.flask = FlaskConfig()
+        self.http_cache = HttpCacheConfig()
+        self.timing = TimingConfig()
+        self.logging = LoggingConfig()
+        self.profiling = ProfilingConfig()
+        self.startup = StartupConfig()
 
         # Validate configuration
         self._validate()
@@ -254,6 +344,9 @@ API_REQUEST_DELAY = config.api.api_request_delay
 # Tournament config
 TARGET_TOURNAMENT_ID = config.tournament.tournament_id
 TARGET_TOURNAMENT_NAME_FOR_DB = config.tournament.tournament_name
+TOURNAMENTS = config.tournament.tournaments
+FAST_STARTUP = config.startup.fast_startup
+MATCH_START_DATE_FILTER = config.tournament.match_start_date_filter
 TEAM_TAG_TO_FULL_NAME = config.tournament.team_tag_to_full_name
 UNKNOWN_BLUE_TAG = config.tournament.unknown_blue_tag
 UNKNOWN_RED_TAG = config.tournament.unknown_red_tag
@@ -3,19 +3,29 @@
 
 import sqlite3
 import os
+import re
 import sys
 from datetime import datetime, timezone
 
+from error_handler import AppLogger
+from request_timing import connection_factory
+
 # Import configuration
 try:
-    from config import config, DATABASE_PATH
+    from config import config, DATABASE_PATH, TOURNAMENTS, FAST_STARTUP
+    ARCHIVE_DIR = config.database.archive_dir
 except ImportError:
     # Fallback if config.py is not available
     _basedir = os.path.abspath(os.path.dirname(__file__))
     # FIXED: Correct path joining without leading slash
     DATABASE_PATH = os.path.join(_basedir, 'data', 'scrims_data.db')
+    ARCHIVE_DIR = os.path.join(_basedir, 'data', 'archive')
+    TOURNAMENTS = []
+    FAST_STARTUP = False
     print(f"Warning: Using fallback database path: {DATABASE_PATH}")
 
+logger = AppLogger.get_logger("database")
+
 # --- Заголовки таблиц ---
 SCRIMS_HEADER = [
     "Date", "Patch", "Blue Team Name", "Red Team Name", "Duration", "Result",
@@ -44,7 +54,7 @@ TOURNAMENT_GAMES_HEADER_BASE = [
     "Red_TOP_PUUID", "Red_JGL_PUUID", "Red_MID_PUUID", "Red_BOT_PUUID", "Red_SUP_PUUID",
     "Blue_TOP_PartID", "Blue_JGL_PartID", "Blue_MID_PartID", "Blue_BOT_PartID", "Blue_SUP_PartID",
     "Red_TOP_PartID", "Red_JGL_PartID", "Red_MID_PartID", "Red_BOT_PartID", "Red_SUP_PartID",
-    "Game ID", "Series ID", "Sequence Number"
+    "Game ID", "Series ID", "Sequence Number", "Tournament ID"
 ]
 draft_action_columns = []
 for i in range(1, 21):
@@ -64,27 +74,209 @@ MANUAL_DRAFTS_HEADER = [
                        ] + manual_draft_action_headers + ["last_updated"]
 
 
-def get_db_connection():
-    """Creates and returns a connection to the SQLite database with improved error handling."""
+def get_db_connection(tournament_id=None):
+    """
+    Creates and returns a connection to the SQLite database with improved error handling.
+    If tournament_id refers to an archived tournament, the connection is opened on its archive file
+    and the live database is attached as 'live' (shared tables like teams/app_meta resolve there).
+    """
     conn = None
     try:
         # Ensure the directory exists
         db_dir = os.path.dirname(DATABASE_PATH)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
-            print(f"Created database directory: {db_dir}")
+            logger.info(f"Created database directory: {db_dir}")
 
-        conn = sqlite3.connect(DATABASE_PATH, timeout=10.0)
+        conn = sqlite3.connect(DATABASE_PATH, timeout=10.0, factory=connection_factory())
         conn.row_factory = sqlite3.Row
-        print(f"Database connection established: {DATABASE_PATH}")
+        logger.debug("Database connection established: %s", DATABASE_PATH)
+        archive_path = get_tournament_archive_path(conn, tournament_id) if tournament_id else None
+        if archive_path:
+            conn.close()
+            conn = sqlite3.connect(archive_path, timeout=10.0, factory=connection_factory())
+            conn.row_factory = sqlite3.Row
+            conn.execute("ATTACH DATABASE ? AS live", (DATABASE_PATH,))
+            logger.debug("Archive connection established: %s", archive_path)
     except sqlite3.Error as e:
-        print(f"ERROR: SQLite connection failed: {e}")
-        print(f"Attempted path: {DATABASE_PATH}")
+        logger.error(f"ERROR: SQLite connection failed: {e}")
+        logger.error("Attempted path: %s", DATABASE_PATH)
     except Exception as e:
-        print(f"ERROR: Unexpected error during database connection: {e}")
+        logger.error(f"ERROR: Unexpected error during database connection: {e}")
     return conn
 
 
+DATA_GENERATION_KEY = "data_generation"
+# Ширина временного интервала вардов (сек) - all_wards_data.time_bucket
+WARD_BUCKET_SECONDS = 90
+
+
+def get_data_generation(cursor_or_conn):
+    """Returns the current data generation counter (0 if the meta table is missing)."""
+    try:
+        row = cursor_or_conn.execute(
+            "SELECT value FROM app_meta WHERE key = ?", (DATA_GENERATION_KEY,)
+        ).fetchone()
+    except sqlite3.Error:
+        return 0
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def bump_data_generation(cursor_or_conn):
+    """Increments the data generation counter. Call inside the ingest transaction, before commit."""
+    cursor_or_conn.execute(
+        "INSERT INTO app_meta (key, value) VALUES (?, '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+        (DATA_GENERATION_KEY,)
+    )
+
+
+def save_team_tags(cursor, team_tags, game_date=None, tournament_id=None):
+    """Upserts team tags seen in an ingested game into the materialized teams (and tournament_teams) tables."""
+    now_iso = datetime.now(timezone.utc).isoformat()
+    rows = [(tag, game_date, now_iso) for tag in team_tags if tag]
+    if not rows:
+        return 0
+    cursor.executemany("""
+        INSERT INTO teams (team_tag, last_seen, last_updated) VALUES (?, ?, ?)
+        ON CONFLICT(team_tag) DO UPDATE SET
+            last_seen = MAX(COALESCE(teams.last_seen, ''), COALESCE(excluded.last_seen, '')),
+            last_updated = excluded.last_updated
+    """, rows)
+    if tournament_id:
+        cursor.executemany("""
+            INSERT INTO tournament_teams (tournament_id, team_tag, last_seen, last_updated) VALUES (?, ?, ?, ?)
+            ON CONFLICT(tournament_id, team_tag) DO UPDATE SET
+                last_seen = MAX(COALESCE(tournament_teams.last_seen, ''), COALESCE(excluded.last_seen, '')),
+                last_updated = excluded.last_updated
+        """, [(str(tournament_id),) + row for row in rows])
+    return len(rows)
+
+
+# --- Tournaments ---
+# Таблицы с данными конкретных игр турнира (таблица -> колонка game id); при архивации
+# их строки переносятся в отдельный файл data/archive/tournament_<id>.db
+# PRAGMA user_version после успешного init_db; увеличивать при любом изменении DDL/миграций в init_db
+SCHEMA_VERSION = 5
+
+TOURNAMENT_GAME_TABLES = (
+    ("tournament_games", "Game_ID"),
+    ("draft_actions", "game_id"),
+    ("champion_games", "game_id"),
+    ("jungle_pathing", "game_id"),
+    ("jungle_timelines", "game_id"),
+    ("jungle_camp_windows", "game_id"),
+    ("player_positions_snapshots", "game_id"),
+    ("first_wards_data", "game_id"),
+    ("all_wards_data", "game_id"),
+    ("player_positions_timeline", "game_id"),
+    ("objective_events", "game_id"),
+)
+
+_ARCHIVE_DDL_RE = re.compile(r"^CREATE\s+(UNIQUE\s+)?(TABLE|INDEX)\s+(?:IF\s+NOT\s+EXISTS\s+)?", re.IGNORECASE)
+
+
+def save_tournament(cursor, tournament_id, name):
+    """Upserts a tournament into the tournaments registry."""
+    cursor.execute("""
+        INSERT INTO tournaments (tournament_id, name, last_updated) VALUES (?, ?, ?)
+        ON CONFLICT(tournament_id) DO UPDATE SET name = excluded.name, last_updated = excluded.last_updated
+    """, (str(tournament_id), name, datetime.now(timezone.utc).isoformat()))
+
+
+_tournaments_cache = {"generation": None, "tournaments": []}
+
+
+def get_tournaments(conn):
+    """Returns [{tournament_id, name, archived}] for all known tournaments (live first)."""
+    try:
+        rows = conn.execute(
+            "SELECT tournament_id, name, archive_file FROM tournaments ORDER BY archive_file IS NOT NULL, last_updated DESC"
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    return [{"tournament_id": row[0], "name": row[1] or row[0], "archived": bool(row[2])} for row in rows]
+
+
+def get_cached_tournaments(generation):
+    """
+    get_tournaments из кэша процесса до смены data generation: список турниров нужен
+    шаблону каждой страницы, соединение открывается только после ingest/архивации.
+    """
+    if _tournaments_cache["generation"] == generation:
+        return _tournaments_cache["tournaments"]
+    conn = get_db_connection()
+    if conn is None:
+        return []
+    try:
+        tournaments = get_tournaments(conn)
+    finally:
+        conn.close()
+    _tournaments_cache.update(generation=generation, tournaments=tournaments)
+    return tournaments
+
+
+def get_tournament_archive_path(conn, tournament_id):
+    """Path of the archive file for an archived tournament, None if the tournament is live."""
+    try:
+        row = conn.execute("SELECT archive_file FROM tournaments WHERE tournament_id = ?", (str(tournament_id),)).fetchone()
+    except sqlite3.Error:
+        return None
+    if not row or not row[0]:
+        return None
+    archive_path = os.path.join(ARCHIVE_DIR, row[0])
+    return archive_path if os.path.exists(archive_path) else None
+
+
+def archive_tournament(tournament_id):
+    """
+    Moves all games of a tournament (and their derived rows) into data/archive/tournament_<id>.db.
+    Live views stop scanning them; the archive stays readable via get_db_connection(tournament_id).
+    Returns the number of archived games, or -1 on error.
+    """
+    tournament_id = str(tournament_id)
+    archive_file = f"tournament_{tournament_id}.db"
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    conn = get_db_connection()
+    if conn is None:
+        return -1
+    try:
+        conn.execute("ATTACH DATABASE ? AS archive", (os.path.join(ARCHIVE_DIR, archive_file),))
+        cursor = conn.cursor()
+        cursor.execute('SELECT "Game_ID" FROM tournament_games WHERE "Tournament_ID" = ?', (tournament_id,))
+        game_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("CREATE TEMP TABLE archive_game_ids (game_id TEXT PRIMARY KEY)")
+        cursor.executemany("INSERT INTO archive_game_ids (game_id) VALUES (?)", [(game_id,) for game_id in game_ids])
+
+        for table_name, game_column in TOURNAMENT_GAME_TABLES:
+            # Схема архива повторяет основную (вместе с индексами)
+            schema_rows = cursor.execute(
+                "SELECT sql FROM main.sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL ORDER BY type = 'index'",
+                (table_name,)
+            ).fetchall()
+            for (object_sql,) in schema_rows:
+                cursor.execute(_ARCHIVE_DDL_RE.sub(
+                    lambda m: f"CREATE {m.group(1) or ''}{m.group(2).upper()} IF NOT EXISTS archive.", object_sql, count=1))
+            where_sql = f'"{game_column}" IN (SELECT game_id FROM archive_game_ids)'
+            cursor.execute(f'INSERT OR REPLACE INTO archive."{table_name}" SELECT * FROM main."{table_name}" WHERE {where_sql}')
+            cursor.execute(f'DELETE FROM main."{table_name}" WHERE {where_sql}')
+
+        cursor.execute("""
+            INSERT INTO tournaments (tournament_id, name, archive_file, last_updated) VALUES (?, ?, ?, ?)
+            ON CONFLICT(tournament_id) DO UPDATE SET archive_file = excluded.archive_file, last_updated = excluded.last_updated
+        """, (tournament_id, tournament_id, archive_file, datetime.now(timezone.utc).isoformat()))
+        bump_data_generation(cursor)
+        conn.commit()
+        logger.info(f"Archived tournament {tournament_id}: {len(game_ids)} games -> {archive_file}")
+        return len(game_ids)
+    except sqlite3.Error as e:
+        logger.error(f"ERROR archiving tournament {tournament_id}: {e}")
+        conn.rollback()
+        return -1
+    finally:
+        conn.close()
+
+
 def create_table_from_header(cursor, table_name, header_list, primary_key_column="Game ID"):
     """Helper function to create a table from header list with validation."""
     # Security: Validate table name against whitelist
@@ -114,7 +306,7 @@ def create_table_from_header(cursor, table_name, header_list, primary_key_column
         try:
             header_copy.remove(pk_col_name_sql)
         except ValueError:
-            print(
+            logger.warning(
                 f"Warning: Primary key '{primary_key_column}' or '{pk_col_name_sql}' not found in header for table '{table_name}'.")
 
     for header_name in header_copy:
@@ -143,52 +335,125 @@ def create_table_from_header(cursor, table_name, header_list, primary_key_column
     create_table_sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" ({", ".join(columns_sql)});'
     try:
         cursor.execute(create_table_sql)
-        print(f"Table '{table_name}' verified/created successfully.")
+        logger.debug(f"Table '{table_name}' verified/created successfully.")
         return True
     except sqlite3.Error as e:
-        print(f"ERROR creating table '{table_name}': {e}")
+        logger.error(f"ERROR creating table '{table_name}': {e}")
         return False
 
 
-def init_db():
-    """Initializes the database: creates tables if they don't exist."""
+def _seed_tournaments(cursor):
+    """Configured tournaments -> tournaments registry (names of existing rows are kept)."""
+    now_iso = datetime.now(timezone.utc).isoformat()
+    cursor.executemany("INSERT OR IGNORE INTO tournaments (tournament_id, name, last_updated) VALUES (?, ?, ?)",
+                       [(tournament_id, name, now_iso) for tournament_id, name in TOURNAMENTS])
+
+
+def _backfill_archives(conn, cursor, ddl_statements, backfill):
+    """
+    Новая таблица игр турнира в уже архивированных файлах: создаёт её по ddl_statements
+    и вызывает backfill(cursor, schema="archive"); возвращает сумму заполненных строк.
+    """
+    backfilled = 0
+    for (archive_file,) in cursor.execute("SELECT archive_file FROM tournaments WHERE archive_file IS NOT NULL").fetchall():
+        archive_path = os.path.join(ARCHIVE_DIR, archive_file)
+        if not os.path.exists(archive_path):
+            continue
+        conn.commit()
+        cursor.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        try:
+            for object_sql in ddl_statements:
+                cursor.execute(_ARCHIVE_DDL_RE.sub(
+                    lambda m: f"CREATE {m.group(1) or ''}{m.group(2).upper()} IF NOT EXISTS archive.", object_sql.strip(), count=1))
+            backfilled += backfill(cursor, schema="archive")
+            conn.commit()
+        finally:
+            cursor.execute("DETACH DATABASE archive")
+    return backfilled
+
+
+def init_db(force=False):
+    """
+    Initializes the database: creates tables if they don't exist.
+    In fast startup mode the DDL is skipped when PRAGMA user_version already equals SCHEMA_VERSION;
+    force=True always runs the full check.
+    """
     conn = get_db_connection()
     if conn is None:
-        print("ERROR: Could not connect to database for initialization.")
+        logger.error("ERROR: Could not connect to database for initialization.")
         return
 
     cursor = conn.cursor()
+    schema_errors = []
     try:
+        if FAST_STARTUP and not force and cursor.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            _seed_tournaments(cursor)
+            conn.commit()
+            logger.info(f"Database schema version {SCHEMA_VERSION} is current, skipping table checks.")
+            return
+
         # --- Existing tables ---
-        print("Checking/creating table scrims...")
-        create_table_from_header(cursor, "scrims", SCRIMS_HEADER, primary_key_column="Game ID")
+        logger.debug("Checking/creating table scrims...")
+        if not create_table_from_header(cursor, "scrims", SCRIMS_HEADER, primary_key_column="Game ID"):
+            schema_errors.append("scrims")
 
-        print("Checking/creating table tournament_games...")
-        create_table_from_header(cursor, "tournament_games", TOURNAMENT_GAMES_HEADER, primary_key_column="Game ID")
+        logger.debug("Checking/creating table tournament_games...")
+        if create_table_from_header(cursor, "tournament_games", TOURNAMENT_GAMES_HEADER, primary_key_column="Game ID"):
+            try:
+                # Tournament_ID добавлен позже - докидываем в старые БД; старые игры относятся к турниру по умолчанию
+                game_columns = {row[1] for row in cursor.execute("PRAGMA table_info(tournament_games)")}
+                if "Tournament_ID" not in game_columns:
+                    cursor.execute('ALTER TABLE tournament_games ADD COLUMN "Tournament_ID" TEXT')
+                if TOURNAMENTS:
+                    cursor.execute('UPDATE tournament_games SET "Tournament_ID" = ? WHERE "Tournament_ID" IS NULL',
+                                   (TOURNAMENTS[0][0],))
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tournament_games_tournament_date ON tournament_games ("Tournament_ID", "Date");')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tournament_games_blue_team ON tournament_games ("Blue_Team_Name", "Tournament_ID");')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tournament_games_red_team ON tournament_games ("Red_Team_Name", "Tournament_ID");')
+                # Список (турнир, патч) для снапшотов общего обзора - без чтения строк игр
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tournament_games_tournament_patch ON tournament_games ("Tournament_ID", "Patch", "Date");')
+                logger.debug("Indexes for 'tournament_games' (Tournament_ID, teams, patch) verified/created.")
+            except sqlite3.Error as e:
+                schema_errors.append(str(e))
+                logger.error(f"ERROR migrating 'tournament_games' Tournament_ID: {e}")
+        else:
+            schema_errors.append("tournament_games")
 
-        print("Checking/creating table soloq_games...")
-        create_table_from_header(cursor, "soloq_games", SOLOQ_GAMES_HEADER, primary_key_column="Match_ID")
+        logger.debug("Checking/creating table soloq_games...")
+        if create_table_from_header(cursor, "soloq_games", SOLOQ_GAMES_HEADER, primary_key_column="Match_ID"):
+            try:
+                cursor.execute(
+                    'CREATE INDEX IF NOT EXISTS idx_soloq_games_player_ts ON soloq_games (Player_Name, Timestamp);')
+                logger.debug("Index for 'soloq_games' (Player_Name, Timestamp) verified/created.")
+            except sqlite3.Error as e:
+                schema_errors.append(str(e))
+                logger.error(f"ERROR creating index for 'soloq_games': {e}")
+        else:
+            schema_errors.append("soloq_games")
 
-        print("Checking/creating table manual_drafts...")
+        logger.debug("Checking/creating table manual_drafts...")
         if create_table_from_header(cursor, "manual_drafts", MANUAL_DRAFTS_HEADER, primary_key_column="id"):
             try:
                 cursor.execute(
                     'CREATE UNIQUE INDEX IF NOT EXISTS idx_manual_drafts_team_game ON manual_drafts (filter_team_name, game_index);')
-                print("Unique index for 'manual_drafts' (team, game_index) verified/created.")
+                logger.debug("Unique index for 'manual_drafts' (team, game_index) verified/created.")
             except sqlite3.Error as e:
-                print(f"ERROR creating unique index for 'manual_drafts': {e}")
+                schema_errors.append(str(e))
+                logger.error(f"ERROR creating unique index for 'manual_drafts': {e}")
+        else:
+            schema_errors.append("manual_drafts")
 
-        print("Checking/creating table schedule_entries...")
+        logger.debug("Checking/creating table schedule_entries...")
         create_schedule_sql = "CREATE TABLE IF NOT EXISTS schedule_entries (id INTEGER PRIMARY KEY AUTOINCREMENT, entry_date TEXT NOT NULL, entry_type TEXT NOT NULL, details_time TEXT, details_opponent TEXT, details_notes TEXT, color TEXT);"
         cursor.execute(create_schedule_sql)
-        print("Table 'schedule_entries' verified/created.")
+        logger.debug("Table 'schedule_entries' verified/created.")
 
-        print("Checking/creating table schedule_notes...")
+        logger.debug("Checking/creating table schedule_notes...")
         create_notes_sql = "CREATE TABLE IF NOT EXISTS schedule_notes (month_id TEXT PRIMARY KEY, notes_content TEXT DEFAULT '');"
         cursor.execute(create_notes_sql)
-        print("Table 'schedule_notes' (monthly) verified/created.")
+        logger.debug("Table 'schedule_notes' (monthly) verified/created.")
 
-        print("Checking/creating table jungle_pathing...")
+        logger.debug("Checking/creating table jungle_pathing...")
         create_pathing_sql = """
         CREATE TABLE IF NOT EXISTS jungle_pathing (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -203,11 +468,47 @@ def init_db():
             cursor.execute(create_pathing_sql)
             cursor.execute(create_pathing_index_sql)
             cursor.execute(create_pathing_unique_sql)
-            print("Table 'jungle_pathing' and indexes verified/created.")
+            logger.debug("Table 'jungle_pathing' and indexes verified/created.")
         except sqlite3.Error as e:
-            print(f"ERROR creating table/indexes 'jungle_pathing': {e}")
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table/indexes 'jungle_pathing': {e}")
 
-        print("Checking/creating table player_positions_snapshots...")
+        # Полные таймлайны лесников: коды действий + дельты времени (децисекунды) в JSON массивах,
+        # плюс постинг-индекс (действие, минута) -> игра/игрок для выборок по кемпу и окну времени
+        logger.debug("Checking/creating jungle timeline tables...")
+        try:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS jungle_event_codes (
+                code INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            );""")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS jungle_timelines (
+                game_id TEXT NOT NULL,
+                player_puuid TEXT NOT NULL,
+                team_side TEXT,
+                event_codes TEXT NOT NULL,
+                event_times TEXT NOT NULL,
+                first_clear_length INTEGER,
+                last_updated TEXT NOT NULL,
+                PRIMARY KEY (game_id, player_puuid)
+            ) WITHOUT ROWID;""")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS jungle_camp_windows (
+                event_code INTEGER NOT NULL,
+                minute INTEGER NOT NULL,
+                game_id TEXT NOT NULL,
+                player_puuid TEXT NOT NULL,
+                events INTEGER NOT NULL,
+                PRIMARY KEY (event_code, minute, game_id, player_puuid)
+            ) WITHOUT ROWID;""")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_jungle_camp_windows_game ON jungle_camp_windows (game_id, player_puuid);")
+            logger.debug("Tables 'jungle_event_codes', 'jungle_timelines', 'jungle_camp_windows' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating jungle timeline tables: {e}")
+
+        logger.debug("Checking/creating table player_positions_snapshots...")
         create_positions_sql = """
         CREATE TABLE IF NOT EXISTS player_positions_snapshots (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -222,11 +523,12 @@ def init_db():
             cursor.execute(create_positions_sql)
             cursor.execute(create_positions_index_sql)
             cursor.execute(create_positions_unique_sql)
-            print("Table 'player_positions_snapshots' and indexes verified/created.")
+            logger.debug("Table 'player_positions_snapshots' and indexes verified/created.")
         except sqlite3.Error as e:
-            print(f"ERROR creating table/indexes 'player_positions_snapshots': {e}")
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table/indexes 'player_positions_snapshots': {e}")
 
-        print("Checking/creating table first_wards_data...")
+        logger.debug("Checking/creating table first_wards_data...")
         create_first_wards_sql = """
         CREATE TABLE IF NOT EXISTS first_wards_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -247,11 +549,12 @@ def init_db():
             cursor.execute(create_first_wards_sql)
             cursor.execute(create_first_wards_unique_sql)
             cursor.execute(create_first_wards_game_id_index_sql)
-            print("Table 'first_wards_data' and indexes verified/created (with player_name column).")
+            logger.debug("Table 'first_wards_data' and indexes verified/created (with player_name column).")
         except sqlite3.Error as e:
-            print(f"ERROR creating table/indexes 'first_wards_data': {e}")
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table/indexes 'first_wards_data': {e}")
 
-        print("Checking/creating table all_wards_data...")
+        logger.debug("Checking/creating table all_wards_data...")
         create_all_wards_sql = """
         CREATE TABLE IF NOT EXISTS all_wards_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -264,7 +567,9 @@ def init_db():
             timestamp_seconds REAL NOT NULL,
             pos_x INTEGER,
             pos_z INTEGER,
-            last_updated TEXT NOT NULL
+            last_updated TEXT NOT NULL,
+            time_bucket INTEGER,
+            team_side TEXT
         );
         """
         create_all_wards_game_id_index_sql = "CREATE INDEX IF NOT EXISTS idx_all_wards_data_game_id ON all_wards_data (game_id);"
@@ -275,11 +580,24 @@ def init_db():
             cursor.execute(create_all_wards_game_id_index_sql)
             cursor.execute(create_all_wards_puuid_index_sql)
             cursor.execute(create_all_wards_timestamp_index_sql)
-            print("Table 'all_wards_data' and indexes verified/created.")
+            # time_bucket (90-секундный интервал) и team_side добавлены позже - докидываем в старые БД
+            ward_columns = {row[1] for row in cursor.execute("PRAGMA table_info(all_wards_data)")}
+            for column_name, column_type in (("time_bucket", "INTEGER"), ("team_side", "TEXT")):
+                if column_name not in ward_columns:
+                    cursor.execute(f"ALTER TABLE all_wards_data ADD COLUMN {column_name} {column_type}")
+            cursor.execute(f"""
+                UPDATE all_wards_data SET
+                    time_bucket = CAST(timestamp_seconds / {WARD_BUCKET_SECONDS} AS INTEGER),
+                    team_side = CASE WHEN participant_id <= 5 THEN 'Blue' ELSE 'Red' END
+                WHERE time_bucket IS NULL OR team_side IS NULL
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_all_wards_data_game_bucket ON all_wards_data (game_id, time_bucket);")
+            logger.debug("Table 'all_wards_data' and indexes verified/created.")
         except sqlite3.Error as e:
-            print(f"ERROR creating table/indexes 'all_wards_data': {e}")
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table/indexes 'all_wards_data': {e}")
 
-        print("Checking/creating table player_positions_timeline...")
+        logger.debug("Checking/creating table player_positions_timeline...")
         create_positions_timeline_sql = """
         CREATE TABLE IF NOT EXISTS player_positions_timeline (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -300,11 +618,12 @@ def init_db():
             cursor.execute(create_timeline_game_id_index_sql)
             cursor.execute(create_timeline_timestamp_index_sql)
             cursor.execute(create_timeline_game_puuid_index_sql)
-            print("Table 'player_positions_timeline' and indexes verified/created.")
+            logger.debug("Table 'player_positions_timeline' and indexes verified/created.")
         except sqlite3.Error as e:
-            print(f"ERROR creating table/indexes 'player_positions_timeline': {e}")
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table/indexes 'player_positions_timeline': {e}")
 
-        print("Checking/creating table objective_events...")
+        logger.debug("Checking/creating table objective_events...")
         create_objectives_sql = """
         CREATE TABLE IF NOT EXISTS objective_events (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -319,18 +638,293 @@ def init_db():
         """
         create_objectives_game_id_index = "CREATE INDEX IF NOT EXISTS idx_objectives_game_id ON objective_events (game_id);"
         create_objectives_type_index = "CREATE INDEX IF NOT EXISTS idx_objectives_type ON objective_events (objective_type);"
+        # Для оконных агрегатов (PARTITION BY game_id ORDER BY timestamp_ms) в objects_logic
+        create_objectives_game_type_ts_index = "CREATE INDEX IF NOT EXISTS idx_objectives_game_type_ts ON objective_events (game_id, objective_type, timestamp_ms);"
         try:
             cursor.execute(create_objectives_sql)
             cursor.execute(create_objectives_game_id_index)
             cursor.execute(create_objectives_type_index)
-            print("Table 'objective_events' and indexes verified/created.")
+            cursor.execute(create_objectives_game_type_ts_index)
+            logger.debug("Table 'objective_events' and indexes verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table/indexes 'objective_events': {e}")
+
+        logger.debug("Checking/creating table soloq_accounts...")
+        create_soloq_accounts_sql = """
+        CREATE TABLE IF NOT EXISTS soloq_accounts (
+            riot_name TEXT NOT NULL,
+            riot_tag TEXT NOT NULL,
+            player_name TEXT,
+            puuid TEXT NOT NULL,
+            last_updated TEXT NOT NULL,
+            last_game_ts INTEGER,
+            PRIMARY KEY (riot_name, riot_tag)
+        );
+        """
+        try:
+            cursor.execute(create_soloq_accounts_sql)
+            # last_game_ts (watermark инкрементальной синхронизации) добавлен позже - докидываем в старые БД
+            account_columns = {row[1] for row in cursor.execute("PRAGMA table_info(soloq_accounts)")}
+            if "last_game_ts" not in account_columns:
+                cursor.execute("ALTER TABLE soloq_accounts ADD COLUMN last_game_ts INTEGER")
+            logger.debug("Table 'soloq_accounts' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'soloq_accounts': {e}")
+
+        logger.debug("Checking/creating table app_meta...")
+        create_app_meta_sql = "CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT);"
+        try:
+            cursor.execute(create_app_meta_sql)
+            cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES (?, '0')", (DATA_GENERATION_KEY,))
+            logger.debug("Table 'app_meta' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'app_meta': {e}")
+
+        logger.debug("Checking/creating table teams...")
+        create_teams_sql = """
+        CREATE TABLE IF NOT EXISTS teams (
+            team_tag TEXT PRIMARY KEY,
+            last_seen TEXT,
+            last_updated TEXT NOT NULL
+        );
+        """
+        try:
+            cursor.execute(create_teams_sql)
+            # Одноразовое заполнение для баз, созданных до появления таблицы teams
+            cursor.execute("SELECT 1 FROM teams LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO teams (team_tag, last_seen, last_updated)
+                    SELECT team_tag, MAX(Date), ? FROM (
+                        SELECT Blue_Team_Name AS team_tag, Date FROM tournament_games
+                        UNION ALL
+                        SELECT Red_Team_Name AS team_tag, Date FROM tournament_games
+                    )
+                    WHERE team_tag IS NOT NULL AND team_tag != ''
+                    GROUP BY team_tag
+                """, (datetime.now(timezone.utc).isoformat(),))
+                if cursor.rowcount > 0:
+                    bump_data_generation(cursor)
+            logger.debug("Table 'teams' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'teams': {e}")
+
+        logger.debug("Checking/creating table tournaments...")
+        create_tournaments_sql = """
+        CREATE TABLE IF NOT EXISTS tournaments (
+            tournament_id TEXT PRIMARY KEY,
+            name TEXT,
+            archive_file TEXT,
+            last_updated TEXT NOT NULL
+        );
+        """
+        try:
+            cursor.execute(create_tournaments_sql)
+            _seed_tournaments(cursor)
+            logger.debug("Table 'tournaments' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'tournaments': {e}")
+
+        logger.debug("Checking/creating table tournament_teams...")
+        create_tournament_teams_sql = """
+        CREATE TABLE IF NOT EXISTS tournament_teams (
+            tournament_id TEXT NOT NULL,
+            team_tag TEXT NOT NULL,
+            last_seen TEXT,
+            last_updated TEXT NOT NULL,
+            PRIMARY KEY (tournament_id, team_tag)
+        ) WITHOUT ROWID;
+        """
+        try:
+            cursor.execute(create_tournament_teams_sql)
+            # Одноразовое заполнение из уже загруженных игр
+            cursor.execute("SELECT 1 FROM tournament_teams LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO tournament_teams (tournament_id, team_tag, last_seen, last_updated)
+                    SELECT tournament_id, team_tag, MAX(Date), ? FROM (
+                        SELECT "Tournament_ID" AS tournament_id, Blue_Team_Name AS team_tag, Date FROM tournament_games
+                        UNION ALL
+                        SELECT "Tournament_ID" AS tournament_id, Red_Team_Name AS team_tag, Date FROM tournament_games
+                    )
+                    WHERE tournament_id IS NOT NULL AND team_tag IS NOT NULL AND team_tag != ''
+                    GROUP BY tournament_id, team_tag
+                """, (datetime.now(timezone.utc).isoformat(),))
+                if cursor.rowcount > 0:
+                    bump_data_generation(cursor)
+            logger.debug("Table 'tournament_teams' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'tournament_teams': {e}")
+
+        logger.debug("Checking/creating table soloq_daily_activity...")
+        create_soloq_daily_sql = """
+        CREATE TABLE IF NOT EXISTS soloq_daily_activity (
+            player_name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            games INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (player_name, day)
+        ) WITHOUT ROWID;
+        """
+        # Дневные роллапы поддерживаются триггерами при вставке/удалении игр
+        # (INSERT OR IGNORE дубликата триггер не вызывает); день - UTC, как в графиках
+        create_soloq_daily_triggers = ("""
+        CREATE TRIGGER IF NOT EXISTS trg_soloq_games_daily_insert
+        AFTER INSERT ON soloq_games WHEN NEW.Timestamp IS NOT NULL
+        BEGIN
+            INSERT INTO soloq_daily_activity (player_name, day, games, wins)
+            VALUES (NEW.Player_Name, date(NEW.Timestamp, 'unixepoch'), 1, NEW.Win IS 1)
+            ON CONFLICT(player_name, day) DO UPDATE SET
+                games = games + 1, wins = wins + excluded.wins;
+        END;
+        """, """
+        CREATE TRIGGER IF NOT EXISTS trg_soloq_games_daily_delete
+        AFTER DELETE ON soloq_games WHEN OLD.Timestamp IS NOT NULL
+        BEGIN
+            UPDATE soloq_daily_activity SET games = games - 1, wins = wins - (OLD.Win IS 1)
+            WHERE player_name = OLD.Player_Name AND day = date(OLD.Timestamp, 'unixepoch');
+            DELETE FROM soloq_daily_activity
+            WHERE player_name = OLD.Player_Name AND day = date(OLD.Timestamp, 'unixepoch') AND games <= 0;
+        END;
+        """)
+        try:
+            cursor.execute(create_soloq_daily_sql)
+            for trigger_sql in create_soloq_daily_triggers:
+                cursor.execute(trigger_sql)
+            # Одноразовое заполнение для баз, где игры были сохранены до появления роллапов
+            cursor.execute("SELECT 1 FROM soloq_daily_activity LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    INSERT INTO soloq_daily_activity (player_name, day, games, wins)
+                    SELECT Player_Name, date(Timestamp, 'unixepoch'), COUNT(*), SUM(Win IS 1)
+                    FROM soloq_games WHERE Timestamp IS NOT NULL
+                    GROUP BY Player_Name, date(Timestamp, 'unixepoch')
+                """)
+            logger.debug("Table 'soloq_daily_activity' and triggers verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'soloq_daily_activity': {e}")
+
+        logger.debug("Checking/creating table draft_actions...")
+        # Драфт в нормализованном виде: строка = действие; team_side - сторона команды-драфтера
+        # (по Drafter_Team_ID), индекс по чемпиону - для выборок "игры, где X взяли первым пиком"
+        create_draft_actions_sql = """
+        CREATE TABLE IF NOT EXISTS draft_actions (
+            game_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            team_side TEXT,
+            action_type TEXT NOT NULL,
+            drafter_team_id TEXT,
+            champion_id TEXT,
+            champion_name TEXT,
+            PRIMARY KEY (game_id, seq)
+        ) WITHOUT ROWID;
+        """
+        create_draft_actions_index_sql = "CREATE INDEX IF NOT EXISTS idx_draft_actions_champion ON draft_actions (champion_name, action_type, seq);"
+        try:
+            cursor.execute(create_draft_actions_sql)
+            cursor.execute(create_draft_actions_index_sql)
+            # Одноразовое заполнение из колонок Draft_Action_* - и для уже архивированных турниров
+            from draft_analytics import backfill_draft_actions
+            backfilled = backfill_draft_actions(cursor)
+            backfilled += _backfill_archives(conn, cursor, (create_draft_actions_sql, create_draft_actions_index_sql),
+                                             backfill_draft_actions)
+            if backfilled:
+                bump_data_generation(cursor)
+                logger.info(f"Backfilled {backfilled} draft actions from Draft_Action_* columns.")
+            logger.debug("Table 'draft_actions' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'draft_actions': {e}")
+
+        logger.debug("Checking/creating table champion_games...")
+        # Индекс чемпионов: строка = чемпион в игре (пик с ролью или бан стороны) и исход для стороны.
+        # PRIMARY KEY начинается с champion - страница чемпиона читает один диапазон
+        create_champion_games_sql = """
+        CREATE TABLE IF NOT EXISTS champion_games (
+            champion TEXT NOT NULL,
+            game_id TEXT NOT NULL,
+            side TEXT NOT NULL,
+            action TEXT NOT NULL,
+            role TEXT,
+            win INTEGER,
+            PRIMARY KEY (champion, game_id, side, action)
+        ) WITHOUT ROWID;
+        """
+        create_champion_games_index_sql = "CREATE INDEX IF NOT EXISTS idx_champion_games_game ON champion_games (game_id);"
+        try:
+            cursor.execute(create_champion_games_sql)
+            cursor.execute(create_champion_games_index_sql)
+            from champion_logic import backfill_champion_games
+            backfilled = backfill_champion_games(cursor)
+            backfilled += _backfill_archives(conn, cursor, (create_champion_games_sql, create_champion_games_index_sql),
+                                             backfill_champion_games)
+            if backfilled:
+                bump_data_generation(cursor)
+                logger.info(f"Backfilled {backfilled} champion index rows from tournament_games.")
+            logger.debug("Table 'champion_games' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'champion_games': {e}")
+
+        logger.debug("Checking/creating table overall_summary_snapshots...")
+        # Снапшоты общего обзора по (турнир, патч): summary - JSON счётчиков (draft_analytics),
+        # games/last_game_date - для проверки актуальности; '' вместо NULL турнира/патча
+        create_snapshots_sql = """
+        CREATE TABLE IF NOT EXISTS overall_summary_snapshots (
+            tournament_id TEXT NOT NULL,
+            patch TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            games INTEGER NOT NULL,
+            last_game_date TEXT,
+            summary TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (tournament_id, patch)
+        ) WITHOUT ROWID;
+        """
+        try:
+            cursor.execute(create_snapshots_sql)
+            logger.debug("Table 'overall_summary_snapshots' verified/created.")
+        except sqlite3.Error as e:
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'overall_summary_snapshots': {e}")
+
+        logger.debug("Checking/creating table ingest_runs...")
+        # Один прогон ingest - одна строка; метрики по этапам (API, парсинг, запись, commit) в JSON
+        create_ingest_runs_sql = """
+        CREATE TABLE IF NOT EXISTS ingest_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            tournament_id TEXT,
+            started_at TEXT NOT NULL,
+            duration_seconds REAL,
+            status TEXT NOT NULL,
+            games INTEGER,
+            metrics TEXT
+        );
+        """
+        try:
+            cursor.execute(create_ingest_runs_sql)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingest_runs_tournament ON ingest_runs (tournament_id, run_id)")
+            logger.debug("Table 'ingest_runs' verified/created.")
         except sqlite3.Error as e:
-            print(f"ERROR creating table/indexes 'objective_events': {e}")
+            schema_errors.append(str(e))
+            logger.error(f"ERROR creating table 'ingest_runs': {e}")
 
+        # Версия схемы ставится только после полностью успешной проверки
+        if not schema_errors:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
-        print("Database initialization completed successfully.")
+        logger.info("Database initialization completed successfully.")
     except sqlite3.Error as e:
-        print(f"ERROR during database initialization: {e}")
+        schema_errors.append(str(e))
+        logger.error(f"ERROR during database initialization: {e}")
         conn.rollback()
     finally:
         conn.close()
@@ -341,5 +935,5 @@ if __name__ == '__main__':
     print(f"!!! NOTICE: Schema includes tournament_games with PUUID/PartID columns.")
     print(f"!!! NOTICE: New tables for jungle_pathing, player_positions_snapshots, wards, and objectives.")
     print(f"!!! If errors occur after update, consider deleting old database file and restarting.")
-    init_db()
+    init_db(force=True)
     print("Database initialization script completed.")
\ No newline at end of file
@@ -0,0 +1,574 @@
+# lol_app_LTA_2/draft_analytics.py
+"""
+Драфт-аналитика турнира поверх компактной целочисленной таблицы.
+
+Игры турнира (составы и баны из tournament_games, драфт из нормализованной
+draft_actions) один раз раскладываются в столбцы NumPy: строка = действие
+(game, seq, side, action, champ, role), чемпионы и команды закодированы
+индексами словарей. Пики по ролям и ротациям, баны по ротациям, приоритет по
+фазам драфта, дуо и паттерны ролей считаются масками и group-by (count_by)
+по этой таблице; общий обзор и страница команды используют один движок.
+Таблица кэшируется по турниру до смены data generation. Новая метрика - это
+маска и набор ключей для count_by, а не ещё один цикл по играм.
+Общий обзор хранится снапшотами по (турнир, патч) в overall_summary_snapshots:
+ingest пересчитывает только патчи с новыми играми, страница складывает снапшоты.
+NumPy импортируется внутри функций, чтобы не замедлять старт приложения.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from database import get_data_generation
+
+BLUE, RED = 0, 1
+SIDES = ("Blue", "Red")
+ROLES = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+ROLE_ABBR = {"TOP": "TOP", "JUNGLE": "JGL", "MIDDLE": "MID", "BOTTOM": "BOT", "UTILITY": "SUP"}
+DUO_ROLES = (("TOP", "JUNGLE", "TOP-JUNGLE"), ("JUNGLE", "MIDDLE", "JUNGLE-MID"), ("BOTTOM", "UTILITY", "ADC-SUPPORT"))
+
+# Источник строки: состав (роль известна), баны из итогов игры (seq = номер бана стороны 1-5),
+# действия драфта из draft_actions (seq = номер хода 1-20, role - роль чемпиона в составе стороны-драфтера)
+PICK, BAN, DRAFT_PICK, DRAFT_BAN = 0, 1, 2, 3
+# Winner_Side: "Unknown" считается отдельно - в поражения команды он не идёт
+WINNER_CODES = {"Blue": 0, "Red": 1, "Unknown": 2}
+WINNER_OTHER = 3
+
+DRAFT_ACTIONS = 20
+BLUE_DRAFT_SEQS = frozenset((1, 3, 5, 7, 10, 11, 14, 16, 18, 19))
+# Ходы-пики турнирного драфта: seq -> (ротация, фаза приоритета, слот паттерна)
+PICK_TURNS = {
+    7: (1, "B1", "B1"), 10: (1, "B2-3", "B2_B3"), 11: (1, "B2-3", "B2_B3"), 18: (2, "B4-5", "B4_B5"), 19: (2, "B4-5", "B4_B5"),
+    8: (1, "R1-2", "R1_R2"), 9: (1, "R1-2", "R1_R2"), 12: (1, "R3", "R3"), 17: (2, "R4", "R4"), 20: (2, "R5", "R5"),
+}
+PRIORITY_PHASES = ("B1", "B2-3", "B4-5", "R1-2", "R3", "R4", "R5")
+PATTERN_SLOTS = ("B1", "B2_B3", "B4_B5", "R1_R2", "R3", "R4", "R5")
+BAN_ROTATION_ONE_LAST = 3
+
+_draft_table_cache = {"generation": None, "tables": {}}
+_draft_table_cache_lock = threading.Lock()
+
+
+def _present(value):
+    return value is not None and value != "" and value != "N/A"
+
+
+class DraftTable:
+    """
+    Столбцы по строкам-действиям (game, side, action, champ, role, seq, drafter) и по играм
+    (winner, blue_team, red_team, lineup[game, side, role] -> champ или -1).
+    У действий драфта side - сторона хода по seq, drafter - сторона по Drafter_Team_ID
+    (-1, если ID не сопоставлен), role - роль чемпиона в составе стороны drafter.
+    """
+
+    def __init__(self, game_ids, winner, blue_team, red_team, teams, lineup, rows, champions):
+        import numpy as np
+        self.game_ids = game_ids
+        self.winner = np.asarray(winner, dtype=np.int8)
+        self.blue_team = np.asarray(blue_team, dtype=np.int32)
+        self.red_team = np.asarray(red_team, dtype=np.int32)
+        self.teams = teams
+        self.team_index = {tag: i for i, tag in enumerate(teams)}
+        self.lineup = np.asarray(lineup, dtype=np.int32).reshape(len(game_ids), 2, len(ROLES))
+        self.champions = champions
+        columns = np.asarray(rows, dtype=np.int32).reshape(-1, 7)
+        self.game = columns[:, 0]
+        self.side = columns[:, 1].astype(np.int8)
+        self.action = columns[:, 2].astype(np.int8)
+        self.champ = columns[:, 3]
+        self.role = columns[:, 4].astype(np.int8)
+        self.seq = columns[:, 5].astype(np.int8)
+        self.drafter = columns[:, 6].astype(np.int8)
+
+    @property
+    def games(self):
+        return len(self.game_ids)
+
+    def team_side(self, team_tag):
+        """По играм: BLUE/RED - сторона команды, -1 - команда не играла."""
+        import numpy as np
+        code = self.team_index.get(team_tag, -1)
+        return np.where(self.blue_team == code, BLUE, np.where(self.red_team == code, RED, -1)).astype(np.int8)
+
+    def turns(self):
+        """Массивы по seq (0..20): ротация пика, код фазы приоритета, код слота паттерна (-1 - не пик-ход)."""
+        import numpy as np
+        rotation = np.full(DRAFT_ACTIONS + 1, -1, dtype=np.int8)
+        phase = np.full(DRAFT_ACTIONS + 1, -1, dtype=np.int8)
+        slot = np.full(DRAFT_ACTIONS + 1, -1, dtype=np.int8)
+        for seq, (rot, phase_name, slot_name) in PICK_TURNS.items():
+            rotation[seq] = rot
+            phase[seq] = PRIORITY_PHASES.index(phase_name)
+            slot[seq] = PATTERN_SLOTS.index(slot_name)
+        return rotation[self.seq], phase[self.seq], slot[self.seq]
+
+
+def count_by(keys, mask, wins=None):
+    """
+    Group-by по целочисленным ключам для строк под маской: {(k1, k2, ...): (count, wins)}.
+    keys - массивы одной формы с mask (значения под маской >= 0), wins - bool той же формы.
+    Группы идут в порядке первого появления (игры - от новых к старым), как при подсчёте циклом.
+    """
+    import numpy as np
+    mask = np.asarray(mask, dtype=bool)
+    columns = [np.broadcast_to(np.asarray(key), mask.shape)[mask].astype(np.int64) for key in keys]
+    if not columns or not columns[0].size:
+        return {}
+    dims = tuple(int(column.max()) + 1 for column in columns)
+    groups, first_index, inverse = np.unique(np.ravel_multi_index(columns, dims), return_index=True, return_inverse=True)
+    counts = np.bincount(inverse)
+    if wins is None:
+        win_counts = np.zeros_like(counts)
+    else:
+        win_counts = np.bincount(inverse, weights=np.broadcast_to(np.asarray(wins), mask.shape)[mask]).astype(np.int64)
+    order = np.argsort(first_index, kind="stable")
+    groups, counts, win_counts = groups[order], counts[order], win_counts[order]
+    group_keys = zip(*(key.tolist() for key in np.unravel_index(groups, dims)))
+    return {key: (count, win) for key, count, win in zip(group_keys, counts.tolist(), win_counts.tolist())}
+
+
+def draft_team_ids(drafters):
+    """
+    {seq: Drafter_Team_ID} -> (blue_id, red_id): ID первого действия на ходу синей/красной
+    стороны (для красной - отличный от синего), None - если не найден.
+    """
+    blue_id = red_id = None
+    for seq in sorted(drafters):
+        if not blue_id and seq in BLUE_DRAFT_SEQS:
+            blue_id = drafters[seq]
+        if not red_id and seq not in BLUE_DRAFT_SEQS and drafters[seq] != blue_id:
+            red_id = drafters[seq]
+    return blue_id, red_id
+
+
+def _game_columns():
+    lineup = [f"{side}_{ROLE_ABBR[role]}_Champ" for side in SIDES for role in ROLES]
+    bans = [f"{side}_Ban_{i}_ID" for side in SIDES for i in range(1, 6)]
+    return ["Game_ID", "Winner_Side", "Blue_Team_Name", "Red_Team_Name", *lineup, *bans]
+
+
+def build_draft_table(game_rows, action_rows):
+    """
+    game_rows - (Game_ID, Winner_Side, команды, составы, баны) из tournament_games,
+    action_rows - (game_id, seq, team_side, action_type, champion_name) из draft_actions -> DraftTable.
+    """
+    champions, champion_index = [], {}
+    teams, team_index = [], {}
+
+    def code(value, vocabulary, index):
+        value = str(value)
+        existing = index.get(value)
+        if existing is None:
+            existing = index[value] = len(vocabulary)
+            vocabulary.append(value)
+        return existing
+
+    draft_by_game = {}
+    for action in action_rows:
+        draft_by_game.setdefault(action[0], []).append(tuple(action[1:]))
+
+    game_ids, winner, blue_team, red_team, lineup, actions = [], [], [], [], [], []
+    lineup_end = 4 + 2 * len(ROLES)
+    for row in game_rows:
+        row = tuple(row)
+        if not row[0]:
+            continue
+        game = len(game_ids)
+        game_ids.append(row[0])
+        winner.append(WINNER_CODES.get(row[1], WINNER_OTHER))
+        blue_team.append(code(row[2], teams, team_index))
+        red_team.append(code(row[3], teams, team_index))
+
+        roles_by_champ = ({}, {})
+        for i, champ in enumerate(row[4:lineup_end]):
+            side, role = divmod(i, len(ROLES))
+            if _present(champ):
+                champ_code = code(champ, champions, champion_index)
+                lineup.append(champ_code)
+                roles_by_champ[side].setdefault(champ_code, role)
+                actions.extend((game, side, PICK, champ_code, role, 0, side))
+            else:
+                lineup.append(-1)
+        for i, ban_id in enumerate(row[lineup_end:]):
+            if _present(ban_id):
+                side, ban_index = divmod(i, 5)
+                actions.extend((game, side, BAN, code(ban_id, champions, champion_index), -1, ban_index + 1, side))
+        for seq, team_side, action_type, champ in draft_by_game.get(row[0], ()):
+            if not _present(champ) or action_type not in ("pick", "ban"):
+                continue
+            side = BLUE if seq in BLUE_DRAFT_SEQS else RED
+            drafter_side = SIDES.index(team_side) if team_side in SIDES else -1
+            champ_code = code(champ, champions, champion_index)
+            if action_type == "pick":
+                role = roles_by_champ[drafter_side].get(champ_code, -1) if drafter_side >= 0 else -1
+                actions.extend((game, side, DRAFT_PICK, champ_code, role, seq, drafter_side))
+            else:
+                actions.extend((game, side, DRAFT_BAN, champ_code, -1, seq, drafter_side))
+    return DraftTable(game_ids, winner, blue_team, red_team, teams, lineup, actions, champions)
+
+
+def get_draft_table(conn, tournament_id=None):
+    """DraftTable турнира (None - все игры базы) из кэша до смены data generation или из БД."""
+    generation = get_data_generation(conn)
+    cache_key = str(tournament_id) if tournament_id else None
+    with _draft_table_cache_lock:
+        if _draft_table_cache["generation"] != generation:
+            _draft_table_cache["generation"] = generation
+            _draft_table_cache["tables"] = {}
+        table = _draft_table_cache["tables"].get(cache_key)
+        if table is not None:
+            return table
+
+    scope_sql, params = (' AND g."Tournament_ID" = ?', (cache_key,)) if cache_key else ("", ())
+    quoted = ", ".join(f'g."{column}"' for column in _game_columns())
+    game_rows = conn.execute(
+        f'SELECT {quoted} FROM tournament_games g WHERE 1=1{scope_sql} ORDER BY g."Date" DESC, g."Series_ID" ASC, g."Sequence_Number" ASC',
+        params).fetchall()
+    # Действия без команды-драфтера в статистику драфта не идут
+    action_rows = conn.execute(f"""
+        SELECT d.game_id, d.seq, d.team_side, d.action_type, d.champion_name
+        FROM draft_actions d JOIN tournament_games g ON g."Game_ID" = d.game_id
+        WHERE d.drafter_team_id IS NOT NULL{scope_sql}
+    """, params).fetchall()
+    table = build_draft_table(game_rows, action_rows)
+
+    with _draft_table_cache_lock:
+        if _draft_table_cache["generation"] == generation:
+            _draft_table_cache["tables"][cache_key] = table
+    return table
+
+
+def find_draft_games(conn, champion_name, action_type="pick", seqs=None, team_side=None, tournament_id=None):
+    """
+    Game_ID игр, где champion_name был взят/забанен (action_type) на ходах seqs стороной team_side,
+    по индексу draft_actions (champion_name, action_type, seq). Первый пик драфта - seqs=(7,).
+    """
+    sql = ["SELECT DISTINCT d.game_id FROM draft_actions d JOIN tournament_games g ON g.\"Game_ID\" = d.game_id",
+           "WHERE d.champion_name = ? AND d.action_type = ?"]
+    params = [champion_name, action_type]
+    if seqs:
+        sql.append(f"AND d.seq IN ({','.join('?' * len(seqs))})")
+        params.extend(int(seq) for seq in seqs)
+    if team_side:
+        sql.append("AND d.team_side = ?")
+        params.append(team_side)
+    if tournament_id:
+        sql.append('AND g."Tournament_ID" = ?')
+        params.append(str(tournament_id))
+    sql.append('ORDER BY g."Date" DESC')
+    return [row[0] for row in conn.execute(" ".join(sql), params).fetchall()]
+
+
+# --- Таблица draft_actions ---
+def draft_action_rows(game_id, actions):
+    """
+    {seq: (action_type, drafter_team_id, champion_id, champion_name)} -> строки draft_actions.
+    Действия без типа пропускаются; team_side - сторона драфтера по draft_team_ids, None - не сопоставлен.
+    """
+    actions = {seq: action for seq, action in actions.items() if _present(action[0])}
+    draft_ids = draft_team_ids({seq: str(action[1]) for seq, action in actions.items() if _present(action[1])})
+    rows = []
+    for seq in sorted(actions):
+        action_type, drafter, champion_id, champion_name = actions[seq]
+        drafter = str(drafter) if _present(drafter) else None
+        team_side = SIDES[draft_ids.index(drafter)] if drafter is not None and drafter in draft_ids else None
+        rows.append((str(game_id), int(seq), team_side, str(action_type).lower(), drafter,
+                     str(champion_id) if _present(champion_id) else None,
+                     str(champion_name) if _present(champion_name) else None))
+    return rows
+
+
+_INSERT_DRAFT_ACTIONS_SQL = """
+    INSERT OR REPLACE INTO {schema}.draft_actions
+    (game_id, seq, team_side, action_type, drafter_team_id, champion_id, champion_name)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def save_draft_actions(cursor, game_id, actions):
+    """Перезаписывает действия драфта игры (формат actions - как у draft_action_rows); возвращает число строк."""
+    rows = draft_action_rows(game_id, actions)
+    cursor.execute("DELETE FROM draft_actions WHERE game_id = ?", (str(game_id),))
+    if rows:
+        cursor.executemany(_INSERT_DRAFT_ACTIONS_SQL.format(schema="main"), rows)
+    return len(rows)
+
+
+def backfill_draft_actions(cursor, schema="main"):
+    """Заполняет пустую draft_actions из колонок Draft_Action_* (игры, сохранённые до таблицы)."""
+    if cursor.execute(f"SELECT 1 FROM {schema}.draft_actions LIMIT 1").fetchone():
+        return 0
+    fields = ("Type", "TeamID", "ChampID", "ChampName")
+    columns = ", ".join(f'"Draft_Action_{seq}_{field}"' for seq in range(1, DRAFT_ACTIONS + 1) for field in fields)
+    rows = []
+    for game in cursor.execute(f'SELECT "Game_ID", {columns} FROM {schema}.tournament_games').fetchall():
+        game = tuple(game)
+        if game[0]:
+            rows.extend(draft_action_rows(game[0], {
+                seq: game[4 * seq - 3:4 * seq + 1] for seq in range(1, DRAFT_ACTIONS + 1)}))
+    if rows:
+        cursor.executemany(_INSERT_DRAFT_ACTIONS_SQL.format(schema=schema), rows)
+    return len(rows)
+
+
+# --- Метрики ---
+def _names(table, counts, champ_position=-1):
+    """{(..., champ): value} -> {(..., champ_name): value}."""
+    named = {}
+    for key, value in counts.items():
+        key = list(key)
+        key[champ_position] = table.champions[key[champ_position]]
+        named[tuple(key)] = value
+    return named
+
+
+def _duo_counts(table, pair_mask, pair_wins):
+    """pair_mask/pair_wins [game, side] -> {title: [(champ1, champ2, games, wins)]} по составам."""
+    duos = {}
+    for role1, role2, title in DUO_ROLES:
+        champ1 = table.lineup[:, :, ROLES.index(role1)]
+        champ2 = table.lineup[:, :, ROLES.index(role2)]
+        counts = count_by((champ1, champ2), pair_mask & (champ1 >= 0) & (champ2 >= 0), pair_wins)
+        duos[title] = [(table.champions[c1], table.champions[c2], games, wins) for (c1, c2), (games, wins) in counts.items()]
+    return duos
+
+
+def overall_draft_stats(table):
+    """
+    Общий обзор (только игры с Winner_Side Blue/Red): total_games, blue_wins,
+    picks {champ: (picks, wins)}, picks_by_role {role: {champ: (picks, wins)}},
+    bans {ban_id: count}, duos {title: [(champ1, champ2, games, wins)]}.
+    """
+    import numpy as np
+    valid_games = table.winner <= RED
+    valid = valid_games[table.game]
+    row_wins = table.winner[table.game] == table.side
+
+    picks_mask = valid & (table.action == PICK)
+    picks = {champ: value for (champ,), value in _names(table, count_by((table.champ,), picks_mask, row_wins)).items()}
+    picks_by_role = {}
+    for (role, champ), value in _names(table, count_by((table.role, table.champ), picks_mask, row_wins)).items():
+        picks_by_role.setdefault(ROLES[role], {})[champ] = value
+    bans = {ban_id: count for (ban_id,), (count, _) in _names(table, count_by((table.champ,), valid & (table.action == BAN))).items()}
+
+    sides = np.array([BLUE, RED], dtype=np.int8)
+    pair_mask = np.broadcast_to(valid_games[:, None], (table.games, 2))
+    return {
+        "total_games": int(valid_games.sum()),
+        "blue_wins": int((table.winner == BLUE).sum()),
+        "picks": picks,
+        "picks_by_role": picks_by_role,
+        "bans": bans,
+        "duos": _duo_counts(table, pair_mask, table.winner[:, None] == sides),
+    }
+
+
+def team_draft_stats(table, team_tag, side_filter="all"):
+    """
+    Драфт команды. side_filter (blue/red/all) ограничивает пики по ролям, пики по ротациям и дуо;
+    баны, приоритет и паттерны считаются по всем играм команды, как на странице команды.
+    Возвращает счётчики игр и словари {..: (games, wins)} / {..: count} с именами чемпионов.
+    """
+    import numpy as np
+    team_side = table.team_side(team_tag)
+    played = team_side >= 0
+    game_wins = played & (table.winner == team_side)
+    on_blue, on_red = team_side == BLUE, team_side == RED
+    if side_filter == "blue":
+        processed = on_blue
+    elif side_filter == "red":
+        processed = on_red
+    else:
+        processed = played
+
+    row_side = team_side[table.game]
+    ours = table.side == row_side
+    row_wins = game_wins[table.game]
+    row_processed = processed[table.game]
+    rotation, phase, slot = table.turns()
+    draft_picks = ours & (table.action == DRAFT_PICK)
+
+    picks = {}
+    for (role, champ), value in _names(table, count_by((table.role, table.champ), ours & row_processed & (table.action == PICK), row_wins)).items():
+        picks.setdefault(ROLES[role], {})[champ] = value
+
+    bans = {f"{who}_team_{side}_rot{rot}": {} for who in ("by", "vs") for side in ("blue", "red") for rot in (1, 2)}
+    ban_rotation = np.where(table.seq > BAN_ROTATION_ONE_LAST, 2, 1)
+    ban_counts = count_by((ours, row_side, ban_rotation, table.champ), (row_side >= 0) & (table.action == BAN))
+    for (is_ours, side, rot, ban_id), (count, _) in _names(table, ban_counts).items():
+        bans[f"{'by' if is_ours else 'vs'}_team_{SIDES[side].lower()}_rot{rot}"][ban_id] = count
+
+    detailed_picks = {f"{side}_rot{rot}": {} for side in ("blue", "red") for rot in (1, 2)}
+    detailed_counts = count_by((row_side, rotation, table.champ), draft_picks & row_processed & (rotation > 0), row_wins)
+    for (side, rot, champ), value in _names(table, detailed_counts).items():
+        detailed_picks[f"{SIDES[side].lower()}_rot{rot}"][champ] = value
+
+    priority = {"Blue": {}, "Red": {}}
+    for (side, champ, phase_code), (count, _) in _names(table, count_by((row_side, table.champ, phase), draft_picks & (phase >= 0)), 1).items():
+        priority[SIDES[side]].setdefault(champ, {})[PRIORITY_PHASES[phase_code]] = count
+
+    # Паттерны ролей: пики, сделанные самой командой (по Drafter_Team_ID) на своих ходах
+    patterns = {"Blue": {}, "Red": {}}
+    own_picks = draft_picks & (table.drafter == row_side) & (slot >= 0) & (table.role >= 0)
+    for (side, slot_code, role), (count, _) in count_by((row_side, slot, table.role), own_picks).items():
+        patterns[SIDES[side]].setdefault(PATTERN_SLOTS[slot_code], {})[ROLES[role]] = count
+
+    sides = np.array([BLUE, RED], dtype=np.int8)
+    pair_mask = processed[:, None] & (team_side[:, None] == sides)
+    decided = table.winner != WINNER_CODES["Unknown"]
+    return {
+        "games_played": int(played.sum()), "wins": int(game_wins.sum()),
+        "losses": int((played & ~game_wins & decided).sum()),
+        "games_blue": int(on_blue.sum()), "wins_blue": int((game_wins & on_blue).sum()),
+        "losses_blue": int((on_blue & (table.winner == RED)).sum()),
+        "games_red": int(on_red.sum()), "wins_red": int((game_wins & on_red).sum()),
+        "losses_red": int((on_red & (table.winner == BLUE)).sum()),
+        "picks": picks,
+        "bans": bans,
+        "detailed_picks": detailed_picks,
+        "priority": priority,
+        "patterns": patterns,
+        "duos": _duo_counts(table, pair_mask, game_wins[:, None]),
+    }
+
+
+# --- Снапшоты общего обзора ---
+# overall_summary_snapshots: счётчики overall_draft_stats по (турнир, патч) в JSON. Общий обзор
+# складывает снапшоты; пересчитываются только патчи, где игры добавились или изменились.
+# Формат summary - при изменении увеличить, старые снапшоты пересчитаются (при чтении - в памяти)
+OVERALL_SNAPSHOT_VERSION = 1
+# Сложенные снапшоты в памяти процесса до смены data generation
+_overall_summary_cache = {"generation": None, "summaries": {}}
+_overall_summary_cache_lock = threading.Lock()
+
+
+def _snapshot_buckets(conn, tournament_id=None):
+    """[(Tournament_ID, Patch, games, last Date)] - только индекс (Tournament_ID, Patch, Date), без чтения игр."""
+    scope_sql, params = (' WHERE "Tournament_ID" = ?', (str(tournament_id),)) if tournament_id else ("", ())
+    return conn.execute(
+        f'SELECT "Tournament_ID", "Patch", COUNT(*), MAX("Date") FROM tournament_games{scope_sql} GROUP BY "Tournament_ID", "Patch"',
+        params).fetchall()
+
+
+def _bucket_summary(conn, tournament_id, patch):
+    """overall_draft_stats одного патча турнира -> dict для JSON (пары счётчиков - списками)."""
+    quoted = ", ".join(f'"{column}"' for column in _game_columns())
+    game_rows = conn.execute(
+        f'SELECT {quoted} FROM tournament_games WHERE "Tournament_ID" IS ? AND "Patch" IS ? '
+        f'ORDER BY "Date" DESC, "Series_ID" ASC, "Sequence_Number" ASC',
+        (tournament_id, patch)).fetchall()
+    overall = overall_draft_stats(build_draft_table(game_rows, ()))
+    return {
+        "games": len(game_rows),
+        "total_games": overall["total_games"],
+        "blue_wins": overall["blue_wins"],
+        "picks": [[champ, picks, wins] for champ, (picks, wins) in overall["picks"].items()],
+        "picks_by_role": {role: [[champ, picks, wins] for champ, (picks, wins) in champs.items()]
+                          for role, champs in overall["picks_by_role"].items()},
+        "bans": [[ban_id, count] for ban_id, count in overall["bans"].items()],
+        "duos": {title: [list(entry) for entry in entries] for title, entries in overall["duos"].items()},
+    }
+
+
+def _merge_summaries(summaries):
+    """Сумма снапшотов в формате overall_draft_stats (+ games); порядок ключей - первое появление."""
+    def add(target, key, values):
+        current = target.get(key)
+        target[key] = tuple(values) if current is None else tuple(a + b for a, b in zip(current, values))
+
+    picks, picks_by_role, bans = {}, {}, {}
+    duos = {title: {} for _, _, title in DUO_ROLES}
+    games = total_games = blue_wins = 0
+    for summary in summaries:
+        games += summary["games"]
+        total_games += summary["total_games"]
+        blue_wins += summary["blue_wins"]
+        for champ, *values in summary["picks"]:
+            add(picks, champ, values)
+        for role, entries in summary["picks_by_role"].items():
+            for champ, *values in entries:
+                add(picks_by_role.setdefault(role, {}), champ, values)
+        for ban_id, count in summary["bans"]:
+            bans[ban_id] = bans.get(ban_id, 0) + count
+        for title, entries in summary["duos"].items():
+            for champ1, champ2, *values in entries:
+                add(duos.setdefault(title, {}), (champ1, champ2), values)
+    return {
+        "games": games, "total_games": total_games, "blue_wins": blue_wins,
+        "picks": picks, "picks_by_role": picks_by_role, "bans": bans,
+        "duos": {title: [(champ1, champ2, *values) for (champ1, champ2), values in pairs.items()]
+                 for title, pairs in duos.items()},
+    }
+
+
+def _collect_overall_snapshots(conn, tournament_id=None):
+    """
+    summary всех патчей - от последних игр к ранним - и строки для записи: отсутствующие и
+    устаревшие снапшоты (версия формата, число игр или последняя дата патча не совпали)
+    пересчитываются в памяти.
+    """
+    scope_sql, params = (" WHERE tournament_id = ?", (str(tournament_id),)) if tournament_id else ("", ())
+    stored = {(row[0], row[1]): row for row in conn.execute(
+        f"SELECT tournament_id, patch, version, games, last_game_date, summary FROM overall_summary_snapshots{scope_sql}",
+        params).fetchall()}
+    summaries, updated = [], []
+    for bucket_tournament, patch, games, last_date in sorted(_snapshot_buckets(conn, tournament_id),
+                                                             key=lambda bucket: bucket[3] or "", reverse=True):
+        key = (bucket_tournament or "", patch or "")
+        row = stored.get(key)
+        if row is not None and row[2] == OVERALL_SNAPSHOT_VERSION and row[3] == games and row[4] == last_date:
+            summaries.append(json.loads(row[5]))
+            continue
+        summary = _bucket_summary(conn, bucket_tournament, patch)
+        summaries.append(summary)
+        updated.append((*key, OVERALL_SNAPSHOT_VERSION, games, last_date, json.dumps(summary),
+                        datetime.now(timezone.utc).isoformat()))
+    return summaries, updated
+
+
+def refresh_overall_snapshots(conn, tournament_id=None):
+    """Ingest: сохраняет отсутствующие и устаревшие снапшоты; commit - на вызывающем. Возвращает summary патчей."""
+    summaries, updated = _collect_overall_snapshots(conn, tournament_id)
+    if updated:
+        conn.executemany("""
+            INSERT OR REPLACE INTO overall_summary_snapshots
+            (tournament_id, patch, version, games, last_game_date, summary, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, updated)
+    return summaries
+
+
+def get_overall_summary(conn, tournament_id=None):
+    """
+    Общий обзор турнира (None - все игры базы) из снапшотов: dict как у overall_draft_stats плюс games.
+    Недостающие снапшоты считаются в памяти и не записываются - их сохраняет ingest.
+    """
+    generation = get_data_generation(conn)
+    cache_key = str(tournament_id) if tournament_id else None
+    with _overall_summary_cache_lock:
+        if _overall_summary_cache["generation"] != generation:
+            _overall_summary_cache["generation"] = generation
+            _overall_summary_cache["summaries"] = {}
+        merged = _overall_summary_cache["summaries"].get(cache_key)
+        if merged is not None:
+            return merged
+
+    summaries, _ = _collect_overall_snapshots(conn, tournament_id)
+    merged = _merge_summaries(summaries)
+
+    with _overall_summary_cache_lock:
+        if _overall_summary_cache["generation"] == generation:
+            _overall_summary_cache["summaries"][cache_key] = merged
+    return merged
+
+
+def invalidate_overall_snapshots(cursor, game_id, tournament_id, patch):
+    """Перед записью игры: снапшоты её патча (и прежнего при перезаписи игры) уходят в пересчёт."""
+    buckets = {(str(tournament_id or ""), str(patch or ""))}
+    previous = cursor.execute('SELECT "Tournament_ID", "Patch" FROM tournament_games WHERE "Game_ID" = ?',
+                              (str(game_id),)).fetchone()
+    if previous:
+        buckets.add((previous[0] or "", previous[1] or ""))
+    cursor.executemany("DELETE FROM overall_summary_snapshots WHERE tournament_id = ? AND patch = ?", sorted(buckets))
+
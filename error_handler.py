@@ -4,66 +4,184 @@ Centralized error handling and logging system for LoL Analytics Application.
 Provides consistent error handling, logging, and recovery strategies.
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+import threading
 import traceback
 import functools
+from datetime import datetime, timezone
 from typing import Callable, Any, Optional
-from datetime import datetime
 import sqlite3
 import os
+import time
 
+from config import config
 
-class AppLogger:
-    """Centralized logging configuration"""
+ROOT_LOGGER_NAME = "lol_analytics"
+# Атрибуты LogRecord, которые не попадают в структурированные поля
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "fields", "sample", "sample_passed"}
 
-    _loggers = {}
 
-    @classmethod
-    def get_logger(cls, name: str = "lol_analytics") -> logging.Logger:
-        """Get or create a logger with the specified name"""
-        if name in cls._loggers:
-            return cls._loggers[name]
+def _utc_timestamp(record):
+    return datetime.fromtimestamp(record.created, timezone.utc)
 
-        logger = logging.getLogger(name)
 
-        # Avoid duplicate handlers
-        if logger.handlers:
-            return logger
+class TextFormatter(logging.Formatter):
+    """2025-01-01 12:00:00 UTC INFO :: message key=value (формат прежнего log_message + уровень и поля)"""
 
-        logger.setLevel(logging.INFO)
+    def __init__(self, with_location=False):
+        super().__init__()
+        self.with_location = with_location
 
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
+    def format(self, record):
+        line = f"{_utc_timestamp(record):%Y-%m-%d %H:%M:%S} UTC {record.levelname} :: {record.getMessage()}"
+        if self.with_location:
+            line = f"{line} [{record.filename}:{record.lineno}]"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
 
-        # File handler
-        try:
-            log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-            os.makedirs(log_dir, exist_ok=True)
 
-            file_handler = logging.FileHandler(
-                os.path.join(log_dir, 'app.log'),
-                encoding='utf-8'
-            )
-            file_handler.setLevel(logging.DEBUG)
-            file_formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
-            file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
-        except Exception as e:
-            logger.warning(f"Could not create file handler: {e}")
+class JsonFormatter(logging.Formatter):
+    """Одна JSON строка на запись: ts, level, logger, module, line, msg + поля из extra."""
+
+    def format(self, record):
+        entry = {
+            "ts": _utc_timestamp(record).isoformat(timespec="milliseconds"),
+            "level": record.levelname, "logger": record.name,
+            "module": record.module, "line": record.lineno, "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживание шумных сообщений в цикле: запись с extra sample=<ключ> проходит первой и
+    далее каждой every-й по этому ключу. Ключи - постоянные строки call site, не id объектов.
+    Решение принимается один раз на запись (record.sample_passed): без очереди фильтр стоит
+    на каждом обработчике, и stdout и файл должны получить одни и те же записи.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(int(every), 1)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None or self.every == 1:
+            return True
+        decided = getattr(record, "sample_passed", None)
+        if decided is not None:
+            return decided
+        with self._lock:
+            count = self._counts[key] = self._counts.get(key, 0) + 1
+        record.sample_passed = count % self.every == 1
+        if record.sample_passed:
+            record.fields = dict(getattr(record, "fields", None) or {}, sampled=f"{count} (1/{self.every})")
+        return record.sample_passed
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler для очереди в том же процессе: prepare() только подставляет args в msg, без
+    полного format() в потоке вызова (время, JSON, обработчики - в потоке QueueListener).
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
 
+class AppLogger:
+    """
+    Centralized logging: все модули пишут в логгер lol_analytics (или его потомков).
+    Обработчики stdout и файла работают за QueueListener, вызов логгера только кладёт
+    запись в очередь. Уровень, формат и файл - config.logging.
+    """
+
+    _loggers = {}
+    _listener = None
+    _configure_lock = threading.Lock()
+
+    @classmethod
+    def _build_handlers(cls):
+        formatter = JsonFormatter() if config.logging.format == "json" else TextFormatter()
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        handlers = [console_handler]
+        if config.logging.file:
+            try:
+                os.makedirs(os.path.dirname(config.logging.file), exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    config.logging.file, maxBytes=config.logging.file_max_bytes,
+                    backupCount=config.logging.file_backup_count, encoding='utf-8')
+                file_handler.setFormatter(JsonFormatter() if config.logging.format == "json" else TextFormatter(with_location=True))
+                handlers.append(file_handler)
+            except OSError as e:
+                print(f"Could not create log file handler: {e}")
+        return handlers
+
+    @classmethod
+    def _restart_listener_after_fork(cls):
+        # Поток QueueListener не переживает fork (gunicorn --preload): в воркере запускаем заново
+        if cls._listener is not None:
+            cls._listener._thread = None
+            cls._listener.start()
+
+    @classmethod
+    def _configure_root(cls):
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        with cls._configure_lock:
+            if root.handlers:
+                return root
+            root.setLevel(getattr(logging, config.logging.level, logging.INFO))
+            root.propagate = False
+            handlers = cls._build_handlers()
+            if config.logging.async_queue:
+                log_queue = queue.SimpleQueue()
+                cls._listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+                cls._listener.start()
+                atexit.register(cls._listener.stop)
+                if hasattr(os, "register_at_fork"):
+                    os.register_at_fork(after_in_child=cls._restart_listener_after_fork)
+                handlers = [_LocalQueueHandler(log_queue)]
+            sampling_filter = SamplingFilter(config.logging.sample_every)
+            for handler in handlers:
+                handler.addFilter(sampling_filter)
+                root.addHandler(handler)
+        return root
+
+    @classmethod
+    def get_logger(cls, name: str = ROOT_LOGGER_NAME) -> logging.Logger:
+        """Логгер lol_analytics или его потомок lol_analytics.<name>"""
+        if name in cls._loggers:
+            return cls._loggers[name]
+        cls._configure_root()
+        logger = logging.getLogger(name if name.startswith(ROOT_LOGGER_NAME) else f"{ROOT_LOGGER_NAME}.{name}")
         cls._loggers[name] = logger
         return logger
 
+    @classmethod
+    def flush(cls):
+        """Дождаться вывода всего, что уже в очереди (скрипты перед выходом, тесты)."""
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener.start()
+
 
 # Global logger instance
 logger = AppLogger.get_logger()
@@ -301,14 +419,15 @@ def validate_input(
 
 
 def log_performance(func: Callable) -> Callable:
-    """Decorator to log function execution time"""
+    """Decorator to log slow calls; inside a request the call is also a timing span named after the function"""
+    from request_timing import span
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = datetime.now()
-        result = func(*args, **kwargs)
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
+        start_time = time.perf_counter()
+        with span(func.__name__):
+            result = func(*args, **kwargs)
+        duration = time.perf_counter() - start_time
 
         if duration > 1.0:  # Log if takes more than 1 second
             logger.info(
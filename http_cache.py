@@ -0,0 +1,186 @@
+# lol_app_LTA_2/http_cache.py
+"""
+HTTP caching middleware: ETag / If-None-Match for data views, gzip (and brotli
+when installed) compression of large responses, and long-lived cache headers
+for versioned static files.
+
+The ETag of a view is derived from the data generation (bumped on every ingest
+commit), the endpoint, its filter args and a build id (mtimes of the code and
+templates), so it only changes when the rendered data can change.
+"""
+
+import os
+import gzip
+import hashlib
+from datetime import datetime, timezone
+
+from flask import Response, g, request, session
+
+from config import config
+from database import get_db_connection, get_data_generation
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+_basedir = os.path.abspath(os.path.dirname(__file__))
+
+# Страницы (и PNG тепловых карт), на которые отвечаем 304 до построения данных
+CACHEABLE_ENDPOINTS = {
+    'tournament', 'jng_clear', 'objects', 'wards', 'wards_heatmap', 'proximity', 'start_positions', 'soloq', 'swap'
+}
+# Фильтры вида "1 week" зависят от текущей даты - добавляем её в ETag
+TIME_RELATIVE_ENDPOINTS = {'soloq', 'api.api_soloq'}
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/json', 'application/javascript', 'image/svg+xml'
+}
+_ENCODING_SUFFIXES = ("", "-gzip", "-br")
+
+
+def _compute_build_id():
+    """Хэш mtime кода, шаблонов и static: одинаков во всех воркерах, меняется при деплое."""
+    mtimes = []
+    for folder in (_basedir, os.path.join(_basedir, 'templates'), os.path.join(_basedir, 'static')):
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if os.path.isfile(path) and (folder != _basedir or name.endswith('.py')):
+                mtimes.append(f"{name}:{int(os.path.getmtime(path))}")
+    return hashlib.sha1("|".join(mtimes).encode("utf-8")).hexdigest()[:8]
+
+
+BUILD_ID = _compute_build_id()
+
+
+def get_request_data_generation():
+    """Data generation, прочитанный один раз за запрос."""
+    if 'data_generation' not in g:
+        conn = get_db_connection()
+        if not conn:
+            g.data_generation = 0
+        else:
+            try:
+                g.data_generation = get_data_generation(conn)
+            finally:
+                conn.close()
+    return g.data_generation
+
+
+def compute_etag(endpoint=None, args=None):
+    """ETag = hash(build id, data generation, endpoint, отсортированные аргументы фильтров)."""
+    endpoint = endpoint or request.endpoint
+    args = request.args if args is None else args
+    args_key = "&".join(f"{k}={v}" for k, v in sorted(args.items(multi=True)))
+    raw = f"{BUILD_ID}|{get_request_data_generation()}|{endpoint}|{args_key}"
+    if endpoint in TIME_RELATIVE_ENDPOINTS:
+        raw += "|" + datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def etag_matches(etag):
+    """Совпавший вариант ETag из If-None-Match (в т.ч. сжатые -gzip/-br) или None."""
+    if not request.if_none_match:
+        return None
+    for suffix in _ENCODING_SUFFIXES:
+        if request.if_none_match.contains(etag + suffix):
+            return etag + suffix
+    return None
+
+
+def not_modified_response(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _has_pending_flashes():
+    # Страница с flash-сообщением уникальна для запроса - не кэшируем
+    return bool(session.get('_flashes'))
+
+
+def _check_not_modified():
+    if not config.http_cache.enabled or request.method != 'GET':
+        return None
+    if request.endpoint not in CACHEABLE_ENDPOINTS or _has_pending_flashes():
+        return None
+    etag = compute_etag()
+    g.view_etag = etag
+    matched_etag = etag_matches(etag)
+    if matched_etag:
+        return not_modified_response(matched_etag)
+    return None
+
+
+def _compress_response(response):
+    if response.direct_passthrough or response.status_code != 200:
+        return response
+    if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < config.http_cache.compress_min_size:
+        return response
+
+    accept_encodings = request.accept_encodings
+    if BROTLI_AVAILABLE and accept_encodings['br']:
+        encoding, suffix = 'br', '-br'
+        compressed = brotli.compress(data, quality=config.http_cache.brotli_quality)
+    elif accept_encodings['gzip']:
+        encoding, suffix = 'gzip', '-gzip'
+        compressed = gzip.compress(data, compresslevel=config.http_cache.gzip_level)
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # Сжатое представление - другой набор байт, поэтому отдельный ETag
+    etag, is_weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + suffix, weak=is_weak)
+    return response
+
+
+def _set_cache_headers(response):
+    if request.endpoint == 'static':
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = f"public, max-age={config.http_cache.static_max_age}, immutable"
+        return response
+
+    etag = g.get('view_etag')
+    if etag and response.status_code == 200 and not response.get_etag()[0] and not _has_pending_flashes():
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _static_url_version(endpoint, values):
+    """url_for('static', ...) -> ...?v=<mtime>, чтобы static можно было кэшировать надолго."""
+    if endpoint != 'static' or 'v' in values or 'filename' not in values:
+        return
+    path = os.path.join(_basedir, 'static', values['filename'])
+    try:
+        values['v'] = int(os.path.getmtime(path))
+    except OSError:
+        pass
+
+
+def init_http_cache(app):
+    """Подключает middleware к Flask приложению."""
+    if not config.http_cache.enabled:
+        return
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = config.http_cache.static_max_age
+    app.url_defaults(_static_url_version)
+    app.before_request(_check_not_modified)
+
+    @app.after_request
+    def _http_cache_after_request(response):
+        response = _set_cache_headers(response)
+        return _compress_response(response)
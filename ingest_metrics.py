@@ -0,0 +1,285 @@
+# lol_app_LTA_2/ingest_metrics.py
+"""
+Метрики прогона ingest: латентность API по эндпоинтам (с гистограммой), повторы и 429,
+байты загрузок (livestats отдельно), время парсинга по экстракторам, строки и время
+записи по таблицам, время commit.
+
+Прогон открывается ingest_run(...) и живёт в contextvar, как RequestTiming в
+request_timing. Вне прогона все хелперы ничего не делают. По завершении прогон
+сохраняется одной строкой в ingest_runs (метрики - JSON) и виден на /ingest/runs.
+"""
+
+import bisect
+import contextvars
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import config
+from database import get_db_connection
+from error_handler import AppLogger
+
+# Границы бакетов латентности API, секунды (GRID отвечает от сотен мс до десятков секунд)
+API_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+# series/123/games/2 -> series/{id}/games/{id}: эндпоинты группируются по шаблону
+_ENDPOINT_ID_RE = re.compile(r"/\d+")
+
+logger = AppLogger.get_logger("ingest_metrics")
+_current_run = contextvars.ContextVar("ingest_run", default=None)
+
+
+def endpoint_label(endpoint):
+    return _ENDPOINT_ID_RE.sub("/{id}", endpoint)
+
+
+class IngestRun:
+    """Счётчики и таймеры одного прогона."""
+    __slots__ = ("kind", "tournament_id", "started_at", "started", "api", "parse", "tables", "commit", "counters", "games")
+
+    def __init__(self, kind, tournament_id=None):
+        self.kind = kind
+        self.tournament_id = tournament_id
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.started = time.perf_counter()
+        self.api = {}
+        self.parse = {}
+        self.tables = {}
+        self.commit = {"calls": 0, "seconds": 0.0}
+        self.counters = {"retries": 0, "rate_limited": 0, "livestats_downloads": 0, "livestats_bytes": 0}
+        self.games = 0
+
+    def observe_api(self, endpoint, seconds, status, size):
+        stats = self.api.get(endpoint)
+        if stats is None:
+            stats = self.api[endpoint] = {
+                "requests": 0, "errors": 0, "rate_limited": 0, "retries": 0,
+                "seconds": 0.0, "max_seconds": 0.0, "bytes": 0,
+                "buckets": [0] * (len(API_LATENCY_BUCKETS) + 1)
+            }
+        stats["requests"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["bytes"] += size
+        stats["buckets"][bisect.bisect_left(API_LATENCY_BUCKETS, seconds)] += 1
+        if status is None or status >= 400:
+            stats["errors"] += 1
+        if status == 429:
+            stats["rate_limited"] += 1
+            self.counters["rate_limited"] += 1
+
+    def to_metrics(self):
+        duration = time.perf_counter() - self.started
+        api_seconds = sum(stats["seconds"] for stats in self.api.values())
+        parse_seconds = sum(stats["seconds"] for stats in self.parse.values())
+        write_seconds = sum(stats["seconds"] for stats in self.tables.values())
+        return duration, {
+            "summary": {
+                "api_seconds": round(api_seconds, 4),
+                "parse_seconds": round(parse_seconds, 4),
+                "write_seconds": round(write_seconds, 4),
+                "commit_seconds": round(self.commit["seconds"], 4),
+                # Паузы API_REQUEST_DELAY, backoff повторов и прочее
+                "other_seconds": round(max(duration - api_seconds - parse_seconds - write_seconds - self.commit["seconds"], 0.0), 4),
+            },
+            "counters": self.counters,
+            "api": self.api,
+            "parse": self.parse,
+            "tables": self.tables,
+            "commit": self.commit,
+            "api_latency_buckets": API_LATENCY_BUCKETS,
+        }
+
+
+def current_run():
+    return _current_run.get()
+
+
+@contextmanager
+def ingest_run(kind, tournament_id=None):
+    """Открывает прогон; на выходе (в т.ч. по исключению) сохраняет его в ingest_runs."""
+    if not config.timing.ingest_metrics or _current_run.get() is not None:
+        yield _current_run.get()
+        return
+    run = IngestRun(kind, tournament_id)
+    token = _current_run.set(run)
+    status = "error"
+    try:
+        yield run
+        status = "ok"
+    finally:
+        _current_run.reset(token)
+        save_ingest_run(run, status)
+
+
+def timed_api_call(endpoint, send, *args, **kwargs):
+    """send(*args, **kwargs) (requests.get/post) с замером латентности, статуса и размера ответа."""
+    run = _current_run.get()
+    if run is None:
+        return send(*args, **kwargs)
+    started = time.perf_counter()
+    response = None
+    try:
+        response = send(*args, **kwargs)
+        return response
+    finally:
+        # bool(Response) ложно для 4xx/5xx - сравниваем с None
+        status = response.status_code if response is not None else None
+        size = len(response.content) if response is not None else 0
+        run.observe_api(endpoint_label(endpoint), time.perf_counter() - started, status, size)
+
+
+def record_retry(endpoint):
+    run = _current_run.get()
+    if run is None:
+        return
+    run.counters["retries"] += 1
+    stats = run.api.get(endpoint_label(endpoint))
+    if stats is not None:
+        stats["retries"] += 1
+
+
+def add_counter(name, value=1):
+    run = _current_run.get()
+    if run is not None:
+        run.counters[name] = run.counters.get(name, 0) + value
+
+
+@contextmanager
+def track_parse(extractor):
+    """Время одного вызова экстрактора."""
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = run.parse.setdefault(extractor, {"calls": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["seconds"] += time.perf_counter() - started
+
+
+@contextmanager
+def track_writes(conn, table):
+    """Время записи в таблицу и число изменённых строк (conn.total_changes: INSERT/UPDATE/DELETE, включая триггеры)."""
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    changes_before = conn.total_changes
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = run.tables.setdefault(table, {"calls": 0, "rows": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["rows"] += conn.total_changes - changes_before
+        stats["seconds"] += time.perf_counter() - started
+
+
+@contextmanager
+def track_commit():
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.commit["calls"] += 1
+        run.commit["seconds"] += time.perf_counter() - started
+
+
+def save_ingest_run(run, status):
+    duration, metrics = run.to_metrics()
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO ingest_runs (kind, tournament_id, started_at, duration_seconds, status, games, metrics)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (run.kind, run.tournament_id, run.started_at, round(duration, 3), status, run.games, json.dumps(metrics)))
+        run_id = cursor.lastrowid
+        keep = max(config.timing.ingest_runs_keep, 1)
+        cursor.execute("DELETE FROM ingest_runs WHERE run_id <= ?", (run_id - keep,))
+        conn.commit()
+        return run_id
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save ingest run metrics: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def _approx_percentile(buckets, fraction):
+    """Верхняя граница бакета, в который попадает перцентиль (None - выше последней границы)."""
+    total = sum(buckets)
+    if not total:
+        return None
+    threshold = total * fraction
+    cumulative = 0
+    for bound, count in zip(API_LATENCY_BUCKETS, buckets):
+        cumulative += count
+        if cumulative >= threshold:
+            return bound
+    return None
+
+
+def _format_run(row):
+    run = dict(row)
+    run["metrics"] = json.loads(run["metrics"]) if run.get("metrics") else {}
+    for endpoint, stats in run["metrics"].get("api", {}).items():
+        stats["endpoint"] = endpoint
+        stats["avg_seconds"] = stats["seconds"] / stats["requests"] if stats["requests"] else 0.0
+        stats["p50_le"] = _approx_percentile(stats["buckets"], 0.5)
+        stats["p95_le"] = _approx_percentile(stats["buckets"], 0.95)
+    return run
+
+
+def get_ingest_runs(limit=50, tournament_id=None):
+    """Последние прогоны (без тяжёлого JSON метрик, кроме summary)."""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        scope_sql, params = ("WHERE tournament_id = ?", [tournament_id]) if tournament_id else ("", [])
+        cursor.execute(f"""
+            SELECT run_id, kind, tournament_id, started_at, duration_seconds, status, games,
+                   json_extract(metrics, '$.summary') AS summary
+            FROM ingest_runs {scope_sql} ORDER BY run_id DESC LIMIT ?
+        """, params + [limit])
+        runs = []
+        for row in cursor.fetchall():
+            run = dict(row)
+            run["summary"] = json.loads(run["summary"]) if run["summary"] else {}
+            runs.append(run)
+        return runs
+    except sqlite3.Error as e:
+        logger.error(f"Failed to load ingest runs: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_ingest_run(run_id):
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM ingest_runs WHERE run_id = ?", (run_id,))
+        row = cursor.fetchone()
+        return _format_run(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to load ingest run {run_id}: {e}")
+        return None
+    finally:
+        conn.close()
@@ -7,15 +7,28 @@ import math
 
 # Импорты из существующих модулей вашего проекта
 from database import get_db_connection
+from request_timing import traced, stage
 from scrims_logic import log_message, get_champion_icon_html, get_champion_data
-from tournament_logic import TEAM_TAG_TO_FULL_NAME, UNKNOWN_BLUE_TAG, UNKNOWN_RED_TAG
+from tournament_logic import (get_team_registry, resolve_team_tag, tournament_scope_sql, load_jungle_timelines,
+                              get_jungle_event_names, find_jungle_events)
 
-def get_jng_clear_data(selected_team_full_name, selected_champion):
+EPIC_OBJECTIVES = ["VoidGrub", "Herald", "Drake", "Baron"]
+
+
+def _new_full_game_stats():
+    return {"games": 0, "camps": 0, "ganks": 0, "recalls": 0,
+            "gank_lanes": defaultdict(int), "first_objectives": defaultdict(list)}
+
+
+@traced("aggregate")
+def get_jng_clear_data(selected_team_full_name, selected_champion, tournament_id=None, event_filter=None, event_before_min=None):
     """
     Извлекает и агрегирует данные о зачистке леса для страницы JNG Clear.
     Версия 2.3: Финальное исправление ошибки инициализации.
+    event_filter/event_before_min оставляют только игры, где лесник сделал действие
+    (кемп/объект/Gank/Recall) до указанной минуты - выборка по индексу jungle_camp_windows.
     """
-    conn = get_db_connection()
+    conn = get_db_connection(tournament_id)
     if not conn:
         return [], {"error": "Database connection failed"}, []
 
@@ -23,62 +36,55 @@ def get_jng_clear_data(selected_team_full_name, selected_champion):
     all_teams_display = []
     # ИСПРАВЛЕННАЯ СТРУКТУРА: Простой словарь, который инициализируется корректно.
     stats = {
-        "error": None, "message": None,
+        "error": None, "message": None, "jungle_events": [],
         "blue_side": {
             "total_games": 0,
             "champions": defaultdict(lambda: {'games': 0, 'wins': 0}),
             "clears": [defaultdict(list) for _ in range(7)],
             "deltas": [[] for _ in range(6)],
-            "overall_camp_times": [[] for _ in range(7)]
+            "overall_camp_times": [[] for _ in range(7)],
+            "full_game": _new_full_game_stats()
         },
         "red_side": {
             "total_games": 0,
             "champions": defaultdict(lambda: {'games': 0, 'wins': 0}),
             "clears": [defaultdict(list) for _ in range(7)],
             "deltas": [[] for _ in range(6)],
-            "overall_camp_times": [[] for _ in range(7)]
+            "overall_camp_times": [[] for _ in range(7)],
+            "full_game": _new_full_game_stats()
         }
     }
     available_champions = ["All"]
 
     try:
         cursor = conn.cursor()
+        stats["jungle_events"] = get_jungle_event_names(cursor)
 
         # 1. Получаем список всех команд
-        cursor.execute(f"""
-            SELECT DISTINCT Blue_Team_Name as team_tag FROM tournament_games
-            WHERE Blue_Team_Name NOT IN ('{UNKNOWN_BLUE_TAG}', 'Blue Team')
-            UNION
-            SELECT DISTINCT Red_Team_Name as team_tag FROM tournament_games
-            WHERE Red_Team_Name NOT IN ('{UNKNOWN_RED_TAG}', 'Red Team')
-        """)
-        all_teams_tags = {row['team_tag'] for row in cursor.fetchall() if row['team_tag']}
-        all_teams_display = sorted(list(set([TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in all_teams_tags])))
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
 
         if not selected_team_full_name:
             stats["message"] = "Please select a team to view jungle clear patterns."
             return all_teams_display, stats, available_champions
 
         # 2. Определяем тег команды
-        selected_team_tag = None
-        for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
-            if full_name == selected_team_full_name: selected_team_tag = tag; break
-        if not selected_team_tag and selected_team_full_name in all_teams_tags:
-            selected_team_tag = selected_team_full_name
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
         if not selected_team_tag:
             stats["error"] = f"Team tag not found for '{selected_team_full_name}'."; return all_teams_display, stats, available_champions
 
         # 3. Получаем чемпионов-лесников для фильтра
-        champs_query = """
-            SELECT DISTINCT champ FROM (SELECT Blue_JGL_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL SELECT Red_JGL_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag) 
+        scope = ' AND "Tournament_ID" = :tournament_id' if tournament_id else ""
+        champs_query = f"""
+            SELECT DISTINCT champ FROM (SELECT Blue_JGL_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL SELECT Red_JGL_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope}) 
             WHERE champ IS NOT NULL AND champ != 'N/A' ORDER BY champ ASC
         """
-        cursor.execute(champs_query, {'tag': selected_team_tag})
+        cursor.execute(champs_query, {'tag': selected_team_tag, 'tournament_id': tournament_id})
         available_champions.extend([row['champ'] for row in cursor.fetchall()])
 
         # 4. Получаем игры и данные о путях
-        query_games = "SELECT * FROM tournament_games WHERE Blue_Team_Name = ? OR Red_Team_Name = ?"
-        cursor.execute(query_games, [selected_team_tag, selected_team_tag])
+        scope_sql, scope_params = tournament_scope_sql(tournament_id)
+        query_games = f"SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql}"
+        cursor.execute(query_games, [selected_team_tag, selected_team_tag, *scope_params])
         game_rows = [dict(row) for row in cursor.fetchall()]
         if not game_rows:
             stats["message"] = "No games found for the selected team."; return all_teams_display, stats, available_champions
@@ -87,6 +93,11 @@ def get_jng_clear_data(selected_team_full_name, selected_champion):
         paths_query = f"SELECT game_id, player_puuid, path_sequence FROM jungle_pathing WHERE game_id IN ({','.join(['?']*len(game_ids))})"
         cursor.execute(paths_query, game_ids)
         paths_data = {(row['game_id'], row['player_puuid']): json.loads(row['path_sequence']) for row in cursor.fetchall()}
+        timelines_data = load_jungle_timelines(cursor, game_ids)
+        event_matches = None
+        if event_filter:
+            end_sec = event_before_min * 60 if event_before_min else None
+            event_matches = {(game_id, puuid) for game_id, puuid, _ in find_jungle_events(cursor, event_filter, 0, end_sec, game_ids)}
 
         # 5. Обрабатываем каждую игру
         for game in game_rows:
@@ -98,6 +109,7 @@ def get_jng_clear_data(selected_team_full_name, selected_champion):
             if selected_champion != "All" and jungler_champ != selected_champion: continue
 
             jungler_puuid = game.get(f"{prefix}_JGL_PUUID")
+            if event_matches is not None and (game['Game_ID'], jungler_puuid) not in event_matches: continue
             is_win = game.get("Winner_Side") == prefix
 
             stats[side_key]["total_games"] += 1
@@ -117,14 +129,36 @@ def get_jng_clear_data(selected_team_full_name, selected_champion):
                     delta = camp_clears[i+1]['time'] - camp_clears[i]['time']
                     if delta > 0: stats[side_key]["deltas"][i].append(delta)
 
+            # Полная игра: кемпы, ганки, реколы и первые эпические объекты
+            timeline = timelines_data.get((game['Game_ID'], jungler_puuid))
+            if timeline:
+                full_game = stats[side_key]["full_game"]
+                full_game["games"] += 1
+                seen_objectives = set()
+                for event in timeline["events"]:
+                    action = event["action"]
+                    if action == "Recall":
+                        full_game["recalls"] += 1
+                    elif action.startswith("Gank"):
+                        full_game["ganks"] += 1
+                        full_game["gank_lanes"][action.split(" ", 1)[-1]] += 1
+                    else:
+                        epic = next((name for name in EPIC_OBJECTIVES if name in action), None)
+                        if epic is None:
+                            full_game["camps"] += 1
+                        elif epic not in seen_objectives:
+                            seen_objectives.add(epic)
+                            full_game["first_objectives"][epic].append(event["time"])
+
     except Exception as e:
         import traceback
-        log_message(f"CRITICAL Error in get_jng_clear_data: {e}\n{traceback.format_exc()}")
+        log_message(f"CRITICAL Error in get_jng_clear_data: {e}\n{traceback.format_exc()}", level="error")
         stats["error"] = "A critical error occurred."
     finally:
         if conn: conn.close()
 
     # 6. Финальная обработка и форматирование данных
+    stage("format")
     def format_side_stats(side_data):
         if side_data["total_games"] == 0: return None
         
@@ -167,9 +201,29 @@ def get_jng_clear_data(selected_team_full_name, selected_champion):
                         }
             clear_details.append(slot_stats)
 
+        full_game = None
+        full_game_data = side_data["full_game"]
+        if full_game_data["games"]:
+            n_games = full_game_data["games"]
+            first_objectives = []
+            for epic in EPIC_OBJECTIVES:
+                times = full_game_data["first_objectives"].get(epic)
+                if times:
+                    mins, secs = divmod(int(sum(times) / len(times)), 60)
+                    first_objectives.append({"name": epic, "avg_time": f"{mins}:{secs:02d}", "games": len(times)})
+            full_game = {
+                "games": n_games,
+                "camps": round(full_game_data["camps"] / n_games, 1),
+                "ganks": round(full_game_data["ganks"] / n_games, 1),
+                "recalls": round(full_game_data["recalls"] / n_games, 1),
+                "gank_lanes": [{"lane": lane, "per_game": round(count / n_games, 1)}
+                               for lane, count in sorted(full_game_data["gank_lanes"].items(), key=lambda item: -item[1])],
+                "first_objectives": first_objectives
+            }
+
         return {
             "champions": formatted_champions, "overall_timers": overall_timers, "overall_deltas": overall_deltas,
-            "clear_details": clear_details, "all_camp_names": all_camp_names
+            "clear_details": clear_details, "all_camp_names": all_camp_names, "full_game": full_game
         }
 
     stats["blue_side"] = format_side_stats(stats["blue_side"])
@@ -0,0 +1,578 @@
+# lol_app_LTA_2/mock_api_server.py
+"""
+Локальная замена GRID и Riot API для offline прогонов ingest и нагрузочных замеров.
+
+Отдаёт те же эндпоинты, что использует код:
+    POST /central-data/graphql                                   allSeries (пагинация 'after')
+    POST /live-data-feed/series-state/graphql                    seriesState(id).games
+    GET  /file-download/end-state/grid/series/<id>               драфт (seriesState.games[].draftActions)
+    GET  /file-download/end-state/riot/series/<id>/games/<n>/summary
+    GET  /file-download/events/riot/series/<id>/games/<n>        livestats JSONL
+    GET  /riot/account/v1/accounts/by-riot-id/<name>/<tag>
+    GET  /lol/match/v5/matches/by-puuid/<puuid>/ids              start, count, startTime
+    GET  /lol/match/v5/matches/<match_id>
+и служебные GET /__mock__/stats, POST /__mock__/reset.
+
+Фикстуры - записанные (--fixtures DIR, раскладка в DirectoryFixtures) или синтетические
+(генераторы benchmark.py, детерминированы по --seed). Латентность, пропускная способность,
+лимиты запросов (скользящие окна, как у Riot) и инъекция 429/5xx задаются флагами; случайность
+инъекций тоже от --seed.
+
+Переключение приложения на мок - через config.APIConfig:
+    GRID_BASE_URL=http://127.0.0.1:8099/ RIOT_BASE_URL=http://127.0.0.1:8099 GRID_API_KEY=mock RIOT_API_KEY=mock
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, Response, jsonify, request
+
+DEFAULT_PORT = 8099
+GRID_PAGE_SIZE = 50
+# Метки для /__mock__/stats: series/123/games/2 -> series/{id}/games/{id}
+_ID_SEGMENT_RE = re.compile(r"/(\d+|[A-Z0-9]+_\d+|mock-puuid-[0-9a-f]+)(?=/|$)")
+_FIRST_ARG_RE = re.compile(r"first:\s*(\d+)")
+_ORDER_DIRECTION_RE = re.compile(r"orderDirection:\s*(ASC|DESC)")
+
+
+# --- Фикстуры ---
+class DirectoryFixtures:
+    """
+    Записанные фикстуры:
+        series.json                                  [{"id", "startTimeScheduled", "tournamentId", "type"}]
+        series/<id>/games.json                       [{"id", "sequenceNumber"}]
+        series/<id>/end_state.json                   ответ end-state/grid
+        series/<id>/games/<n>/summary.json           Riot summary
+        series/<id>/games/<n>/livestats.jsonl        Riot livestats
+        riot/accounts.json                           {"gameName#tagLine": {"puuid", "gameName", "tagLine"}}
+        riot/matches/<match_id>.json                 match-v5 детали
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._series = self._read_json("series.json") or []
+        self._accounts = self._read_json(os.path.join("riot", "accounts.json")) or {}
+        self._matches_by_puuid = defaultdict(list)
+        matches_dir = os.path.join(root, "riot", "matches")
+        if os.path.isdir(matches_dir):
+            for name in os.listdir(matches_dir):
+                match = self._read_json(os.path.join("riot", "matches", name))
+                if not match:
+                    continue
+                created = match.get("info", {}).get("gameCreation", 0) // 1000
+                for participant in match.get("info", {}).get("participants", []):
+                    self._matches_by_puuid[participant.get("puuid")].append((created, name[:-len(".json")]))
+        for matches in self._matches_by_puuid.values():
+            matches.sort(reverse=True)
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *[str(part) for part in parts])
+
+    def _read_json(self, relative_path):
+        path = self._path(relative_path)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_series(self):
+        return self._series
+
+    def series_games(self, series_id):
+        return self._read_json(os.path.join("series", str(series_id), "games.json"))
+
+    def end_state(self, series_id):
+        return self._read_json(os.path.join("series", str(series_id), "end_state.json"))
+
+    def summary(self, series_id, sequence_number):
+        return self._read_json(os.path.join("series", str(series_id), "games", str(sequence_number), "summary.json"))
+
+    def livestats(self, series_id, sequence_number):
+        path = self._path("series", series_id, "games", sequence_number, "livestats.jsonl")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def riot_account(self, game_name, tag_line):
+        return self._accounts.get(f"{game_name}#{tag_line}")
+
+    def riot_match_ids(self, puuid):
+        """[(gameCreation в секундах, match_id)], новые первыми."""
+        return self._matches_by_puuid.get(puuid, [])
+
+    def riot_match(self, match_id):
+        return self._read_json(os.path.join("riot", "matches", f"{match_id}.json"))
+
+
+class SyntheticFixtures:
+    """Синтетический турнир: series_count серий по games_per_series игр; Riot - любой Riot ID резолвится."""
+
+    def __init__(self, series_count=20, games_per_series=2, seed=42, stats_interval=1.0, tournament_id=None,
+                 teams=10, riot_matches_per_player=200):
+        from config import config
+        self.series_count = series_count
+        self.games_per_series = games_per_series
+        self.seed = seed
+        self.stats_interval = stats_interval
+        self.tournament_id = str(tournament_id or config.tournament.tournament_id)
+        self.tags = [f"T{index:02d}" for index in range(1, teams + 1)]
+        self.riot_matches_per_player = riot_matches_per_player
+        self._start = datetime(2025, 5, 1, tzinfo=timezone.utc)
+        self._riot_base_ts = int(datetime(2025, 6, 1, tzinfo=timezone.utc).timestamp())
+        self._puuid_by_key = {}
+        self._lock = threading.Lock()
+
+    def _series_index(self, series_id):
+        try:
+            index = int(series_id) - 100000
+        except (TypeError, ValueError):
+            return None
+        return index if 0 <= index < self.series_count else None
+
+    def list_series(self):
+        return [{
+            "id": str(100000 + index), "tournamentId": self.tournament_id, "type": "ESPORTS",
+            "startTimeScheduled": (self._start + timedelta(hours=6 * index)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        } for index in range(self.series_count)]
+
+    def series_games(self, series_id):
+        if self._series_index(series_id) is None:
+            return None
+        return [{"id": f"{series_id}-{sequence}", "sequenceNumber": sequence} for sequence in range(1, self.games_per_series + 1)]
+
+    @functools.lru_cache(maxsize=256)
+    def _game(self, series_id, sequence_number):
+        """(summary, draft_actions, game_seconds) - детерминированы по (seed, серия, номер игры)."""
+        from benchmark import CHAMPIONS, ROLES, make_draft_actions, make_game_summary
+        index = self._series_index(series_id)
+        if index is None or not 1 <= sequence_number <= self.games_per_series:
+            return None
+        rng = random.Random(f"{self.seed}:{series_id}:{sequence_number}")
+        blue_tag = self.tags[index % len(self.tags)]
+        red_tag = self.tags[(index + 1 + (index // len(self.tags)) % (len(self.tags) - 1)) % len(self.tags)]
+        if sequence_number % 2 == 0:
+            blue_tag, red_tag = red_tag, blue_tag
+        rosters = {tag: {role: f"{tag}-{role.lower()}-puuid" for role in ROLES} for tag in (blue_tag, red_tag)}
+        champions = rng.sample(list(CHAMPIONS), 10)
+        game_seconds = rng.randint(25 * 60, 38 * 60)
+        game_index = index * self.games_per_series + sequence_number - 1
+        summary = make_game_summary(f"MOCK-{series_id}-{sequence_number}", game_index, blue_tag, red_tag, rosters,
+                                    champions, rng.random() < 0.5, game_seconds)
+        summary["gameCreation"] = int((self._start + timedelta(hours=6 * index, minutes=45 * (sequence_number - 1))).timestamp() * 1000)
+        return summary, make_draft_actions(rng, champions), game_seconds
+
+    def end_state(self, series_id):
+        games = self.series_games(series_id)
+        if games is None:
+            return None
+        return {"seriesState": {"id": str(series_id), "games": [
+            {"sequenceNumber": game["sequenceNumber"], "draftActions": self._game(str(series_id), game["sequenceNumber"])[1]}
+            for game in games
+        ]}}
+
+    def summary(self, series_id, sequence_number):
+        game = self._game(str(series_id), int(sequence_number))
+        return game[0] if game else None
+
+    @functools.lru_cache(maxsize=8)
+    def livestats(self, series_id, sequence_number):
+        from benchmark import make_livestats
+        game = self._game(str(series_id), int(sequence_number))
+        if not game:
+            return None
+        summary, _, game_seconds = game
+        content = make_livestats(random.Random(f"{self.seed}:{series_id}:{sequence_number}:livestats"), game_seconds, self.stats_interval)
+        # Плейсхолдеры генератора (@P1@, @C1@) -> игроки и чемпионы этой игры
+        for participant in summary["participants"]:
+            pid = participant["participantId"]
+            content = content.replace(f"@P{pid}@", participant["puuid"]).replace(f"@C{pid}@", participant["championName"])
+        return content.encode("utf-8")
+
+    def riot_account(self, game_name, tag_line):
+        key = hashlib.sha1(f"{game_name}#{tag_line}".lower().encode("utf-8")).hexdigest()[:16]
+        puuid = f"mock-puuid-{key}"
+        with self._lock:
+            self._puuid_by_key[key] = puuid
+        return {"puuid": puuid, "gameName": game_name, "tagLine": tag_line}
+
+    def _match_id(self, puuid, number):
+        return f"EUW1_{int(puuid[-8:], 16) % 10 ** 6:06d}{number:04d}"
+
+    def riot_match_ids(self, puuid):
+        if not puuid.startswith("mock-puuid-"):
+            return []
+        # Игра каждые 4 часа назад от фиксированной даты
+        return [(self._riot_base_ts - number * 4 * 3600, self._match_id(puuid, number)) for number in range(self.riot_matches_per_player)]
+
+    def riot_match(self, match_id):
+        from benchmark import CHAMPIONS, ROLES
+        match = re.fullmatch(r"EUW1_(\d{6})(\d{4})", match_id)
+        if not match:
+            return None
+        with self._lock:
+            owners = [puuid for puuid in self._puuid_by_key.values() if int(puuid[-8:], 16) % 10 ** 6 == int(match.group(1))]
+        if not owners:
+            return None
+        puuid, number = owners[0], int(match.group(2))
+        rng = random.Random(f"{self.seed}:{match_id}")
+        champions = rng.sample(list(CHAMPIONS), 10)
+        slot = number % 10
+        blue_wins = rng.random() < 0.5
+        participants = [{
+            "puuid": puuid if index == slot else f"mock-puuid-other-{match_id}-{index}",
+            "championName": champions[index], "teamPosition": ROLES[index % 5], "teamId": 100 if index < 5 else 200,
+            "win": blue_wins == (index < 5), "kills": rng.randint(0, 12), "deaths": rng.randint(0, 10), "assists": rng.randint(0, 15)
+        } for index in range(10)]
+        return {
+            "metadata": {"matchId": match_id, "participants": [p["puuid"] for p in participants]},
+            "info": {"gameCreation": (self._riot_base_ts - number * 4 * 3600) * 1000, "gameDuration": rng.randint(1300, 2300),
+                     "queueId": 420, "participants": participants}
+        }
+
+
+class LiveFixtures:
+    """Живые GRID API как источник фикстур для --record (нужен настоящий GRID_API_KEY)."""
+
+    def __init__(self, tournament_id):
+        self.tournament_id = str(tournament_id)
+
+    def list_series(self):
+        from tournament_logic import get_tournament_matches
+        return [dict(series, tournamentId=self.tournament_id, type="ESPORTS") for series in get_tournament_matches(self.tournament_id)]
+
+    def series_games(self, series_id):
+        from scrims_logic import get_series_state
+        return get_series_state(series_id)
+
+    def end_state(self, series_id):
+        from tournament_logic import download_grid_end_state_data
+        return download_grid_end_state_data(series_id)
+
+    def summary(self, series_id, sequence_number):
+        from scrims_logic import download_riot_summary_data
+        return download_riot_summary_data(series_id, sequence_number)
+
+    def livestats(self, series_id, sequence_number):
+        from scrims_logic import download_riot_livestats_data
+        content = download_riot_livestats_data(series_id, sequence_number)
+        return content.encode("utf-8") if content else None
+
+
+def save_fixtures(store, root):
+    """Пишет GRID часть store в раскладку DirectoryFixtures; возвращает число сохранённых игр."""
+    os.makedirs(root, exist_ok=True)
+
+    def write_json(data, *parts):
+        path = os.path.join(root, *[str(part) for part in parts])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    series_list = store.list_series()
+    write_json(series_list, "series.json")
+    saved_games = 0
+    for series in series_list:
+        series_id = series["id"]
+        games = store.series_games(series_id) or []
+        write_json(games, "series", series_id, "games.json")
+        end_state = store.end_state(series_id)
+        if end_state:
+            write_json(end_state, "series", series_id, "end_state.json")
+        for game in games:
+            sequence_number = game.get("sequenceNumber")
+            summary = store.summary(series_id, sequence_number)
+            if not summary:
+                continue
+            write_json(summary, "series", series_id, "games", sequence_number, "summary.json")
+            content = store.livestats(series_id, sequence_number)
+            if content:
+                path = os.path.join(root, "series", str(series_id), "games", str(sequence_number), "livestats.jsonl")
+                with open(path, "wb") as f:
+                    f.write(content)
+            saved_games += 1
+    return saved_games
+
+
+# --- Поведение: латентность, лимиты, инъекция ошибок ---
+def parse_rate_limits(spec):
+    """'20/1,100/120' -> [(20, 1.0), (100, 120.0)] (запросов / окно в секундах); пусто - без лимита."""
+    limits = []
+    for part in (spec or "").split(","):
+        if part.strip():
+            count, _, window = part.partition("/")
+            limits.append((int(count), float(window or 1)))
+    return limits
+
+
+@dataclass
+class MockSettings:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    bandwidth_mbps: float = 0.0  # 0 - без ограничения скорости отдачи
+    grid_rate_limits: list = field(default_factory=list)
+    riot_rate_limits: list = field(default_factory=list)
+    inject_429: float = 0.0
+    inject_5xx: float = 0.0
+    retry_after: int = 1
+    require_key: bool = True
+    seed: int = 42
+
+
+class SlidingWindowLimiter:
+    """Скользящие окна лимитов; allow() -> (True, 0) или (False, секунды до освобождения)."""
+
+    def __init__(self, limits):
+        self._windows = [(count, window, deque()) for count, window in limits]
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            for count, window, stamps in self._windows:
+                while stamps and now - stamps[0] >= window:
+                    stamps.popleft()
+                if len(stamps) >= count:
+                    wait = max(wait, window - (now - stamps[0]))
+            if wait > 0:
+                return False, wait
+            for _, _, stamps in self._windows:
+                stamps.append(now)
+            return True, 0.0
+
+
+def _endpoint_label(path):
+    return _ID_SEGMENT_RE.sub("/{id}", path)
+
+
+def create_mock_app(store, settings=None):
+    settings = settings or MockSettings()
+    app = Flask(__name__)
+    limiters = {"grid": SlidingWindowLimiter(settings.grid_rate_limits), "riot": SlidingWindowLimiter(settings.riot_rate_limits)}
+    rng = random.Random(settings.seed)
+    rng_lock = threading.Lock()
+    stats = defaultdict(lambda: {"requests": 0, "rate_limited": 0, "injected_429": 0, "injected_5xx": 0, "bytes": 0})
+    stats_lock = threading.Lock()
+
+    def count(label, key, value=1):
+        with stats_lock:
+            stats[label][key] += value
+
+    def too_many_requests(retry_after):
+        response = jsonify({"status": {"message": "Rate limit exceeded", "status_code": 429}})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    @app.before_request
+    def _simulate_api():
+        if request.path.startswith("/__mock__"):
+            return None
+        family = "riot" if request.path.startswith(("/riot/", "/lol/")) else "grid"
+        label = _endpoint_label(request.path)
+        count(label, "requests")
+        if settings.require_key:
+            key_header = "X-Riot-Token" if family == "riot" else "x-api-key"
+            if not request.headers.get(key_header):
+                return jsonify({"status": {"message": "Unauthorized", "status_code": 401}}), 401
+        with rng_lock:
+            delay = max(0.0, settings.latency_ms + rng.uniform(-settings.jitter_ms, settings.jitter_ms)) / 1000
+            roll_429, roll_5xx = rng.random(), rng.random()
+        if delay:
+            time.sleep(delay)
+        allowed, wait = limiters[family].allow()
+        if not allowed:
+            count(label, "rate_limited")
+            return too_many_requests(wait)
+        if roll_429 < settings.inject_429:
+            count(label, "injected_429")
+            return too_many_requests(settings.retry_after)
+        if roll_5xx < settings.inject_5xx:
+            count(label, "injected_5xx")
+            return jsonify({"message": "Injected server error"}), 503
+        return None
+
+    @app.after_request
+    def _throttle_body(response):
+        if request.path.startswith("/__mock__") or response.direct_passthrough:
+            return response
+        size = response.calculate_content_length() or 0
+        count(_endpoint_label(request.path), "bytes", size)
+        if settings.bandwidth_mbps > 0 and size:
+            time.sleep(size * 8 / (settings.bandwidth_mbps * 1e6))
+        return response
+
+    def not_found():
+        return jsonify({"message": "Not found"}), 404
+
+    # --- GRID ---
+    @app.route('/central-data/graphql', methods=['POST'])
+    def central_data_graphql():
+        payload = request.get_json(silent=True) or {}
+        query, variables = payload.get("query", ""), payload.get("variables") or {}
+        if "allSeries" not in query:
+            return jsonify({"errors": [{"message": "Query not supported by mock server"}]})
+        series_filter = variables.get("filter") or {}
+        types = series_filter.get("types")
+        start_gte = (series_filter.get("startTimeScheduled") or {}).get("gte")
+        series = [
+            s for s in store.list_series()
+            if (not series_filter.get("tournamentId") or str(s.get("tournamentId")) == str(series_filter["tournamentId"]))
+            and (not types or s.get("type", "ESPORTS") in types)
+            and (not start_gte or s.get("startTimeScheduled", "") >= start_gte)
+        ]
+        direction = variables.get("orderDirection") or (_ORDER_DIRECTION_RE.search(query) or [None, "ASC"])[1]
+        series.sort(key=lambda s: s.get("startTimeScheduled", ""), reverse=direction == "DESC")
+        first_match = _FIRST_ARG_RE.search(query)
+        page_size = int(variables.get("first") or (first_match.group(1) if first_match else GRID_PAGE_SIZE))
+        offset = int(variables.get("after") or 0)
+        page = series[offset:offset + page_size]
+        has_next = offset + page_size < len(series)
+        return jsonify({"data": {"allSeries": {
+            "totalCount": len(series),
+            "pageInfo": {"hasNextPage": has_next, "endCursor": str(offset + page_size) if has_next else None},
+            "edges": [{"node": {"id": s["id"], "startTimeScheduled": s.get("startTimeScheduled")}} for s in page]
+        }}})
+
+    @app.route('/live-data-feed/series-state/graphql', methods=['POST'])
+    def series_state_graphql():
+        payload = request.get_json(silent=True) or {}
+        series_id = (payload.get("variables") or {}).get("seriesId")
+        games = store.series_games(series_id) if series_id else None
+        if games is None:
+            return jsonify({"data": {"seriesState": None}})
+        return jsonify({"data": {"seriesState": {"id": str(series_id), "games": games}}})
+
+    @app.route('/file-download/end-state/grid/series/<series_id>')
+    def grid_end_state(series_id):
+        data = store.end_state(series_id)
+        return jsonify(data) if data else not_found()
+
+    @app.route('/file-download/end-state/riot/series/<series_id>/games/<int:sequence_number>/summary')
+    def riot_summary(series_id, sequence_number):
+        data = store.summary(series_id, sequence_number)
+        return jsonify(data) if data else not_found()
+
+    @app.route('/file-download/events/riot/series/<series_id>/games/<int:sequence_number>')
+    def riot_livestats(series_id, sequence_number):
+        content = store.livestats(series_id, sequence_number)
+        if not content:
+            return not_found()
+        return Response(content, mimetype="application/x-ndjson")
+
+    # --- Riot ---
+    @app.route('/riot/account/v1/accounts/by-riot-id/<game_name>/<tag_line>')
+    def riot_account(game_name, tag_line):
+        data = store.riot_account(game_name, tag_line) if hasattr(store, "riot_account") else None
+        return jsonify(data) if data else not_found()
+
+    @app.route('/lol/match/v5/matches/by-puuid/<puuid>/ids')
+    def riot_match_ids(puuid):
+        start = request.args.get("start", 0, type=int)
+        count_arg = min(request.args.get("count", 20, type=int), 100)
+        start_time = request.args.get("startTime", type=int)
+        matches = store.riot_match_ids(puuid) if hasattr(store, "riot_match_ids") else []
+        ids = [match_id for created, match_id in matches if start_time is None or created >= start_time]
+        return jsonify(ids[start:start + count_arg])
+
+    @app.route('/lol/match/v5/matches/<match_id>')
+    def riot_match(match_id):
+        data = store.riot_match(match_id) if hasattr(store, "riot_match") else None
+        return jsonify(data) if data else not_found()
+
+    # --- Служебное ---
+    @app.route('/__mock__/stats')
+    def mock_stats():
+        with stats_lock:
+            return jsonify({label: dict(values) for label, values in stats.items()})
+
+    @app.route('/__mock__/reset', methods=['POST'])
+    def mock_reset():
+        with stats_lock:
+            stats.clear()
+        return jsonify({"ok": True})
+
+    return app
+
+
+def start_mock_server(store, settings=None, host="127.0.0.1", port=0):
+    """Запускает мок в фоновом потоке; возвращает (server, base_url). Остановка - server.shutdown()."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        # Лог каждого запроса топит вывод ingest в тестах
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server(host, port, create_mock_app(store, settings), threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="mock-api-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local GRID/Riot API stand-in for offline ingest and load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fixtures", help="Recorded fixture directory (default: synthetic fixtures)")
+    parser.add_argument("--series", type=int, default=20, help="Synthetic series count (default: 20)")
+    parser.add_argument("--games-per-series", type=int, default=2)
+    parser.add_argument("--teams", type=int, default=10)
+    parser.add_argument("--tournament-id", help="Tournament id of synthetic series (default: config TOURNAMENT_ID)")
+    parser.add_argument("--stats-interval", type=float, default=1.0, help="Seconds between synthetic stats_update events")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="Response body throughput limit (0 = unlimited)")
+    parser.add_argument("--grid-rate-limit", default="", help="GRID limits as count/seconds[,count/seconds] (e.g. 20/1)")
+    parser.add_argument("--riot-rate-limit", default="20/1,100/120", help="Riot limits (default: dev key 20/1,100/120)")
+    parser.add_argument("--inject-429", type=float, default=0.0, help="Probability of an injected 429 per request")
+    parser.add_argument("--inject-5xx", type=float, default=0.0, help="Probability of an injected 503 per request")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds of injected 429s")
+    parser.add_argument("--no-key-check", action="store_true", help="Accept requests without API key headers")
+    parser.add_argument("--save-fixtures", metavar="DIR", help="Write the synthetic GRID fixtures to DIR and exit")
+    parser.add_argument("--record", metavar="DIR", help="Record a live tournament (GRID_API_KEY required) to DIR and exit")
+    parser.add_argument("--record-tournament", help="Tournament id for --record (default: config TOURNAMENT_ID)")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        from config import config
+        saved = save_fixtures(LiveFixtures(args.record_tournament or config.tournament.tournament_id), args.record)
+        print(f"Recorded {saved} games to {args.record}")
+        return 0
+
+    if args.fixtures:
+        store = DirectoryFixtures(args.fixtures)
+    else:
+        store = SyntheticFixtures(args.series, args.games_per_series, args.seed, args.stats_interval, args.tournament_id, args.teams)
+    if args.save_fixtures:
+        saved = save_fixtures(store, args.save_fixtures)
+        print(f"Saved {saved} games to {args.save_fixtures}")
+        return 0
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, bandwidth_mbps=args.bandwidth_mbps,
+        grid_rate_limits=parse_rate_limits(args.grid_rate_limit), riot_rate_limits=parse_rate_limits(args.riot_rate_limit),
+        inject_429=args.inject_429, inject_5xx=args.inject_5xx, retry_after=args.retry_after,
+        require_key=not args.no_key_check, seed=args.seed
+    )
+    base_url = f"http://{args.host}:{args.port}"
+    print(f"Mock GRID/Riot API on {base_url}")
+    print(f"  GRID_BASE_URL={base_url}/ RIOT_BASE_URL={base_url} GRID_API_KEY=mock RIOT_API_KEY=mock")
+    create_mock_app(store, settings).run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,20 +1,26 @@
 # lol_app_LTA_1.5v/objects_logic.py
 
 import sqlite3
+import json
 from collections import defaultdict
 import statistics
 import traceback
 
+from config import config
 from database import get_db_connection
+from request_timing import traced
 from scrims_logic import log_message
-from tournament_logic import TEAM_TAG_TO_FULL_NAME, UNKNOWN_BLUE_TAG, UNKNOWN_RED_TAG
+from tournament_logic import get_team_registry, resolve_team_tag, tournament_scope_sql
 
-def get_objects_data(selected_team_full_name):
+@traced("aggregate")
+def get_objects_data(selected_team_full_name, backend=None, tournament_id=None):
     """
     Извлекает и агрегирует данные по всем игровым объектам для выбранной команды.
     Версия 2.1: Исправлена логика для Atakhan.
+    backend: "python" (события в памяти) или "sql" (агрегация оконными функциями в SQLite),
+    по умолчанию config.analytics.objects_backend.
     """
-    conn = get_db_connection()
+    conn = get_db_connection(tournament_id)
     if not conn:
         return [], {"error": "Database connection failed"}
 
@@ -28,29 +34,24 @@ def get_objects_data(selected_team_full_name):
     try:
         cursor = conn.cursor()
 
-        cursor.execute(f"""
-            SELECT DISTINCT Blue_Team_Name as team_tag FROM tournament_games
-            WHERE Blue_Team_Name NOT IN ('{UNKNOWN_BLUE_TAG}', 'Blue Team')
-            UNION
-            SELECT DISTINCT Red_Team_Name as team_tag FROM tournament_games
-            WHERE Red_Team_Name NOT IN ('{UNKNOWN_RED_TAG}', 'Red Team')
-        """)
-        all_teams_tags = {row['team_tag'] for row in cursor.fetchall() if row['team_tag']}
-        all_teams_display = sorted(list(set([TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in all_teams_tags])))
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
 
         if not selected_team_full_name:
             stats["message"] = "Please select a team to view object statistics."
             return all_teams_display, stats
 
-        selected_team_tag = None
-        for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
-            if full_name == selected_team_full_name: selected_team_tag = tag; break
-        if not selected_team_tag and selected_team_full_name in all_teams_tags:
-            selected_team_tag = selected_team_full_name
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
         if not selected_team_tag:
             stats["error"] = f"Team tag not found for '{selected_team_full_name}'."; return all_teams_display, stats
 
-        cursor.execute("SELECT * FROM tournament_games WHERE Blue_Team_Name = ? OR Red_Team_Name = ?", (selected_team_tag, selected_team_tag))
+        if (backend or config.analytics.objects_backend) == "sql":
+            if not _fill_objects_stats_sql(cursor, selected_team_tag, stats, tournament_id):
+                stats["message"] = "No games found for the selected team."
+            return all_teams_display, stats
+
+        scope_sql, scope_params = tournament_scope_sql(tournament_id)
+        cursor.execute(f"SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql}",
+                       (selected_team_tag, selected_team_tag, *scope_params))
         games = [dict(row) for row in cursor.fetchall()]
         
         if not games:
@@ -59,22 +60,37 @@ def get_objects_data(selected_team_full_name):
             
         game_ids = [game["Game_ID"] for game in games]
         placeholders = ','.join(['?'] * len(game_ids))
-        cursor.execute(f"SELECT * FROM objective_events WHERE game_id IN ({placeholders}) ORDER BY timestamp_ms ASC", game_ids)
+        cursor.execute(f"SELECT * FROM objective_events WHERE game_id IN ({placeholders}) ORDER BY timestamp_ms ASC, id ASC", game_ids)
         events = [dict(row) for row in cursor.fetchall()]
 
-        _process_side_data(games, events, selected_team_tag, "overall", stats["overall"])
-        _process_side_data(games, events, selected_team_tag, "blue", stats["blue_side"])
-        _process_side_data(games, events, selected_team_tag, "red", stats["red_side"])
+        # События группируются по игре и типу один раз; все разрезы (overall/blue/red) читают из индекса
+        events_by_game = _index_events_by_game(events)
+        _process_side_data(games, events_by_game, selected_team_tag, "overall", stats["overall"])
+        _process_side_data(games, events_by_game, selected_team_tag, "blue", stats["blue_side"])
+        _process_side_data(games, events_by_game, selected_team_tag, "red", stats["red_side"])
 
     except Exception as e:
-        log_message(f"CRITICAL Error in get_objects_data: {e}\n{traceback.format_exc()}")
+        log_message(f"CRITICAL Error in get_objects_data: {e}\n{traceback.format_exc()}", level="error")
         stats["error"] = "A critical error occurred."
     finally:
         if conn: conn.close()
 
     return all_teams_display, stats
 
-def _process_side_data(all_games, all_events, team_tag, side_filter, output_stats):
+def _index_events_by_game(events):
+    """
+    Один проход по событиям (уже отсортированным по timestamp_ms):
+    {game_id: {objective_type: [events по времени]}}.
+    """
+    events_by_game = {}
+    for event in events:
+        events_by_game.setdefault(event['game_id'], {}).setdefault(event['objective_type'], []).append(event)
+    return events_by_game
+
+def _game_events(events_by_game, game_id, obj_type):
+    return events_by_game.get(game_id, {}).get(obj_type, [])
+
+def _process_side_data(all_games, events_by_game, team_tag, side_filter, output_stats):
     games_on_side = []
     if side_filter == "overall": games_on_side = all_games
     elif side_filter == "blue": games_on_side = [g for g in all_games if g['Blue_Team_Name'] == team_tag]
@@ -84,18 +100,15 @@ def _process_side_data(all_games, all_events, team_tag, side_filter, output_stat
     if total_games == 0:
         output_stats['message'] = f"No games played on {side_filter} side."
         return
-        
-    game_ids_on_side = {g['Game_ID'] for g in games_on_side}
-    events_on_side = [e for e in all_events if e['game_id'] in game_ids_on_side]
 
     output_stats['total_games'] = total_games
-    output_stats['drakes'] = _calculate_drake_stats(games_on_side, events_on_side, team_tag)
-    output_stats['voidgrubs'] = _calculate_voidgrub_stats(games_on_side, events_on_side, team_tag)
+    output_stats['drakes'] = _calculate_drake_stats(games_on_side, events_by_game, team_tag)
+    output_stats['voidgrubs'] = _calculate_voidgrub_stats(games_on_side, events_by_game, team_tag)
     # --- ИЗМЕНЕНИЕ: Считаем статистику по objective_type 'ATAKHAN' ---
-    output_stats['atakhan'] = _calculate_generic_objective_stats(games_on_side, events_on_side, team_tag, 'ATAKHAN')
-    output_stats['heralds'] = _calculate_generic_objective_stats(games_on_side, events_on_side, team_tag, 'HERALD')
-    output_stats['barons'] = _calculate_generic_objective_stats(games_on_side, events_on_side, team_tag, 'BARON')
-    output_stats['first_tower'] = _calculate_ft_stats(games_on_side, events_on_side, team_tag)
+    output_stats['atakhan'] = _calculate_generic_objective_stats(games_on_side, events_by_game, team_tag, 'ATAKHAN')
+    output_stats['heralds'] = _calculate_generic_objective_stats(games_on_side, events_by_game, team_tag, 'HERALD')
+    output_stats['barons'] = _calculate_generic_objective_stats(games_on_side, events_by_game, team_tag, 'BARON')
+    output_stats['first_tower'] = _calculate_ft_stats(games_on_side, events_by_game, team_tag)
 
 def _ms_to_min_sec(ms):
     if not isinstance(ms, (int, float)) or ms <= 0: return "N/A"
@@ -104,7 +117,7 @@ def _ms_to_min_sec(ms):
     seconds %= 60
     return f"{minutes}:{seconds:02d}"
 
-def _calculate_drake_stats(games, events, team_tag):
+def _calculate_drake_stats(games, events_by_game, team_tag):
     total_games = len(games)
     if total_games == 0: return {}
 
@@ -122,12 +135,10 @@ def _calculate_drake_stats(games, events, team_tag):
         our_team_id = 100 if is_blue else 200
         
         # --- ИЗМЕНЕНИЕ: Исключаем ELDER и ATAKHAN из подсчета обычных драконов ---
-        drakes_in_game = sorted([
-            e for e in events 
-            if e['game_id'] == game_id 
-            and e['objective_type'] == 'DRAGON' 
-            and e['objective_subtype'] not in ['ELDER', 'ATAKHAN']
-        ], key=lambda x: x['timestamp_ms'])
+        drakes_in_game = [
+            e for e in _game_events(events_by_game, game_id, 'DRAGON')
+            if e['objective_subtype'] not in ['ELDER', 'ATAKHAN']
+        ]
         
         our_drake_count = 0
         their_drake_count = 0
@@ -157,27 +168,32 @@ def _calculate_drake_stats(games, events, team_tag):
         drakes_by_us_before_7 += len([d for d in drakes_by_us_in_game if d['timestamp_ms'] < 7 * 60 * 1000])
         drakes_by_us_before_15 += len([d for d in drakes_by_us_in_game if d['timestamp_ms'] < 15 * 60 * 1000])
 
+    spawn_takes = {i: (takes['us'], takes['us'] + takes['them']) for i, takes in drake_spawn_takes.items()}
+    return _drake_result(total_games, spawn_takes, drakes_by_us_before_7, drakes_by_us_before_15, total_drakes_by_us,
+                         games_with_soul, games_with_soul_and_win, first_drake_by_us_times)
+
+def _drake_result(total_games, spawn_takes, drakes_before_7, drakes_before_15, total_drakes,
+                  games_with_soul, games_with_soul_and_win, first_drake_times):
+    """Итог по драконам; spawn_takes: {номер спавна: (взято нами, всего взято)}."""
     result = { "take_rate": {} }
     for i in range(1, 5):
-        us = drake_spawn_takes[i]['us']
-        them = drake_spawn_takes[i]['them']
-        total = us + them
+        us, total = spawn_takes.get(i, (0, 0))
         result["take_rate"][i] = round((us / total) * 100) if total > 0 else 0
 
-    result["avg_drakes_at_7min"] = round(drakes_by_us_before_7 / total_games, 2)
-    result["avg_drakes_at_15min"] = round(drakes_by_us_before_15 / total_games, 2)
-    result["avg_drakes_per_game"] = round(total_drakes_by_us / total_games, 2)
+    result["avg_drakes_at_7min"] = round(drakes_before_7 / total_games, 2)
+    result["avg_drakes_at_15min"] = round(drakes_before_15 / total_games, 2)
+    result["avg_drakes_per_game"] = round(total_drakes / total_games, 2)
     result["soul_percent"] = round((games_with_soul / total_games) * 100) if total_games > 0 else 0
     result["soul_wr_percent"] = round((games_with_soul_and_win / games_with_soul) * 100) if games_with_soul > 0 else 0
     
-    result["avg_first_drake_timer"] = _ms_to_min_sec(statistics.mean(first_drake_by_us_times)) if first_drake_by_us_times else "N/A"
-    result["min_first_drake_timer"] = _ms_to_min_sec(min(first_drake_by_us_times)) if first_drake_by_us_times else "N/A"
-    result["max_first_drake_timer"] = _ms_to_min_sec(max(first_drake_by_us_times)) if first_drake_by_us_times else "N/A"
-    result["all_first_drake_timers"] = sorted([_ms_to_min_sec(t) for t in first_drake_by_us_times])
+    result["avg_first_drake_timer"] = _ms_to_min_sec(statistics.mean(first_drake_times)) if first_drake_times else "N/A"
+    result["min_first_drake_timer"] = _ms_to_min_sec(min(first_drake_times)) if first_drake_times else "N/A"
+    result["max_first_drake_timer"] = _ms_to_min_sec(max(first_drake_times)) if first_drake_times else "N/A"
+    result["all_first_drake_timers"] = sorted([_ms_to_min_sec(t) for t in first_drake_times])
 
     return result
 
-def _calculate_voidgrub_stats(games, events, team_tag):
+def _calculate_voidgrub_stats(games, events_by_game, team_tag):
     """
     Рассчитывает всю статистику по Личинкам Бездны.
     Версия 2.2: Винрейт в таблице теперь возвращается как число для корректного окрашивания.
@@ -186,14 +202,13 @@ def _calculate_voidgrub_stats(games, events, team_tag):
     first_grub_times = []
     total_games = len(games)
     our_team_wins = len([g for g in games if g['Winner_Side'] == ('Blue' if g['Blue_Team_Name'] == team_tag else 'Red')])
-    base_winrate = (our_team_wins / total_games) * 100 if total_games > 0 else 0
 
     for game in games:
         game_id = game['Game_ID']
         is_blue = game['Blue_Team_Name'] == team_tag
         our_team_id = 100 if is_blue else 200
         
-        grubs_in_game = sorted([e for e in events if e['game_id'] == game_id and e['objective_type'] == 'VOIDGRUB'], key=lambda x: x['timestamp_ms'])
+        grubs_in_game = _game_events(events_by_game, game_id, 'VOIDGRUB')
         
         our_grubs_in_game = [g for g in grubs_in_game if g['team_id'] == our_team_id]
         if our_grubs_in_game:
@@ -208,12 +223,22 @@ def _calculate_voidgrub_stats(games, events, team_tag):
         games_with_grubs_dist[count_key]['count'] += 1
         if data['win']:
             games_with_grubs_dist[count_key]['wins'] += 1
-    
+
+    total_grubs_taken = sum(g['our_team_count'] for g in grubs_by_game.values())
+    games_with_one_plus_grubs = len([g for g in grubs_by_game.values() if g['our_team_count'] >= 1])
+    games_with_three_plus_grubs = len([g for g in grubs_by_game.values() if g['our_team_count'] >= 3])
+    grubs_dist = {count_key: (data['count'], data['wins']) for count_key, data in games_with_grubs_dist.items()}
+    return _voidgrub_result(total_games, our_team_wins, grubs_dist, total_grubs_taken,
+                            games_with_one_plus_grubs, games_with_three_plus_grubs, first_grub_times)
+
+def _voidgrub_result(total_games, our_team_wins, grubs_dist, total_grubs_taken,
+                     games_with_one_plus_grubs, games_with_three_plus_grubs, first_grub_times):
+    """Итог по личинкам; grubs_dist: {0/1/2/3(+): (игр, побед)}."""
+    base_winrate = (our_team_wins / total_games) * 100 if total_games > 0 else 0
     result = {"wr_by_grubs": [], "first_grub_stats": {}}
     for i in range(4):
-        data = games_with_grubs_dist.get(i, {'count': 0, 'wins': 0})
-        count = data['count']
-        wr = (data['wins'] / count * 100) if count > 0 else 0
+        count, wins = grubs_dist.get(i, (0, 0))
+        wr = (wins / count * 100) if count > 0 else 0
         result["wr_by_grubs"].append({
             "grubs_count": i,
             "games": count,
@@ -222,10 +247,6 @@ def _calculate_voidgrub_stats(games, events, team_tag):
             "diff_wr": f"{'+' if wr > base_winrate else ''}{(wr - base_winrate):.2f}%"
         })
 
-    total_grubs_taken = sum(g['our_team_count'] for g in grubs_by_game.values())
-    games_with_one_plus_grubs = len([g for g in grubs_by_game.values() if g['our_team_count'] >= 1])
-    games_with_three_plus_grubs = len([g for g in grubs_by_game.values() if g['our_team_count'] >= 3])
-
     result["first_grub_stats"] = {
         "avg_taken": f"{(total_grubs_taken / total_games):.2f}" if total_games > 0 else "0.00",
         "one_plus_rate": round(games_with_one_plus_grubs / total_games * 100) if total_games > 0 else 0,
@@ -237,7 +258,7 @@ def _calculate_voidgrub_stats(games, events, team_tag):
     }
     return result
 
-def _calculate_generic_objective_stats(games, events, team_tag, obj_type, obj_subtype=None):
+def _calculate_generic_objective_stats(games, events_by_game, team_tag, obj_type, obj_subtype=None):
     # Эта функция остается без изменений
     obj_times = []
     games_with_obj = 0
@@ -248,11 +269,11 @@ def _calculate_generic_objective_stats(games, events, team_tag, obj_type, obj_su
         is_blue = game['Blue_Team_Name'] == team_tag
         our_team_id = 100 if is_blue else 200
         
-        obj_events = [e for e in events if e['game_id'] == game_id and e['objective_type'] == obj_type]
+        obj_events = _game_events(events_by_game, game_id, obj_type)
         if obj_subtype:
             obj_events = [e for e in obj_events if e['objective_subtype'] == obj_subtype]
 
-        our_team_obj_events = sorted([e for e in obj_events if e['team_id'] == our_team_id], key=lambda x: x['timestamp_ms'])
+        our_team_obj_events = [e for e in obj_events if e['team_id'] == our_team_id]
         
         if our_team_obj_events:
             games_with_obj += 1
@@ -260,7 +281,10 @@ def _calculate_generic_objective_stats(games, events, team_tag, obj_type, obj_su
             if game['Winner_Side'] == ('Blue' if is_blue else 'Red'):
                 games_with_obj_win += 1
 
-    total_games = len(games)
+    return _objective_result(len(games), games_with_obj, games_with_obj_win, obj_times)
+
+def _objective_result(total_games, games_with_obj, games_with_obj_win, obj_times):
+    """Итог по объекту, где важен первый взятый нами (герольд, барон, атакан)."""
     return {
         "percent": round((games_with_obj / total_games) * 100) if total_games > 0 else 0,
         "total": games_with_obj,
@@ -271,7 +295,7 @@ def _calculate_generic_objective_stats(games, events, team_tag, obj_type, obj_su
         "start_times": sorted([_ms_to_min_sec(t) for t in obj_times])
     }
 
-def _calculate_ft_stats(games, events, team_tag):
+def _calculate_ft_stats(games, events_by_game, team_tag):
     """
     Рассчитывает всю статистику по башням.
     Версия 2.2: FT% по линиям теперь показывает распределение, где была взята FT.
@@ -297,7 +321,7 @@ def _calculate_ft_stats(games, events, team_tag):
         our_team_id = 100 if is_blue else 200
         enemy_team_id = 200 if is_blue else 100
 
-        all_towers_in_game = sorted([e for e in events if e['game_id'] == game_id and e['objective_type'] == 'TOWER'], key=lambda x: x['timestamp_ms'])
+        all_towers_in_game = _game_events(events_by_game, game_id, 'TOWER')
         
         # 1. Находим самую первую башню в игре
         first_tower_event = next((t for t in all_towers_in_game), None)
@@ -323,11 +347,18 @@ def _calculate_ft_stats(games, events, team_tag):
             if enemy_first_t1:
                 enemy_first_t1_times[lane_key].append(enemy_first_t1['timestamp_ms'])
 
+    return _ft_result(total_games, [e['lane'] for e in our_ft_events], [e['timestamp_ms'] for e in our_ft_events],
+                      our_ftl_times, our_first_t1_times, enemy_first_t1_times)
+
+def _ft_result(total_games, our_ft_lanes, our_ft_total_times, our_ftl_times, our_first_t1_times, enemy_first_t1_times):
+    """
+    Итог по башням. our_ft_lanes/our_ft_total_times - линия и время наших First Tower,
+    остальные - {TOP/MID/BOT: [таймеры]}.
+    """
     # --- Этап 2: Расчет итоговой статистики ---
     result = {"by_lane": {}}
     
-    our_ft_count = len(our_ft_events)
-    our_ft_total_times = [e['timestamp_ms'] for e in our_ft_events]
+    our_ft_count = len(our_ft_lanes)
 
     # Общая статистика по FT (не меняется)
     result['avg_ft_percent'] = round((our_ft_count / total_games) * 100) if total_games > 0 else 0
@@ -335,10 +366,10 @@ def _calculate_ft_stats(games, events, team_tag):
     
     # Считаем, на каких линиях были взяты FT
     ft_location_counts = {'TOP': 0, 'MID': 0, 'BOT': 0}
-    for ft_event in our_ft_events:
-        if ft_event['lane'] == 'TOP_LANE': ft_location_counts['TOP'] += 1
-        elif ft_event['lane'] == 'MID_LANE': ft_location_counts['MID'] += 1
-        elif ft_event['lane'] == 'BOT_LANE': ft_location_counts['BOT'] += 1
+    for ft_lane in our_ft_lanes:
+        if ft_lane == 'TOP_LANE': ft_location_counts['TOP'] += 1
+        elif ft_lane == 'MID_LANE': ft_location_counts['MID'] += 1
+        elif ft_lane == 'BOT_LANE': ft_location_counts['BOT'] += 1
         
     # Статистика по линиям
     for lane in ['TOP', 'MID', 'BOT']:
@@ -366,4 +397,220 @@ def _calculate_ft_stats(games, events, team_tag):
             "t1_diff": time_diff_str
         }
         
-    return result
\ No newline at end of file
+    return result
+
+# --- SQL backend: агрегаты считает SQLite (ROW_NUMBER / оконные SUM), в Python приходят только итоги ---
+# Игры команды со стороной и результатом; split_games дублирует каждую игру в разрез 'overall' и свою сторону
+_SQL_SPLIT_GAMES_CTE = """
+    team_games AS (
+        SELECT Game_ID AS game_id,
+               CASE WHEN Blue_Team_Name = :tag THEN 'blue' ELSE 'red' END AS side,
+               CASE WHEN Blue_Team_Name = :tag THEN 100 ELSE 200 END AS our_team_id,
+               CASE WHEN Blue_Team_Name = :tag THEN 200 ELSE 100 END AS enemy_team_id,
+               Winner_Side = CASE WHEN Blue_Team_Name = :tag THEN 'Blue' ELSE 'Red' END AS win
+        FROM tournament_games
+        WHERE (Blue_Team_Name = :tag OR Red_Team_Name = :tag)
+          AND (:tournament_id IS NULL OR "Tournament_ID" = :tournament_id)
+    ),
+    split_games AS (
+        SELECT 'overall' AS split, tg.* FROM team_games tg
+        UNION ALL
+        SELECT side AS split, tg.* FROM team_games tg
+    )
+"""
+
+_SQL_TOTALS = f"""
+    WITH {_SQL_SPLIT_GAMES_CTE}
+    SELECT split, COUNT(*) AS total_games, COALESCE(SUM(win), 0) AS wins FROM split_games GROUP BY split
+"""
+
+# Обычные драконы (без ELDER/ATAKHAN) с номером спавна и накопленным счётом для души
+_SQL_DRAKES_CTE = """
+    drakes AS (
+        SELECT e.game_id, e.timestamp_ms,
+               COALESCE(e.team_id, 0) = tg.our_team_id AS ours,
+               ROW_NUMBER() OVER (PARTITION BY e.game_id ORDER BY e.timestamp_ms, e.id) AS spawn_num
+        FROM objective_events e JOIN team_games tg ON tg.game_id = e.game_id
+        WHERE e.objective_type = 'DRAGON' AND COALESCE(e.objective_subtype, '') NOT IN ('ELDER', 'ATAKHAN')
+    ),
+    drake_runs AS (
+        SELECT d.*, SUM(ours) OVER w AS our_running, SUM(1 - ours) OVER w AS their_running
+        FROM drakes d
+        WINDOW w AS (PARTITION BY game_id ORDER BY spawn_num ROWS UNBOUNDED PRECEDING)
+    ),
+    drake_games AS (
+        SELECT game_id,
+               SUM(ours) AS our_drakes,
+               SUM(ours AND timestamp_ms < 7 * 60 * 1000) AS before_7,
+               SUM(ours AND timestamp_ms < 15 * 60 * 1000) AS before_15,
+               MAX(CASE WHEN spawn_num = 1 AND ours THEN timestamp_ms END) AS first_drake_ms,
+               MIN(CASE WHEN ours AND our_running = 4 THEN spawn_num END) AS our_soul_spawn,
+               MIN(CASE WHEN NOT ours AND their_running = 4 THEN spawn_num END) AS their_soul_spawn
+        FROM drake_runs GROUP BY game_id
+    )
+"""
+
+_SQL_DRAKE_SPAWNS = f"""
+    WITH {_SQL_SPLIT_GAMES_CTE}, {_SQL_DRAKES_CTE}
+    SELECT sg.split, d.spawn_num, SUM(d.ours) AS us, COUNT(*) AS total
+    FROM split_games sg JOIN drakes d ON d.game_id = sg.game_id
+    WHERE d.spawn_num <= 4
+    GROUP BY sg.split, d.spawn_num
+"""
+
+_SQL_DRAKE_SUMMARY = f"""
+    WITH {_SQL_SPLIT_GAMES_CTE}, {_SQL_DRAKES_CTE},
+    soul_games AS (
+        SELECT game_id FROM drake_games
+        WHERE our_soul_spawn IS NOT NULL AND (their_soul_spawn IS NULL OR our_soul_spawn < their_soul_spawn)
+    )
+    SELECT sg.split,
+           COALESCE(SUM(dg.before_7), 0) AS before_7,
+           COALESCE(SUM(dg.before_15), 0) AS before_15,
+           COALESCE(SUM(dg.our_drakes), 0) AS our_drakes,
+           COUNT(soul.game_id) AS soul_games,
+           COALESCE(SUM(soul.game_id IS NOT NULL AND sg.win), 0) AS soul_wins,
+           json_group_array(dg.first_drake_ms) FILTER (WHERE dg.first_drake_ms IS NOT NULL) AS first_drake_times
+    FROM split_games sg
+    LEFT JOIN drake_games dg ON dg.game_id = sg.game_id
+    LEFT JOIN soul_games soul ON soul.game_id = sg.game_id
+    GROUP BY sg.split
+"""
+
+# Личинки: число наших за игру (0/1/2/3+) и время первой
+_SQL_VOIDGRUBS = f"""
+    WITH {_SQL_SPLIT_GAMES_CTE},
+    grub_games AS (
+        SELECT sg.split, sg.win, COUNT(e.id) AS our_grubs, MIN(e.timestamp_ms) AS first_grub_ms
+        FROM split_games sg
+        LEFT JOIN objective_events e
+            ON e.game_id = sg.game_id AND e.objective_type = 'VOIDGRUB' AND e.team_id = sg.our_team_id
+        GROUP BY sg.split, sg.game_id
+    )
+    SELECT split, MIN(our_grubs, 3) AS grubs_bucket, COUNT(*) AS games, COALESCE(SUM(win), 0) AS wins,
+           SUM(our_grubs) AS grubs_taken,
+           json_group_array(first_grub_ms) FILTER (WHERE first_grub_ms IS NOT NULL) AS first_grub_times
+    FROM grub_games GROUP BY split, grubs_bucket
+"""
+
+# Герольд / барон / атакан: первый взятый нами в игре
+_SQL_FIRST_OBJECTIVES = f"""
+    WITH {_SQL_SPLIT_GAMES_CTE},
+    objective_games AS (
+        SELECT sg.split, sg.win, e.objective_type, MIN(e.timestamp_ms) AS first_ms
+        FROM split_games sg
+        JOIN objective_events e ON e.game_id = sg.game_id AND e.team_id = sg.our_team_id
+        WHERE e.objective_type IN ('HERALD', 'BARON', 'ATAKHAN')
+        GROUP BY sg.split, sg.game_id, e.objective_type
+    )
+    SELECT split, objective_type, COUNT(*) AS games_with_obj, COALESCE(SUM(win), 0) AS wins,
+           json_group_array(first_ms) AS first_times
+    FROM objective_games GROUP BY split, objective_type
+"""
+
+# Башни: первая в игре, первая на линии, первые T1 наши/вражеские - списки таймеров по линиям
+_SQL_TOWERS = f"""
+    WITH {_SQL_SPLIT_GAMES_CTE},
+    towers AS (
+        SELECT e.game_id, e.timestamp_ms, e.lane, e.objective_subtype, e.team_id,
+               ROW_NUMBER() OVER (PARTITION BY e.game_id ORDER BY e.timestamp_ms, e.id) AS game_rank,
+               ROW_NUMBER() OVER (PARTITION BY e.game_id, e.lane ORDER BY e.timestamp_ms, e.id) AS lane_rank
+        FROM objective_events e JOIN team_games tg ON tg.game_id = e.game_id
+        WHERE e.objective_type = 'TOWER'
+    ),
+    first_outer AS (
+        SELECT sg.split, t.lane,
+               MIN(CASE WHEN t.team_id = sg.our_team_id THEN t.timestamp_ms END) AS our_ms,
+               MIN(CASE WHEN t.team_id = sg.enemy_team_id THEN t.timestamp_ms END) AS enemy_ms
+        FROM split_games sg JOIN towers t ON t.game_id = sg.game_id AND t.objective_subtype = 'OUTER'
+        GROUP BY sg.split, sg.game_id, t.lane
+    )
+    SELECT sg.split, 'ft' AS metric, t.lane, json_group_array(t.timestamp_ms) AS times
+    FROM split_games sg JOIN towers t ON t.game_id = sg.game_id AND t.game_rank = 1 AND t.team_id = sg.our_team_id
+    GROUP BY sg.split, t.lane
+    UNION ALL
+    SELECT sg.split, 'ftl', t.lane, json_group_array(t.timestamp_ms)
+    FROM split_games sg JOIN towers t ON t.game_id = sg.game_id AND t.lane_rank = 1 AND t.team_id = sg.our_team_id
+    GROUP BY sg.split, t.lane
+    UNION ALL
+    SELECT split, 't1_our', lane, json_group_array(our_ms) FILTER (WHERE our_ms IS NOT NULL)
+    FROM first_outer GROUP BY split, lane
+    UNION ALL
+    SELECT split, 't1_enemy', lane, json_group_array(enemy_ms) FILTER (WHERE enemy_ms IS NOT NULL)
+    FROM first_outer GROUP BY split, lane
+"""
+
+_SQL_SPLIT_OUTPUT_KEYS = {"overall": "overall", "blue": "blue_side", "red": "red_side"}
+_SQL_LANE_KEYS = {'TOP_LANE': 'TOP', 'MID_LANE': 'MID', 'BOT_LANE': 'BOT'}
+
+
+def _fill_objects_stats_sql(cursor, team_tag, stats, tournament_id=None):
+    """Заполняет stats["overall"/"blue_side"/"red_side"] из SQL агрегатов. False, если игр нет."""
+    params = {'tag': team_tag, 'tournament_id': tournament_id}
+    cursor.execute(_SQL_TOTALS, params)
+    totals = {row['split']: (row['total_games'], row['wins']) for row in cursor.fetchall()}
+    if not totals:
+        return False
+
+    spawn_takes = defaultdict(dict)
+    for row in cursor.execute(_SQL_DRAKE_SPAWNS, params):
+        spawn_takes[row['split']][row['spawn_num']] = (row['us'], row['total'])
+    drake_rows = {row['split']: row for row in cursor.execute(_SQL_DRAKE_SUMMARY, params).fetchall()}
+
+    grub_rows = defaultdict(list)
+    for row in cursor.execute(_SQL_VOIDGRUBS, params):
+        grub_rows[row['split']].append(row)
+
+    objective_rows = {(row['split'], row['objective_type']): row
+                      for row in cursor.execute(_SQL_FIRST_OBJECTIVES, params).fetchall()}
+
+    tower_times = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    for row in cursor.execute(_SQL_TOWERS, params):
+        tower_times[row['split']][row['metric']][row['lane']].extend(json.loads(row['times']))
+
+    for split, output_key in _SQL_SPLIT_OUTPUT_KEYS.items():
+        output_stats = stats[output_key]
+        total_games, our_team_wins = totals.get(split, (0, 0))
+        if total_games == 0:
+            output_stats['message'] = f"No games played on {split} side."
+            continue
+
+        output_stats['total_games'] = total_games
+        drake_row = drake_rows[split]
+        output_stats['drakes'] = _drake_result(
+            total_games, spawn_takes[split], drake_row['before_7'], drake_row['before_15'], drake_row['our_drakes'],
+            drake_row['soul_games'], drake_row['soul_wins'], json.loads(drake_row['first_drake_times'])
+        )
+
+        grubs_dist, first_grub_times = {}, []
+        for row in grub_rows[split]:
+            grubs_dist[row['grubs_bucket']] = (row['games'], row['wins'])
+            first_grub_times.extend(json.loads(row['first_grub_times']))
+        output_stats['voidgrubs'] = _voidgrub_result(
+            total_games, our_team_wins, grubs_dist,
+            sum(row['grubs_taken'] for row in grub_rows[split]),
+            sum(games for bucket, (games, _) in grubs_dist.items() if bucket >= 1),
+            grubs_dist.get(3, (0, 0))[0],
+            first_grub_times
+        )
+
+        for output_name, obj_type in (('atakhan', 'ATAKHAN'), ('heralds', 'HERALD'), ('barons', 'BARON')):
+            row = objective_rows.get((split, obj_type))
+            output_stats[output_name] = _objective_result(
+                total_games, row['games_with_obj'] if row else 0, row['wins'] if row else 0,
+                json.loads(row['first_times']) if row else []
+            )
+
+        split_towers = tower_times[split]
+        our_ft_lanes, our_ft_times = [], []
+        for lane, times in split_towers['ft'].items():
+            our_ft_lanes.extend([lane] * len(times))
+            our_ft_times.extend(times)
+
+        def by_lane(metric):
+            return {lane_key: list(split_towers[metric].get(lane_db, [])) for lane_db, lane_key in _SQL_LANE_KEYS.items()}
+
+        output_stats['first_tower'] = _ft_result(
+            total_games, our_ft_lanes, our_ft_times, by_lane('ftl'), by_lane('t1_our'), by_lane('t1_enemy')
+        )
+    return True
@@ -0,0 +1,333 @@
+# lol_app_LTA_2/profiler.py
+"""
+Опциональный сэмплирующий профайлер: один запрос или один ingest прогон.
+
+Фоновый поток раз в config.profiling.interval_ms снимает стеки (sys._current_frames) целевого
+потока и, для ingest, потоков, созданных во время прогона (ThreadPoolExecutor soloq). Это
+wall-clock профиль: ожидание API и SQLite видно так же, как работа CPU. Код приложения не
+инструментируется, поэтому накладные расходы - только сам сэмплер (~1-2% при 5 мс).
+
+Результат - collapsed stacks ("a;b;c 42", формат flamegraph.pl / speedscope) в
+config.profiling.directory плюс JSON с метаданными рядом. Список - /admin/profiles,
+скачивание - collapsed или speedscope JSON.
+
+Включение: PROFILING_ENABLED=true, затем ?_profile=<PROFILING_TOKEN> (или заголовок
+X-Profile) у запроса; ingest - PROFILE_INGEST=true или флаг на POST /update_*.
+Без PROFILING_TOKEN профилирование запросов и /admin/profiles не включаются.
+"""
+
+import contextvars
+import functools
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import config
+from error_handler import AppLogger
+
+PROFILE_ARG = "_profile"
+PROFILE_HEADER = "X-Profile"
+UNPROFILED_ENDPOINTS = {'static', 'metrics', 'profiles', 'profile_download'}
+_PROFILE_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}_[0-9]{6}-[a-z0-9_.-]+-[0-9a-f]{6}$")
+# ThreadPoolExecutor-0_3 -> ThreadPoolExecutor: воркеры пула сливаются в один корень
+_THREAD_NUMBER_RE = re.compile(r"[-_]\d+")
+
+logger = AppLogger.get_logger("profiler")
+_active_profiler = contextvars.ContextVar("active_profiler", default=None)
+
+
+class SamplingProfiler:
+    """Сэмплер стеков в отдельном потоке; counts - Counter по collapsed стеку."""
+
+    def __init__(self, thread_ids, interval_ms=None, max_seconds=None):
+        self.thread_ids = set(thread_ids)
+        self.interval = max(interval_ms or config.profiling.interval_ms, 0.5) / 1000
+        self.max_seconds = max_seconds or config.profiling.max_seconds
+        self.counts = Counter()
+        self.samples = 0
+        self.truncated = False
+        self.started_at = None
+        self.duration = 0.0
+        self._baseline_threads = None
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def follow_new_threads(self):
+        """Сэмплировать и потоки, созданные после этого вызова (пулы ingest)."""
+        if self._baseline_threads is None:
+            self._baseline_threads = set(sys._current_frames())
+
+    def _frame_label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _collapse(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return ";".join(stack)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        started = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            if time.perf_counter() - started > self.max_seconds:
+                self.truncated = True
+                break
+            frames = sys._current_frames()
+            baseline = self._baseline_threads
+            names = None
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                if thread_id in self.thread_ids:
+                    self.counts[self._collapse(frame)] += 1
+                elif baseline is not None and thread_id not in baseline:
+                    if names is None:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    root = f"[{_THREAD_NUMBER_RE.sub('', names.get(thread_id, 'thread'))}]"
+                    self.counts[f"{root};{self._collapse(frame)}"] += 1
+            self.samples += 1
+            del frames
+
+    def start(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def to_collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+# --- Хранение ---
+def _slug(value):
+    return re.sub(r"[^a-z0-9_.]+", "_", str(value).lower()).strip("_")[:40] or "profile"
+
+
+def save_profile(profiler, kind, label, status="ok", extra=None):
+    """Пишет <id>.collapsed и <id>.json; возвращает id (None - пустой профиль или ошибка записи)."""
+    if not profiler.counts:
+        return None
+    directory = config.profiling.directory
+    profile_id = f"{profiler.started_at:%Y%m%dT%H%M%S_%f}-{_slug(kind)}-{uuid.uuid4().hex[:6]}"
+    meta = {
+        "id": profile_id, "kind": kind, "label": label, "status": status,
+        "started_at": profiler.started_at.isoformat(), "duration_seconds": round(profiler.duration, 3),
+        "samples": profiler.samples, "stacks": len(profiler.counts), "interval_ms": profiler.interval * 1000,
+        "truncated": profiler.truncated,
+    }
+    meta.update(extra or {})
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{profile_id}.collapsed"), "w", encoding="utf-8") as f:
+            f.write(profiler.to_collapsed())
+        with open(os.path.join(directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        _prune_profiles(directory)
+    except OSError as e:
+        logger.error(f"Failed to save profile {profile_id}: {e}")
+        return None
+    return profile_id
+
+
+def _prune_profiles(directory):
+    meta_files = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    for name in meta_files[:max(len(meta_files) - max(config.profiling.keep, 1), 0)]:
+        for suffix in (".json", ".collapsed"):
+            path = os.path.join(directory, name[:-len(".json")] + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles(limit=100):
+    directory = config.profiling.directory
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True)[:limit]:
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def load_profile(profile_id):
+    """(meta, collapsed text) или None; id проверяется, путь наружу каталога не собрать."""
+    if not _PROFILE_ID_RE.match(profile_id or ""):
+        return None
+    directory = config.profiling.directory
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, f"{profile_id}.collapsed"), encoding="utf-8") as f:
+            return meta, f.read()
+    except (OSError, ValueError):
+        return None
+
+
+def collapsed_to_speedscope(collapsed, name, interval_ms):
+    """Collapsed stacks -> speedscope "sampled" профиль (веса в миллисекундах)."""
+    frames, frame_index, samples, weights = [], {}, [], []
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if not stack:
+            continue
+        indexes = []
+        for frame in stack.split(";"):
+            index = frame_index.get(frame)
+            if index is None:
+                index = frame_index[frame] = len(frames)
+                frames.append({"name": frame})
+            indexes.append(index)
+        samples.append(indexes)
+        weights.append(int(count) * interval_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": name, "unit": "milliseconds",
+            "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights
+        }],
+        "name": name, "exporter": "lol_app profiler"
+    }
+
+
+# --- Ingest ---
+def current_profiler():
+    return _active_profiler.get()
+
+
+@contextmanager
+def profile_job(kind, label="", force=False):
+    """
+    Профиль фонового ingest. Внутри уже профилируемого запроса (флаг на POST /update_*)
+    отдельный профиль не создаётся: профиль запроса начинает сэмплировать и потоки пула.
+    """
+    active = _active_profiler.get()
+    if active is not None:
+        active.follow_new_threads()
+        yield active
+        return
+    if not config.profiling.enabled or not (force or config.profiling.profile_ingest):
+        yield None
+        return
+    profiler = SamplingProfiler({threading.get_ident()})
+    profiler.follow_new_threads()
+    token = _active_profiler.set(profiler.start())
+    status = "error"
+    try:
+        yield profiler
+        status = "ok"
+    finally:
+        _active_profiler.reset(token)
+        profiler.stop()
+        save_profile(profiler, f"ingest-{kind}", label, status)
+
+
+def profiled_job(kind):
+    """Декоратор для fetch_and_store_*: первый аргумент (турнир, ростер) - подпись профиля."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_job(kind, label=f"{func.__name__}({args[0] if args else ''})"):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Flask ---
+def _token_ok(value):
+    if not value or not config.profiling.token:
+        return False
+    return hmac.compare_digest(value, config.profiling.token)
+
+
+def init_profiling(app):
+    """Флаг ?_profile= / X-Profile профилирует запрос; /admin/profiles - список профилей."""
+    if not config.profiling.enabled:
+        return
+    if not config.profiling.token:
+        logger.warning("PROFILING_ENABLED without PROFILING_TOKEN: request profiling and /admin/profiles are disabled.")
+        return
+    from flask import Response, abort, g, jsonify, render_template, request
+
+    @app.before_request
+    def _start_request_profile():
+        if request.endpoint in UNPROFILED_ENDPOINTS:
+            return
+        if not _token_ok(request.args.get(PROFILE_ARG) or request.headers.get(PROFILE_HEADER)):
+            return
+        profiler = SamplingProfiler({threading.get_ident()}).start()
+        g.profiler = profiler
+        g.profiler_token = _active_profiler.set(profiler)
+
+    def _finish_request_profile(status, status_code=None):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return None
+        _active_profiler.reset(g.pop("profiler_token"))
+        profiler.stop()
+        return save_profile(profiler, "request", f"{request.method} {request.path}", status,
+                            {"endpoint": request.endpoint, "status_code": status_code})
+
+    @app.after_request
+    def _save_request_profile(response):
+        profile_id = _finish_request_profile("ok" if response.status_code < 500 else "error", response.status_code)
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    @app.teardown_request
+    def _discard_request_profile(exc):
+        # after_request не вызывается при необработанном исключении
+        if "profiler" in g:
+            _finish_request_profile("error", 500)
+
+    def _require_admin():
+        if not _token_ok(request.args.get("token") or request.headers.get(PROFILE_HEADER)):
+            abort(404)
+
+    @app.route('/admin/profiles')
+    def profiles():
+        _require_admin()
+        return render_template('profiles.html', profiles=list_profiles(), token=request.args.get("token"),
+                               profile_arg=PROFILE_ARG)
+
+    @app.route('/admin/profiles/<profile_id>')
+    def profile_download(profile_id):
+        _require_admin()
+        loaded = load_profile(profile_id)
+        if loaded is None:
+            abort(404)
+        meta, collapsed = loaded
+        if request.args.get("format") == "speedscope":
+            response = jsonify(collapsed_to_speedscope(collapsed, f"{meta['kind']} {meta['label']}", meta["interval_ms"]))
+            filename = f"{profile_id}.speedscope.json"
+        else:
+            response = Response(collapsed, mimetype="text/plain")
+            filename = f"{profile_id}.collapsed.txt"
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
@@ -0,0 +1,267 @@
+# lol_app_LTA_2/request_timing.py
+"""
+Тайминги запросов: вложенные спаны (sql, fetch, aggregate, format, icons, render),
+заголовок Server-Timing и Prometheus гистограммы на /metrics.
+
+Спаны пишутся в RequestTiming текущего запроса (contextvar). Вне запроса (ingest,
+скрипты) span()/stage()/traced() ничего не делают. Время каждого спана считается
+"собственным" - без вложенных спанов, поэтому сумма по спанам + app = total.
+Метрики живут в памяти процесса: при нескольких воркерах каждый отдаёт свои.
+"""
+
+import bisect
+import contextvars
+import functools
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config import config
+
+METRICS_PREFIX = "lol_analytics"
+# Границы бакетов гистограмм, секунды
+HISTOGRAM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNTIMED_ENDPOINTS = {'static', 'metrics'}
+
+_current_timing = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """Спаны одного запроса: стек открытых [name, start, child_seconds, is_stage] и собственное время по имени."""
+    __slots__ = ("started", "stack", "totals")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stack = []
+        self.totals = {}
+
+    def push(self, name, is_stage=False):
+        self.stack.append([name, time.perf_counter(), 0.0, is_stage])
+
+    def pop(self):
+        name, started, child_seconds, _ = self.stack.pop()
+        duration = time.perf_counter() - started
+        self.totals[name] = self.totals.get(name, 0.0) + duration - child_seconds
+        if self.stack:
+            self.stack[-1][2] += duration
+
+    def pop_to(self, depth):
+        while len(self.stack) > depth:
+            self.pop()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_timing():
+    return _current_timing.get()
+
+
+@contextmanager
+def span(name):
+    """Вложенный спан; stage() внутри него закрываются вместе с ним."""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    depth = len(timing.stack)
+    timing.push(name)
+    try:
+        yield
+    finally:
+        timing.pop_to(depth)
+
+
+def stage(name):
+    """Последовательный этап внутри текущего спана: закрывает предыдущий stage() того же уровня."""
+    timing = _current_timing.get()
+    if timing is None:
+        return
+    if timing.stack and timing.stack[-1][3]:
+        timing.pop()
+    timing.push(name, is_stage=True)
+
+
+def traced(name):
+    """Декоратор: вызов функции - спан name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timing = _current_timing.get()
+            if timing is None:
+                return func(*args, **kwargs)
+            depth = len(timing.stack)
+            timing.push(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing.pop_to(depth)
+        return wrapper
+    return decorator
+
+
+# --- SQLite: execute -> "sql", fetch* -> "fetch" ---
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        with span("sql"):
+            return super().execute(*args)
+
+    def executemany(self, *args):
+        with span("sql"):
+            return super().executemany(*args)
+
+    def fetchone(self):
+        with span("fetch"):
+            return super().fetchone()
+
+    def fetchmany(self, *args):
+        with span("fetch"):
+            return super().fetchmany(*args)
+
+    def fetchall(self):
+        with span("fetch"):
+            return super().fetchall()
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+def connection_factory():
+    """Класс соединения для sqlite3.connect(factory=...)."""
+    return TimedConnection if config.timing.enabled else sqlite3.Connection
+
+
+# --- Prometheus гистограммы ---
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(HISTOGRAM_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+_histograms = {"request": {}, "stage": {}}
+_histograms_lock = threading.Lock()
+
+
+def observe_request(route, method, status, total_seconds, stage_seconds):
+    with _histograms_lock:
+        request_key = (route, method, str(status))
+        histogram = _histograms["request"].get(request_key)
+        if histogram is None:
+            histogram = _histograms["request"][request_key] = _Histogram()
+        histogram.observe(total_seconds)
+        for stage_name, seconds in stage_seconds.items():
+            stage_key = (route, stage_name)
+            histogram = _histograms["stage"].get(stage_key)
+            if histogram is None:
+                histogram = _histograms["stage"][stage_key] = _Histogram()
+            histogram.observe(seconds)
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_histogram(lines, name, label_names, histograms):
+    for labels, histogram in sorted(histograms.items()):
+        label_text = ",".join(f'{key}="{_label_value(value)}"' for key, value in zip(label_names, labels))
+        cumulative = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{label_text}}} {histogram.total:.6f}')
+        lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+
+
+def render_metrics():
+    """Текстовый формат Prometheus (version 0.0.4)."""
+    lines = [
+        f"# HELP {METRICS_PREFIX}_request_duration_seconds Request latency by route.",
+        f"# TYPE {METRICS_PREFIX}_request_duration_seconds histogram",
+    ]
+    with _histograms_lock:
+        _render_histogram(lines, f"{METRICS_PREFIX}_request_duration_seconds", ("route", "method", "status"), _histograms["request"])
+    lines += [
+        f"# HELP {METRICS_PREFIX}_request_stage_seconds Per-request self time of a span (sql, fetch, aggregate, format, icons, render, app).",
+        f"# TYPE {METRICS_PREFIX}_request_stage_seconds histogram",
+    ]
+    with _histograms_lock:
+        _render_histogram(lines, f"{METRICS_PREFIX}_request_stage_seconds", ("route", "stage"), _histograms["stage"])
+    return "\n".join(lines) + "\n"
+
+
+# --- Flask ---
+def _server_timing_header(stage_seconds, total_seconds):
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stage_seconds.items()]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def init_request_timing(app):
+    """
+    Подключает тайминги к приложению. Регистрировать до init_http_cache, чтобы
+    before_request открывал запрос первым, а after_request (Server-Timing) шёл последним.
+    """
+    if not config.timing.enabled:
+        return
+    from flask import Response, request, before_render_template, template_rendered
+
+    @app.before_request
+    def _start_request_timing():
+        if request.endpoint not in UNTIMED_ENDPOINTS:
+            _current_timing.set(RequestTiming())
+
+    @app.after_request
+    def _finish_request_timing(response):
+        timing = _current_timing.get()
+        if timing is None:
+            return response
+        _current_timing.set(None)
+        timing.pop_to(0)
+        total_seconds = timing.elapsed()
+        stage_seconds = dict(timing.totals)
+        stage_seconds["app"] = max(total_seconds - sum(stage_seconds.values()), 0.0)
+        observe_request(request.endpoint or "unknown", request.method, response.status_code, total_seconds, stage_seconds)
+        if config.timing.server_timing_header:
+            response.headers["Server-Timing"] = _server_timing_header(stage_seconds, total_seconds)
+        return response
+
+    @app.teardown_request
+    def _reset_request_timing(exc):
+        # after_request не вызывается при необработанном исключении
+        _current_timing.set(None)
+
+    def _render_started(sender, **extra):
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.push("render")
+
+    def _render_finished(sender, **extra):
+        timing = _current_timing.get()
+        if timing is not None and timing.stack and timing.stack[-1][0] == "render":
+            timing.pop()
+
+    before_render_template.connect(_render_started, app, weak=False)
+    template_rendered.connect(_render_finished, app, weak=False)
+
+    if config.timing.metrics_endpoint:
+        @app.route('/metrics')
+        def metrics():
+            return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -1,20 +1,28 @@
 # scrims_logic.py (Обновленная HLL версия)
 
 import requests
+import contextvars
 import json
+import logging
 import os
 from datetime import datetime, timedelta, timezone
 import time
 from collections import defaultdict
+from contextlib import contextmanager
 import sqlite3
 # Убедитесь, что database.py находится там, где его можно импортировать
 # Возможно, потребуется from .database import ... если структура проекта изменилась
+from config import config
+from error_handler import AppLogger
 from database import get_db_connection, SCRIMS_HEADER
+from request_timing import traced
+from ingest_metrics import timed_api_call, record_retry, add_counter
+from profiler import profiled_job
 import math # Для округления
 
 # --- КОНСТАНТЫ (HLL) ---
 GRID_API_KEY = os.getenv("GRID_API_KEY")
-GRID_BASE_URL = "https://api.grid.gg/"
+GRID_BASE_URL = config.api.grid_base_url
 TEAM_NAME = "Gamespace MC" # HLL Team Name
 PLAYER_IDS = {"26433": "IceBreaker", "25262": "Pallet", "25266": "Tsiperakos", "20958": "Nikiyas", "21922": "CENTU"} # HLL Roster
 ROSTER_RIOT_NAME_TO_GRID_ID = {"IceBreaker": "26433", "Pallet": "25262", "Tsiperakos": "25266", "Nikiyas": "20958", "CENTU": "21922"} # HLL Roster
@@ -24,15 +32,26 @@ ROLE_ORDER_FOR_SHEET = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
 PLAYER_DISPLAY_ORDER = ["IceBreaker", "Pallet", "Tsiperakos", "Nikiyas", "CENTU"] # HLL Player Order
 
 # --- Логирование ---
-def log_message(message):
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    print(f"{timestamp} :: {message}")
+_logger = AppLogger.get_logger()
+_LOG_LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR, "critical": logging.CRITICAL}
+
+def log_message(message, *args, level="info", sample=None, **fields):
+    """
+    Запись в общий логгер (error_handler.AppLogger). args подставляются в message через %
+    только если уровень включён - в горячих циклах передавайте их вместо f-строки.
+    sample="<ключ>" - шумное сообщение в цикле, выводится каждое N-е (LOG_SAMPLE_EVERY).
+    Именованные аргументы - структурированные поля записи.
+    """
+    level_no = _LOG_LEVELS.get(level, logging.INFO)
+    if not _logger.isEnabledFor(level_no):
+        return
+    _logger.log(level_no, message, *args, extra={"fields": fields, "sample": sample}, stacklevel=2)
 
 # --- Функции для работы с GRID API (Без изменений от HLL версии) ---
 def post_graphql_request(query_string, variables, endpoint, retries=3, initial_delay=1):
     """ Отправляет GraphQL POST запрос с обработкой ошибок и повторами """
     if not GRID_API_KEY:
-        log_message("API Key Error: GRID_API_KEY not set.")
+        log_message("API Key Error: GRID_API_KEY not set.", level="error")
         return None
     headers = {"x-api-key": GRID_API_KEY, "Content-Type": "application/json"}
     payload = json.dumps({"query": query_string, "variables": variables})
@@ -40,50 +59,51 @@ def post_graphql_request(query_string, variables, endpoint, retries=3, initial_d
     last_exception = None
 
     for attempt in range(retries):
+        if attempt: record_retry(endpoint)
         try:
-            response = requests.post(url, headers=headers, data=payload, timeout=20)
+            response = timed_api_call(endpoint, requests.post, url, headers=headers, data=payload, timeout=20)
             response.raise_for_status()
             response_data = response.json()
             if "errors" in response_data and response_data["errors"]:
                 error_msg = response_data["errors"][0].get("message", "Unknown GraphQL error")
-                log_message(f"GraphQL Error in response: {json.dumps(response_data['errors'])}")
+                log_message(f"GraphQL Error in response: {json.dumps(response_data['errors'])}", level="error")
                 if "UNAUTHENTICATED" in error_msg or "UNAUTHORIZED" in error_msg or "forbidden" in error_msg.lower():
-                     log_message(f"GraphQL Auth/Permission Error: {error_msg}. Check API Key/Permissions.")
+                     log_message(f"GraphQL Auth/Permission Error: {error_msg}. Check API Key/Permissions.", level="error")
                      return None
                 last_exception = Exception(f"GraphQL Error: {error_msg}")
                 time.sleep(initial_delay * (2 ** attempt))
                 continue
             return response_data.get("data")
         except requests.exceptions.HTTPError as http_err:
-            log_message(f"HTTP error on attempt {attempt + 1}: {http_err}")
+            log_message(f"HTTP error on attempt {attempt + 1}: {http_err}", level="warning")
             last_exception = http_err
             if response is not None:
                 if response.status_code == 429:
                     retry_after = int(response.headers.get("Retry-After", initial_delay * (2 ** attempt)))
-                    log_message(f"Rate limited (429). Retrying after {retry_after} seconds.")
+                    log_message(f"Rate limited (429). Retrying after {retry_after} seconds.", level="warning")
                     time.sleep(retry_after)
                     continue
                 elif response.status_code in [401, 403]:
-                    log_message(f"Authorization error ({response.status_code}). Check API Key/Permissions.")
+                    log_message(f"Authorization error ({response.status_code}). Check API Key/Permissions.", level="error")
                     return None
                 elif response.status_code == 400:
-                     try: error_details = response.json(); log_message(f"Bad Request (400) details: {json.dumps(error_details)}")
+                     try: error_details = response.json(); log_message(f"Bad Request (400) details: {json.dumps(error_details)}", level="error")
                      except json.JSONDecodeError: log_message(f"Bad Request (400), could not decode JSON: {response.text[:500]}")
                      break # Не повторяем 400 Bad Request
             if response is None or 500 <= response.status_code < 600: # Повторяем серверные ошибки
                  time.sleep(initial_delay * (2 ** attempt))
             else: break # Не повторяем другие клиентские ошибки
-        except requests.exceptions.RequestException as req_err: log_message(f"Request exception on attempt {attempt + 1}: {req_err}"); last_exception = req_err; time.sleep(initial_delay * (2 ** attempt))
-        except json.JSONDecodeError as json_err: log_message(f"JSON decode error attempt {attempt+1}: {json_err}. Response: {response.text[:200] if response else 'N/A'}"); last_exception = json_err; time.sleep(initial_delay * (2 ** attempt))
-        except Exception as e: import traceback; log_message(f"Unexpected error in post_graphql attempt {attempt + 1}: {e}\n{traceback.format_exc()}"); last_exception = e; time.sleep(initial_delay * (2 ** attempt))
+        except requests.exceptions.RequestException as req_err: log_message(f"Request exception on attempt {attempt + 1}: {req_err}", level="warning"); last_exception = req_err; time.sleep(initial_delay * (2 ** attempt))
+        except json.JSONDecodeError as json_err: log_message(f"JSON decode error attempt {attempt+1}: {json_err}. Response: {response.text[:200] if response else 'N/A'}", level="warning"); last_exception = json_err; time.sleep(initial_delay * (2 ** attempt))
+        except Exception as e: import traceback; log_message(f"Unexpected error in post_graphql attempt {attempt + 1}: {e}\n{traceback.format_exc()}", level="error"); last_exception = e; time.sleep(initial_delay * (2 ** attempt))
 
-    log_message(f"GraphQL request failed after {retries} attempts. Last error: {last_exception}")
+    log_message(f"GraphQL request failed after {retries} attempts. Last error: {last_exception}", level="warning")
     return None
 
 def get_rest_request(endpoint, retries=5, initial_delay=2, expected_type='json'):
     """ Отправляет REST GET запрос с обработкой ошибок и повторами """
     if not GRID_API_KEY:
-        log_message("API Key Error: GRID_API_KEY not set.")
+        log_message("API Key Error: GRID_API_KEY not set.", level="error")
         return None
     headers = {"x-api-key": GRID_API_KEY}
     if expected_type == 'json': headers['Accept'] = 'application/json'
@@ -92,25 +112,26 @@ def get_rest_request(endpoint, retries=5, initial_delay=2, expected_type='json')
     last_exception = None
 
     for attempt in range(retries):
+        if attempt: record_retry(endpoint)
         try:
-            response = requests.get(url, headers=headers, timeout=15) # Таймаут 15 секунд
+            response = timed_api_call(endpoint, requests.get, url, headers=headers, timeout=15) # Таймаут 15 секунд
             if response.status_code == 200:
                 if expected_type == 'json':
                     try: return response.json()
-                    except json.JSONDecodeError as json_err: log_message(f"JSON decode error (200 OK): {json_err}. Response: {response.text[:200]}"); last_exception = json_err; break # Не повторяем ошибку декодирования
+                    except json.JSONDecodeError as json_err: log_message(f"JSON decode error (200 OK): {json_err}. Response: {response.text[:200]}", level="error"); last_exception = json_err; break # Не повторяем ошибку декодирования
                 else: return response.content # Возвращаем байты для .jsonl и др.
             elif response.status_code == 429:
                 retry_after = int(response.headers.get("Retry-After", initial_delay * (2 ** attempt)))
-                log_message(f"Rate limited (429). Retrying after {retry_after} seconds.")
+                log_message(f"Rate limited (429). Retrying after {retry_after} seconds.", level="warning")
                 time.sleep(retry_after); last_exception = requests.exceptions.HTTPError(f"429 Too Many Requests"); continue
-            elif response.status_code == 404: log_message(f"Resource not found (404) at {endpoint}"); last_exception = requests.exceptions.HTTPError(f"404 Not Found"); return None # Не найдено - не повторяем
-            elif response.status_code in [401, 403]: error_msg = f"Auth error ({response.status_code}) for {endpoint}. Check API Key."; log_message(error_msg); last_exception = requests.exceptions.HTTPError(f"{response.status_code} Unauthorized/Forbidden"); return None # Ошибка доступа - не повторяем
+            elif response.status_code == 404: log_message(f"Resource not found (404) at {endpoint}", level="warning"); last_exception = requests.exceptions.HTTPError(f"404 Not Found"); return None # Не найдено - не повторяем
+            elif response.status_code in [401, 403]: error_msg = f"Auth error ({response.status_code}) for {endpoint}. Check API Key."; log_message(error_msg, level="error"); last_exception = requests.exceptions.HTTPError(f"{response.status_code} Unauthorized/Forbidden"); return None # Ошибка доступа - не повторяем
             else: response.raise_for_status() # Вызовет HTTPError для других кодов 4xx/5xx
-        except requests.exceptions.HTTPError as http_err: log_message(f"HTTP error attempt {attempt + 1}: {http_err}"); last_exception = http_err; time.sleep(initial_delay * (2 ** attempt)) # Повторяем серверные ошибки
-        except requests.exceptions.RequestException as req_err: log_message(f"Request exception attempt {attempt + 1}: {req_err}"); last_exception = req_err; time.sleep(initial_delay * (2 ** attempt)) # Повторяем ошибки сети
-        except Exception as e: log_message(f"Unexpected error attempt {attempt + 1}: {e}"); last_exception = e; time.sleep(initial_delay * (2 ** attempt)) # Повторяем другие ошибки
+        except requests.exceptions.HTTPError as http_err: log_message(f"HTTP error attempt {attempt + 1}: {http_err}", level="warning"); last_exception = http_err; time.sleep(initial_delay * (2 ** attempt)) # Повторяем серверные ошибки
+        except requests.exceptions.RequestException as req_err: log_message(f"Request exception attempt {attempt + 1}: {req_err}", level="warning"); last_exception = req_err; time.sleep(initial_delay * (2 ** attempt)) # Повторяем ошибки сети
+        except Exception as e: log_message(f"Unexpected error attempt {attempt + 1}: {e}", level="warning"); last_exception = e; time.sleep(initial_delay * (2 ** attempt)) # Повторяем другие ошибки
 
-    log_message(f"REST GET failed after {retries} attempts for {endpoint}. Last error: {last_exception}")
+    log_message(f"REST GET failed after {retries} attempts for {endpoint}. Last error: {last_exception}", level="warning")
     return None
 
 def get_all_series(days_ago=30):
@@ -131,7 +152,7 @@ def get_all_series(days_ago=30):
         else: current_variables.pop("after", None)
 
         response_data = post_graphql_request(query_string=query_string, variables=current_variables, endpoint="central-data/graphql")
-        if not response_data: log_message(f"Failed to fetch series page {page_num}. Stopping."); break
+        if not response_data: log_message(f"Failed to fetch series page {page_num}. Stopping.", level="error"); break
 
         series_data = response_data.get("allSeries", {}); edges = series_data.get("edges", [])
         nodes = [edge["node"] for edge in edges if "node" in edge]; all_nodes.extend(nodes)
@@ -153,7 +174,7 @@ def get_series_state(series_id):
         if games is None: log_message(f"Series {series_id} found, but games list is null."); return []
         return games
     elif response_data and not response_data.get("seriesState"): log_message(f"No seriesState found for series {series_id}."); return []
-    else: log_message(f"Failed to get games for series {series_id}."); return []
+    else: log_message(f"Failed to get games for series {series_id}.", level="error"); return []
 
 def download_riot_summary_data(series_id, sequence_number):
     """ Скачивает Riot Summary JSON для конкретной игры """
@@ -165,29 +186,31 @@ def download_riot_summary_data(series_id, sequence_number):
 def download_riot_livestats_data(series_id, sequence_number):
     """ Скачивает Riot LiveStats (.jsonl) для конкретной игры LoL """
     endpoint = f"file-download/events/riot/series/{series_id}/games/{sequence_number}"
-    log_message(f"Attempting to download LiveStats for s:{series_id} g:{sequence_number} from {endpoint}")
+    log_message("Attempting to download LiveStats for s:%s g:%s from %s", series_id, sequence_number, endpoint, level="debug")
 
     # Ожидаем сырой контент (байты)
     livestats_content_bytes = get_rest_request(endpoint, expected_type='content', retries=2, initial_delay=5)
 
     if livestats_content_bytes:
-        log_message(f"Successfully downloaded LiveStats content for s:{series_id} g:{sequence_number} ({len(livestats_content_bytes)} bytes)")
+        add_counter("livestats_downloads")
+        add_counter("livestats_bytes", len(livestats_content_bytes))
+        log_message("Downloaded LiveStats for s:%s g:%s", series_id, sequence_number, bytes=len(livestats_content_bytes))
         try:
             # Пытаемся декодировать как UTF-8
             return livestats_content_bytes.decode('utf-8')
         except UnicodeDecodeError:
-            log_message(f"Warning: Could not decode LiveStats as UTF-8 for s:{series_id} g:{sequence_number}. Trying latin-1.")
+            log_message(f"Warning: Could not decode LiveStats as UTF-8 for s:{series_id} g:{sequence_number}. Trying latin-1.", level="warning")
             try:
                 # Попытка с другой кодировкой
                 return livestats_content_bytes.decode('latin-1')
             except Exception as e_dec:
-                 log_message(f"Error decoding livestats content with latin-1 for s:{series_id} g:{sequence_number}: {e_dec}. Returning None.")
+                 log_message(f"Error decoding livestats content with latin-1 for s:{series_id} g:{sequence_number}: {e_dec}. Returning None.", level="error")
                  return None
         except Exception as e:
-            log_message(f"Error decoding livestats content for s:{series_id} g:{sequence_number}: {e}")
+            log_message(f"Error decoding livestats content for s:{series_id} g:{sequence_number}: {e}", level="error")
             return None
     else:
-        log_message(f"Failed to download LiveStats for s:{series_id} g:{sequence_number}")
+        log_message(f"Failed to download LiveStats for s:{series_id} g:{sequence_number}", level="error")
         return None
 
 # --- Вспомогательные функции парсинга ---
@@ -210,6 +233,7 @@ def extract_team_tag(riot_id_game_name):
     return None
 
 # --- Функция обновления и сохранения данных скримов в SQLite (Без изменений от HLL) ---
+@profiled_job("scrims")
 def fetch_and_store_scrims():
     """
     Получает последние скримы с GRID API, парсит их
@@ -221,7 +245,7 @@ def fetch_and_store_scrims():
     if not series_list: log_message("No recent series found."); return 0
 
     conn = get_db_connection()
-    if not conn: log_message("DB Connection failed for scrim update."); return -1 # Возвращаем -1 при ошибке БД
+    if not conn: log_message("DB Connection failed for scrim update.", level="error"); return -1 # Возвращаем -1 при ошибке БД
     cursor = conn.cursor()
 
     try:
@@ -229,7 +253,7 @@ def fetch_and_store_scrims():
         existing_game_ids = {row['Game_ID'] for row in cursor.fetchall()}
         log_message(f"Found {len(existing_game_ids)} existing game IDs in DB.")
     except sqlite3.Error as e:
-        log_message(f"Error reading existing game IDs: {e}. Proceeding without duplicate check.")
+        log_message(f"Error reading existing game IDs: {e}. Proceeding without duplicate check.", level="error")
         existing_game_ids = set()
 
     added_count = 0; processed_series_count = 0; total_series = len(series_list)
@@ -269,7 +293,7 @@ def fetch_and_store_scrims():
                     if normalized_name in ROSTER_RIOT_NAME_TO_GRID_ID: # Используем HLL ростер
                         current_side='blue' if idx<5 else 'red'; current_team_id=100 if idx<5 else 200
                         if our_side is None: our_side=current_side; our_team_id=current_team_id
-                        elif our_side!=current_side: log_message(f"Warn: Players on both sides! G:{game_id}"); break
+                        elif our_side!=current_side: log_message("Warn: Players on both sides! G:%s", game_id, level="warning", sample="scrim_both_sides"); break
                 if our_side is None: continue
 
                 opponent_team_name = "Opponent"; opponent_tags = defaultdict(int)
@@ -313,7 +337,7 @@ def fetch_and_store_scrims():
                 role_to_abbr = {"TOP": "TOP", "JUNGLE": "JGL", "MIDDLE": "MID", "BOTTOM": "BOT", "UTILITY": "SUP"}
                 for idx, p in enumerate(participants):
                     if not all(k in p for k in ['riotIdGameName', 'championName', 'kills', 'deaths', 'assists', 'totalDamageDealtToChampions', 'totalMinionsKilled', 'neutralMinionsKilled']):
-                        log_message(f"Warn G:{game_id}: Incomplete participant data index {idx}"); continue
+                        log_message("Warn G:%s: Incomplete participant data index %s", game_id, idx, level="warning", sample="scrim_incomplete_participant"); continue
 
                     role_name = ROLE_ORDER_FOR_SHEET[idx % 5]; side_prefix = "Blue" if idx < 5 else "Red"
                     role_abbr = role_to_abbr.get(role_name); player_col_prefix = f"{side_prefix}_{role_abbr}"
@@ -332,17 +356,17 @@ def fetch_and_store_scrims():
                 try:
                     cursor.execute(insert_sql, data_tuple)
                     if cursor.rowcount > 0: added_count += 1; existing_game_ids.add(game_id)
-                except sqlite3.Error as e: log_message(f"DB Insert Error G:{game_id}: {e}")
+                except sqlite3.Error as e: log_message(f"DB Insert Error G:{game_id}: {e}", level="error")
 
             except Exception as e:
-                log_message(f"Parse/Process fail G:{game_id}: {e}"); import traceback; log_message(traceback.format_exc()); continue
+                log_message(f"Parse/Process fail G:{game_id}: {e}", level="error"); import traceback; log_message(traceback.format_exc(), level="error"); continue
             finally: time.sleep(API_REQUEST_DELAY / 4)
         try: conn.commit() # Commit after each series
-        except sqlite3.Error as e: log_message(f"DB Commit Error after S:{series_id}: {e}")
+        except sqlite3.Error as e: log_message(f"DB Commit Error after S:{series_id}: {e}", level="error")
         time.sleep(API_REQUEST_DELAY / 2)
 
     try: conn.commit() # Final commit
-    except sqlite3.Error as e: log_message(f"DB Final Commit Error: {e}")
+    except sqlite3.Error as e: log_message(f"DB Final Commit Error: {e}", level="error")
     finally: conn.close()
 
     log_message(f"Scrims update finished. Added {added_count} new game(s).")
@@ -368,7 +392,7 @@ def get_latest_patch_version(cache_duration=3600):
             _patch_cache_time = now
             return _latest_patch_cache
         else: return "14.7.1" # Fallback
-    except Exception as e: log_message(f"Error getting latest patch: {e}"); return "14.7.1"
+    except Exception as e: log_message(f"Error getting latest patch: {e}", level="error"); return "14.7.1"
 
 # ОБНОВЛЕННАЯ normalize_champion_name_for_ddragon (с UOL)
 def normalize_champion_name_for_ddragon(champ):
@@ -431,17 +455,11 @@ def get_champion_data(cache_duration=86400):
         log_message("Champion data fetched and cached.")
         return result_data
     except Exception as e:
-        log_message(f"Failed to fetch or process champion data: {e}")
+        log_message(f"Failed to fetch or process champion data: {e}", level="error")
         return {'id_map': {}, 'name_map': {}}
 
-# ОБНОВЛЕННАЯ get_champion_icon_html (из UOL)
-def get_champion_icon_html(champion_name_or_id, champion_data, width=25, height=25):
-    """Генерирует HTML img тэг (или fallback span '?') для иконки чемпиона."""
-    func_input = champion_name_or_id # Сохраняем исходное значение для логов/title
-
-    if not champion_name_or_id or not champion_data:
-        return f'<span title="Icon error: Input missing for {func_input}">?</span>' # Заглушка
-
+def _resolve_champion_names(champion_name_or_id, champion_data):
+    """Возвращает (champ_name, ddragon_name) для имени или ID чемпиона; ddragon_name=None, если не найден."""
     champ_name = None
     ddragon_name = None
     input_is_string = isinstance(champion_name_or_id, str)
@@ -474,9 +492,9 @@ def get_champion_icon_html(champion_name_or_id, champion_data, width=25, height=
          normalized_input = normalize_champion_name_for_ddragon(champion_name_or_id)
          if normalized_input:
               ddragon_name = normalized_input
-              # log_message(f"[Icon Debug] Used normalized input '{ddragon_name}' for '{func_input}'.")
+              # log_message(f"[Icon Debug] Used normalized input '{ddragon_name}' for '{champion_name_or_id}'.")
 
-    # 3. Проверка валидности ddragon_name и генерация HTML
+    # 3. Проверка валидности ddragon_name
     is_ddragon_name_valid = False
     if ddragon_name:
         ddragon_name_lower = ddragon_name.lower()
@@ -484,7 +502,43 @@ def get_champion_icon_html(champion_name_or_id, champion_data, width=25, height=
         if ddragon_name_lower not in ["n/a", "-1", "unknown", "none", "null", ""]:
             is_ddragon_name_valid = True
 
-    if is_ddragon_name_valid:
+    if not is_ddragon_name_valid:
+        ddragon_name = None
+    return champ_name, ddragon_name
+
+def get_champion_key(champion_name_or_id, champion_data):
+    """Ключ Data Dragon (например 'MonkeyKing') для имени или ID чемпиона; None, если определить нельзя."""
+    if not champion_name_or_id or not champion_data:
+        return None
+    return _resolve_champion_names(champion_name_or_id, champion_data)[1]
+
+# False внутри skip_icon_html(): JSON API отдаёт карту ключей вместо HTML иконок
+_icon_html_enabled = contextvars.ContextVar("icon_html_enabled", default=True)
+
+
+@contextmanager
+def skip_icon_html():
+    """Внутри блока get_champion_icon_html возвращает "" (агрегаторы не собирают HTML)."""
+    token = _icon_html_enabled.set(False)
+    try:
+        yield
+    finally:
+        _icon_html_enabled.reset(token)
+
+# ОБНОВЛЕННАЯ get_champion_icon_html (из UOL)
+@traced("icons")
+def get_champion_icon_html(champion_name_or_id, champion_data, width=25, height=25):
+    """Генерирует HTML img тэг (или fallback span '?') для иконки чемпиона."""
+    if not _icon_html_enabled.get():
+        return ""
+    func_input = champion_name_or_id # Сохраняем исходное значение для логов/title
+
+    if not champion_name_or_id or not champion_data:
+        return f'<span title="Icon error: Input missing for {func_input}">?</span>' # Заглушка
+
+    champ_name, ddragon_name = _resolve_champion_names(champion_name_or_id, champion_data)
+
+    if ddragon_name:
         patch = get_latest_patch_version()
         icon_url = f"https://ddragon.leagueoflegends.com/cdn/{patch}/img/champion/{ddragon_name}.png"
         display_name_title = champ_name if champ_name else ddragon_name # Для title используем лучшее доступное имя
@@ -503,7 +557,7 @@ def aggregate_scrim_data(time_filter="All Time", side_filter="all"):
     Загружает данные из SQLite, фильтрует по времени и стороне (для статы игроков),
     и агрегирует статистику.
     """
-    log_message(f"Aggregating scrim data. Time: {time_filter}, Side: {side_filter}")
+    log_message("Aggregating scrim data", level="debug", time_filter=time_filter, side_filter=side_filter)
     conn = get_db_connection()
     if not conn: return {}, [], {}, {} # Добавлены пустые словари/списки
 
@@ -521,8 +575,8 @@ def aggregate_scrim_data(time_filter="All Time", side_filter="all"):
             cutoff_date = (now_utc - delta).strftime("%Y-%m-%d %H:%M:%S")
             where_clause = "WHERE \"Date\" >= ?"
             params.append(cutoff_date)
-            log_message(f"Applying time filter: Date >= {cutoff_date}")
-        else: log_message(f"Warning: Unknown time filter '{time_filter}'.")
+            log_message("Applying time filter: Date >= %s", cutoff_date, level="debug")
+        else: log_message(f"Warning: Unknown time filter '{time_filter}'.", level="warning")
 
     all_scrim_data = []
     try:
@@ -530,9 +584,9 @@ def aggregate_scrim_data(time_filter="All Time", side_filter="all"):
         select_all_sql = f"SELECT * FROM scrims {where_clause} ORDER BY \"Date\" DESC"
         cursor.execute(select_all_sql, params)
         all_scrim_data = cursor.fetchall()
-        log_message(f"Fetched {len(all_scrim_data)} rows from DB based on time filter.")
+        log_message("Fetched %d rows from DB based on time filter.", len(all_scrim_data), level="debug")
     except Exception as e:
-        log_message(f"Error fetching data for aggregation: {e}")
+        log_message(f"Error fetching data for aggregation: {e}", level="error")
         if conn: conn.close(); return {}, [], {}, {} # Добавлены пустые словари/списки
     finally:
         if conn: conn.close()
@@ -600,7 +654,7 @@ def aggregate_scrim_data(time_filter="All Time", side_filter="all"):
             hist_entry["R_Picks_HTML"] = " ".join(filter(None, rp_icons))
             history_list.append(hist_entry)
         except Exception as row_err:
-            log_message(f"Error processing row: {dict(row) if row else 'N/A'}. Error: {row_err}"); continue
+            log_message("Error processing row: %s. Error: %s", dict(row) if row else 'N/A', row_err, level="error", sample="scrim_aggregate_row"); continue
 
     final_player_stats = defaultdict(dict)
     for player in PLAYER_DISPLAY_ORDER:
@@ -617,7 +671,7 @@ def aggregate_scrim_data(time_filter="All Time", side_filter="all"):
                     stats['icon_html'] = get_champion_icon_html(champ, champion_data, width=30, height=30)
                     final_player_stats[player][champ] = stats
 
-    log_message("Aggregation complete.")
+    log_message("Aggregation complete.", level="debug")
     return overall_stats, history_list, dict(final_player_stats), champion_data # Возвращаем dict
 
 # --- Блок для тестирования ---
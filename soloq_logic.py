@@ -7,16 +7,22 @@ from datetime import datetime, timedelta, timezone
 from collections import defaultdict
 import math
 import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Импорты из вашего проекта
-from database import get_db_connection, SOLOQ_GAMES_HEADER
+from config import config
+from database import get_db_connection, SOLOQ_GAMES_HEADER, bump_data_generation
+from request_timing import traced
+from profiler import profiled_job
 from scrims_logic import log_message, get_champion_data, get_champion_icon_html
 
 # --- Константы ---
 # Загружаем ключ из переменных окружения
 RIOT_API_KEY = os.getenv("RIOT_API_KEY")
 if not RIOT_API_KEY:
-    log_message("!!! ОШИБКА: RIOT_API_KEY не найден в переменных окружения (.env файле)")
+    log_message("!!! ОШИБКА: RIOT_API_KEY не найден в переменных окружения (.env файле)", level="error")
     # Можно либо завершить работу, либо продолжить без возможности обновления
     # raise ValueError("RIOT_API_KEY не установлен")
 
@@ -31,38 +37,84 @@ TEAM_ROSTERS = {
 DEFAULT_REGION_ACCOUNT = "europe" # Для Account API (получение PUUID)
 DEFAULT_REGION_MATCH = "europe"   # Для Match API (история, детали)
 
-# URL Адреса Riot API
-BASE_ACCOUNT_URL = f"https://{DEFAULT_REGION_ACCOUNT}.api.riotgames.com/riot/account/v1/accounts/by-riot-id"
-BASE_MATCH_HISTORY_URL = f"https://{DEFAULT_REGION_MATCH}.api.riotgames.com/lol/match/v5/matches/by-puuid"
-BASE_MATCH_DETAIL_URL = f"https://{DEFAULT_REGION_MATCH}.api.riotgames.com/lol/match/v5/matches"
-
-# Задержка между запросами к Riot API (в секундах) - НАСТРОЙТЕ ПРИ НЕОБХОДИМОСТИ
-RIOT_API_DELAY = 1.3 # ~1 запрос в 1.3 секунды, чтобы уложиться в стандартные лимиты (20/сек, 100/2мин)
+# URL Адреса Riot API (база - config.api.riot_base_url, RIOT_BASE_URL для локального мока)
+BASE_ACCOUNT_URL = f"{config.api.riot_base_url.format(region=DEFAULT_REGION_ACCOUNT)}/riot/account/v1/accounts/by-riot-id"
+BASE_MATCH_HISTORY_URL = f"{config.api.riot_base_url.format(region=DEFAULT_REGION_MATCH)}/lol/match/v5/matches/by-puuid"
+BASE_MATCH_DETAIL_URL = f"{config.api.riot_base_url.format(region=DEFAULT_REGION_MATCH)}/lol/match/v5/matches"
+
+# Лимиты Riot API (запросов, окно в секундах) - стандартный dev/personal ключ: 20/сек и 100/2мин
+RIOT_RATE_LIMITS = [(20, 1.0), (100, 120.0)]
+# Сколько аккаунтов / матчей обрабатываем параллельно (темп всё равно задаёт лимитер)
+SOLOQ_MAX_WORKERS = 8
+# Пагинация истории матчей: максимум Riot match-v5 за один запрос
+SOLOQ_PAGE_SIZE = 100
+# Новый аккаунт без watermark - только последние SOLOQ_PAGE_SIZE игр; backfill листает глубже
+SOLOQ_INITIAL_MAX_PAGES = 1
+SOLOQ_BACKFILL_MAX_PAGES = 50
+# Сколько Match ID проверяем на существование одним запросом (лимит параметров SQLite)
+SOLOQ_EXISTS_CHUNK = 500
+
+
+class RiotRateLimiter:
+    """Общий для всех потоков лимитер запросов к Riot API (скользящие окна + пауза после 429)."""
+
+    def __init__(self, limits):
+        self._windows = [(count, float(window), deque()) for count, window in limits]
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """Блокирует поток, пока запрос не укладывается во все окна лимитов."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    for count, window, stamps in self._windows:
+                        while stamps and now - stamps[0] >= window:
+                            stamps.popleft()
+                        if len(stamps) >= count:
+                            wait = max(wait, window - (now - stamps[0]))
+                if wait <= 0:
+                    for _, _, stamps in self._windows:
+                        stamps.append(now)
+                    return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Останавливает все потоки на seconds (Retry-After из ответа 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+RIOT_RATE_LIMITER = RiotRateLimiter(RIOT_RATE_LIMITS)
 
 # --- Вспомогательная функция для запросов к Riot API ---
-def _riot_api_request(url):
-    """Отправляет GET запрос к Riot API с обработкой ошибок и лимитов."""
+def _riot_api_request(url, max_retries=3):
+    """Отправляет GET запрос к Riot API через общий лимитер, с обработкой ошибок и 429."""
     if not RIOT_API_KEY:
-        log_message("Riot API request failed: API Key not configured.")
+        log_message("Riot API request failed: API Key not configured.", level="error")
         return None
 
     headers = {"X-Riot-Token": RIOT_API_KEY}
+    response = None
     try:
         # log_message(f"Riot API Request: {url}") # Лог для отладки
-        response = requests.get(url, headers=headers, timeout=15)
-
-        # Обработка Rate Limit (429) - простая задержка, можно улучшить экспоненциальным отступлением
-        if response.status_code == 429:
+        for attempt in range(max_retries + 1):
+            RIOT_RATE_LIMITER.acquire()
+            response = requests.get(url, headers=headers, timeout=15)
+            if response.status_code != 429 or attempt == max_retries:
+                break
+            # Rate Limit (429) - ставим на паузу все потоки, а не только текущий
             retry_after = int(response.headers.get("Retry-After", "5")) # По умолчанию ждем 5 секунд
-            log_message(f"Rate limited (429). Retrying after {retry_after} seconds...")
-            time.sleep(retry_after)
-            response = requests.get(url, headers=headers, timeout=15) # Повторная попытка
+            log_message(f"Rate limited (429). Retrying after {retry_after} seconds...", level="warning")
+            RIOT_RATE_LIMITER.pause(retry_after)
 
         response.raise_for_status() # Вызовет исключение для других ошибок (4xx, 5xx)
         return response.json()
 
     except requests.exceptions.HTTPError as http_err:
-        log_message(f"HTTP error occurred: {http_err} - URL: {url}")
+        log_message(f"HTTP error occurred: {http_err} - URL: {url}", level="error")
         # Дополнительная информация при 403 (Forbidden) - часто из-за неверного ключа или его истечения
         if response is not None and response.status_code == 403:
              log_message("Received 403 Forbidden. Check if RIOT_API_KEY is valid and has not expired.")
@@ -72,7 +124,7 @@ def _riot_api_request(url):
     except requests.exceptions.RequestException as req_err:
         log_message(f"Request exception occurred: {req_err} - URL: {url}")
     except Exception as e:
-        log_message(f"An unexpected error occurred during Riot API request: {e} - URL: {url}")
+        log_message(f"An unexpected error occurred during Riot API request: {e} - URL: {url}", level="error")
 
     return None # Возвращаем None при любой ошибке
 
@@ -84,69 +136,59 @@ def get_puuid(game_name, tag_line):
     if data and "puuid" in data:
         return data["puuid"]
     else:
-        log_message(f"Could not get PUUID for {game_name}#{tag_line}")
+        log_message(f"Could not get PUUID for {game_name}#{tag_line}", level="warning")
         return None
 
 
+# Ключ периода из дневного роллапа: неделя - понедельник, месяц - первое число (UTC)
+_ACTIVITY_BUCKET_SQL = {
+    "Day": "day",
+    "Week": "date(day, 'weekday 0', '-6 days')",
+    "Month": "strftime('%Y-%m-01', day)",
+}
+
+
+def _query_daily_activity(conn, player_name, aggregation_type):
+    """(period, games, wins) из soloq_daily_activity, сгруппированные по дню/неделе/месяцу."""
+    bucket_sql = _ACTIVITY_BUCKET_SQL.get(aggregation_type, _ACTIVITY_BUCKET_SQL["Day"]) # По умолчанию - день
+    return conn.execute(f"""
+        SELECT {bucket_sql} AS period, SUM(games) AS games, SUM(wins) AS wins
+        FROM soloq_daily_activity
+        WHERE player_name = ?
+        GROUP BY period
+        ORDER BY period
+    """, (player_name,)).fetchall()
+
+
+@traced("aggregate")
 def get_soloq_activity_data(player_name, aggregation_type="Day"):
-    log_message(f"Getting activity data for {player_name}. Aggregate by: {aggregation_type}")
+    log_message("Getting activity data for %s. Aggregate by: %s", player_name, aggregation_type, level="debug")
     conn = get_db_connection()
     if not conn: return {}
 
-    # Используем defaultdict для удобства
-    activity_data = defaultdict(lambda: {'wins': 0, 'losses': 0, 'total': 0})
+    activity_data = {}
     try:
-        cursor = conn.cursor()
-        # Получаем Timestamp и Win для игрока
-        cursor.execute("SELECT Timestamp, Win FROM soloq_games WHERE Player_Name = ?", (player_name,))
-        rows = cursor.fetchall()
-
-        for row in rows:
-            ts = row['Timestamp']
-            win = row['Win'] # 0 или 1
-            # Проверка на None перед конвертацией
-            if ts is None:
-                log_message(f"Warning: Found null Timestamp for player {player_name}")
-                continue
-            try:
-                dt_object = datetime.fromtimestamp(ts, timezone.utc)
-            except (OSError, OverflowError, TypeError) as ts_err:
-                 log_message(f"Warning: Invalid timestamp {ts} for player {player_name}: {ts_err}")
-                 continue
-
-
-            if aggregation_type == "Day":
-                date_key = dt_object.strftime("%Y-%m-%d")
-            elif aggregation_type == "Week":
-                 # Начало недели (понедельник)
-                 start_of_week = dt_object - timedelta(days=dt_object.weekday())
-                 date_key = start_of_week.strftime("%Y-%m-%d")
-            elif aggregation_type == "Month":
-                 date_key = dt_object.strftime("%Y-%m-01") # Первый день месяца
-            else: # По умолчанию - день
-                 date_key = dt_object.strftime("%Y-%m-%d")
-
-            activity_data[date_key]['total'] += 1
-            # Убедимся, что win это 0 или 1
-            if win == 1:
-                activity_data[date_key]['wins'] += 1
-            else: # Считаем все остальное (0 или None) как поражение
-                activity_data[date_key]['losses'] += 1
-
+        # Считаем из дневных роллапов, а не по каждой игре
+        for row in _query_daily_activity(conn, player_name, aggregation_type):
+            activity_data[row['period']] = {
+                'wins': row['wins'],
+                'losses': row['games'] - row['wins'], # Все не-победы считаем поражениями
+                'total': row['games']
+            }
     except sqlite3.Error as e:
-        log_message(f"DB Error getting activity data for {player_name}: {e}")
+        log_message(f"DB Error getting activity data for {player_name}: {e}", level="error")
         return {}
     finally:
         if conn: conn.close()
 
     # Вернем просто словарь, его удобнее обработать в JS
-    log_message(f"Activity data processed for {player_name}. Found {len(activity_data)} points.")
-    return dict(activity_data)
+    log_message("Activity data processed for %s. Found %d points.", player_name, len(activity_data), level="debug")
+    return activity_data
 
-def get_match_ids(puuid, count=20, start_time=None):
-    """Получает список ID матчей для PUUID."""
+def get_match_ids(puuid, count=20, start_time=None, start=0):
+    """Получает список ID матчей для PUUID (новые первыми, start - смещение страницы)."""
     # Уменьшил count до 20 для ускорения обновлений, можно увеличить до 100
-    url = f"{BASE_MATCH_HISTORY_URL}/{puuid}/ids?start=0&count={count}"
+    url = f"{BASE_MATCH_HISTORY_URL}/{puuid}/ids?start={start}&count={count}"
     if start_time: # Опционально: фильтр по времени начала (Unix timestamp seconds)
         url += f"&startTime={start_time}"
     # Добавляем тип матча - только ranked solo/duo (420)
@@ -155,164 +197,288 @@ def get_match_ids(puuid, count=20, start_time=None):
     # API возвращает список строк или None при ошибке
     return match_ids if isinstance(match_ids, list) else []
 
+def get_match_id_history(puuid, start_time=None, max_pages=SOLOQ_INITIAL_MAX_PAGES):
+    """
+    Все ID матчей с start_time (включительно), постранично по SOLOQ_PAGE_SIZE.
+    При обычной синхронизации по watermark это один дешёвый запрос.
+    """
+    match_ids = []
+    for page in range(max_pages):
+        page_ids = get_match_ids(puuid, count=SOLOQ_PAGE_SIZE, start_time=start_time, start=page * SOLOQ_PAGE_SIZE)
+        match_ids.extend(page_ids)
+        if len(page_ids) < SOLOQ_PAGE_SIZE:
+            break
+    else:
+        log_message(f"Match history for PUUID {puuid} truncated at {max_pages} page(s).")
+    return match_ids
+
 def get_match_details(match_id):
     """Получает детали конкретного матча по его ID."""
     url = f"{BASE_MATCH_DETAIL_URL}/{match_id}"
     return _riot_api_request(url)
 
 # --- Логика сохранения данных в БД ---
-def fetch_and_store_soloq_data(player_name):
-    """
-    Загружает историю матчей SoloQ для игрока из Riot API
-    и сохраняет новые игры в базу данных SQLite.
-    """
-    if not RIOT_API_KEY:
-        log_message(f"Skipping SoloQ update for {player_name}: RIOT_API_KEY not set.")
-        return 0
-
-    player_config = TEAM_ROSTERS["Gamespace"].get(player_name)
-    if not player_config:
-        log_message(f"Player {player_name} not found in TEAM_ROSTERS.")
-        return 0
+def _load_cached_puuids(conn, accounts):
+    """{(game_name, tag_line): puuid} из таблицы soloq_accounts."""
+    cached = {}
+    try:
+        for row in conn.execute("SELECT riot_name, riot_tag, puuid FROM soloq_accounts"):
+            cached[(row['riot_name'], row['riot_tag'])] = row['puuid']
+    except sqlite3.Error as e:
+        log_message(f"Error reading PUUID cache: {e}", level="error")
+    return {(name, tag): cached[(name, tag)] for _, name, tag in accounts if (name, tag) in cached}
 
-    log_message(f"Starting SoloQ update for {player_name}...")
-    added_count_total = 0
-    processed_accounts = 0
 
-    # Получаем существующие Match ID из БД для этого игрока
-    conn = get_db_connection()
-    if not conn: return -1 # Ошибка подключения к БД
-    cursor = conn.cursor()
+def _save_cached_puuids(conn, resolved):
+    """resolved: {(player_name, game_name, tag_line): puuid}"""
+    now_iso = datetime.now(timezone.utc).isoformat()
+    rows = [(name, tag, player, puuid, now_iso) for (player, name, tag), puuid in resolved.items() if puuid]
+    if not rows:
+        return
     try:
-        cursor.execute("SELECT Match_ID FROM soloq_games WHERE Player_Name = ?", (player_name,))
-        existing_match_ids = {row['Match_ID'] for row in cursor.fetchall()}
-        log_message(f"Found {len(existing_match_ids)} existing SoloQ games for {player_name} in DB.")
+        conn.executemany("""
+            INSERT INTO soloq_accounts (riot_name, riot_tag, player_name, puuid, last_updated) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(riot_name, riot_tag) DO UPDATE SET
+                player_name = excluded.player_name, puuid = excluded.puuid, last_updated = excluded.last_updated
+        """, rows)
+        conn.commit()
     except sqlite3.Error as e:
-        log_message(f"Error reading existing SoloQ games for {player_name}: {e}")
-        existing_match_ids = set() # Продолжаем без проверки дубликатов в случае ошибки
-
-    # Перебираем все Riot ID аккаунты игрока
-    for game_name, tag_line in zip(player_config.get("game_name", []), player_config.get("tag_line", [])):
-        processed_accounts += 1
-        log_message(f"Processing account {processed_accounts}/{len(player_config.get('game_name', []))}: {game_name}#{tag_line}")
+        log_message(f"Error saving PUUID cache: {e}", level="error")
+        conn.rollback()
 
-        puuid = get_puuid(game_name, tag_line)
-        time.sleep(RIOT_API_DELAY) # Задержка после запроса PUUID
 
-        if not puuid:
-            continue # Переходим к следующему аккаунту, если PUUID не найден
+def _load_sync_watermarks(conn, accounts):
+    """
+    {(game_name, tag_line): gameCreation последней сохранённой игры (сек)}.
+    Для аккаунтов без watermark берём MAX(Timestamp) из уже сохранённых игр.
+    """
+    watermarks = {}
+    try:
+        for row in conn.execute("SELECT riot_name, riot_tag, last_game_ts FROM soloq_accounts WHERE last_game_ts IS NOT NULL"):
+            watermarks[(row['riot_name'], row['riot_tag'])] = row['last_game_ts']
+        players = sorted({player for player, _, _ in accounts})
+        placeholders = ", ".join(["?"] * len(players))
+        for row in conn.execute(f"""
+            SELECT Riot_Name, Riot_Tag, MAX(Timestamp) AS last_ts FROM soloq_games
+            WHERE Player_Name IN ({placeholders}) GROUP BY Riot_Name, Riot_Tag
+        """, players):
+            if row['last_ts'] is not None:
+                watermarks.setdefault((row['Riot_Name'], row['Riot_Tag']), int(row['last_ts']))
+    except sqlite3.Error as e:
+        log_message(f"Error reading SoloQ sync watermarks: {e}", level="error")
+    return {(name, tag): watermarks[(name, tag)] for _, name, tag in accounts if (name, tag) in watermarks}
+
+
+def _save_sync_watermarks(conn, watermarks):
+    """Сдвигает watermark вперёд (никогда назад - backfill старых игр его не откатывает)."""
+    rows = [(ts, ts, name, tag) for (name, tag), ts in watermarks.items()]
+    conn.executemany("""
+        UPDATE soloq_accounts SET last_game_ts = CASE
+            WHEN last_game_ts IS NULL OR last_game_ts < ? THEN ? ELSE last_game_ts END
+        WHERE riot_name = ? AND riot_tag = ?
+    """, rows)
+
+
+def _existing_match_ids(conn, match_ids):
+    """Какие из match_ids уже есть в soloq_games (поиск по PK, без загрузки всей истории)."""
+    existing = set()
+    match_ids = list(match_ids)
+    for i in range(0, len(match_ids), SOLOQ_EXISTS_CHUNK):
+        chunk = match_ids[i:i + SOLOQ_EXISTS_CHUNK]
+        placeholders = ", ".join(["?"] * len(chunk))
+        for row in conn.execute(f"SELECT Match_ID FROM soloq_games WHERE Match_ID IN ({placeholders})", chunk):
+            existing.add(row['Match_ID'])
+    return existing
+
+
+def _build_soloq_row(match_id, match_details, puuid, player_name, game_name, tag_line):
+    """Строка для soloq_games из деталей матча (None, если игрок не найден)."""
+    if not match_details or "info" not in match_details:
+        log_message(f"Failed to get details for Match ID: {match_id}", level="error")
+        return None
 
-        match_ids = get_match_ids(puuid, count=100) # Берем последние 30 игр (можно настроить)
-        time.sleep(RIOT_API_DELAY) # Задержка после запроса истории
+    info = match_details["info"]
+    participants = info.get("participants", [])
+    game_creation_ts = info.get("gameCreation") // 1000 # Секунды Unix timestamp
+    game_date_readable = datetime.fromtimestamp(game_creation_ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
-        if not match_ids:
-            log_message(f"No recent SoloQ match IDs found for {game_name}#{tag_line} (PUUID: {puuid})")
-            continue
+    player_part_data = None
+    for p_data in participants:
+        if p_data.get("puuid") == puuid:
+            player_part_data = p_data
+            break
 
-        new_match_ids = [m_id for m_id in match_ids if m_id not in existing_match_ids]
-        log_message(f"Found {len(new_match_ids)} new match(es) to process for {game_name}#{tag_line}.")
+    if not player_part_data:
+        log_message("Could not find participant data for PUUID %s in Match ID: %s", puuid, match_id, level="warning", sample="soloq_missing_participant")
+        return None
 
-        added_count_for_account = 0
-        sql_column_names_db = [hdr.replace(" ", "_").replace(".", "").replace("-", "_") for hdr in SOLOQ_GAMES_HEADER]
-        quoted_column_names_db = [f'"{col}"' for col in sql_column_names_db]
-        columns_string_db = ', '.join(quoted_column_names_db)
-        sql_placeholders_db = ", ".join(["?"] * len(sql_column_names_db))
-        insert_sql = f"INSERT OR IGNORE INTO soloq_games ({columns_string_db}) VALUES ({sql_placeholders_db})"
+    # Определяем роль (может быть teamPosition или individualPosition) и нормализуем к нашим значениям
+    role = player_part_data.get("teamPosition") or player_part_data.get("individualPosition") or "UNKNOWN"
+    role_map = {"TOP": "TOP", "JUNGLE": "JUNGLE", "MIDDLE": "MIDDLE", "BOTTOM": "BOTTOM", "UTILITY": "UTILITY", "SUPPORT": "UTILITY"}
+
+    return {
+        "Match_ID": match_id,
+        "Player_Name": player_name,
+        "Riot_Name": game_name,
+        "Riot_Tag": tag_line,
+        "Timestamp": game_creation_ts,
+        "Date_Readable": game_date_readable,
+        "Win": 1 if player_part_data.get("win", False) else 0,
+        "Champion": player_part_data.get("championName", "UnknownChamp"),
+        "Role": role_map.get(role.upper(), "UNKNOWN"), # Сохраняем нормализованную роль
+        "Kills": player_part_data.get("kills", 0),
+        "Deaths": player_part_data.get("deaths", 0),
+        "Assists": player_part_data.get("assists", 0)
+    }
 
-        for match_id in new_match_ids:
-            match_details = get_match_details(match_id)
-            time.sleep(RIOT_API_DELAY) # Задержка после запроса деталей матча
 
-            if not match_details or "info" not in match_details:
-                log_message(f"Failed to get details for Match ID: {match_id}")
-                continue
+@profiled_job("soloq")
+def fetch_and_store_soloq_roster(team_roster_key="Gamespace", player_names=None, backfill_from_ts=None):
+    """
+    Обновляет SoloQ для всего ростера: аккаунты и матчи обрабатываются параллельно
+    под общим лимитером Riot API, PUUID берутся из кэша soloq_accounts,
+    новые игры вставляются пачкой. Возвращает {player_name: added_count или -1}.
 
-            info = match_details["info"]
-            participants = info.get("participants", [])
-            game_creation_ts = info.get("gameCreation") // 1000 # Секунды Unix timestamp
-            game_date_readable = datetime.fromtimestamp(game_creation_ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    Синхронизация инкрементальная: startTime = watermark аккаунта (gameCreation
+    последней сохранённой игры). backfill_from_ts (Unix сек) игнорирует watermark
+    и листает историю назад до этой даты.
+    """
+    roster = TEAM_ROSTERS.get(team_roster_key, {})
+    players = [p for p in (player_names if player_names is not None else roster.keys()) if p in roster]
+    results = {player: 0 for player in players}
+    if not RIOT_API_KEY:
+        log_message(f"Skipping SoloQ update for {team_roster_key}: RIOT_API_KEY not set.")
+        return results
+
+    accounts = []
+    for player in players:
+        player_config = roster[player]
+        for game_name, tag_line in zip(player_config.get("game_name", []), player_config.get("tag_line", [])):
+            accounts.append((player, game_name, tag_line))
+    if not accounts:
+        return results
+    log_message(f"Starting SoloQ update for {len(players)} player(s), {len(accounts)} account(s)...")
 
-            player_part_data = None
-            for p_data in participants:
-                if p_data.get("puuid") == puuid:
-                    player_part_data = p_data
-                    break
+    conn = get_db_connection()
+    if not conn: return {player: -1 for player in players} # Ошибка подключения к БД
 
-            if not player_part_data:
-                log_message(f"Could not find participant data for PUUID {puuid} in Match ID: {match_id}")
+    try:
+        # 1. PUUID: сначала кэш, недостающие - параллельно через API
+        cached_puuids = _load_cached_puuids(conn, accounts)
+        missing_accounts = [acc for acc in accounts if (acc[1], acc[2]) not in cached_puuids]
+        with ThreadPoolExecutor(max_workers=SOLOQ_MAX_WORKERS) as pool:
+            resolved = dict(zip(missing_accounts, pool.map(lambda acc: get_puuid(acc[1], acc[2]), missing_accounts)))
+        _save_cached_puuids(conn, resolved)
+        puuid_by_account = {acc: cached_puuids.get((acc[1], acc[2])) or resolved.get(acc) for acc in accounts}
+
+        # 2. Списки матчей по всем аккаунтам параллельно, начиная с watermark
+        active_accounts = [acc for acc in accounts if puuid_by_account.get(acc)]
+        watermarks = _load_sync_watermarks(conn, active_accounts)
+
+        def list_account_matches(acc):
+            if backfill_from_ts is not None:
+                return get_match_id_history(puuid_by_account[acc], int(backfill_from_ts), SOLOQ_BACKFILL_MAX_PAGES)
+            watermark = watermarks.get((acc[1], acc[2]))
+            if watermark is None:
+                return get_match_id_history(puuid_by_account[acc], None, SOLOQ_INITIAL_MAX_PAGES)
+            # startTime включительный: игра с тем же gameCreation отсеется проверкой существования
+            return get_match_id_history(puuid_by_account[acc], watermark, SOLOQ_BACKFILL_MAX_PAGES)
+
+        with ThreadPoolExecutor(max_workers=SOLOQ_MAX_WORKERS) as pool:
+            match_ids_by_account = dict(zip(active_accounts, pool.map(list_account_matches, active_accounts)))
+
+        # Проверяем существование только полученных ID (индекс по Match_ID)
+        try:
+            known_match_ids = _existing_match_ids(
+                conn, {m_id for match_ids in match_ids_by_account.values() for m_id in match_ids})
+        except sqlite3.Error as e:
+            log_message(f"Error checking existing SoloQ games: {e}", level="error")
+            return {player: -1 for player in players}
+
+        jobs = []
+        for acc in active_accounts:
+            player, game_name, tag_line = acc
+            match_ids = match_ids_by_account.get(acc) or []
+            if not match_ids:
+                log_message(f"No new SoloQ match IDs found for {game_name}#{tag_line} (PUUID: {puuid_by_account[acc]})")
                 continue
+            new_match_ids = [m_id for m_id in match_ids if m_id not in known_match_ids]
+            known_match_ids.update(new_match_ids) # Не запрашиваем один матч дважды
+            log_message(f"Found {len(new_match_ids)} new match(es) to process for {game_name}#{tag_line}.")
+            jobs.extend((acc, m_id) for m_id in new_match_ids)
+
+        # 3. Детали матчей параллельно
+        with ThreadPoolExecutor(max_workers=SOLOQ_MAX_WORKERS) as pool:
+            details = list(pool.map(lambda job: get_match_details(job[1]), jobs))
+
+        rows_by_player = defaultdict(list)
+        new_watermarks = {}
+        failed_accounts = set()
+        for (acc, match_id), match_details in zip(jobs, details):
+            player, game_name, tag_line = acc
+            if not match_details:
+                # Матч не скачался - не двигаем watermark, чтобы забрать его при следующей синхронизации
+                failed_accounts.add((game_name, tag_line))
+            row_dict = _build_soloq_row(match_id, match_details, puuid_by_account[acc], player, game_name, tag_line)
+            if row_dict:
+                rows_by_player[player].append(row_dict)
+                key = (game_name, tag_line)
+                new_watermarks[key] = max(new_watermarks.get(key, 0), row_dict["Timestamp"])
+        for key in failed_accounts:
+            new_watermarks.pop(key, None)
+
+        # 4. Пакетная вставка
+        sql_column_names_db = [hdr.replace(" ", "_").replace(".", "").replace("-", "_") for hdr in SOLOQ_GAMES_HEADER]
+        columns_string_db = ', '.join(f'"{col}"' for col in sql_column_names_db)
+        sql_placeholders_db = ", ".join(["?"] * len(sql_column_names_db))
+        insert_sql = f"INSERT OR IGNORE INTO soloq_games ({columns_string_db}) VALUES ({sql_placeholders_db})"
 
-            # Извлекаем нужные данные
-            win = 1 if player_part_data.get("win", False) else 0
-            champion = player_part_data.get("championName", "UnknownChamp")
-            # Определяем роль (может быть teamPosition или individualPosition)
-            role = player_part_data.get("teamPosition") or player_part_data.get("individualPosition") or "UNKNOWN"
-            if role == "UTILITY": role = "SUPPORT" # Приводим к общему виду? Или оставляем UTILITY? Оставим UTILITY пока
-            # Нормализуем роль из API к нашим значениям, если нужно
-            role_map = {"TOP": "TOP", "JUNGLE": "JUNGLE", "MIDDLE": "MIDDLE", "BOTTOM": "BOTTOM", "UTILITY": "UTILITY", "SUPPORT": "UTILITY"}
-            role_normalized = role_map.get(role.upper(), "UNKNOWN")
-
-            kills = player_part_data.get("kills", 0)
-            deaths = player_part_data.get("deaths", 0)
-            assists = player_part_data.get("assists", 0)
-
-            # Собираем данные для вставки
-            row_dict = {
-                "Match_ID": match_id,
-                "Player_Name": player_name,
-                "Riot_Name": game_name,
-                "Riot_Tag": tag_line,
-                "Timestamp": game_creation_ts,
-                "Date_Readable": game_date_readable,
-                "Win": win,
-                "Champion": champion,
-                "Role": role_normalized, # Сохраняем нормализованную роль
-                "Kills": kills,
-                "Deaths": deaths,
-                "Assists": assists
-            }
-            data_tuple = tuple(row_dict.get(sql_col, None) for sql_col in sql_column_names_db)
-
-            # Вставляем в БД
+        for player, rows in rows_by_player.items():
+            data_tuples = [tuple(row.get(sql_col) for sql_col in sql_column_names_db) for row in rows]
+            changes_before = conn.total_changes
             try:
-                cursor.execute(insert_sql, data_tuple)
-                if cursor.rowcount > 0:
-                    added_count_for_account += 1
-                    existing_match_ids.add(match_id) # Добавляем в сет, чтобы не обработать снова
+                conn.executemany(insert_sql, data_tuples)
+                results[player] = conn.total_changes - changes_before
             except sqlite3.Error as e:
-                 log_message(f"DB Insert Error SoloQ Match:{match_id} for Player:{player_name}: {e}")
-                 log_message(f"Data attempted (SoloQ): {data_tuple}")
+                log_message(f"DB Insert Error SoloQ for Player:{player}: {e}", level="error")
+                results[player] = -1
 
-        # Коммит после обработки одного Riot ID аккаунта
+        failed_players = {player for player, count in results.items() if count == -1}
+        for player, game_name, tag_line in active_accounts:
+            if player in failed_players:
+                new_watermarks.pop((game_name, tag_line), None)
         try:
+            _save_sync_watermarks(conn, new_watermarks)
+            if any(count > 0 for count in results.values()):
+                bump_data_generation(conn)
             conn.commit()
-            log_message(f"Added {added_count_for_account} new game(s) for {game_name}#{tag_line}.")
-            added_count_total += added_count_for_account
         except sqlite3.Error as e:
-            log_message(f"DB Commit Error after processing account {game_name}#{tag_line}: {e}")
-            conn.rollback() # Откатываем изменения для этого аккаунта при ошибке коммита
+            log_message(f"DB Commit Error after SoloQ update for {team_roster_key}: {e}", level="error")
+            conn.rollback()
+            return {player: -1 for player in players}
+    finally:
+        conn.close()
 
-    # Закрываем соединение после обработки всех аккаунтов игрока
-    conn.close()
-    log_message(f"SoloQ update finished for {player_name}. Total new games added: {added_count_total}")
-    return added_count_total
+    for player, added in results.items():
+        log_message(f"SoloQ update finished for {player}. Total new games added: {added}")
+    return results
 
 
-# --- Логика агрегации данных из БД ---
-def aggregate_soloq_data_from_db(player_name, time_filter="All Time", date_from_str=None, date_to_str=None):
-    log_message(f"Aggregating SoloQ data for {player_name}. Time filter: {time_filter}, Dates: {date_from_str} - {date_to_str}") # Добавил даты в лог
-    player_config = TEAM_ROSTERS["Gamespace"].get(player_name)
-    if not player_config:
-        log_message(f"Cannot aggregate: Player {player_name} not in roster.")
-        return {}
-    player_main_role = player_config.get("role")
+def fetch_and_store_soloq_data(player_name):
+    """
+    Загружает историю матчей SoloQ для одного игрока из Riot API
+    и сохраняет новые игры в базу данных SQLite.
+    """
+    if player_name not in TEAM_ROSTERS["Gamespace"]:
+        log_message(f"Player {player_name} not found in TEAM_ROSTERS.", level="warning")
+        return 0
+    return fetch_and_store_soloq_roster("Gamespace", player_names=[player_name]).get(player_name, 0)
 
-    conn = get_db_connection()
-    if not conn: return {}
 
-    # --- Фильтр по времени ---
-    sql = "SELECT Champion, Win, Kills, Deaths, Assists, Role FROM soloq_games WHERE Player_Name = ?"
-    params = [player_name]
+# --- Логика агрегации данных из БД ---
+def _soloq_time_window(time_filter="All Time", date_from_str=None, date_to_str=None):
+    """Возвращает (ts_from, ts_to) в секундах Unix; None - граница не задана."""
+    ts_from, ts_to = None, None
     date_filter_active = False
 
     # Приоритет у ручного выбора дат
@@ -322,120 +488,119 @@ def aggregate_soloq_data_from_db(player_name, time_filter="All Time", date_from_
                 # Добавляем 00:00:00 к начальной дате
                 dt_from = datetime.strptime(date_from_str + " 00:00:00", "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
                 ts_from = int(dt_from.timestamp())
-                sql += " AND Timestamp >= ?"
-                params.append(ts_from)
-                # log_message(f"Applying date filter: Timestamp >= {dt_from}")
                 date_filter_active = True
             if date_to_str:
                 # Добавляем 23:59:59 к конечной дате
                 dt_to = datetime.strptime(date_to_str + " 23:59:59", "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
                 ts_to = int(dt_to.timestamp())
-                sql += " AND Timestamp <= ?"
-                params.append(ts_to)
-                # log_message(f"Applying date filter: Timestamp <= {dt_to}")
                 date_filter_active = True
         except ValueError:
-             log_message(f"Invalid date format received: from='{date_from_str}', to='{date_to_str}'. Ignoring date filter.")
+             log_message(f"Invalid date format received: from='{date_from_str}', to='{date_to_str}'. Ignoring date filter.", level="warning")
+             ts_from, ts_to = None, None
              date_filter_active = False # Сбрасываем флаг при ошибке
 
     # Если ручные даты не применились, используем dropdown
     if not date_filter_active and time_filter != "All Time":
-        now_utc_ts = int(datetime.now(timezone.utc).timestamp())
-        delta_seconds = None
-        if time_filter == "1 week": delta_seconds = timedelta(weeks=1).total_seconds()
-        elif time_filter == "2 weeks": delta_seconds = timedelta(weeks=2).total_seconds()
-        elif time_filter == "3 weeks": delta_seconds = timedelta(weeks=3).total_seconds()
-        elif time_filter == "4 weeks": delta_seconds = timedelta(weeks=4).total_seconds()
-
-        if delta_seconds:
-            cutoff_ts = now_utc_ts - delta_seconds
-            sql += " AND Timestamp >= ?"
-            params.append(int(cutoff_ts))
-            # log_message(f"Applying time filter: {time_filter} (Timestamp >= {datetime.fromtimestamp(cutoff_ts, timezone.utc)})") # Скрыл лог
-        # else: log_message(f"Warning: Unknown time filter '{time_filter}'.")
-
-    # --- Агрегация ---
-    aggregated_data = defaultdict(lambda: {'games': 0, 'wins': 0, 'kills': 0, 'deaths': 0, 'assists': 0})
+        weeks_by_filter = {"1 week": 1, "2 weeks": 2, "3 weeks": 3, "4 weeks": 4}
+        weeks = weeks_by_filter.get(time_filter)
+        if weeks:
+            now_utc_ts = int(datetime.now(timezone.utc).timestamp())
+            ts_from = int(now_utc_ts - timedelta(weeks=weeks).total_seconds())
+
+    return ts_from, ts_to
+
+
+@traced("aggregate")
+def aggregate_soloq_roster_data(team_roster_key="Gamespace", time_filter="All Time", date_from_str=None, date_to_str=None, player_names=None):
+    """
+    Статистика SoloQ по чемпионам для всего ростера одним запросом
+    (GROUP BY Player_Name, Champion с фильтром по основной роли и окну времени).
+    Возвращает {player_name: [ {Champion, Games, WinRate, KDA, icon_html}, ... ]}.
+    """
+    roster = TEAM_ROSTERS.get(team_roster_key, {})
+    if player_names is None:
+        player_names = list(roster.keys())
+    players_roles = [(name, roster[name].get("role")) for name in player_names if name in roster]
+    result = {name: [] for name, _ in players_roles}
+    if not players_roles:
+        return result
+    log_message("Aggregating SoloQ roster data (%d players)", len(players_roles), level="debug", time_filter=time_filter, date_from=date_from_str, date_to=date_to_str)
+
+    ts_from, ts_to = _soloq_time_window(time_filter, date_from_str, date_to_str)
+
+    # Основная роль игрока передаётся через VALUES, чтобы фильтр роли остался в SQL
+    roster_values = ", ".join(["(?, ?)"] * len(players_roles))
+    sql = f"""
+        WITH roster(player_name, main_role) AS (VALUES {roster_values})
+        SELECT s.Player_Name AS player_name, s.Champion AS champion,
+               COUNT(*) AS games, SUM(s.Win) AS wins,
+               SUM(s.Kills) AS kills, SUM(s.Deaths) AS deaths, SUM(s.Assists) AS assists
+        FROM soloq_games s
+        JOIN roster r ON s.Player_Name = r.player_name AND s.Role = r.main_role
+        WHERE s.Champion IS NOT NULL AND s.Champion != ''
+    """
+    params = [value for pair in players_roles for value in pair]
+    if ts_from is not None:
+        sql += " AND s.Timestamp >= ?"
+        params.append(ts_from)
+    if ts_to is not None:
+        sql += " AND s.Timestamp <= ?"
+        params.append(ts_to)
+    sql += " GROUP BY s.Player_Name, s.Champion ORDER BY s.Player_Name, games DESC"
+
+    conn = get_db_connection()
+    if not conn: return result
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-        # log_message(f"Fetched {len(rows)} SoloQ games for {player_name} from DB matching filters.") # Скрыл лог
-
-        for row in rows:
-            game = dict(row)
-            if game.get("Role") == player_main_role: # Фильтр по основной роли
-                champion = game.get("Champion")
-                if champion:
-                    stats = aggregated_data[champion]
-                    stats['games'] += 1
-                    stats['wins'] += game.get("Win", 0)
-                    stats['kills'] += game.get("Kills", 0)
-                    stats['deaths'] += game.get("Deaths", 0)
-                    stats['assists'] += game.get("Assists", 0)
-
-    except sqlite3.Error as e: log_message(f"DB Error aggregating SoloQ data for {player_name}: {e}"); return {}
-    finally: conn.close()
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        log_message(f"DB Error aggregating SoloQ roster data: {e}", level="error")
+        return result
+    finally:
+        conn.close()
 
     # --- Форматирование результата ---
-    formatted_stats = []
-    # Загружаем данные чемпионов один раз перед циклом
+    # Загружаем данные чемпионов один раз для всего ростера
     champ_data_local = get_champion_data()
-    for champ, data in aggregated_data.items():
-        games = data['games']
+    for row in rows:
+        games = row['games']
         if games > 0:
-            win_rate = round((data['wins'] / games) * 100, 1)
-            deaths = max(1, data['deaths'])
-            kda = round((data['kills'] + data['assists']) / deaths, 1)
-            formatted_stats.append({ "Champion": champ, "Games": games, "WinRate": win_rate, "KDA": kda, "icon_html": get_champion_icon_html(champ, champ_data_local, width=30, height=30) })
+            win_rate = round(((row['wins'] or 0) / games) * 100, 1)
+            deaths = max(1, row['deaths'] or 0)
+            kda = round(((row['kills'] or 0) + (row['assists'] or 0)) / deaths, 1)
+            result[row['player_name']].append({
+                "Champion": row['champion'], "Games": games, "WinRate": win_rate, "KDA": kda,
+                "icon_html": get_champion_icon_html(row['champion'], champ_data_local, width=30, height=30)
+            })
+    return result
 
-    formatted_stats.sort(key=lambda x: x['Games'], reverse=True)
-    # log_message(f"Aggregation complete for {player_name}. Found stats for {len(formatted_stats)} champions.") # Скрыл лог
-    return formatted_stats
+
+def aggregate_soloq_data_from_db(player_name, time_filter="All Time", date_from_str=None, date_to_str=None):
+    """Статистика одного игрока (обёртка над aggregate_soloq_roster_data)."""
+    if player_name not in TEAM_ROSTERS["Gamespace"]:
+        log_message(f"Cannot aggregate: Player {player_name} not in roster.")
+        return {}
+    return aggregate_soloq_roster_data("Gamespace", time_filter, date_from_str, date_to_str, player_names=[player_name])[player_name]
 
 
 # --- Логика получения данных для графика ---
 def get_soloq_timeline_data(player_name, aggregation_type="Day"):
-    """Получает данные для графика игр по времени из БД."""
-    log_message(f"Getting timeline data for {player_name}. Aggregate by: {aggregation_type}")
+    """Получает данные для графика игр по времени из дневных роллапов."""
+    log_message("Getting timeline data for %s. Aggregate by: %s", player_name, aggregation_type, level="debug")
     conn = get_db_connection()
     if not conn: return []
 
-    timeline_data = defaultdict(int)
     try:
-        cursor = conn.cursor()
-        # Получаем все временные метки для игрока
-        cursor.execute("SELECT Timestamp FROM soloq_games WHERE Player_Name = ?", (player_name,))
-        rows = cursor.fetchall()
-
-        for row in rows:
-            ts = row['Timestamp']
-            dt_object = datetime.fromtimestamp(ts, timezone.utc)
-
-            if aggregation_type == "Day":
-                date_key = dt_object.strftime("%Y-%m-%d")
-            elif aggregation_type == "Week":
-                 # Начало недели (понедельник)
-                 start_of_week = dt_object - timedelta(days=dt_object.weekday())
-                 date_key = start_of_week.strftime("%Y-%m-%d")
-            elif aggregation_type == "Month":
-                 date_key = dt_object.strftime("%Y-%m-01") # Первый день месяца
-            else: # По умолчанию - день
-                 date_key = dt_object.strftime("%Y-%m-%d")
-
-            timeline_data[date_key] += 1
-
+        rows = _query_daily_activity(conn, player_name, aggregation_type)
     except sqlite3.Error as e:
-        log_message(f"DB Error getting timeline data for {player_name}: {e}")
+        log_message(f"DB Error getting timeline data for {player_name}: {e}", level="error")
         return []
     finally:
         conn.close()
 
-    # Преобразуем в список словарей и сортируем по дате
-    formatted_timeline = [{"date": date_str, "count": count} for date_str, count in timeline_data.items()]
-    formatted_timeline.sort(key=lambda x: x['date'])
+    # Список словарей, уже отсортированный по дате
+    formatted_timeline = [{"date": row['period'], "count": row['games']} for row in rows]
 
-    log_message(f"Timeline data processed for {player_name}. Found {len(formatted_timeline)} points.")
+    log_message("Timeline data processed for %s. Found %d points.", player_name, len(formatted_timeline), level="debug")
     return formatted_timeline
 
 # --- Блок для тестирования (если нужно запустить отдельно) ---
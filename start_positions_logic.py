@@ -6,13 +6,16 @@ from collections import defaultdict
 # <<< ИЗМЕНЕНИЯ: Добавлены импорты для генерации иконок
 from scrims_logic import log_message, get_champion_data, get_champion_icon_html
 from database import get_db_connection
-from tournament_logic import TEAM_TAG_TO_FULL_NAME, UNKNOWN_BLUE_TAG, UNKNOWN_RED_TAG
+from request_timing import traced
+from tournament_logic import TEAM_TAG_TO_FULL_NAME, get_team_registry, resolve_team_tag, tournament_scope_sql
+from champion_logic import champion_games_filter_sql
 
-def get_start_positions_data(selected_team_full_name, selected_champion, games_filter):
+@traced("aggregate")
+def get_start_positions_data(selected_team_full_name, selected_champion, games_filter, tournament_id=None):
     """
     Извлекает данные о стартовых позициях и таймлайны для выбранной команды и фильтров.
     """
-    conn = get_db_connection()
+    conn = get_db_connection(tournament_id)
     if not conn:
         return [], {"error": "Database connection failed"}, []
 
@@ -27,61 +30,45 @@ def get_start_positions_data(selected_team_full_name, selected_champion, games_f
         cursor = conn.cursor()
         
         # 1. Получаем список всех команд
-        cursor.execute(f"""
-            SELECT DISTINCT Blue_Team_Name as team_tag FROM tournament_games
-            WHERE Blue_Team_Name NOT IN ('{UNKNOWN_BLUE_TAG}', 'Blue Team')
-            UNION
-            SELECT DISTINCT Red_Team_Name as team_tag FROM tournament_games
-            WHERE Red_Team_Name NOT IN ('{UNKNOWN_RED_TAG}', 'Red Team')
-        """)
-        all_teams_tags = {row['team_tag'] for row in cursor.fetchall() if row['team_tag']}
-        all_teams_display = sorted(list(set([TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in all_teams_tags])))
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
 
         if not selected_team_full_name:
             stats["message"] = "Please select a team to view starting positions."
             return all_teams_display, stats, available_champions
 
         # 2. Определяем тег команды
-        selected_team_tag = None
-        for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
-            if full_name == selected_team_full_name:
-                selected_team_tag = tag
-                break
-        if not selected_team_tag and selected_team_full_name in all_teams_tags:
-            selected_team_tag = selected_team_full_name
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
         
         if not selected_team_tag:
             stats["error"] = f"Team tag not found for '{selected_team_full_name}'."
             return all_teams_display, stats, available_champions
 
         # 3. Получаем список доступных чемпионов для фильтра
-        champs_query = """
+        scope = ' AND "Tournament_ID" = :tournament_id' if tournament_id else ""
+        champs_query = f"""
             SELECT DISTINCT champ FROM (
-                SELECT Blue_TOP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_JGL_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_MID_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_BOT_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_SUP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Red_TOP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_JGL_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_MID_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_BOT_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_SUP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag
+                SELECT Blue_TOP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Blue_JGL_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Blue_MID_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Blue_BOT_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Blue_SUP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_TOP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_JGL_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_MID_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_BOT_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_SUP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope}
             ) WHERE champ IS NOT NULL AND champ != 'N/A' ORDER BY champ ASC
         """
-        cursor.execute(champs_query, {'tag': selected_team_tag})
+        cursor.execute(champs_query, {'tag': selected_team_tag, 'tournament_id': tournament_id})
         available_champions.extend([row['champ'] for row in cursor.fetchall()])
 
         # 4. Получаем последние игры
-        query_games = "SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?)"
-        params_games = [selected_team_tag, selected_team_tag]
+        scope_sql, scope_params = tournament_scope_sql(tournament_id)
+        query_games = f"SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql}"
+        params_games = [selected_team_tag, selected_team_tag, *scope_params]
         
         if selected_champion and selected_champion != "All":
-            champion_filter_sql = """
-             AND (? IN (Blue_TOP_Champ, Blue_JGL_Champ, Blue_MID_Champ, Blue_BOT_Champ, Blue_SUP_Champ,
-                        Red_TOP_Champ, Red_JGL_Champ, Red_MID_Champ, Red_BOT_Champ, Red_SUP_Champ))
-            """
-            query_games += champion_filter_sql
+            query_games += champion_games_filter_sql()
             params_games.append(selected_champion)
 
         query_games += ' ORDER BY "Date" DESC'
@@ -161,11 +148,11 @@ def get_start_positions_data(selected_team_full_name, selected_champion, games_f
                 })
 
     except sqlite3.Error as e:
-        log_message(f"DB Error in get_start_positions_data: {e}")
+        log_message(f"DB Error in get_start_positions_data: {e}", level="error")
         stats["error"] = "A database error occurred."
     except Exception as e:
         import traceback
-        log_message(f"!!! CRITICAL Error in get_start_positions_data: {e}\n{traceback.format_exc()}")
+        log_message(f"!!! CRITICAL Error in get_start_positions_data: {e}\n{traceback.format_exc()}", level="error")
         stats["error"] = "A critical error occurred."
     finally:
         if conn: conn.close()
@@ -3,26 +3,11 @@ import sqlite3
 from collections import defaultdict
 import traceback
 
-try:
-    from shapely.geometry import Point, Polygon
-    SHAPELY_AVAILABLE = True
-except ImportError:
-    SHAPELY_AVAILABLE = False
-    Point, Polygon = None, None
-
 from database import get_db_connection
+from request_timing import traced
 from scrims_logic import log_message
-from tournament_logic import TEAM_TAG_TO_FULL_NAME, UNKNOWN_BLUE_TAG, UNKNOWN_RED_TAG, rift_zones, rift_zone_polygons_list
-
-ZONE_POLYGONS = {}
-if SHAPELY_AVAILABLE and rift_zones and rift_zone_polygons_list:
-    try:
-        ZONE_POLYGONS = dict(zip(rift_zones, [Polygon(p) for p in rift_zone_polygons_list]))
-    except Exception as e:
-        log_message(f"[Swap Logic] Ошибка при обработке полигонов: {e}")
-        ZONE_POLYGONS = {}
-else:
-    log_message(f"[Swap Logic] Shapely не доступен или списки зон пусты. Определение зон отключено.")
+from tournament_logic import get_team_registry, resolve_team_tag, tournament_scope_sql, get_zone_index
+from champion_logic import champion_games_filter_sql
 
 def _get_simplified_zone(x, y, zone_name):
     """
@@ -60,18 +45,21 @@ def _get_simplified_zone(x, y, zone_name):
 
 def _get_zone_name_and_simplify(x, y):
     """Находит полное название зоны и сразу его упрощает."""
-    if not SHAPELY_AVAILABLE or not ZONE_POLYGONS:
+    # Полигоны общие с tournament_logic (строятся один раз при первом обращении)
+    zone_polygons, _ = get_zone_index()
+    if not zone_polygons:
         return None
-    
-    point = Point(x, y)
-    for zone_name, polygon in ZONE_POLYGONS.items():
-        if point.within(polygon):
+
+    from shapely import contains_xy
+    for zone_name, polygon in zone_polygons.items():
+        if contains_xy(polygon, x, y):
             return _get_simplified_zone(x, y, zone_name)
     # Если точка не попала ни в один полигон, она также игнорируется
     return None
 
-def get_swap_data(selected_team_full_name, selected_champion, games_filter):
-    conn = get_db_connection()
+@traced("aggregate")
+def get_swap_data(selected_team_full_name, selected_champion, games_filter, tournament_id=None):
+    conn = get_db_connection(tournament_id)
     if not conn:
         return [], {"error": "Database connection failed"}, []
 
@@ -89,48 +77,38 @@ def get_swap_data(selected_team_full_name, selected_champion, games_filter):
     try:
         cursor = conn.cursor()
         
-        cursor.execute(f"""
-            SELECT DISTINCT Blue_Team_Name as team_tag FROM tournament_games
-            WHERE Blue_Team_Name NOT IN ('{UNKNOWN_BLUE_TAG}', 'Blue Team')
-            UNION
-            SELECT DISTINCT Red_Team_Name as team_tag FROM tournament_games
-            WHERE Red_Team_Name NOT IN ('{UNKNOWN_RED_TAG}', 'Red Team')
-        """)
-        all_teams_tags = {row['team_tag'] for row in cursor.fetchall() if row['team_tag']}
-        all_teams_display = sorted(list(set([TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in all_teams_tags])))
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
 
         if not selected_team_full_name:
             stats["message"] = "Please select a team to view swap patterns."
             return all_teams_display, stats, available_champions
 
-        selected_team_tag = None
-        for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
-            if full_name == selected_team_full_name: selected_team_tag = tag; break
-        if not selected_team_tag and selected_team_full_name in all_teams_tags:
-            selected_team_tag = selected_team_full_name
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
         
         if not selected_team_tag:
             stats["error"] = f"Team tag not found for '{selected_team_full_name}'."
             return all_teams_display, stats, available_champions
         
-        champs_query = """
+        scope = ' AND "Tournament_ID" = :tournament_id' if tournament_id else ""
+        champs_query = f"""
             SELECT DISTINCT champ FROM (
-                SELECT Blue_TOP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_BOT_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_SUP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Red_TOP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_BOT_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_SUP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag
+                SELECT Blue_TOP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Blue_BOT_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Blue_SUP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_TOP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_BOT_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+                SELECT Red_SUP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope}
             ) WHERE champ IS NOT NULL AND champ != 'N/A' ORDER BY champ ASC
         """
-        cursor.execute(champs_query, {'tag': selected_team_tag})
+        cursor.execute(champs_query, {'tag': selected_team_tag, 'tournament_id': tournament_id})
         available_champions.extend([row['champ'] for row in cursor.fetchall()])
 
-        query_games = "SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?)"
-        params_games = [selected_team_tag, selected_team_tag]
+        scope_sql, scope_params = tournament_scope_sql(tournament_id)
+        query_games = f"SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql}"
+        params_games = [selected_team_tag, selected_team_tag, *scope_params]
         
         if selected_champion and selected_champion != "All":
-            query_games += " AND (? IN (Blue_TOP_Champ, Blue_BOT_Champ, Blue_SUP_Champ, Red_TOP_Champ, Red_BOT_Champ, Red_SUP_Champ))"
+            query_games += champion_games_filter_sql(roles=("TOP", "BOTTOM", "UTILITY"))
             params_games.append(selected_champion)
 
         query_games += ' ORDER BY "Date" DESC'
@@ -206,10 +184,10 @@ def get_swap_data(selected_team_full_name, selected_champion, games_filter):
         stats['data'] = final_data
 
     except sqlite3.Error as e:
-        log_message(f"[Swap Logic] DB Error: {e}")
+        log_message(f"[Swap Logic] DB Error: {e}", level="error")
         stats["error"] = "A database error occurred."
     except Exception as e:
-        log_message(f"[Swap Logic] CRITICAL Error: {e}\n{traceback.format_exc()}")
+        log_message(f"[Swap Logic] CRITICAL Error: {e}\n{traceback.format_exc()}", level="error")
         stats["error"] = "A critical error occurred."
     finally:
         if conn: conn.close()
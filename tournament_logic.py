@@ -3,20 +3,18 @@
 
 import os
 import time
+import importlib.util
+import threading
 import sqlite3
 from datetime import datetime, timezone
-from collections import defaultdict, deque
+from collections import Counter, defaultdict
 import math
 import json
 import traceback
 
 # Attempt to import Shapely for zone detection
-try:
-    from shapely.geometry import Point, Polygon
-    SHAPELY_AVAILABLE = True
-except ImportError:
-    SHAPELY_AVAILABLE = False
-    Point, Polygon = None, None
+# (сам импорт откладывается до первого построения зон, см. get_zone_index)
+SHAPELY_AVAILABLE = importlib.util.find_spec("shapely") is not None
 
 from scrims_logic import (
     log_message,
@@ -32,12 +30,22 @@ from scrims_logic import (
     get_champion_data,
     get_champion_icon_html
 )
-from database import get_db_connection, TOURNAMENT_GAMES_HEADER
+from ingest_metrics import ingest_run, track_parse, track_writes, track_commit
+from database import (
+    get_db_connection, TOURNAMENT_GAMES_HEADER, WARD_BUCKET_SECONDS,
+    get_data_generation, bump_data_generation, save_team_tags,
+    save_tournament, get_tournament_archive_path
+)
+from config import TARGET_TOURNAMENT_ID, TARGET_TOURNAMENT_NAME_FOR_DB, MATCH_START_DATE_FILTER, TOURNAMENTS
+from request_timing import traced, stage
+from draft_analytics import (
+    PRIORITY_PHASES, draft_team_ids, get_draft_table, get_overall_summary, team_draft_stats, save_draft_actions,
+    invalidate_overall_snapshots, refresh_overall_snapshots
+)
+from champion_logic import save_champion_games
+from profiler import profiled_job
 
 # --- Constants ---
-TARGET_TOURNAMENT_ID = "827201"
-TARGET_TOURNAMENT_NAME_FOR_DB = "HLL Split 3"
-MATCH_START_DATE_FILTER = "2025-04-03T00:00:00Z"
 TEAM_TAG_TO_FULL_NAME = {
 
 }
@@ -135,477 +143,504 @@ rift_zones = [
     'Red Side Top Inhib Entrance', 'Red Side Mid Inhib Entrance', 'Red Side Bot Inhib Entrance',
 ]
 
-rift_zone_polygons_list = [
+# Контуры зон (координаты карты); Polygon строятся лениво в get_zone_index()
+rift_zone_coords = [
     # Blue Side Raptor Brush
-    Polygon([(216 * 30, 148 * 30), (220 * 30, 164 * 30), (228 * 30, 166 * 30), (223 * 30, 148 * 30)]),
+    [(216 * 30, 148 * 30), (220 * 30, 164 * 30), (228 * 30, 166 * 30), (223 * 30, 148 * 30)],
 
     # Blue Side Raptors (Inner)
-    Polygon([(220 * 30, 164 * 30), (222 * 30, 191 * 30), (235 * 30, 198 * 30), (249 * 30, 193 * 30), (261 * 30, 179 * 30)]),
+    [(220 * 30, 164 * 30), (222 * 30, 191 * 30), (235 * 30, 198 * 30), (249 * 30, 193 * 30), (261 * 30, 179 * 30)],
 
     # Blue Side Raptors (Outer)
-    Polygon([(225 * 30, 150 * 30), (229 * 30, 167 * 30), (262 * 30, 179 * 30), (285 * 30, 160 * 30)]),
+    [(225 * 30, 150 * 30), (229 * 30, 167 * 30), (262 * 30, 179 * 30), (285 * 30, 160 * 30)],
 
     # Blue Side Raptor Intersection
-    Polygon([(285 * 30, 160 * 30), (261 * 30, 179 * 30), (272 * 30, 195 * 30), (309 * 30, 160 * 30)]),
+    [(285 * 30, 160 * 30), (261 * 30, 179 * 30), (272 * 30, 195 * 30), (309 * 30, 160 * 30)],
 
     # Blue Side Raptor Ramp Entrance
-    Polygon([(294 * 30, 173 * 30), (272 * 30, 195 * 30), (284 * 30, 205 * 30), (312 * 30, 185 * 30)]),
+    [(294 * 30, 173 * 30), (272 * 30, 195 * 30), (284 * 30, 205 * 30), (312 * 30, 185 * 30)],
 
     # Behind Dragon Pit 1
-    Polygon([(295 * 30, 131 * 30), (295 * 30, 160 * 30), (310 * 30, 160 * 30), (317 * 30, 127 * 30)]),
+    [(295 * 30, 131 * 30), (295 * 30, 160 * 30), (310 * 30, 160 * 30), (317 * 30, 127 * 30)],
 
     # Behind Dragon Pit 2
-    Polygon([(284 * 30, 105 * 30), (297 * 30, 131 * 30), (337 * 30, 122 * 30), (336 * 30, 96 * 30)]),
+    [(284 * 30, 105 * 30), (297 * 30, 131 * 30), (337 * 30, 122 * 30), (336 * 30, 96 * 30)],
 
     # Blue Side Red Brush
-    Polygon([(266 * 30, 117 * 30), (290 * 30, 133 * 30), (295 * 30, 131 * 30), (288 * 30, 117 * 30)]),
+    [(266 * 30, 117 * 30), (290 * 30, 133 * 30), (295 * 30, 131 * 30), (288 * 30, 117 * 30)],
 
     # Blue Side Red Ramp Brush
-    Polygon([(287 * 30, 133 * 30), (285 * 30, 160 * 30), (295 * 30, 160 * 30), (295 * 30, 132 * 30)]),
+    [(287 * 30, 133 * 30), (285 * 30, 160 * 30), (295 * 30, 160 * 30), (295 * 30, 132 * 30)],
 
     # Blue Side Red Buff 1
-    Polygon([(250 * 30, 108 * 30), (221 * 30, 120 * 30), (215 * 30, 147 * 30), (268 * 30, 157 * 30), (284 * 30, 130 * 30)]),
+    [(250 * 30, 108 * 30), (221 * 30, 120 * 30), (215 * 30, 147 * 30), (268 * 30, 157 * 30), (284 * 30, 130 * 30)],
 
     # Blue Side Red Buff 2
-    Polygon([(252 * 30, 107 * 30), (265 * 30, 117 * 30), (290 * 30, 117 * 30), (282 * 30, 105 * 30)]),
+    [(252 * 30, 107 * 30), (265 * 30, 117 * 30), (290 * 30, 117 * 30), (282 * 30, 105 * 30)],
 
     # Blue Side Krugs Intersection Brush
-    Polygon([(220 * 30, 101 * 30), (230 * 30, 116 * 30), (250 * 30, 108 * 30), (241 * 30, 93 * 30)]),
+    [(220 * 30, 101 * 30), (230 * 30, 116 * 30), (250 * 30, 108 * 30), (241 * 30, 93 * 30)],
 
     # Blue Side Krugs Intersection 2
-    Polygon([(229 * 30, 75 * 30), (250 * 30, 107 * 30), (258 * 30, 107 * 30), (265 * 30, 69 * 30)]),
+    [(229 * 30, 75 * 30), (250 * 30, 107 * 30), (258 * 30, 107 * 30), (265 * 30, 69 * 30)],
 
     # Blue Side Krugs Intersection 1
-    Polygon([(200 * 30, 60 * 30), (200 * 30, 79 * 30), (219 * 30, 100 * 30), (240 * 30, 93 * 30), (214 * 30, 60 * 30)]),
+    [(200 * 30, 60 * 30), (200 * 30, 79 * 30), (219 * 30, 100 * 30), (240 * 30, 93 * 30), (214 * 30, 60 * 30)],
 
     # Blue Side Krugs
-    Polygon([(266 * 30, 58 * 30), (258 * 30, 106 * 30), (305 * 30, 101 * 30), (315 * 30, 77 * 30), (279 * 30, 58 * 30)]),
+    [(266 * 30, 58 * 30), (258 * 30, 106 * 30), (305 * 30, 101 * 30), (315 * 30, 77 * 30), (279 * 30, 58 * 30)],
 
     # Blue Side Krugs Brush
-    Polygon([(296 * 30, 58 * 30), (295 * 30, 67 * 30), (315 * 30, 77 * 30), (331 * 30, 58 * 30)]),
+    [(296 * 30, 58 * 30), (295 * 30, 67 * 30), (315 * 30, 77 * 30), (331 * 30, 58 * 30)],
 
     # Blue Side Red Shallow Cross
-    Polygon([(261 * 30, 181 * 30), (234 * 30, 208 * 30), (247 * 30, 221 * 30), (274 * 30, 198 * 30)]),
+    [(261 * 30, 181 * 30), (234 * 30, 208 * 30), (247 * 30, 221 * 30), (274 * 30, 198 * 30)],
 
     # Blue Side Red Gate Brush
-    Polygon([(188 * 30, 104 * 30), (181 * 30, 115 * 30), (195 * 30, 122 * 30), (201 * 30, 110 * 30)]),
+    [(188 * 30, 104 * 30), (181 * 30, 115 * 30), (195 * 30, 122 * 30), (201 * 30, 110 * 30)],
 
     # Blue Side Red Gate
-    Polygon([(175 * 30, 60 * 30), (150 * 30, 133 * 30), (165 * 30, 145 * 30), (190 * 30, 100 * 30), (193 * 30, 60 * 30)]),
+    [(175 * 30, 60 * 30), (150 * 30, 133 * 30), (165 * 30, 145 * 30), (190 * 30, 100 * 30), (193 * 30, 60 * 30)],
 
     # Blue Side Red Gate
-    Polygon([(182 * 30, 117 * 30), (178 * 30, 123 * 30), (190 * 30, 132 * 30), (195 * 30, 123 * 30)]),
+    [(182 * 30, 117 * 30), (178 * 30, 123 * 30), (190 * 30, 132 * 30), (195 * 30, 123 * 30)],
 
     # Blue Side Red Deep Path
-    Polygon([(211 * 30, 92 * 30), (188 * 30, 142 * 30), (215 * 30, 147 * 30), (223 * 30, 105 * 30)]),
+    [(211 * 30, 92 * 30), (188 * 30, 142 * 30), (215 * 30, 147 * 30), (223 * 30, 105 * 30)],
 
     # Blue Side Red Deep Cross
-    Polygon([(187 * 30, 142 * 30), (187 * 30, 164 * 30), (205 * 30, 180 * 30), (221 * 30, 169 * 30), (215 * 30, 147 * 30)]),
+    [(187 * 30, 142 * 30), (187 * 30, 164 * 30), (205 * 30, 180 * 30), (221 * 30, 169 * 30), (215 * 30, 147 * 30)],
 
     # Blue Side Red Dive Area
-    Polygon([(341 * 30, 61 * 30), (316 * 30, 76 * 30), (307 * 30, 97 * 30), (365 * 30, 94 * 30), (382 * 30, 67 * 30), (367 * 30, 60 * 30)]),
+    [(341 * 30, 61 * 30), (316 * 30, 76 * 30), (307 * 30, 97 * 30), (365 * 30, 94 * 30), (382 * 30, 67 * 30), (367 * 30, 60 * 30)],
 
     # Blue Side Red Tribrush
-    Polygon([(336 * 30, 96 * 30), (337 * 30, 122 * 30), (368 * 30, 124 * 30), (372 * 30, 94 * 30)]),
+    [(336 * 30, 96 * 30), (337 * 30, 122 * 30), (368 * 30, 124 * 30), (372 * 30, 94 * 30)],
 
     # Blue Side Wolves Ramp Brush
-    Polygon([(170 * 30, 278 * 30), (158 * 30, 284 * 30), (174 * 30, 296 * 30), (184 * 30, 289 * 30)]),
+    [(170 * 30, 278 * 30), (158 * 30, 284 * 30), (174 * 30, 296 * 30), (184 * 30, 289 * 30)],
 
     # Blue Side Wolves Ramp
-    Polygon([(157 * 30, 284 * 30), (149 * 30, 287 * 30), (166 * 30, 300 * 30), (173 * 30, 296 * 30)]),
+    [(157 * 30, 284 * 30), (149 * 30, 287 * 30), (166 * 30, 300 * 30), (173 * 30, 296 * 30)],
     
     # Blue Side Wolves Intersection 1
-    Polygon([(149 * 30, 234 * 30), (129 * 30, 240 * 30), (130 * 30, 249 * 30), (152 * 30, 286 * 30), (180 * 30, 270 * 30)]),
+    [(149 * 30, 234 * 30), (129 * 30, 240 * 30), (130 * 30, 249 * 30), (152 * 30, 286 * 30), (180 * 30, 270 * 30)],
 
     # Blue Side Wolves Intersection 2
-    Polygon([(149 * 30, 222 * 30), (150 * 30, 233 * 30), (163 * 30, 246 * 30), (161 * 30, 218 * 30)]),
+    [(149 * 30, 222 * 30), (150 * 30, 233 * 30), (163 * 30, 246 * 30), (161 * 30, 218 * 30)],
 
     # Blue Side Wolves Brush
-    Polygon([(162 * 30, 218 * 30), (163 * 30, 246 * 30), (176 * 30, 245 * 30), (173 * 30, 215 * 30)]),
+    [(162 * 30, 218 * 30), (163 * 30, 246 * 30), (176 * 30, 245 * 30), (173 * 30, 215 * 30)],
 
     # Blue Side Blue Deep Cross
-    Polygon([(149 * 30, 194 * 30), (142 * 30, 222 * 30), (182 * 30, 212 * 30), (162 * 30, 192 * 30)]),
+    [(149 * 30, 194 * 30), (142 * 30, 222 * 30), (182 * 30, 212 * 30), (162 * 30, 192 * 30)],
 
     # Blue Side Wolves
-    Polygon([(114 * 30, 197 * 30), (99 * 30, 216 * 30), (101 * 30, 241 * 30), (138 * 30, 233 * 30), (149 * 30, 194 * 30)]),
+    [(114 * 30, 197 * 30), (99 * 30, 216 * 30), (101 * 30, 241 * 30), (138 * 30, 233 * 30), (149 * 30, 194 * 30)],
 
     # Blue Side Blue Intersection 1
-    Polygon([(79 * 30, 245 * 30), (59 * 30, 256 * 30), (59 * 30, 271 * 30), (131 * 30, 253 * 30), (128 * 30, 236 * 30)]),
+    [(79 * 30, 245 * 30), (59 * 30, 256 * 30), (59 * 30, 271 * 30), (131 * 30, 253 * 30), (128 * 30, 236 * 30)],
 
     # Blue Side Blue Intersection 2
-    Polygon([(79 * 30, 218 * 30), (79 * 30, 245 * 30), (100 * 30, 241 * 30), (99 * 30, 216 * 30)]),
+    [(79 * 30, 218 * 30), (79 * 30, 245 * 30), (100 * 30, 241 * 30), (99 * 30, 216 * 30)],
 
     # Blue Side Blue Gate
-    Polygon([(59 * 30, 176 * 30), (59 * 30, 191 * 30), (79 * 30, 218 * 30), (99 * 30, 216 * 30), (137 * 30, 169 * 30), (126 * 30, 154 * 30)]),
+    [(59 * 30, 176 * 30), (59 * 30, 191 * 30), (79 * 30, 218 * 30), (99 * 30, 216 * 30), (137 * 30, 169 * 30), (126 * 30, 154 * 30)],
 
     # Blue Side Blue Buff
-    Polygon([(98 * 30, 262 * 30), (110 * 30, 291 * 30), (127 * 30, 301 * 30), (147 * 30, 279 * 30), (131 * 30, 253 * 30)]),
+    [(98 * 30, 262 * 30), (110 * 30, 291 * 30), (127 * 30, 301 * 30), (147 * 30, 279 * 30), (131 * 30, 253 * 30)],
 
     # Blue Side Gromp
-    Polygon([(98 * 30, 262 * 30), (59 * 30, 272 * 30), (62 * 30, 303 * 30), (69 * 30, 313 * 30), (92 * 30, 308 * 30), (108 * 30, 290 * 30)]),
+    [(98 * 30, 262 * 30), (59 * 30, 272 * 30), (62 * 30, 303 * 30), (69 * 30, 313 * 30), (92 * 30, 308 * 30), (108 * 30, 290 * 30)],
 
     # Blue Side Blue Tribrush
-    Polygon([(59 * 30, 316 * 30), (59 * 30, 335 * 30), (71 * 30, 363 * 30), (91 * 30, 333 * 30), (88 * 30, 310 * 30)]),
+    [(59 * 30, 316 * 30), (59 * 30, 335 * 30), (71 * 30, 363 * 30), (91 * 30, 333 * 30), (88 * 30, 310 * 30)],
 
     # Blue Side Blue Pocket
-    Polygon([(94 * 30, 330 * 30), (78 * 30, 353 * 30), (89 * 30, 371 * 30), (111 * 30, 324 * 30)]),
+    [(94 * 30, 330 * 30), (78 * 30, 353 * 30), (89 * 30, 371 * 30), (111 * 30, 324 * 30)],
 
     # Blue Side Blue Ramp Brush
-    Polygon([(107 * 30, 289 * 30), (92 * 30, 307 * 30), (96 * 30, 324 * 30), (116 * 30, 296 * 30)]),
+    [(107 * 30, 289 * 30), (92 * 30, 307 * 30), (96 * 30, 324 * 30), (116 * 30, 296 * 30)],
 
     # Blue Side Blue Ramp
-    Polygon([(117 * 30, 295 * 30), (93 * 30, 329 * 30), (132 * 30, 317 * 30), (128 * 30, 302 * 30)]),
+    [(117 * 30, 295 * 30), (93 * 30, 329 * 30), (132 * 30, 317 * 30), (128 * 30, 302 * 30)],
 
     # Blue Side Blue Shallow Cross
-    Polygon([(197 * 30, 224 * 30), (170 * 30, 253 * 30), (200 * 30, 264 * 30), (220 * 30, 247 * 30)]),
+    [(197 * 30, 224 * 30), (170 * 30, 253 * 30), (200 * 30, 264 * 30), (220 * 30, 247 * 30)],
 
     # Red Side Raptor Brush
-    Polygon([(273 * 30, 334 * 30), (277 * 30, 352 * 30), (286 * 30, 353 * 30), (281 * 30, 336 * 30)]),
+    [(273 * 30, 334 * 30), (277 * 30, 352 * 30), (286 * 30, 353 * 30), (281 * 30, 336 * 30)],
 
     # Red Side Raptors (Inner)
-    Polygon([(266 * 30, 302 * 30), (252 * 30, 307 * 30), (240 * 30, 321 * 30), (280 * 30, 335 * 30), (279 * 30, 309 * 30)]),
+    [(266 * 30, 302 * 30), (252 * 30, 307 * 30), (240 * 30, 321 * 30), (280 * 30, 335 * 30), (279 * 30, 309 * 30)],
 
     # Red Side Raptors (Outer)
-    Polygon([(240 * 30, 322 * 30), (217 * 30, 341 * 30), (277 * 30, 352 * 30), (273 * 30, 334 * 30)]),
+    [(240 * 30, 322 * 30), (217 * 30, 341 * 30), (277 * 30, 352 * 30), (273 * 30, 334 * 30)],
 
     # Red Side Raptor Intersection
-    Polygon([(228 * 30, 306 * 30), (192 * 30, 341 * 30), (217 * 30, 341 * 30), (241 * 30, 318 * 30)]),
+    [(228 * 30, 306 * 30), (192 * 30, 341 * 30), (217 * 30, 341 * 30), (241 * 30, 318 * 30)],
 
     # Red Side Raptor Ramp Entrance
-    Polygon([(217 * 30, 293 * 30), (188 * 30, 316 * 30), (205 * 30, 327 * 30), (229 * 30, 305 * 30)]),
+    [(217 * 30, 293 * 30), (188 * 30, 316 * 30), (205 * 30, 327 * 30), (229 * 30, 305 * 30)],
 
     # Behind Baron Pit 1
-    Polygon([(191 * 30, 341 * 30), (184 * 30, 374 * 30), (206 * 30, 370 * 30), (206 * 30, 341 * 30)]),
+    [(191 * 30, 341 * 30), (184 * 30, 374 * 30), (206 * 30, 370 * 30), (206 * 30, 341 * 30)],
 
     # Behind Baron Pit 2
-    Polygon([(204 * 30, 370 * 30), (165 * 30, 379 * 30), (166 * 30, 405 * 30), (217 * 30, 396 * 30)]),
+    [(204 * 30, 370 * 30), (165 * 30, 379 * 30), (166 * 30, 405 * 30), (217 * 30, 396 * 30)],
 
     # Red Side Red Brush
-    Polygon([(207 * 30, 370 * 30), (213 * 30, 384 * 30), (236 * 30, 384 * 30), (211 * 30, 368 * 30)]),
+    [(207 * 30, 370 * 30), (213 * 30, 384 * 30), (236 * 30, 384 * 30), (211 * 30, 368 * 30)],
 
     # Red Side Red Ramp Brush
-    Polygon([(206 * 30, 341 * 30), (206 * 30, 369 * 30), (214 * 30, 368 * 30), (216 * 30, 341 * 30)]),
+    [(206 * 30, 341 * 30), (206 * 30, 369 * 30), (214 * 30, 368 * 30), (216 * 30, 341 * 30)],
 
     # Red Side Red Buff 1
-    Polygon([(233 * 30, 344 * 30), (217 * 30, 371 * 30), (251 * 30, 393 * 30), (280 * 30, 381 * 30), (286 * 30, 354 * 30)]),
+    [(233 * 30, 344 * 30), (217 * 30, 371 * 30), (251 * 30, 393 * 30), (280 * 30, 381 * 30), (286 * 30, 354 * 30)],
 
     # Red Side Red Buff 2
-    Polygon([(212 * 30, 384 * 30), (218 * 30, 396 * 30), (249 * 30, 394 * 30), (235 * 30, 384 * 30)]),
+    [(212 * 30, 384 * 30), (218 * 30, 396 * 30), (249 * 30, 394 * 30), (235 * 30, 384 * 30)],
 
     # Red Side Krugs Intersection Brush
-    Polygon([(249 * 30, 394 * 30), (259 * 30, 408 * 30), (280 * 30, 400 * 30), (271 * 30, 385 * 30)]),
+    [(249 * 30, 394 * 30), (259 * 30, 408 * 30), (280 * 30, 400 * 30), (271 * 30, 385 * 30)],
 
     # Red Side Krugs Intersection 1
-    Polygon([(243 * 30, 394 * 30), (236 * 30, 432 * 30), (272 * 30, 426 * 30), (250 * 30, 394 * 30)]),
+    [(243 * 30, 394 * 30), (236 * 30, 432 * 30), (272 * 30, 426 * 30), (250 * 30, 394 * 30)],
 
     # Red Side Krugs Intersection 2
-    Polygon([(282 * 30, 401 * 30), (260 * 30, 408 * 30), (286 * 30, 441 * 30), (301 * 30, 441 * 30)]),
+    [(282 * 30, 401 * 30), (260 * 30, 408 * 30), (286 * 30, 441 * 30), (301 * 30, 441 * 30)],
 
     # Red Side Krugs
-    Polygon([(196 * 30, 400 * 30), (186 * 30, 424 * 30), (223 * 30, 443 * 30), (235 * 30, 443 * 30), (243 * 30, 395 * 30)]),
+    [(196 * 30, 400 * 30), (186 * 30, 424 * 30), (223 * 30, 443 * 30), (235 * 30, 443 * 30), (243 * 30, 395 * 30)],
 
     # Red Side Krugs Brush
-    Polygon([(186 * 30, 424 * 30), (170 * 30, 443 * 30), (205 * 30, 443 * 30), (206 * 30, 443 * 30)]),
+    [(186 * 30, 424 * 30), (170 * 30, 443 * 30), (205 * 30, 443 * 30), (206 * 30, 443 * 30)],
 
     # Red Side Red Shallow Cross
-    Polygon([(254 * 30, 280 * 30), (228 * 30, 303 * 30), (240 * 30, 316 * 30), (268 * 30, 293 * 30)]),
+    [(254 * 30, 280 * 30), (228 * 30, 303 * 30), (240 * 30, 316 * 30), (268 * 30, 293 * 30)],
 
     # Red Side Red Gate Brush
-    Polygon([(306 * 30, 378 * 30), (300 * 30, 391 * 30), (313 * 30, 396 * 30), (319 * 30, 385 * 30)]),
+    [(306 * 30, 378 * 30), (300 * 30, 391 * 30), (313 * 30, 396 * 30), (319 * 30, 385 * 30)],
 
     # Red Side Red Gate 1
-    Polygon([(336 * 30, 357 * 30), (311 * 30, 401 * 30), (308 * 30, 441 * 30), (326 * 30, 441 * 30), (351 * 30, 368 * 30)]),
+    [(336 * 30, 357 * 30), (311 * 30, 401 * 30), (308 * 30, 441 * 30), (326 * 30, 441 * 30), (351 * 30, 368 * 30)],
 
     # Red Side Red Gate 2
-    Polygon([(311 * 30, 369 * 30), (306 * 30, 379 * 30), (319 * 30, 385 * 30), (323 * 30, 379 * 30)]),
+    [(311 * 30, 369 * 30), (306 * 30, 379 * 30), (319 * 30, 385 * 30), (323 * 30, 379 * 30)],
 
     # Red Side Red Deep Path
-    Polygon([(287 * 30, 354 * 30), (279 * 30, 395 * 30), (291 * 30, 410 * 30), (314 * 30, 359 * 30)]),
+    [(287 * 30, 354 * 30), (279 * 30, 395 * 30), (291 * 30, 410 * 30), (314 * 30, 359 * 30)],
 
     # Red Side Red Deep Cross
-    Polygon([(289 * 30, 312 * 30), (280 * 30, 332 * 30), (286 * 30, 354 * 30), (314 * 30, 359 * 30), (315 * 30, 336 * 30)]),
+    [(289 * 30, 312 * 30), (280 * 30, 332 * 30), (286 * 30, 354 * 30), (314 * 30, 359 * 30), (315 * 30, 336 * 30)],
 
     # Red Side Red Dive Area
-    Polygon([(135 * 30, 407 * 30), (120 * 30, 432 * 30), (137 * 30, 441 * 30), (155 * 30, 441 * 30), (184 * 30, 427 * 30), (194 * 30, 405 * 30)]),
+    [(135 * 30, 407 * 30), (120 * 30, 432 * 30), (137 * 30, 441 * 30), (155 * 30, 441 * 30), (184 * 30, 427 * 30), (194 * 30, 405 * 30)],
 
     # Red Side Red Tribrush
-    Polygon([(133 * 30, 375 * 30), (128 * 30, 407 * 30), (165 * 30, 405 * 30), (164 * 30, 379 * 30)]),
+    [(133 * 30, 375 * 30), (128 * 30, 407 * 30), (165 * 30, 405 * 30), (164 * 30, 379 * 30)],
 
     # Red Side Wolves Ramp Brush
-    Polygon([(327 * 30, 203 * 30), (315 * 30, 211 * 30), (332 * 30, 223 * 30), (344 * 30, 217 * 30)]),
+    [(327 * 30, 203 * 30), (315 * 30, 211 * 30), (332 * 30, 223 * 30), (344 * 30, 217 * 30)],
 
     # Red Side Wolves Ramp
-    Polygon([(326 * 30, 202 * 30), (344 * 30, 217 * 30), (353 * 30, 212 * 30), (333 * 30, 198 * 30)]),
+    [(326 * 30, 202 * 30), (344 * 30, 217 * 30), (353 * 30, 212 * 30), (333 * 30, 198 * 30)],
 
     # Red Side Wolves Intersection 1
-    Polygon([(348 * 30, 215 * 30), (313 * 30, 231 * 30), (351 * 30, 267 * 30), (371 * 30, 261 * 30), (370 * 30, 251 * 30)]),
+    [(348 * 30, 215 * 30), (313 * 30, 231 * 30), (351 * 30, 267 * 30), (371 * 30, 261 * 30), (370 * 30, 251 * 30)],
 
     # Red Side Wolves Intersection 2
-    Polygon([(338 * 30, 256 * 30), (340 * 30, 283 * 30), (352 * 30, 280 * 30), (351 * 30, 268 * 30)]),
+    [(338 * 30, 256 * 30), (340 * 30, 283 * 30), (352 * 30, 280 * 30), (351 * 30, 268 * 30)],
 
     # Red Side Wolves Brush
-    Polygon([(325 * 30, 257 * 30), (328 * 30, 286 * 30), (339 * 30, 284 * 30), (338 * 30, 255 * 30)]),
+    [(325 * 30, 257 * 30), (328 * 30, 286 * 30), (339 * 30, 284 * 30), (338 * 30, 255 * 30)],
 
     # Red Side Blue Deep Cross
-    Polygon([(318 * 30, 289 * 30), (339 * 30, 309 * 30), (352 * 30, 307 * 30), (358 * 30, 280 * 30)]),
+    [(318 * 30, 289 * 30), (339 * 30, 309 * 30), (352 * 30, 307 * 30), (358 * 30, 280 * 30)],
 
     # Red Side Wolves
-    Polygon([(361 * 30, 268 * 30), (351 * 30, 307 * 30), (386 * 30, 304 * 30), (401 * 30, 285 * 30), (399 * 30, 260 * 30)]),
+    [(361 * 30, 268 * 30), (351 * 30, 307 * 30), (386 * 30, 304 * 30), (401 * 30, 285 * 30), (399 * 30, 260 * 30)],
 
     # Red Side Blue Intersection 1
-    Polygon([(369 * 30, 248 * 30), (372 * 30, 265 * 30), (421 * 30, 256 * 30), (441 * 30, 245 * 30), (441 * 30, 230 * 30)]),
+    [(369 * 30, 248 * 30), (372 * 30, 265 * 30), (421 * 30, 256 * 30), (441 * 30, 245 * 30), (441 * 30, 230 * 30)],
 
     # Red Side Blue Intersection 2
-    Polygon([(401 * 30, 260 * 30), (402 * 30, 285 * 30), (422 * 30, 283 * 30), (422 * 30, 256 * 30)]),
+    [(401 * 30, 260 * 30), (402 * 30, 285 * 30), (422 * 30, 283 * 30), (422 * 30, 256 * 30)],
 
     # Red Side Blue Gate
-    Polygon([(401 * 30, 286 * 30), (364 * 30, 335 * 30), (375 * 30, 347 * 30), (442 * 30, 325 * 30), (442 * 30, 310 * 30), (422 * 30, 283 * 30)]),
+    [(401 * 30, 286 * 30), (364 * 30, 335 * 30), (375 * 30, 347 * 30), (442 * 30, 325 * 30), (442 * 30, 310 * 30), (422 * 30, 283 * 30)],
 
     # Red Side Blue Buff
-    Polygon([(373 * 30, 200 * 30), (353 * 30, 222 * 30), (369 * 30, 248 * 30), (401 * 30, 239 * 30), (390 * 30, 211 * 30)]),
+    [(373 * 30, 200 * 30), (353 * 30, 222 * 30), (369 * 30, 248 * 30), (401 * 30, 239 * 30), (390 * 30, 211 * 30)],
 
     # Red Side Gromp
-    Polygon([(392 * 30, 211 * 30), (402 * 30, 239 * 30), (441 * 30, 229 * 30), (438 * 30, 198 * 30), (431 * 30, 188 * 30), (408 * 30, 193 * 30)]),
+    [(392 * 30, 211 * 30), (402 * 30, 239 * 30), (441 * 30, 229 * 30), (438 * 30, 198 * 30), (431 * 30, 188 * 30), (408 * 30, 193 * 30)],
 
     # Red Side Blue Tribrush
-    Polygon([(429 * 30, 138 * 30), (409 * 30, 168 * 30), (412 * 30, 191 * 30), (441 * 30, 188 * 30), (441 * 30, 166 * 30)]),
+    [(429 * 30, 138 * 30), (409 * 30, 168 * 30), (412 * 30, 191 * 30), (441 * 30, 188 * 30), (441 * 30, 166 * 30)],
 
     # Red Side Blue Pocket
-    Polygon([(412 * 30, 131 * 30), (389 * 30, 175 * 30), (410 * 30, 168 * 30), (423 * 30, 149 * 30)]),
+    [(412 * 30, 131 * 30), (389 * 30, 175 * 30), (410 * 30, 168 * 30), (423 * 30, 149 * 30)],
 
     # Red Side Blue Ramp Brush
-    Polygon([(409 * 30, 170 * 30), (384 * 30, 205 * 30), (393 * 30, 211 * 30), (411 * 30, 189 * 30)]),
+    [(409 * 30, 170 * 30), (384 * 30, 205 * 30), (393 * 30, 211 * 30), (411 * 30, 189 * 30)],
 
     # Red Side Blue Ramp
-    Polygon([(408 * 30, 169 * 30), (369 * 30, 184 * 30), (373 * 30, 200 * 30), (384 * 30, 206 * 30)]),
+    [(408 * 30, 169 * 30), (369 * 30, 184 * 30), (373 * 30, 200 * 30), (384 * 30, 206 * 30)],
 
     # Red Side Blue Shallow Cross
-    Polygon([(311 * 30, 228 * 30), (281 * 30, 253 * 30), (305 * 30, 277 * 30), (331 * 30, 248 * 30)]),
+    [(311 * 30, 228 * 30), (281 * 30, 253 * 30), (305 * 30, 277 * 30), (331 * 30, 248 * 30)],
 
     # Bot Line Brush
-    Polygon([(266 * 30, 204 * 30), (254 * 30, 215 * 30), (288 * 30, 246 * 30), (302 * 30, 235 * 30)]),
+    [(266 * 30, 204 * 30), (254 * 30, 215 * 30), (288 * 30, 246 * 30), (302 * 30, 235 * 30)],
 
     # Bot Mid River 1
-    Polygon([(273 * 30, 197 * 30), (265 * 30, 205 * 30), (301 * 30, 235 * 30), (311 * 30, 228 * 30)]),
+    [(273 * 30, 197 * 30), (265 * 30, 205 * 30), (301 * 30, 235 * 30), (311 * 30, 228 * 30)],
 
     # Bot Mid River 2
-    Polygon([(304 * 30, 191 * 30), (285 * 30, 206 * 30), (302 * 30, 220 * 30), (320 * 30, 206 * 30)]),
+    [(304 * 30, 191 * 30), (285 * 30, 206 * 30), (302 * 30, 220 * 30), (320 * 30, 206 * 30)],
 
     # Bot Pixel
-    Polygon([(312 * 30, 185 * 30), (304 * 30, 191 * 30), (320 * 30, 206 * 30), (332 * 30, 198 * 30)]),
+    [(312 * 30, 185 * 30), (304 * 30, 191 * 30), (320 * 30, 206 * 30), (332 * 30, 198 * 30)],
 
     # Dragon Pit
-    Polygon([(317 * 30, 127 * 30), (309 * 30, 158 * 30), (334 * 30, 169 * 30), (360 * 30, 157 * 30), (362 * 30, 127 * 30)]),
+    [(317 * 30, 127 * 30), (309 * 30, 158 * 30), (334 * 30, 169 * 30), (360 * 30, 157 * 30), (362 * 30, 127 * 30)],
 
     # Outside Dragon Pit (Higher)
-    Polygon([(307 * 30, 181 * 30), (338 * 30, 202 * 30), (370 * 30, 188 * 30), (360 * 30, 158 * 30)]),
+    [(307 * 30, 181 * 30), (338 * 30, 202 * 30), (370 * 30, 188 * 30), (360 * 30, 158 * 30)],
 
     # Outside Dragon Pit (Lower)
-    Polygon([(376 * 30, 130 * 30), (361 * 30, 155 * 30), (369 * 30, 183 * 30), (389 * 30, 176 * 30), (403 * 30, 145 * 30)]),
+    [(376 * 30, 130 * 30), (361 * 30, 155 * 30), (369 * 30, 183 * 30), (389 * 30, 176 * 30), (403 * 30, 145 * 30)],
 
     # Bot River Brush
-    Polygon([(401 * 30, 108 * 30), (394 * 30, 140 * 30), (403 * 30, 146 * 30), (416 * 30, 122 * 30)]),
+    [(401 * 30, 108 * 30), (394 * 30, 140 * 30), (403 * 30, 146 * 30), (416 * 30, 122 * 30)],
 
     # Bot Tribrush Entrance
-    Polygon([(372 * 30, 107 * 30), (368 * 30, 124 * 30), (380 * 30, 130 * 30), (383 * 30, 103 * 30)]),
+    [(372 * 30, 107 * 30), (368 * 30, 124 * 30), (380 * 30, 130 * 30), (383 * 30, 103 * 30)],
 
     # Bot River Mouth 1
-    Polygon([(385 * 30, 93 * 30), (380 * 30, 131 * 30), (395 * 30, 138 * 30), (401 * 30, 108 * 30)]),
+    [(385 * 30, 93 * 30), (380 * 30, 131 * 30), (395 * 30, 138 * 30), (401 * 30, 108 * 30)],
 
     # Bot River Mouth 2
-    Polygon([(390 * 30, 97 * 30), (417 * 30, 122 * 30), (427 * 30, 110 * 30), (396 * 30, 83 * 30)]),
+    [(390 * 30, 97 * 30), (417 * 30, 122 * 30), (427 * 30, 110 * 30), (396 * 30, 83 * 30)],
 
     # Top Line Brush
-    Polygon([(212 * 30, 253 * 30), (200 * 30, 265 * 30), (235 * 30, 294 * 30), (247 * 30, 285 * 30)]),
+    [(212 * 30, 253 * 30), (200 * 30, 265 * 30), (235 * 30, 294 * 30), (247 * 30, 285 * 30)],
 
     # Top Mid River 1
-    Polygon([(200 * 30, 264 * 30), (191 * 30, 272 * 30), (227 * 30, 302 * 30), (235 * 30, 295 * 30)]),
+    [(200 * 30, 264 * 30), (191 * 30, 272 * 30), (227 * 30, 302 * 30), (235 * 30, 295 * 30)],
 
     # Top Mid River 2
-    Polygon([(199 * 30, 279 * 30), (181 * 30, 293 * 30), (197 * 30, 308 * 30), (216 * 30, 293 * 30)]),
+    [(199 * 30, 279 * 30), (181 * 30, 293 * 30), (197 * 30, 308 * 30), (216 * 30, 293 * 30)],
 
     # Top Pixel
-    Polygon([(181 * 30, 293 * 30), (168 * 30, 301 * 30), (187 * 30, 315 * 30), (197 * 30, 309 * 30)]),
+    [(181 * 30, 293 * 30), (168 * 30, 301 * 30), (187 * 30, 315 * 30), (197 * 30, 309 * 30)],
 
     # Baron Pit
-    Polygon([(168 * 30, 330 * 30), (141 * 30, 346 * 30), (139 * 30, 372 * 30), (184 * 30, 372 * 30), (192 * 30, 341 * 30)]),
+    [(168 * 30, 330 * 30), (141 * 30, 346 * 30), (139 * 30, 372 * 30), (184 * 30, 372 * 30), (192 * 30, 341 * 30)],
 
     # Outside Baron Pit (Lower)
-    Polygon([(162 * 30, 297 * 30), (131 * 30, 311 * 30), (141 * 30, 345 * 30), (190 * 30, 317 * 30)]),
+    [(162 * 30, 297 * 30), (131 * 30, 311 * 30), (141 * 30, 345 * 30), (190 * 30, 317 * 30)],
 
     # Outside Baron Pit (Higher)
-    Polygon([(132 * 30, 316 * 30), (112 * 30, 324 * 30), (98 * 30, 353 * 30), (127 * 30, 371 * 30), (140 * 30, 347 * 30)]),
+    [(132 * 30, 316 * 30), (112 * 30, 324 * 30), (98 * 30, 353 * 30), (127 * 30, 371 * 30), (140 * 30, 347 * 30)],
 
     # Top River Brush
-    Polygon([(98 * 30, 354 * 30), (85 * 30, 377 * 30), (100 * 30, 391 * 30), (107 * 30, 359 * 30)]),
+    [(98 * 30, 354 * 30), (85 * 30, 377 * 30), (100 * 30, 391 * 30), (107 * 30, 359 * 30)],
 
     # Top Tribrush Entrance
-    Polygon([(121 * 30, 369 * 30), (117 * 30, 396 * 30), (129 * 30, 392 * 30), (133 * 30, 375 * 30)]),
+    [(121 * 30, 369 * 30), (117 * 30, 396 * 30), (129 * 30, 392 * 30), (133 * 30, 375 * 30)],
 
     # Top River Mouth 1
-    Polygon([(106 * 30, 361 * 30), (100 * 30, 391 * 30), (116 * 30, 406 * 30), (121 * 30, 368 * 30)]),
+    [(106 * 30, 361 * 30), (100 * 30, 391 * 30), (116 * 30, 406 * 30), (121 * 30, 368 * 30)],
 
     # Top River Mouth 2
-    Polygon([(85 * 30, 378 * 30), (74 * 30, 397 * 30), (104 * 30, 421 * 30), (115 * 30, 409 * 30)]),
+    [(85 * 30, 378 * 30), (74 * 30, 397 * 30), (104 * 30, 421 * 30), (115 * 30, 409 * 30)],
 
     # Mid Lane (Center)
-    Polygon([(255 * 30, 215 * 30), (214 * 30, 254 * 30), (247 * 30, 284 * 30), (289 * 30, 245 * 30)]),
+    [(255 * 30, 215 * 30), (214 * 30, 254 * 30), (247 * 30, 284 * 30), (289 * 30, 245 * 30)],
 
     # Blue Side Mid Outer Tower
-    Polygon([(212 * 30, 187 * 30), (185 * 30, 212 * 30), (202 * 30, 227 * 30), (227 * 30, 203 * 30)]),
+    [(212 * 30, 187 * 30), (185 * 30, 212 * 30), (202 * 30, 227 * 30), (227 * 30, 203 * 30)],
 
     # Blue Side Mid Outside Outer Tower
-    Polygon([(227 * 30, 203 * 30), (203 * 30, 228 * 30), (221 * 30, 246 * 30), (247 * 30, 221 * 30)]),
+    [(227 * 30, 203 * 30), (203 * 30, 228 * 30), (221 * 30, 246 * 30), (247 * 30, 221 * 30)],
 
     # Blue Side Mid Inner Tower
-    Polygon([(166 * 30, 145 * 30), (137 * 30, 168 * 30), (160 * 30, 191 * 30), (186 * 30, 165 * 30)]),
+    [(166 * 30, 145 * 30), (137 * 30, 168 * 30), (160 * 30, 191 * 30), (186 * 30, 165 * 30)],
 
     # Blue Side Mid Cross
-    Polygon([(187 * 30, 166 * 30), (162 * 30, 191 * 30), (183 * 30, 211 * 30), (210 * 30, 186 * 30)]),
+    [(187 * 30, 166 * 30), (162 * 30, 191 * 30), (183 * 30, 211 * 30), (210 * 30, 186 * 30)],
 
     # Red Side Mid Outer Tower
-    Polygon([(300 * 30, 272 * 30), (274 * 30, 297 * 30), (288 * 30, 312 * 30), (318 * 30, 288 * 30)]),
+    [(300 * 30, 272 * 30), (274 * 30, 297 * 30), (288 * 30, 312 * 30), (318 * 30, 288 * 30)],
 
     # Red Side Mid Outside Outer Tower
-    Polygon([(282 * 30, 253 * 30), (254 * 30, 280 * 30), (272 * 30, 296 * 30), (300 * 30, 270 * 30)]),
+    [(282 * 30, 253 * 30), (254 * 30, 280 * 30), (272 * 30, 296 * 30), (300 * 30, 270 * 30)],
 
     # Red Side Mid Inner Tower
-    Polygon([(344 * 30, 315 * 30), (315 * 30, 337 * 30), (334 * 30, 355 * 30), (362 * 30, 334 * 30)]),
+    [(344 * 30, 315 * 30), (315 * 30, 337 * 30), (334 * 30, 355 * 30), (362 * 30, 334 * 30)],
 
     # Red Side Mid Cross
-    Polygon([(318 * 30, 288 * 30), (288 * 30, 312 * 30), (314 * 30, 337 * 30), (344 * 30, 314 * 30)]),
+    [(318 * 30, 288 * 30), (288 * 30, 312 * 30), (314 * 30, 337 * 30), (344 * 30, 314 * 30)],
 
     # Bot Lane Brush Middle
-    Polygon([(446 * 30, 52 * 30), (429 * 30, 66 * 30), (442 * 30, 78 * 30), (458 * 30, 63 * 30)]),
+    [(446 * 30, 52 * 30), (429 * 30, 66 * 30), (442 * 30, 78 * 30), (458 * 30, 63 * 30)],
 
     # Bot Lane Brush Left
-    Polygon([(441 * 30, 32 * 30), (406 * 30, 43 * 30), (421 * 30, 60 * 29), (438 * 30, 44 * 30)]),
+    [(441 * 30, 32 * 30), (406 * 30, 43 * 30), (421 * 30, 60 * 29), (438 * 30, 44 * 30)],
 
     # Bot Lane Brush Right
-    Polygon([(463 * 30, 74 * 30), (449 * 30, 86 * 30), (464 * 30, 101 * 30), (471 * 30, 99 * 30)]),
+    [(463 * 30, 74 * 30), (449 * 30, 86 * 30), (464 * 30, 101 * 30), (471 * 30, 99 * 30)],
 
     # Bot Lane (Center) 1
-    Polygon([(438 * 30, 44 * 30), (422 * 30, 58 * 30), (429 * 30, 64 * 30), (445 * 30, 51 * 30)]),
+    [(438 * 30, 44 * 30), (422 * 30, 58 * 30), (429 * 30, 64 * 30), (445 * 30, 51 * 30)],
 
     # Bot Lane (Center) 2
-    Polygon([(458 * 30, 64 * 30), (442 * 30, 78 * 30), (448 * 30, 85 * 30), (464 * 30, 71 * 30)]),
+    [(458 * 30, 64 * 30), (442 * 30, 78 * 30), (448 * 30, 85 * 30), (464 * 30, 71 * 30)],
 
     # Bot Lane (Center) 3
-    Polygon([(406 * 30, 44 * 30), (390 * 30, 78 * 30), (428 * 30, 110 * 30), (462 * 30, 101 * 30)]),
+    [(406 * 30, 44 * 30), (390 * 30, 78 * 30), (428 * 30, 110 * 30), (462 * 30, 101 * 30)],
 
     # Bot Lane Alcove
-    Polygon([(440 * 30, 6 * 30), (440 * 30, 42 * 30), (464 * 30, 72 * 30), (496 * 30, 63 * 30)]),
+    [(440 * 30, 6 * 30), (440 * 30, 42 * 30), (464 * 30, 72 * 30), (496 * 30, 63 * 30)],
 
     # Blue Side Bot Lane Outer Tower
-    Polygon([(344 * 30, 21 * 30), (343 * 30, 59 * 30), (369 * 30, 59 * 30), (374 * 30, 21 * 30)]),
+    [(344 * 30, 21 * 30), (343 * 30, 59 * 30), (369 * 30, 59 * 30), (374 * 30, 21 * 30)],
 
     # Blue Side Bot Lane Outside Outer Tower
-    Polygon([(374 * 30, 21 * 30), (369 * 30, 60 * 30), (392 * 30, 74 * 30), (414 * 30, 26 * 30)]),
+    [(374 * 30, 21 * 30), (369 * 30, 60 * 30), (392 * 30, 74 * 30), (414 * 30, 26 * 30)],
 
     # Blue Side Bot Lane Inner Tower
-    Polygon([(216 * 30, 21 * 30), (216 * 30, 59 * 30), (251 * 30, 58 * 30), (254 * 30, 21 * 30)]),
+    [(216 * 30, 21 * 30), (216 * 30, 59 * 30), (251 * 30, 58 * 30), (254 * 30, 21 * 30)],
 
     # Blue Side Bot Lane Area
-    Polygon([(254 * 30, 21 * 30), (252 * 30, 58 * 30), (341 * 30, 57 * 30), (343 * 30, 21 * 30)]),
+    [(254 * 30, 21 * 30), (252 * 30, 58 * 30), (341 * 30, 57 * 30), (343 * 30, 21 * 30)],
 
     # Red Side Bot Lane Outer Tower
-    Polygon([(480 * 30, 135 * 30), (440 * 30, 138 * 30), (442 * 30, 170 * 30), (480 * 30, 168 * 30)]),
+    [(480 * 30, 135 * 30), (440 * 30, 138 * 30), (442 * 30, 170 * 30), (480 * 30, 168 * 30)],
 
     # Red Side Bot Lane Outside Outer Tower
-    Polygon([(429 * 30, 111 * 30), (438 * 30, 137 * 30), (480 * 30, 135 * 30), (471 * 30, 100 * 30)]),
+    [(429 * 30, 111 * 30), (438 * 30, 137 * 30), (480 * 30, 135 * 30), (471 * 30, 100 * 30)],
 
     # Red Side Bot Lane Inner Tower
-    Polygon([(441 * 30, 259 * 30), (442 * 30, 296 * 30), (478 * 30, 295 * 30), (479 * 30, 257 * 30)]),
+    [(441 * 30, 259 * 30), (442 * 30, 296 * 30), (478 * 30, 295 * 30), (479 * 30, 257 * 30)],
 
     # Red Side Bot Lane Area
-    Polygon([(441 * 30, 171 * 30), (441 * 30, 258 * 30), (479 * 30, 257 * 30), (480 * 30, 168 * 30)]),
+    [(441 * 30, 171 * 30), (441 * 30, 258 * 30), (479 * 30, 257 * 30), (480 * 30, 168 * 30)],
 
     # Top Lane Brush Middle
-    Polygon([(59 * 30, 425 * 30), (42 * 30, 439 * 30), (54 * 30, 452 * 30), (71 * 30, 438 * 30)]),
+    [(59 * 30, 425 * 30), (42 * 30, 439 * 30), (54 * 30, 452 * 30), (71 * 30, 438 * 30)],
 
     # Top Lane Brush Right
-    Polygon([(78 * 30, 444 * 30), (62 * 30, 460 * 30), (89 * 30, 471 * 30), (94 * 30, 460 * 30)]),
+    [(78 * 30, 444 * 30), (62 * 30, 460 * 30), (89 * 30, 471 * 30), (94 * 30, 460 * 30)],
 
     # Top Lane Brush Left
-    Polygon([(36 * 30, 403 * 30), (29 * 30, 405 * 30), (36 * 30, 430 * 30), (51 * 30, 418 * 30)]),
+    [(36 * 30, 403 * 30), (29 * 30, 405 * 30), (36 * 30, 430 * 30), (51 * 30, 418 * 30)],
 
     # Top Lane (Center) 1
-    Polygon([(71 * 30, 438 * 30), (55 * 30, 453 * 30), (62 * 30, 459 * 30), (77 * 30, 445 * 30)]),
+    [(71 * 30, 438 * 30), (55 * 30, 453 * 30), (62 * 30, 459 * 30), (77 * 30, 445 * 30)],
 
     # Top Lane (Center) 2
-    Polygon([(52 * 30, 418 * 30), (36 * 30, 432 * 30), (42 * 30, 439 * 30), (57 * 30, 425 * 30)]),
+    [(52 * 30, 418 * 30), (36 * 30, 432 * 30), (42 * 30, 439 * 30), (57 * 30, 425 * 30)],
 
     # Top Lane (Center) 3
-    Polygon([(72 * 30, 394 * 30), (38 * 30, 403 * 30), (94 * 30, 460 * 30), (110 * 30, 426 * 30)]),
+    [(72 * 30, 394 * 30), (38 * 30, 403 * 30), (94 * 30, 460 * 30), (110 * 30, 426 * 30)],
 
     # Top Lane Alcove
-    Polygon([(35 * 30, 432 * 30), (10 * 30, 464 * 30), (66 * 30, 492 * 30), (60 * 30, 461 * 30)]),
+    [(35 * 30, 432 * 30), (10 * 30, 464 * 30), (66 * 30, 492 * 30), (60 * 30, 461 * 30)],
 
     # Red Side Top Lane Outer Tower
-    Polygon([(135 * 30, 442 * 30), (130 * 30, 475 * 30), (160 * 30, 475 * 30), (161 * 30, 442 * 30)]),
+    [(135 * 30, 442 * 30), (130 * 30, 475 * 30), (160 * 30, 475 * 30), (161 * 30, 442 * 30)],
 
     # Red Side Top Lane Outside Outer Tower
-    Polygon([(111 * 30, 428 * 30), (90 * 30, 472 * 30), (131 * 30, 475 * 30), (136 * 30, 441 * 30)]),
+    [(111 * 30, 428 * 30), (90 * 30, 472 * 30), (131 * 30, 475 * 30), (136 * 30, 441 * 30)],
 
     # Red Side Top Lane Inner Tower
-    Polygon([(253 * 30, 443 * 30), (250 * 30, 475 * 30), (288 * 30, 475 * 30), (288 * 30, 442 * 30)]),
+    [(253 * 30, 443 * 30), (250 * 30, 475 * 30), (288 * 30, 475 * 30), (288 * 30, 442 * 30)],
 
     # Red Side Top Lane Area
-    Polygon([(162 * 30, 444 * 30), (161 * 30, 475 * 30), (250 * 30, 475 * 30), (252 * 30, 443 * 30)]),
+    [(162 * 30, 444 * 30), (161 * 30, 475 * 30), (250 * 30, 475 * 30), (252 * 30, 443 * 30)],
 
     # Blue Side Top Lane Outer Tower
-    Polygon([(20 * 30, 340 * 30), (21 * 30, 373 * 30), (62 * 30, 371 * 30), (58 * 30, 338 * 30)]),
+    [(20 * 30, 340 * 30), (21 * 30, 373 * 30), (62 * 30, 371 * 30), (58 * 30, 338 * 30)],
 
     # Blue Side Top Lane Outside Outer Tower
-    Polygon([(21 * 30, 373 * 30), (29 * 30, 405 * 30), (71 * 30, 394 * 30), (62 * 30, 371 * 30)]),
+    [(21 * 30, 373 * 30), (29 * 30, 405 * 30), (71 * 30, 394 * 30), (62 * 30, 371 * 30)],
 
     # Blue Side Top Lane Inner Tower
-    Polygon([(22 * 30, 213 * 30), (21 * 30, 251 * 30), (59 * 30, 249 * 30), (58 * 30, 212 * 30)]),
+    [(22 * 30, 213 * 30), (21 * 30, 251 * 30), (59 * 30, 249 * 30), (58 * 30, 212 * 30)],
 
     # Blue Side Top Lane Area
-    Polygon([(21 * 30, 251 * 30), (20 * 30, 340 * 30), (59 * 30, 337 * 30), (59 * 30, 250 * 30)]),
+    [(21 * 30, 251 * 30), (20 * 30, 340 * 30), (59 * 30, 337 * 30), (59 * 30, 250 * 30)],
 
     # Blue Side Base
-    Polygon([(0 * 30, 0 * 30), (0 * 30, 170 * 30), (59 * 30, 176 * 30), (127 * 30, 154 * 30), (150 * 30, 132 * 30), (174 * 30, 61 * 30), (173 * 30, 0 * 30)]),
+    [(0 * 30, 0 * 30), (0 * 30, 170 * 30), (59 * 30, 176 * 30), (127 * 30, 154 * 30), (150 * 30, 132 * 30), (174 * 30, 61 * 30), (173 * 30, 0 * 30)],
 
     # Blue Side Bot Inhib Entrance
-    Polygon([(174 * 30, 21 * 30), (174 * 30, 60 * 30), (216 * 30, 59 * 30), (216 * 30, 21 * 30)]),
+    [(174 * 30, 21 * 30), (174 * 30, 60 * 30), (216 * 30, 59 * 30), (216 * 30, 21 * 30)],
 
     # Blue Side Mid Inhib Entrance
-    Polygon([(125 * 30, 155 * 30), (137 * 30, 168 * 30), (165 * 30, 144 * 30), (150 * 30, 133 * 30)]),
+    [(125 * 30, 155 * 30), (137 * 30, 168 * 30), (165 * 30, 144 * 30), (150 * 30, 133 * 30)],
 
     # Blue Side Top Inhib Entrance
-    Polygon([(23 * 30, 173 * 30), (22 * 30, 213 * 30), (58 * 30, 211 * 30), (58 * 30, 176 * 30)]),
+    [(23 * 30, 173 * 30), (22 * 30, 213 * 30), (58 * 30, 211 * 30), (58 * 30, 176 * 30)],
 
     # Red Side Base
-    Polygon([(500 * 30, 500 * 30), (328 * 30, 500 * 30), (327 * 30, 441 * 30), (351 * 30, 368 * 30), (375 * 30, 347 * 30), (443 * 30, 325 * 30), (500 * 30, 331 * 30)]),
+    [(500 * 30, 500 * 30), (328 * 30, 500 * 30), (327 * 30, 441 * 30), (351 * 30, 368 * 30), (375 * 30, 347 * 30), (443 * 30, 325 * 30), (500 * 30, 331 * 30)],
 
     # Red Side Bot Inhib Entrance
-    Polygon([(327 * 30, 441 * 30), (288 * 30, 442 * 30), (288 * 30, 475 * 30), (327 * 30, 475 * 30)]),
+    [(327 * 30, 441 * 30), (288 * 30, 442 * 30), (288 * 30, 475 * 30), (327 * 30, 475 * 30)],
 
     # Red Side Mid Inhib Entrance
-    Polygon([(363 * 30, 334 * 30), (334 * 30, 356 * 30), (350 * 30, 368 * 30), (375 * 30, 347 * 30)]),
+    [(363 * 30, 334 * 30), (334 * 30, 356 * 30), (350 * 30, 368 * 30), (375 * 30, 347 * 30)],
 
     # Red Side Top Inhib Entrance
-    Polygon([(442 * 30, 296 * 30), (443 * 30, 325 * 30), (478 * 30, 328 * 30), (478 * 30, 295 * 30)]),
+    [(442 * 30, 296 * 30), (443 * 30, 325 * 30), (478 * 30, 328 * 30), (478 * 30, 295 * 30)],
 ]
 
 
-ZONE_POLYGONS = {}
-LANE_ZONE_NAMES = []
-if SHAPELY_AVAILABLE:
-    if len(rift_zones) == len(rift_zone_polygons_list) and len(rift_zones) > 0:
-        try:
-            ZONE_POLYGONS = dict(zip(rift_zones, rift_zone_polygons_list))
-            LANE_ZONE_NAMES = [name for name in ZONE_POLYGONS if 'Lane' in name and not any(sub in name for sub in ['Area', 'Outside', 'Inhib', 'Brush'])]
-        except Exception as poly_err:
-             log_message(f"ERROR Processing Polygons/Names for zone detection: {poly_err}. Zone detection might fail.")
-             ZONE_POLYGONS = {}
-    elif len(rift_zones) > 0 or len(rift_zone_polygons_list) > 0 :
-         log_message(f"ERROR: Mismatch or empty rift_zones/rift_zone_polygons_list. Zone detection disabled.")
-         ZONE_POLYGONS = {}
-else:
-     pass
+_zone_index = {"polygons": None, "lane_names": [], "lane_bounds": [], "contains_xy": None}
+_zone_index_lock = threading.Lock()
+
+
+def _build_zone_index():
+    """(polygons, lane_names, lane_bounds, contains_xy); нужен Shapely 2.x (prepare, contains_xy)."""
+    polygons, lane_names, lane_bounds = {}, [], []
+    if not SHAPELY_AVAILABLE:
+        return polygons, lane_names, lane_bounds, None
+    if len(rift_zones) != len(rift_zone_coords) or not rift_zones:
+        log_message(f"ERROR: Mismatch or empty rift_zones/rift_zone_coords. Zone detection disabled.", level="error")
+        return polygons, lane_names, lane_bounds, None
+    try:
+        from shapely.geometry import Polygon
+        from shapely import contains_xy, prepare
+        for zone_name, coords in zip(rift_zones, rift_zone_coords):
+            polygon = Polygon(coords)
+            prepare(polygon)
+            polygons[zone_name] = polygon
+        lane_names = [name for name in polygons if 'Lane' in name and not any(sub in name for sub in ['Area', 'Outside', 'Inhib', 'Brush'])]
+        lane_bounds = [(name, polygons[name]) + tuple(polygons[name].bounds) for name in lane_names]
+    except Exception as poly_err:
+        log_message(f"ERROR Processing Polygons/Names for zone detection: {poly_err}. Zone detection might fail.", level="error")
+        return {}, [], [], None
+    return polygons, lane_names, lane_bounds, contains_xy
+
+
+def get_zone_index():
+    """
+    (zone_polygons, lane_zone_names): shapely и полигоны зон грузятся при первом обращении,
+    а не при импорте модуля - воркеры стартуют быстрее, страницы без зон их не строят.
+    """
+    if _zone_index["polygons"] is None:
+        with _zone_index_lock:
+            if _zone_index["polygons"] is None:
+                polygons, lane_names, lane_bounds, contains_xy = _build_zone_index()
+                _zone_index["lane_names"] = lane_names
+                _zone_index["lane_bounds"] = lane_bounds
+                _zone_index["contains_xy"] = contains_xy
+                _zone_index["polygons"] = polygons
+    return _zone_index["polygons"], _zone_index["lane_names"]
 
 
 MONSTER_NAME_MAP_V3 = {
@@ -667,7 +702,7 @@ def extract_objective_events(livestats_content_str, game_id, participants_summar
     try:
         lines = livestats_content_str.strip().split('\n')
     except Exception as e:
-        log_message(f"[Objectives] G:{game_id}: Could not split lines - {e}")
+        log_message(f"[Objectives] G:{game_id}: Could not split lines - {e}", level="warning")
         return []
 
     for line in lines:
@@ -731,7 +766,7 @@ def extract_objective_events(livestats_content_str, game_id, participants_summar
         except (json.JSONDecodeError, TypeError, KeyError):
             continue
             
-    log_message(f"[Objectives] G:{game_id}: Finished parsing. Extracted {len(events)} total objective events.")
+    log_message("[Objectives] G:%s: Finished parsing. Extracted %d total objective events.", game_id, len(events), level="debug")
     return events
 
 def save_objective_events(conn, game_id, events):
@@ -758,39 +793,54 @@ def save_objective_events(conn, game_id, events):
                 (game_id, timestamp_ms, objective_type, objective_subtype, team_id, killer_participant_id, lane)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, to_insert)
-            log_message(f"[DB Objectives Save] G:{game_id}: Saved {cursor.rowcount} objective events.")
+            log_message("[DB Objectives Save] G:%s: Saved %d objective events.", game_id, cursor.rowcount, level="debug")
         return True
     except sqlite3.Error as e:
-        log_message(f"[DB Objectives Save] G:{game_id}: Database error - {e}")
+        log_message(f"[DB Objectives Save] G:{game_id}: Database error - {e}", level="error")
         return False
     finally:
         if cursor: cursor.close()
 
 # --- Helper Functions (Jungle Pathing, Player Positions, etc.) ---
 def get_zone_for_position(x, z):
-    if not SHAPELY_AVAILABLE or not ZONE_POLYGONS:
+    zone_polygons, lane_zone_names = get_zone_index()
+    if not SHAPELY_AVAILABLE or not zone_polygons:
         reason = "Shapely N/A" if not SHAPELY_AVAILABLE else "Polygons not loaded"
         if x < 7400: return f"Blue Side ({reason})"
         elif x > 7400: return f"Red Side ({reason})"
         else: return f"Mid Area ({reason})"
+    from shapely.geometry import Point
     point = Point(x, z)
-    priority_zone_names = [name for name in LANE_ZONE_NAMES] + ['Blue Side Base', 'Red Side Base', 'Dragon Pit', 'Baron Pit']
+    priority_zone_names = list(lane_zone_names) + ['Blue Side Base', 'Red Side Base', 'Dragon Pit', 'Baron Pit']
     for zone_name in priority_zone_names:
-        polygon = ZONE_POLYGONS.get(zone_name)
+        polygon = zone_polygons.get(zone_name)
         if polygon:
             try:
                 if point.within(polygon): return zone_name
-            except Exception as e: log_message(f"Shapely error checking point in priority zone '{zone_name}': {e}")
+            except Exception as e: log_message("Shapely error checking point in priority zone '%s': %s", zone_name, e, level="error", sample="zone_priority_shapely")
 
-    for zone_name, polygon in ZONE_POLYGONS.items():
+    for zone_name, polygon in zone_polygons.items():
         if zone_name not in priority_zone_names:
             try:
                 if point.within(polygon): return zone_name
-            except Exception as e: log_message(f"Shapely error checking point in zone '{zone_name}': {e}"); continue
+            except Exception as e: log_message("Shapely error checking point in zone '%s': %s", zone_name, e, level="error", sample="zone_shapely"); continue
     if x < 7400: return "Blue Side Unknown"
     elif x > 7400: return "Red Side Unknown"
     else: return "Mid Unknown"
 
+def get_lane_zone_for_position(x, z):
+    """
+    Линия, в которой стоит точка, или None. Линии проверяются первыми и в get_zone_for_position,
+    поэтому для детекта ганков этого достаточно; bbox отсекает почти все полигоны без вызова shapely.
+    """
+    get_zone_index()
+    contains_xy = _zone_index["contains_xy"]
+    for zone_name, polygon, min_x, min_z, max_x, max_z in _zone_index["lane_bounds"]:
+        if min_x <= x <= max_x and min_z <= z <= max_z:
+            if contains_xy(polygon, x, z):
+                return zone_name
+    return None
+
 def get_monster_details(monster_type, pos_x, pos_z, jungler_team_side):
     camp_name = MONSTER_NAME_MAP_V3.get(monster_type, monster_type)
     epics = ["Drake", "Herald", "Baron", "VoidGrub"]
@@ -814,13 +864,13 @@ def get_monster_details(monster_type, pos_x, pos_z, jungler_team_side):
 def extract_player_positions(livestats_content_str, game_id, target_timestamps_sec, tolerance_sec=5.0):
     if not livestats_content_str: return {}
     if not isinstance(target_timestamps_sec, list) or not all(isinstance(ts, (int, float)) for ts in target_timestamps_sec):
-         log_message(f"[Positions-ERROR] G:{game_id}: Invalid target_timestamps_sec: {target_timestamps_sec}."); return {}
+         log_message(f"[Positions-ERROR] G:{game_id}: Invalid target_timestamps_sec: {target_timestamps_sec}.", level="error"); return {}
     if not target_timestamps_sec: return {}
 
     final_extracted_positions = {}
     targets_completed = set()
     try: lines = livestats_content_str.strip().split('\n')
-    except Exception as split_err: log_message(f"[Positions-ERROR] G:{game_id}: Error splitting lines: {split_err}"); return {}
+    except Exception as split_err: log_message(f"[Positions-ERROR] G:{game_id}: Error splitting lines: {split_err}", level="error"); return {}
 
     for line in lines:
         if not line.strip(): continue
@@ -875,7 +925,7 @@ def extract_player_positions(livestats_content_str, game_id, target_timestamps_s
 def save_position_snapshot(conn, game_id, timestamp_sec, positions_list):
     if not conn or not game_id or timestamp_sec not in TARGET_POSITION_TIMESTAMPS_SEC or not isinstance(positions_list, list): return False
     try: positions_json = json.dumps(positions_list)
-    except (TypeError, ValueError) as json_err: log_message(f"[DB Pos Save] G:{game_id} T:{timestamp_sec}: Error serializing positions: {json_err}"); return False
+    except (TypeError, ValueError) as json_err: log_message(f"[DB Pos Save] G:{game_id} T:{timestamp_sec}: Error serializing positions: {json_err}", level="error"); return False
 
     last_updated = datetime.now(timezone.utc).isoformat()
     cursor = None
@@ -887,7 +937,7 @@ def save_position_snapshot(conn, game_id, timestamp_sec, positions_list):
             VALUES (?, ?, ?, ?)
         """, (str(game_id), int(timestamp_sec), positions_json, last_updated))
         return True
-    except sqlite3.Error as e: log_message(f"[DB Pos Save] G:{game_id} T:{timestamp_sec}: Database error: {e}"); return False
+    except sqlite3.Error as e: log_message(f"[DB Pos Save] G:{game_id} T:{timestamp_sec}: Database error: {e}", level="error"); return False
     finally:
         if cursor: cursor.close()
 
@@ -901,7 +951,7 @@ def extract_player_positions_timeline(livestats_content_str, game_id):
     try:
         lines = livestats_content_str.strip().split('\n')
     except Exception as e:
-        log_message(f"[TimelineExtract] G:{game_id}: Could not split lines - {e}")
+        log_message(f"[TimelineExtract] G:{game_id}: Could not split lines - {e}", level="warning")
         return []
 
     for line in lines:
@@ -952,130 +1002,184 @@ def save_player_positions_timeline(conn, game_id, positions_timeline):
                 (game_id, timestamp_ms, participant_id, player_puuid, pos_x, pos_z, last_updated)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, to_insert)
-            log_message(f"[DB Timeline Save] G:{game_id}: Saved {cursor.rowcount} position entries.")
+            log_message("[DB Timeline Save] G:%s: Saved %d position entries.", game_id, cursor.rowcount, level="debug")
         return True
     except sqlite3.Error as e:
-        log_message(f"[DB Timeline Save] G:{game_id}: Database error - {e}")
+        log_message(f"[DB Timeline Save] G:{game_id}: Database error - {e}", level="error")
         return False
     finally:
         if cursor: cursor.close()
 
 
-def process_livestats_content(conn, livestats_content_str, jungler_puuid, game_id):
-    """
-    Обрабатывает содержимое livestats для извлечения пути лесника.
-    Принимает существующее соединение с БД 'conn', чтобы избежать блокировки.
-    """
-    if not livestats_content_str or not jungler_puuid: return None
-    path_sequence = deque()
-    jungler_participant_id = None
-    jungler_team_side = None
-    first_camp_cleared = False
-    first_recall_after_camp_detected = False
-
-    cursor = conn.cursor()
-    try:
-        cursor.execute('SELECT Blue_JGL_PUUID, Red_JGL_PUUID FROM tournament_games WHERE "Game_ID" = ?', (str(game_id),))
-        row = cursor.fetchone()
-        if row:
-            if row["Blue_JGL_PUUID"] == jungler_puuid: jungler_team_side = "Blue"
-            elif row["Red_JGL_PUUID"] == jungler_puuid: jungler_team_side = "Red"
-    except sqlite3.Error as e:
-        log_message(f"Error getting team side for G:{game_id}, P:{jungler_puuid[:8]}: {e}")
-    finally:
-        if cursor: cursor.close()
-
-    try: lines = livestats_content_str.strip().split('\n')
-    except Exception as split_err: log_message(f"Error splitting lines G:{game_id}: {split_err}"); return None
-
-    for line in lines:
-        if not line.strip(): continue
+# --- Jungle pathing ---
+# Путь строится до первого рекола после первого кемпа; события отсекаются по схеме
+# ещё до json.loads, а разбор файла прекращается, когда все отслеживаемые игроки закончили.
+JUNGLE_PATH_SCHEMAS = ('"stats_update"', '"epic_monster_kill"', '"channeling_started"')
+
+
+class _JunglePathState:
+    """Состояние пути одного игрока: зона/время входа для ганков, дедуп кемпов и реколов."""
+    __slots__ = ("participant_id", "team_side", "path", "last_action_name", "last_kill_time",
+                 "last_recall_time", "last_zone", "time_entered_zone", "first_camp_cleared", "done",
+                 "first_clear_length")
+
+    def __init__(self, participant_id, team_side):
+        self.participant_id = participant_id
+        self.team_side = team_side
+        self.path = []
+        self.last_action_name = None
+        self.last_kill_time = -1.0
+        self.last_recall_time = -1.0
+        self.last_zone = None
+        self.time_entered_zone = 0.0
+        self.first_camp_cleared = False
+        self.done = False
+        self.first_clear_length = None
+
+    def _append(self, action_name, game_time_sec):
+        if not self.path or action_name != self.last_action_name:
+            self.path.append({"action": action_name, "time": game_time_sec})
+            self.last_action_name = action_name
+
+    def on_position(self, game_time_sec, pos):
+        # Для ганков важна только линия: переходы между нелинейными зонами ничего не меняют
+        current_zone = get_lane_zone_for_position(pos['x'], pos['z'])
+        if current_zone == self.last_zone:
+            return
+        if self.last_zone is not None and game_time_sec - self.time_entered_zone >= GANK_PRESENCE_THRESHOLD:
+            lane_name = "Unknown"
+            if "Top" in self.last_zone: lane_name = "Top"
+            elif "Mid" in self.last_zone: lane_name = "Mid"
+            elif "Bot" in self.last_zone: lane_name = "Bot"
+            action_gank = f"Gank/Save {lane_name}"
+            # Ганк дедуплицируется только с последним элементом пути
+            if not self.path or self.path[-1].get("action") != action_gank:
+                self.path.append({"action": action_gank, "time": game_time_sec})
+                self.last_action_name = action_gank
+        self.last_zone = current_zone
+        self.time_entered_zone = game_time_sec
+
+    def on_monster_kill(self, game_time_sec, monster_type, pos):
+        if game_time_sec <= self.last_kill_time + 0.5:
+            return
+        self.last_kill_time = game_time_sec
+        self.first_camp_cleared = True
+        self._append(get_monster_details(monster_type, pos['x'], pos['z'], self.team_side), game_time_sec)
+
+    def on_recall(self, game_time_sec):
+        if game_time_sec <= self.last_recall_time + 1.0:
+            return
+        self.last_recall_time = game_time_sec
+        self._append("Recall", game_time_sec)
+        if self.first_camp_cleared and not self.done:
+            # Первый рекол после кемпа закрывает first clear; в режиме full game путь продолжается
+            self.done = True
+            self.first_clear_length = len(self.path)
+
+
+def _iter_livestats_lines(livestats_content_str):
+    """Строки livestats без копирования всего файла в список (проход может остановиться рано)."""
+    start = 0
+    while True:
+        end = livestats_content_str.find('\n', start)
+        if end == -1:
+            yield livestats_content_str[start:]
+            return
+        yield livestats_content_str[start:end]
+        start = end + 1
+
+
+def _build_jungle_states(game_participants_summary, tracked_puuids):
+    """participantID -> (puuid, _JunglePathState) для отслеживаемых игроков (по умолчанию оба лесника)."""
+    if tracked_puuids is None:
+        tracked_puuids = [game_participants_summary[i].get("puuid")
+                          for i in (1, 6) if len(game_participants_summary) > i]
+    states = {}
+    for index, p_summary in enumerate(game_participants_summary):
+        puuid = p_summary.get("puuid")
+        if not puuid or puuid not in tracked_puuids:
+            continue
+        participant_id = p_summary.get("participantId") or index + 1
+        team_id = p_summary.get("teamId") or (100 if index < 5 else 200)
+        states[participant_id] = (puuid, _JunglePathState(participant_id, "Blue" if team_id == 100 else "Red"))
+    return states
+
+
+def _run_jungle_states(livestats_content_str, states, stop_after_first_clear):
+    """Один проход livestats по всем состояниям; при stop_after_first_clear - до конца first clear у всех."""
+    track_positions = SHAPELY_AVAILABLE and all(get_zone_index())
+    active = {participant_id: state for participant_id, (_, state) in states.items()}
+    for line in _iter_livestats_lines(livestats_content_str):
+        if not active:
+            break
+        if not any(schema in line for schema in JUNGLE_PATH_SCHEMAS):
+            continue
         try:
-            if '"rfc461Schema":"stats_update"' in line and f'"puuid":"{jungler_puuid}"' in line:
-                 snapshot = json.loads(line)
-                 for p_data in snapshot.get("participants", []):
-                     if p_data.get("puuid") == jungler_puuid:
-                         jungler_participant_id = p_data.get("participantID"); break
-                 if jungler_participant_id: break
-        except json.JSONDecodeError: continue
-        except Exception as e: log_message(f"Error in jungler ID pass G:{game_id}: {e}"); continue
-    if jungler_participant_id is None: return None
-
-    last_action = None
-    last_kill_event_time = -1.0
-    last_recall_event_time = -1.0
-    last_known_zone = "Unknown"
-    time_entered_zone = 0.0
-
-    for line in lines:
-        if first_recall_after_camp_detected: break
-        if not line.strip(): continue
-        try: snapshot = json.loads(line)
-        except json.JSONDecodeError: continue
+            snapshot = json.loads(line)
+        except json.JSONDecodeError:
+            continue
 
         game_time_ms = snapshot.get("gameTime")
-        if game_time_ms is None: continue
+        if game_time_ms is None:
+            continue
         game_time_sec = game_time_ms / 1000.0
         schema = snapshot.get("rfc461Schema")
-        current_action = None
         if schema == "stats_update":
+            if not track_positions:
+                continue
             for p_data in snapshot.get("participants", []):
-                if p_data.get("participantID") == jungler_participant_id:
-                    pos = p_data.get("position")
-                    if pos and 'x' in pos and 'z' in pos and SHAPELY_AVAILABLE and ZONE_POLYGONS and LANE_ZONE_NAMES:
-                        current_zone = get_zone_for_position(pos['x'], pos['z'])
-                        if current_zone != last_known_zone:
-                            if LANE_ZONE_NAMES and last_known_zone in LANE_ZONE_NAMES:
-                                time_spent = game_time_sec - time_entered_zone
-                                if time_spent >= GANK_PRESENCE_THRESHOLD:
-                                    lane_name = "Unknown"
-                                    if "Top" in last_known_zone: lane_name = "Top"
-                                    elif "Mid" in last_known_zone: lane_name = "Mid"
-                                    elif "Bot" in last_known_zone: lane_name = "Bot"
-                                    action_gank = f"Gank/Save {lane_name}"
-                                    # ИЗМЕНЕНИЕ: Сохраняем как объект
-                                    gank_action_obj = {"action": action_gank, "time": game_time_sec}
-                                    if not path_sequence or path_sequence[-1].get("action") != action_gank:
-                                        path_sequence.append(gank_action_obj)
-                                        last_action = gank_action_obj
-                            last_known_zone = current_zone
-                            time_entered_zone = game_time_sec
-                    break
+                state = active.get(p_data.get("participantID"))
+                pos = p_data.get("position")
+                if state and pos and 'x' in pos and 'z' in pos:
+                    state.on_position(game_time_sec, pos)
         elif schema == "epic_monster_kill":
-            killer_id = snapshot.get("killer")
-            if killer_id == jungler_participant_id:
-                monster_type = snapshot.get("monsterType")
-                pos = snapshot.get("position")
-                if monster_type and pos and 'x' in pos and 'z' in pos:
-                     action_camp = get_monster_details(monster_type, pos['x'], pos['z'], jungler_team_side)
-                     # ИЗМЕНЕНИЕ: Сохраняем как объект с действием и временем
-                     current_action = {"action": action_camp, "time": game_time_sec}
-                     if game_time_sec <= last_kill_event_time + 0.5: current_action = None
-                     else:
-                         last_kill_event_time = game_time_sec
-                         if not first_camp_cleared: first_camp_cleared = True
+            state = active.get(snapshot.get("killer"))
+            monster_type = snapshot.get("monsterType")
+            pos = snapshot.get("position")
+            if state and monster_type and pos and 'x' in pos and 'z' in pos:
+                state.on_monster_kill(game_time_sec, monster_type, pos)
         elif schema == "channeling_started" and snapshot.get("channelingType") == "recall":
-             p_id = snapshot.get("participantID")
-             if p_id == jungler_participant_id:
-                 # ИЗМЕНЕНИЕ: Сохраняем как объект
-                 current_action = {"action": "Recall", "time": game_time_sec}
-                 if game_time_sec <= last_recall_event_time + 1.0: current_action = None
-                 else:
-                     last_recall_event_time = game_time_sec
-                     if first_camp_cleared: first_recall_after_camp_detected = True
-
-        if current_action:
-            # ИЗМЕНЕНИЕ: Сравниваем по ключу 'action' в словаре
-            last_action_name = last_action.get("action") if isinstance(last_action, dict) else last_action
-            if not path_sequence or current_action.get("action") != last_action_name:
-                path_sequence.append(current_action)
-                last_action = current_action
-    return list(path_sequence)
+            state = active.get(snapshot.get("participantID"))
+            if state:
+                state.on_recall(game_time_sec)
+                if stop_after_first_clear and state.done:
+                    del active[state.participant_id]
+
+
+def extract_jungle_paths(livestats_content_str, game_id, game_participants_summary, tracked_puuids=None):
+    """
+    Пути лесников за один проход livestats -> {puuid: [{"action", "time"}, ...]}.
+    participantId и сторона берутся из summary; tracked_puuids - кого отслеживать
+    (по умолчанию оба лесника: participants[1] и participants[6]).
+    """
+    if not livestats_content_str or not game_participants_summary:
+        return {}
+    states = _build_jungle_states(game_participants_summary, tracked_puuids)
+    if not states:
+        return {}
+    _run_jungle_states(livestats_content_str, states, stop_after_first_clear=True)
+    return {puuid: state.path for puuid, state in states.values()}
+
+
+def extract_jungle_timelines(livestats_content_str, game_id, game_participants_summary, tracked_puuids=None):
+    """
+    Полные таймлайны лесников за всю игру (кемпы, объекты, ганки, реколы) за тот же один проход ->
+    {puuid: {"team_side", "events", "first_clear_length"}}; events[:first_clear_length] - путь first clear.
+    """
+    if not livestats_content_str or not game_participants_summary:
+        return {}
+    states = _build_jungle_states(game_participants_summary, tracked_puuids)
+    if not states:
+        return {}
+    _run_jungle_states(livestats_content_str, states, stop_after_first_clear=False)
+    return {puuid: {"team_side": state.team_side, "events": state.path, "first_clear_length": state.first_clear_length}
+            for puuid, state in states.values()}
+
 
 def save_jungle_path(conn, game_id, player_puuid, path_sequence):
     if not conn or not game_id or not player_puuid or path_sequence is None: return False
     try: path_json = json.dumps(path_sequence)
-    except TypeError as json_err: log_message(f"Error serializing path for G:{game_id}, P:{player_puuid[:8]}: {json_err}"); return False
+    except TypeError as json_err: log_message(f"Error serializing path for G:{game_id}, P:{player_puuid[:8]}: {json_err}", level="error"); return False
 
     last_updated = datetime.now(timezone.utc).isoformat()
     cursor = None
@@ -1087,10 +1191,126 @@ def save_jungle_path(conn, game_id, player_puuid, path_sequence):
             VALUES (?, ?, ?, ?)
         """, (str(game_id), str(player_puuid), path_json, last_updated))
         return True
-    except sqlite3.Error as e: log_message(f"DB Error saving path for G:{game_id}, P:{player_puuid[:8]}: {e}"); return False
+    except sqlite3.Error as e: log_message(f"DB Error saving path for G:{game_id}, P:{player_puuid[:8]}: {e}", level="error"); return False
+    finally:
+        if cursor: cursor.close()
+
+# --- Полные таймлайны лесников ---
+# Время хранится в децисекундах дельтами от предыдущего события, действия - целочисленными кодами
+JUNGLE_TIMELINE_TIME_SCALE = 10
+JUNGLE_WINDOW_SECONDS = 60
+
+
+def _get_jungle_event_codes(cursor, action_names=None):
+    """name -> code из jungle_event_codes; недостающие action_names добавляются."""
+    if action_names:
+        cursor.executemany("INSERT OR IGNORE INTO jungle_event_codes (name) VALUES (?)",
+                           [(name,) for name in sorted(set(action_names))])
+    cursor.execute("SELECT name, code FROM jungle_event_codes")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def _encode_jungle_events(events, codes_by_name):
+    """[{"action", "time"}] -> (коды, дельты в децисекундах)."""
+    codes, deltas, previous = [], [], 0
+    for event in events:
+        ticks = int(round(event["time"] * JUNGLE_TIMELINE_TIME_SCALE))
+        codes.append(codes_by_name[event["action"]])
+        deltas.append(ticks - previous)
+        previous = ticks
+    return codes, deltas
+
+
+def _decode_jungle_events(event_codes_json, event_times_json, names_by_code):
+    events, ticks = [], 0
+    for code, delta in zip(json.loads(event_codes_json), json.loads(event_times_json)):
+        ticks += delta
+        events.append({"action": names_by_code.get(code, "Unknown"), "time": ticks / JUNGLE_TIMELINE_TIME_SCALE})
+    return events
+
+
+def save_jungle_timeline(conn, game_id, player_puuid, team_side, events, first_clear_length=None):
+    """Сохраняет полный таймлайн лесника и его записи в индексе (действие, минута)."""
+    if not conn or not game_id or not player_puuid or events is None: return False
+    game_id, player_puuid = str(game_id), str(player_puuid)
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        codes_by_name = _get_jungle_event_codes(cursor, [event["action"] for event in events])
+        codes, deltas = _encode_jungle_events(events, codes_by_name)
+        cursor.execute("""
+            INSERT OR REPLACE INTO jungle_timelines
+            (game_id, player_puuid, team_side, event_codes, event_times, first_clear_length, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (game_id, player_puuid, team_side, json.dumps(codes, separators=(",", ":")),
+              json.dumps(deltas, separators=(",", ":")), first_clear_length, datetime.now(timezone.utc).isoformat()))
+
+        windows = Counter((codes_by_name[event["action"]], int(event["time"] // JUNGLE_WINDOW_SECONDS)) for event in events)
+        cursor.execute("DELETE FROM jungle_camp_windows WHERE game_id = ? AND player_puuid = ?", (game_id, player_puuid))
+        cursor.executemany("""
+            INSERT INTO jungle_camp_windows (event_code, minute, game_id, player_puuid, events)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(code, minute, game_id, player_puuid, count) for (code, minute), count in windows.items()])
+        return True
+    except (sqlite3.Error, KeyError) as e: log_message(f"DB Error saving timeline for G:{game_id}, P:{player_puuid[:8]}: {e}", level="error"); return False
     finally:
         if cursor: cursor.close()
 
+
+def load_jungle_timelines(cursor, game_ids):
+    """{(game_id, puuid): {"team_side", "events", "first_clear_length"}} для списка игр."""
+    game_ids = [str(game_id) for game_id in game_ids]
+    if not game_ids:
+        return {}
+    names_by_code = {code: name for name, code in _get_jungle_event_codes(cursor).items()}
+    timelines = {}
+    placeholders = ','.join(['?'] * len(game_ids))
+    cursor.execute(f"""
+        SELECT game_id, player_puuid, team_side, event_codes, event_times, first_clear_length
+        FROM jungle_timelines WHERE game_id IN ({placeholders})
+    """, game_ids)
+    for row in cursor.fetchall():
+        timelines[(row[0], row[1])] = {
+            "team_side": row[2],
+            "events": _decode_jungle_events(row[3], row[4], names_by_code),
+            "first_clear_length": row[5]
+        }
+    return timelines
+
+
+def get_jungle_event_names(cursor):
+    """Имена действий, встречавшихся в сохранённых таймлайнах (для фильтра JNG Clear)."""
+    return sorted(_get_jungle_event_codes(cursor))
+
+
+def find_jungle_events(cursor, action_name, start_sec=0, end_sec=None, game_ids=None):
+    """
+    Все события action_name (кемп/объект/Gank/Recall) в окне [start_sec, end_sec] ->
+    [(game_id, puuid, time_sec)]. Кандидаты берутся range-сканом индекса по минутам,
+    точное время проверяется по декодированному таймлайну.
+    """
+    codes_by_name = _get_jungle_event_codes(cursor)
+    if action_name not in codes_by_name:
+        return []
+    params = [codes_by_name[action_name], int(start_sec // JUNGLE_WINDOW_SECONDS)]
+    minute_sql = "minute >= ?"
+    if end_sec is not None:
+        minute_sql += " AND minute <= ?"
+        params.append(int(end_sec // JUNGLE_WINDOW_SECONDS))
+    cursor.execute(f"SELECT DISTINCT game_id FROM jungle_camp_windows WHERE event_code = ? AND {minute_sql}", params)
+    candidate_games = {row[0] for row in cursor.fetchall()}
+    if game_ids is not None:
+        candidate_games &= {str(game_id) for game_id in game_ids}
+
+    matches = []
+    for (game_id, puuid), timeline in load_jungle_timelines(cursor, sorted(candidate_games)).items():
+        for event in timeline["events"]:
+            if event["action"] == action_name and event["time"] >= start_sec and (end_sec is None or event["time"] <= end_sec):
+                matches.append((game_id, puuid, event["time"]))
+    matches.sort(key=lambda match: (match[0], match[2]))
+    return matches
+
+
 def extract_first_ward_data(livestats_content_str, game_id, game_participants_summary):
     if not livestats_content_str or not game_participants_summary: return []
     pid_to_details = {}
@@ -1104,7 +1324,7 @@ def extract_first_ward_data(livestats_content_str, game_id, game_participants_su
 
     first_wards_by_puuid = {}
     try: lines = livestats_content_str.strip().split('\n')
-    except Exception as split_err: log_message(f"[FirstWards-ERROR] G:{game_id}: Error splitting lines: {split_err}"); return []
+    except Exception as split_err: log_message(f"[FirstWards-ERROR] G:{game_id}: Error splitting lines: {split_err}", level="error"); return []
 
     for line in lines:
         if not line.strip(): continue
@@ -1132,7 +1352,7 @@ def extract_first_ward_data(livestats_content_str, game_id, game_participants_su
                         "pos_x": int(position_data['x']), "pos_z": int(position_data['z']),
                     }
     
-    if not first_wards_by_puuid: log_message(f"[FirstWards] G:{game_id}: No real first ward events found.")
+    if not first_wards_by_puuid: log_message("[FirstWards] G:%s: No real first ward events found.", game_id, level="debug")
     return list(first_wards_by_puuid.values())
 
 def save_first_ward_data(conn, game_id, first_wards_list):
@@ -1156,11 +1376,11 @@ def save_first_ward_data(conn, game_id, first_wards_list):
                     ward_data.get('pos_x'), ward_data.get('pos_z'), last_updated
                 ))
                 if cursor.rowcount > 0: saved_count +=1
-            except sqlite3.Error as e_item: log_message(f"[DB Ward Save] G:{game_id} PUID:{ward_data.get('player_puuid','N/A')[:6]}: DB error: {e_item}")
-            except KeyError as ke: log_message(f"[DB Ward Save] G:{game_id} PUID:{ward_data.get('player_puuid','N/A')[:6]}: Missing key {ke} in ward_data: {ward_data}")
-        if saved_count > 0: log_message(f"[DB Ward Save] G:{game_id}: Saved/Replaced {saved_count} first ward entries.")
+            except sqlite3.Error as e_item: log_message("[DB Ward Save] G:%s PUID:%s: DB error: %s", game_id, ward_data.get('player_puuid','N/A')[:6], e_item, level="error", sample="first_ward_save_db")
+            except KeyError as ke: log_message("[DB Ward Save] G:%s PUID:%s: Missing key %s in ward_data: %s", game_id, ward_data.get('player_puuid','N/A')[:6], ke, ward_data, level="warning", sample="first_ward_save_key")
+        if saved_count > 0: log_message("[DB Ward Save] G:%s: Saved/Replaced %d first ward entries.", game_id, saved_count, level="debug")
         return True
-    except sqlite3.Error as e: log_message(f"[DB Ward Save] G:{game_id}: General database error: {e}"); return False
+    except sqlite3.Error as e: log_message(f"[DB Ward Save] G:{game_id}: General database error: {e}", level="error"); return False
     finally:
         if cursor: cursor.close()
 
@@ -1173,14 +1393,16 @@ def extract_all_ward_data(livestats_content_str, game_id, game_participants_summ
         puuid = p_summary.get("puuid")
         champ_name = p_summary.get("championName")
         player_name_display = p_summary.get("riotIdGameName", p_summary.get("summonerName", "UnknownPlayer"))
+        team_id = p_summary.get("teamId") or (100 if pid is not None and pid <= 5 else 200)
         if pid is not None and puuid is not None:
-            pid_to_details[pid] = {"puuid": puuid, "championName": champ_name or "UnknownChamp", "playerName": player_name_display}
+            pid_to_details[pid] = {"puuid": puuid, "championName": champ_name or "UnknownChamp", "playerName": player_name_display,
+                                   "teamSide": "Blue" if team_id == 100 else "Red"}
 
     all_wards = []
     try:
         lines = livestats_content_str.strip().split('\n')
     except Exception as split_err:
-        log_message(f"[AllWards-ERROR] G:{game_id}: Error splitting lines: {split_err}")
+        log_message(f"[AllWards-ERROR] G:{game_id}: Error splitting lines: {split_err}", level="error")
         return []
 
     for line in lines:
@@ -1206,9 +1428,10 @@ def extract_all_ward_data(livestats_content_str, game_id, game_participants_summ
                     "player_name": participant_details["playerName"], "champion_name": participant_details["championName"],
                     "ward_type": ward_type_mapped, "timestamp_seconds": game_time_ms / 1000.0,
                     "pos_x": int(position_data['x']), "pos_z": int(position_data['z']),
+                    "team_side": participant_details["teamSide"],
                 })
     
-    log_message(f"[AllWards] G:{game_id}: Extracted {len(all_wards)} total REAL ward placement events.")
+    log_message("[AllWards] G:%s: Extracted %d total REAL ward placement events.", game_id, len(all_wards), level="debug")
     return all_wards
 
 
@@ -1223,7 +1446,7 @@ def save_all_ward_data(conn, game_id, all_wards_list):
         cursor.execute("DELETE FROM all_wards_data WHERE game_id = ?", (str(game_id),))
         
         if not all_wards_list:
-            log_message(f"[DB AllWards Save] G:{game_id}: No new wards to save. Old entries (if any) deleted.")
+            log_message("[DB AllWards Save] G:%s: No new wards to save. Old entries (if any) deleted.", game_id, level="debug")
             return True
 
         last_updated = datetime.now(timezone.utc).isoformat()
@@ -1233,21 +1456,23 @@ def save_all_ward_data(conn, game_id, all_wards_list):
                 str(ward['game_id']), str(ward['player_puuid']), ward.get('participant_id'),
                 str(ward.get('player_name', 'Unknown Player')), str(ward.get('champion_name', 'Unknown')),
                 str(ward.get('ward_type', 'Unknown Ward')), float(ward['timestamp_seconds']),
-                ward.get('pos_x'), ward.get('pos_z'), last_updated
+                ward.get('pos_x'), ward.get('pos_z'), last_updated,
+                int(float(ward['timestamp_seconds']) // WARD_BUCKET_SECONDS),
+                ward.get('team_side') or ('Blue' if (ward.get('participant_id') or 0) <= 5 else 'Red')
             ) for ward in all_wards_list
         ]
 
         cursor.executemany("""
             INSERT INTO all_wards_data
             (game_id, player_puuid, participant_id, player_name, champion_name, ward_type,
-             timestamp_seconds, pos_x, pos_z, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             timestamp_seconds, pos_x, pos_z, last_updated, time_bucket, team_side)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, wards_to_insert)
         
-        log_message(f"[DB AllWards Save] G:{game_id}: Saved {cursor.rowcount} new ward entries.")
+        log_message("[DB AllWards Save] G:%s: Saved %d new ward entries.", game_id, cursor.rowcount, level="debug")
         return True
     except sqlite3.Error as e:
-        log_message(f"[DB AllWards Save] G:{game_id}: General database error: {e}")
+        log_message(f"[DB AllWards Save] G:{game_id}: General database error: {e}", level="error")
         return False
     finally:
         if cursor: cursor.close()
@@ -1283,7 +1508,7 @@ def download_grid_end_state_data(series_id):
     end_state_data = get_rest_request(endpoint, expected_type='json')
     return end_state_data
 
-def parse_and_store_tournament_game(cursor, summary_data, series_info, draft_actions, tournament_name="HLL"):
+def parse_and_store_tournament_game(cursor, summary_data, series_info, draft_actions, tournament_name="HLL", tournament_id=TARGET_TOURNAMENT_ID):
     game_id = None
     try:
         game_id = summary_data.get("esportsGameId") or summary_data.get("gameId")
@@ -1293,7 +1518,7 @@ def parse_and_store_tournament_game(cursor, summary_data, series_info, draft_act
         participants = summary_data.get("participants", [])
         teams_data = summary_data.get("teams", [])
         if not participants or len(participants) != 10 or not teams_data or len(teams_data) != 2:
-            log_message(f"T_G:{game_id} Invalid participants/teams count."); return None
+            log_message(f"T_G:{game_id} Invalid participants/teams count.", level="warning"); return None
 
         blue_team_tag = UNKNOWN_BLUE_TAG; red_team_tag = UNKNOWN_RED_TAG
         if len(participants) > 0 and 'riotIdGameName' in participants[0]:
@@ -1336,6 +1561,7 @@ def parse_and_store_tournament_game(cursor, summary_data, series_info, draft_act
         row_dict = {sql_col: None for sql_col in sql_column_names}
 
         row_dict["Tournament_Name"] = str(tournament_name)
+        row_dict["Tournament_ID"] = str(tournament_id) if tournament_id else None
         row_dict["Stage_Name"] = str(series_info.get("stage", {}).get("name", "N/A")) if series_info and isinstance(series_info, dict) else "N/A"
         row_dict["Date"] = str(date_str) if date_str != "N/A" else None
         row_dict["Patch"] = str(patch_str) if patch_str != "N/A" else None
@@ -1400,38 +1626,79 @@ def parse_and_store_tournament_game(cursor, summary_data, series_info, draft_act
         data_tuple = tuple(data_tuple_list)
 
         try:
+            invalidate_overall_snapshots(cursor, game_id, tournament_id, row_dict["Patch"])
             cursor.execute(insert_sql, data_tuple)
+            save_draft_actions(cursor, game_id, {
+                i: tuple(row_dict[f"Draft_Action_{i}_{field}"] for field in ("Type", "TeamID", "ChampID", "ChampName"))
+                for i in range(1, 21)
+            })
+            save_champion_games(cursor, row_dict)
+            save_team_tags(cursor, [blue_team_tag, red_team_tag], row_dict["Date"], tournament_id=tournament_id)
             return game_id
         except sqlite3.Error as e:
-            log_message(f"DB Insert/Replace Error T_G:{game_id}: {e}")
+            log_message(f"DB Insert/Replace Error T_G:{game_id}: {e}", level="error")
             return None
 
     except Exception as e:
         series_id_log = series_info.get('id', 'N/A') if isinstance(series_info, dict) else 'N/A'
-        log_message(f"Error parsing summary/draft G:{game_id or 'Unknown'} S:{series_id_log}: {e}")
-        log_message(traceback.format_exc())
+        log_message(f"Error parsing summary/draft G:{game_id or 'Unknown'} S:{series_id_log}: {e}", level="error")
+        log_message(traceback.format_exc(), level="error")
         return None
 
 # lol_app_LTA_1.4v/tournament_logic.py
 
-def fetch_and_store_tournament_data():
+@profiled_job("tournament")
+def fetch_and_store_tournament_data(tournament_id=None, tournament_name=None):
     """
     Главная функция для сбора и сохранения всех данных по турниру, включая
     информацию об играх, пути лесников, варды, и события по объектам.
+    Без tournament_id обновляются все турниры из конфига (TOURNAMENTS), кроме архивных.
     """
-    tournament_id = TARGET_TOURNAMENT_ID
-    tournament_name = TARGET_TOURNAMENT_NAME_FOR_DB
+    if tournament_id is None:
+        total_games = 0
+        for configured_id, configured_name in TOURNAMENTS:
+            result = fetch_and_store_tournament_data(configured_id, configured_name)
+            if result < 0:
+                return result
+            total_games += result
+        return total_games
+
+    tournament_id = str(tournament_id)
+    tournament_name = tournament_name or tournament_id
+    conn = get_db_connection()
+    if not conn:
+        log_message("Failed to connect to database.", level="error")
+        return -1
+    # Прогон пишется в ingest_runs (API/парсинг/запись/commit по этапам), отчёт - /ingest/runs.
+    # Соединение закрывается до сохранения прогона: незакоммиченная транзакция после ошибки держала бы lock
+    with ingest_run("tournament", tournament_id) as run:
+        try:
+            games = _fetch_and_store_single_tournament(conn, tournament_id, tournament_name)
+        finally:
+            conn.close()
+        if run is not None:
+            run.games = max(games, 0)
+        return games
+
+
+def _fetch_and_store_single_tournament(conn, tournament_id, tournament_name):
+    if get_tournament_archive_path(conn, tournament_id):
+        log_message(f"Tournament {tournament_name} (ID: {tournament_id}) is archived, skipping update.")
+        conn.close()
+        return 0
+    cursor = conn.cursor()
+
     log_message(f"Starting data fetch for tournament: {tournament_name} (ID: {tournament_id})")
     matches = get_tournament_matches(tournament_id)
     if not matches:
         log_message("No matches found for the tournament.")
+        conn.close()
         return 0
-
-    conn = get_db_connection()
-    if not conn:
-        log_message("Failed to connect to database.")
-        return -1
-    cursor = conn.cursor()
+    try:
+        save_tournament(cursor, tournament_id, tournament_name)
+        conn.commit()
+    except sqlite3.Error as e:
+        log_message(f"Failed to register tournament {tournament_id}: {e}", level="error")
 
     added_or_updated_games_count = 0
     processed_paths_count = 0
@@ -1479,16 +1746,19 @@ def fetch_and_store_tournament_data():
                         current_game_draft_actions = game_state.get("draftActions", [])
                         break
 
-            game_info_saved_id = parse_and_store_tournament_game(cursor, summary_data, series_info, current_game_draft_actions, tournament_name)
+            with track_writes(conn, "tournament_games"):
+                game_info_saved_id = parse_and_store_tournament_game(cursor, summary_data, series_info, current_game_draft_actions, tournament_name, tournament_id)
             if not game_info_saved_id:
                 time.sleep(API_REQUEST_DELAY / 2)
                 continue
             else:
                 added_or_updated_games_count += 1
                 try:
-                    conn.commit()
+                    bump_data_generation(cursor)
+                    with track_commit():
+                        conn.commit()
                 except sqlite3.Error as e:
-                    log_message(f"DB Commit Error G:{game_id}: {e}")
+                    log_message(f"DB Commit Error G:{game_id}: {e}", level="error")
                     conn.rollback()
 
             livestats_content = download_riot_livestats_data(series_id, sequence_number)
@@ -1498,56 +1768,90 @@ def fetch_and_store_tournament_data():
                 game_participants_summary = summary_data.get('participants', [])
 
                 # <<< ИСПРАВЛЕНИЕ: Передаем 'game_participants_summary' в функцию >>>
-                objective_events = extract_objective_events(livestats_content, game_id, game_participants_summary)
+                with track_parse("objective_events"):
+                    objective_events = extract_objective_events(livestats_content, game_id, game_participants_summary)
                 if objective_events:
-                    if save_objective_events(conn, game_id, objective_events):
+                    with track_writes(conn, "objective_events"):
+                        objectives_saved = save_objective_events(conn, game_id, objective_events)
+                    if objectives_saved:
                         processed_objectives_count += len(objective_events)
 
-                timeline_positions = extract_player_positions_timeline(livestats_content, game_id)
-                if timeline_positions and save_player_positions_timeline(conn, game_id, timeline_positions):
-                    processed_timeline_count += len(timeline_positions)
-
-                blue_jungler_puuid = game_participants_summary[1].get("puuid") if len(game_participants_summary) > 1 else None
-                red_jungler_puuid = game_participants_summary[6].get("puuid") if len(game_participants_summary) > 6 else None
+                with track_parse("positions_timeline"):
+                    timeline_positions = extract_player_positions_timeline(livestats_content, game_id)
+                if timeline_positions:
+                    with track_writes(conn, "player_positions_timeline"):
+                        timeline_saved = save_player_positions_timeline(conn, game_id, timeline_positions)
+                    if timeline_saved:
+                        processed_timeline_count += len(timeline_positions)
 
                 paths_saved_this_game = 0
-                if blue_jungler_puuid:
-                    blue_path = process_livestats_content(conn, livestats_content, blue_jungler_puuid, game_id)
-                    if blue_path and save_jungle_path(conn, game_id, blue_jungler_puuid, blue_path):
-                        paths_saved_this_game += 1
-                if red_jungler_puuid:
-                    red_path = process_livestats_content(conn, livestats_content, red_jungler_puuid, game_id)
-                    if red_path and save_jungle_path(conn, game_id, red_jungler_puuid, red_path):
-                        paths_saved_this_game += 1
+                with track_parse("jungle_timelines"):
+                    jungle_timelines = extract_jungle_timelines(livestats_content, game_id, game_participants_summary)
+                for jungler_puuid, timeline in jungle_timelines.items():
+                    if timeline["events"]:
+                        with track_writes(conn, "jungle_timelines"):
+                            save_jungle_timeline(conn, game_id, jungler_puuid, timeline["team_side"],
+                                                 timeline["events"], timeline["first_clear_length"])
+                    # Путь first clear - префикс полного таймлайна (тот же проход по livestats)
+                    jungle_path = timeline["events"][:timeline["first_clear_length"]]
+                    if jungle_path:
+                        with track_writes(conn, "jungle_pathing"):
+                            path_saved = save_jungle_path(conn, game_id, jungler_puuid, jungle_path)
+                        if path_saved:
+                            paths_saved_this_game += 1
                 processed_paths_count += paths_saved_this_game
 
-                positions_data = extract_player_positions(livestats_content, game_id, TARGET_POSITION_TIMESTAMPS_SEC, TIMESTAMP_TOLERANCE_SEC)
+                with track_parse("position_snapshots"):
+                    positions_data = extract_player_positions(livestats_content, game_id, TARGET_POSITION_TIMESTAMPS_SEC, TIMESTAMP_TOLERANCE_SEC)
                 snapshots_saved_this_game = 0
                 if positions_data:
-                    for ts_sec, pos_list in positions_data.items():
-                        if pos_list and save_position_snapshot(conn, game_id, ts_sec, pos_list):
-                            snapshots_saved_this_game += 1
+                    with track_writes(conn, "player_positions_snapshots"):
+                        for ts_sec, pos_list in positions_data.items():
+                            if pos_list and save_position_snapshot(conn, game_id, ts_sec, pos_list):
+                                snapshots_saved_this_game += 1
                 if snapshots_saved_this_game > 0:
                     processed_position_snapshots_count += snapshots_saved_this_game
 
-                first_wards_extracted = extract_first_ward_data(livestats_content, game_id, game_participants_summary)
-                if first_wards_extracted and save_first_ward_data(conn, game_id, first_wards_extracted):
-                    processed_first_wards_count += len(first_wards_extracted)
-                
-                all_wards_extracted = extract_all_ward_data(livestats_content, game_id, game_participants_summary)
-                if all_wards_extracted and save_all_ward_data(conn, game_id, all_wards_extracted):
-                    processed_all_wards_count += len(all_wards_extracted)
+                with track_parse("first_wards"):
+                    first_wards_extracted = extract_first_ward_data(livestats_content, game_id, game_participants_summary)
+                if first_wards_extracted:
+                    with track_writes(conn, "first_wards_data"):
+                        first_wards_saved = save_first_ward_data(conn, game_id, first_wards_extracted)
+                    if first_wards_saved:
+                        processed_first_wards_count += len(first_wards_extracted)
+
+                with track_parse("all_wards"):
+                    all_wards_extracted = extract_all_ward_data(livestats_content, game_id, game_participants_summary)
+                if all_wards_extracted:
+                    with track_writes(conn, "all_wards_data"):
+                        all_wards_saved = save_all_ward_data(conn, game_id, all_wards_extracted)
+                    if all_wards_saved:
+                        processed_all_wards_count += len(all_wards_extracted)
 
                 try:
-                    conn.commit()
+                    bump_data_generation(cursor)
+                    with track_commit():
+                        conn.commit()
                 except sqlite3.Error as e_commit_ls:
-                    log_message(f"DB Commit Error LiveStats G:{game_id}: {e_commit_ls}")
+                    log_message(f"DB Commit Error LiveStats G:{game_id}: {e_commit_ls}", level="error")
                     conn.rollback()
         time.sleep(API_REQUEST_DELAY)
 
-    log_message(f"Tournament data update finished. Games: {added_or_updated_games_count}, Objectives: {processed_objectives_count}, Paths: {processed_paths_count}, PosSnapshots: {processed_position_snapshots_count}, FirstWards: {processed_first_wards_count}, AllWards: {processed_all_wards_count}, TimelinePoints: {processed_timeline_count}.")
+    # Снапшоты общего обзора: пересчёт только патчей, где появились или изменились игры
+    # (и тех, что ещё не сохранены - игры до появления снапшотов); чтение их не пишет
+    try:
+        with track_writes(conn, "overall_summary_snapshots"):
+            refresh_overall_snapshots(conn, tournament_id)
+        with track_commit():
+            conn.commit()
+    except sqlite3.Error as e:
+        log_message(f"Failed to refresh overall summary snapshots for {tournament_id}: {e}", level="error")
+        conn.rollback()
+
+    log_message(f"Tournament {tournament_id} data update finished. Games: {added_or_updated_games_count}, Objectives: {processed_objectives_count}, Paths: {processed_paths_count}, PosSnapshots: {processed_position_snapshots_count}, FirstWards: {processed_first_wards_count}, AllWards: {processed_all_wards_count}, TimelinePoints: {processed_timeline_count}.")
     conn.close()
     return added_or_updated_games_count
+@profiled_job("wards")
 def fetch_and_store_ward_data():
     """
     Проходит по всем существующим играм в БД, скачивает для них livestats
@@ -1556,7 +1860,18 @@ def fetch_and_store_ward_data():
     log_message("Starting dedicated ward data update process...")
     conn = get_db_connection()
     if not conn:
-        log_message("Ward Update: DB Connection failed."); return -1
+        log_message("Ward Update: DB Connection failed.", level="error"); return -1
+    with ingest_run("wards") as run:
+        try:
+            games = _fetch_and_store_all_ward_data(conn)
+        finally:
+            conn.close()
+        if run is not None:
+            run.games = max(games, 0)
+        return games
+
+
+def _fetch_and_store_all_ward_data(conn):
     
     games_to_process = []
     try:
@@ -1565,7 +1880,7 @@ def fetch_and_store_ward_data():
         games_to_process = cursor.fetchall()
         log_message(f"Found {len(games_to_process)} games in DB to check for ward data.")
     except sqlite3.Error as e:
-        log_message(f"Ward Update: Error fetching games from DB: {e}")
+        log_message(f"Ward Update: Error fetching games from DB: {e}", level="error")
         conn.close()
         return -1
 
@@ -1583,7 +1898,7 @@ def fetch_and_store_ward_data():
         summary_data = download_riot_summary_data(series_id, sequence_number)
         time.sleep(API_REQUEST_DELAY / 2)
         if not summary_data:
-            log_message(f"Ward Update G:{game_id}: Could not download summary data. Skipping.")
+            log_message(f"Ward Update G:{game_id}: Could not download summary data. Skipping.", level="warning")
             continue
 
         livestats_content = download_riot_livestats_data(series_id, sequence_number)
@@ -1591,29 +1906,106 @@ def fetch_and_store_ward_data():
         
         if livestats_content:
             game_participants_summary = summary_data.get('participants', [])
-            all_wards_extracted = extract_all_ward_data(livestats_content, game_id, game_participants_summary)
-            
-            if save_all_ward_data(conn, game_id, all_wards_extracted):
+            with track_parse("all_wards"):
+                all_wards_extracted = extract_all_ward_data(livestats_content, game_id, game_participants_summary)
+
+            with track_writes(conn, "all_wards_data"):
+                all_wards_saved = save_all_ward_data(conn, game_id, all_wards_extracted)
+            if all_wards_saved:
                 total_wards_saved += len(all_wards_extracted)
             
             try:
-                conn.commit()
+                bump_data_generation(conn)
+                with track_commit():
+                    conn.commit()
                 processed_games_count += 1
                 if processed_games_count % 10 == 0:
                     log_message(f"Ward Update: Processed {processed_games_count}/{len(games_to_process)} games...")
             except sqlite3.Error as e_commit:
-                log_message(f"Ward Update G:{game_id}: DB Commit Error: {e_commit}")
+                log_message(f"Ward Update G:{game_id}: DB Commit Error: {e_commit}", level="error")
                 conn.rollback()
 
     conn.close()
     log_message(f"Ward data update finished. Processed {processed_games_count} games, saved/updated a total of {total_wards_saved} ward entries.")
     return processed_games_count
-    
-def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
+
+# --- Team registry ---
+# Список команд материализуется в таблице tournament_teams при загрузке игр; карты
+# tag<->full name строятся один раз на турнир и перестраиваются только при смене data generation.
+_EXCLUDED_TEAM_TAGS = {UNKNOWN_BLUE_TAG, UNKNOWN_RED_TAG, "Blue Team", "Red Team"}
+_team_registry_cache = {"generation": None, "by_tournament": {}}
+_EMPTY_TEAM_REGISTRY = {"tags": frozenset(), "display": [], "full_to_tag": {}}
+
+
+def resolve_tournament_arg(tournament_arg):
+    """?tournament=<id> -> tournament_id: без параметра - турнир по умолчанию, 'all' - все живые турниры (None)."""
+    if not tournament_arg:
+        return TARGET_TOURNAMENT_ID
+    return None if tournament_arg == "all" else str(tournament_arg)
+
+
+def tournament_scope_sql(tournament_id):
+    """(SQL-условие, параметры) для фильтра tournament_games по турниру (индекс по Tournament_ID)."""
+    if not tournament_id:
+        return "", ()
+    return ' AND "Tournament_ID" = ?', (str(tournament_id),)
+
+
+def _load_team_registry(conn, tournament_id=None):
+    generation = get_data_generation(conn)
+    if _team_registry_cache["generation"] != generation:
+        _team_registry_cache["generation"] = generation
+        _team_registry_cache["by_tournament"] = {}
+    cache_key = str(tournament_id) if tournament_id else None
+    registry = _team_registry_cache["by_tournament"].get(cache_key)
+    if registry is not None:
+        return registry
+    try:
+        if cache_key:
+            rows = conn.execute("SELECT team_tag FROM tournament_teams WHERE tournament_id = ?", (cache_key,)).fetchall()
+        else:
+            # Все живые турниры: архивные команды не попадают в список
+            rows = conn.execute("""
+                SELECT DISTINCT team_tag FROM tournament_teams
+                WHERE tournament_id NOT IN (SELECT tournament_id FROM tournaments WHERE archive_file IS NOT NULL)
+            """).fetchall()
+    except sqlite3.Error as e:
+        log_message(f"Team registry: failed to read teams table: {e}", level="error")
+        return _EMPTY_TEAM_REGISTRY
+    tags = frozenset(row[0] for row in rows if row[0] and row[0] not in _EXCLUDED_TEAM_TAGS)
+    full_to_tag = {}
+    for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
+        full_to_tag.setdefault(full_name, tag)
+    for tag in tags:
+        full_to_tag.setdefault(tag, tag)
+    registry = {
+        "tags": tags,
+        "display": sorted({TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in tags}),
+        "full_to_tag": full_to_tag,
+    }
+    _team_registry_cache["by_tournament"][cache_key] = registry
+    return registry
+
+
+def get_team_registry(conn, tournament_id=None):
+    """Возвращает (all_teams_display, all_teams_tags) из кэша реестра команд (по турниру или по всем)."""
+    registry = _load_team_registry(conn, tournament_id)
+    return list(registry["display"]), registry["tags"]
+
+
+def resolve_team_tag(conn, selected_team_full_name, tournament_id=None):
+    """Full name (или тег) -> тег команды; None, если команда не найдена."""
+    if not selected_team_full_name:
+        return None
+    return _load_team_registry(conn, tournament_id)["full_to_tag"].get(selected_team_full_name)
+
+
+@traced("aggregate")
+def aggregate_tournament_data(selected_team_full_name=None, side_filter="all", tournament_id=None):
     is_overall_view = not selected_team_full_name
     view_type_log = "Overall Tournament" if is_overall_view else f"Team: {selected_team_full_name}"
 
-    conn = get_db_connection()
+    conn = get_db_connection(tournament_id)
     if not conn: return [], {"error": "Database connection failed"}, {}, []
 
     all_teams_display = []
@@ -1622,108 +2014,95 @@ def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
     all_game_details_list = []
     selected_team_tag = None
 
-    duo_roles_config = { ("TOP", "JUNGLE"): "TOP-JUNGLE", ("JUNGLE", "MIDDLE"): "JUNGLE-MID", ("BOTTOM", "UTILITY"): "ADC-SUPPORT" }
     role_to_abbr = {"TOP": "TOP", "JUNGLE": "JGL", "MIDDLE": "MID", "BOTTOM": "BOT", "UTILITY": "SUP"}
     role_map_display = {"TOP": "Top", "JUNGLE": "Jungle", "MIDDLE": "Mid", "BOTTOM": "ADC", "UTILITY": "Support"}
     roles_for_pattern = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
     valid_side_filters = ["blue", "red"];
     filter_side_norm = side_filter.lower() if side_filter.lower() in valid_side_filters else 'all'
 
-    def format_bans_agg(ban_dict_input, champ_data, icon_size_px):
+    def format_bans_agg(ban_dict_input, champ_data, icon_size_px, sort_key=lambda x: -x['count']):
         formatted = []
         if not champ_data or 'id_map' not in champ_data: return formatted
-        for ban_id, count in sorted(ban_dict_input.items(), key=lambda item: item[1], reverse=True):
+        for ban_id, count in ban_dict_input.items():
              ban_id_str = str(ban_id);
              champ_name = champ_data.get('id_map',{}).get(ban_id_str, f"ID:{ban_id_str}");
              icon_html = get_champion_icon_html(ban_id_str, champ_data, width=icon_size_px, height=icon_size_px);
              formatted.append({'champion': champ_name, 'count': count, 'icon_html': icon_html});
+        formatted.sort(key=sort_key)
         return formatted
 
     cursor = None
     try:
         cursor = conn.cursor()
-        cursor.execute(f"""SELECT DISTINCT Blue_Team_Name as team_tag FROM tournament_games WHERE Blue_Team_Name NOT IN ('{UNKNOWN_BLUE_TAG}', 'Blue Team') UNION SELECT DISTINCT Red_Team_Name as team_tag FROM tournament_games WHERE Red_Team_Name NOT IN ('{UNKNOWN_RED_TAG}', 'Red Team')""")
-        all_teams_tags = {row['team_tag'] for row in cursor.fetchall() if row['team_tag']}
-        all_teams_display = sorted(list(set( [TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in all_teams_tags] )))
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
 
         if not is_overall_view:
-            for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
-                if full_name == selected_team_full_name: selected_team_tag = tag; break
-            if not selected_team_tag and selected_team_full_name in all_teams_tags: selected_team_tag = selected_team_full_name
+            selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
             if not selected_team_tag:
                 stats["error"] = "Team tag not found."; conn.close(); return all_teams_display, stats, {}, []
 
-        sql_query_games = "SELECT * FROM tournament_games ORDER BY \"Date\" DESC, \"Series_ID\" ASC, \"Sequence_Number\" ASC"
-        params_games = []
-        if not is_overall_view:
-             sql_query_games = "SELECT * FROM tournament_games WHERE Blue_Team_Name = ? OR Red_Team_Name = ? ORDER BY \"Date\" DESC, \"Series_ID\" ASC, \"Sequence_Number\" ASC"
-             params_games = (selected_team_tag, selected_team_tag)
-        cursor.execute(sql_query_games, params_games)
-        games_rows = cursor.fetchall();
-
-        if not games_rows:
+        if is_overall_view:
+            # Сумма снапшотов по патчам; игры перечитываются только для изменившихся патчей
+            overall = get_overall_summary(conn, tournament_id)
+            has_games = overall["games"] > 0
+        else:
+            draft_table = get_draft_table(conn, tournament_id)
+            # Карточкам матчей нужны только эти колонки; драфт - из draft_actions
+            card_columns = ["Game_ID", "Series_ID", "Sequence_Number", "Blue_Team_Name", "Red_Team_Name", "Winner_Side",
+                            "Blue_JGL_Champ", "Red_JGL_Champ",
+                            *[f"{side}_{role_to_abbr[role]}_PUUID" for side in ("Blue", "Red") for role in ROLE_ORDER_FOR_SHEET]]
+            scope_sql, scope_params = tournament_scope_sql(tournament_id)
+            team_params = [selected_team_tag, selected_team_tag, *scope_params]
+            cursor.execute(f"SELECT {', '.join(card_columns)} FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql} ORDER BY \"Date\" DESC, \"Series_ID\" ASC, \"Sequence_Number\" ASC",
+                           team_params)
+            games_rows = cursor.fetchall()
+            has_games = bool(games_rows)
+
+        if not has_games:
             stats["message"] = "No games found."; conn.close(); return all_teams_display, stats, grouped_matches, all_game_details_list
 
         champion_data = get_champion_data()
         if not champion_data or not champion_data.get('id_map'):
              stats["error"] = "Failed to load champion data for icons."
-        
+
+        def format_duos(duo_counts, sort_key=lambda x: -x['games']):
+            duo_picks = {}
+            for duo_title, entries in duo_counts.items():
+                duo_stats = [{
+                    "champ1": champ1, "champ2": champ2,
+                    "icon1_html": get_champion_icon_html(champ1, champion_data, ICON_SIZE_DUOS, ICON_SIZE_DUOS),
+                    "icon2_html": get_champion_icon_html(champ2, champion_data, ICON_SIZE_DUOS, ICON_SIZE_DUOS),
+                    "games": games, "win_rate": round(wins / games * 100, 1)
+                } for champ1, champ2, games, wins in entries]
+                duo_stats.sort(key=sort_key)
+                duo_picks[duo_title] = {"title": duo_title, "stats": duo_stats}
+            return duo_picks
+
         if is_overall_view:
-            # Логика для общего обзора турнира (без изменений)
+            # Счётчики драфта - снапшоты draft_analytics, здесь только форматирование.
+            # Сумма по патчам не сохраняет порядок первого появления: равные счётчики - по имени
+            stage("format")
+            valid_games_count_overall = overall["total_games"]
             stats.update({
-                "overall_total_games": 0, "overall_blue_wins": 0, "overall_red_wins": 0,
-                "overall_champ_stats": defaultdict(lambda: {'picks': 0, 'bans': 0, 'wins_when_picked': 0}),
-                "overall_picks_by_role": defaultdict(lambda: defaultdict(lambda: {'picks': 0, 'wins': 0})),
-                "overall_bans_ids": defaultdict(int),
-                "temp_overall_duo_stats": defaultdict(lambda: {'games': 0, 'wins': 0, 'roles': None}),
-                "overall_bans_formatted": [], "overall_champ_stats_formatted": [],
-                "overall_picks_by_role_formatted": defaultdict(list),
-                "overall_duo_picks": defaultdict(lambda: {"title": "", "stats": []})
+                "overall_total_games": valid_games_count_overall,
+                "overall_blue_wins": overall["blue_wins"],
+                "overall_red_wins": valid_games_count_overall - overall["blue_wins"],
+                "overall_bans_formatted": format_bans_agg(overall["bans"], champion_data, ICON_SIZE_PICKS_BANS,
+                                                          sort_key=lambda x: (-x['count'], x['champion'])),
+                "overall_picks_by_role_formatted": {},
+                "overall_duo_picks": format_duos(overall["duos"], sort_key=lambda x: (-x['games'], x['champ1'], x['champ2']))
             })
-            valid_games_count_overall = 0
-            for game_row in games_rows:
-                 game = dict(game_row); winner_side = game.get("Winner_Side");
-                 if winner_side not in ["Blue", "Red"]: continue
-                 valid_games_count_overall +=1
-                 if winner_side == "Blue": stats["overall_blue_wins"] += 1
-
-                 game_picks_by_role = {"Blue": {}, "Red": {}}
-                 for side in ["Blue", "Red"]:
-                     is_win_for_side = (side == winner_side)
-                     for role in ROLE_ORDER_FOR_SHEET:
-                         role_abbr = role_to_abbr.get(role)
-                         if not role_abbr: continue
-                         champ = game.get(f"{side}_{role_abbr}_Champ")
-                         if champ and champ != "N/A":
-                              stats["overall_champ_stats"][champ]['picks'] += 1
-                              if is_win_for_side: stats["overall_champ_stats"][champ]['wins_when_picked'] += 1
-                              stats["overall_picks_by_role"][role][champ]['picks'] +=1
-                              if is_win_for_side: stats["overall_picks_by_role"][role][champ]['wins'] +=1
-                              game_picks_by_role[side][role] = champ
-                 for side in ["Blue", "Red"]:
-                     for i in range(1, 6):
-                         ban_id = game.get(f"{side}_Ban_{i}_ID")
-                         if ban_id and ban_id != "N/A":
-                             stats["overall_bans_ids"][ban_id] += 1
-                             ban_champ_name = champion_data.get('id_map', {}).get(str(ban_id))
-                             if ban_champ_name: stats["overall_champ_stats"][ban_champ_name]['bans'] += 1
-                 for side in ["Blue", "Red"]:
-                     is_win_for_side = (side == winner_side)
-                     side_picks = game_picks_by_role[side]
-                     for (r1_cfg, r2_cfg), duo_title in duo_roles_config.items():
-                         champ1 = side_picks.get(r1_cfg); champ2 = side_picks.get(r2_cfg)
-                         if champ1 and champ2:
-                             duo_key = tuple(sorted([(r1_cfg, champ1), (r2_cfg, champ2)]))
-                             stats["temp_overall_duo_stats"][duo_key]['games'] +=1
-                             if is_win_for_side: stats["temp_overall_duo_stats"][duo_key]['wins'] +=1
-                             if stats["temp_overall_duo_stats"][duo_key]['roles'] is None: stats["temp_overall_duo_stats"][duo_key]['roles'] = (r1_cfg, r2_cfg)
-
-            stats["overall_total_games"] = valid_games_count_overall
-            stats["overall_red_wins"] = valid_games_count_overall - stats["overall_blue_wins"]
-            stats["overall_bans_formatted"] = format_bans_agg(stats["overall_bans_ids"], champion_data, ICON_SIZE_PICKS_BANS);
+
+            overall_champ_stats = defaultdict(lambda: {'picks': 0, 'bans': 0, 'wins_when_picked': 0})
+            for champ, (picks, wins) in overall["picks"].items():
+                overall_champ_stats[champ]['picks'] = picks
+                overall_champ_stats[champ]['wins_when_picked'] = wins
+            for ban_id, count in overall["bans"].items():
+                ban_champ_name = champion_data.get('id_map', {}).get(str(ban_id))
+                if ban_champ_name: overall_champ_stats[ban_champ_name]['bans'] += count
 
             temp_champ_list = []
-            for champ, data in stats["overall_champ_stats"].items():
+            for champ, data in overall_champ_stats.items():
                 pick_r = (data['picks'] / valid_games_count_overall * 100) if valid_games_count_overall else 0
                 ban_r = (data['bans'] / valid_games_count_overall * 100) if valid_games_count_overall else 0
                 win_r = (data['wins_when_picked'] / data['picks'] * 100) if data['picks'] > 0 else 0
@@ -1731,84 +2110,39 @@ def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
                                         "pick_rate": round(pick_r,1), "ban_rate": round(ban_r,1),
                                         "presence": round(pick_r + ban_r, 1), "win_rate": round(win_r,1),
                                         "icon_html": get_champion_icon_html(champ, champion_data, ICON_SIZE_PICKS_BANS, ICON_SIZE_PICKS_BANS)})
-            stats["overall_champ_stats_formatted"] = sorted(temp_champ_list, key=lambda x: x['presence'], reverse=True)
+            # Пики и баны приходят отдельными счётчиками: при равном presence - по имени
+            stats["overall_champ_stats_formatted"] = sorted(temp_champ_list, key=lambda x: (-x['presence'], x['champion']))
 
-            for role, champs in stats["overall_picks_by_role"].items():
+            for role, champs in overall["picks_by_role"].items():
                 role_list = []
-                for champ, data in champs.items():
-                    if data['picks'] > 0:
-                        win_r = (data['wins'] / data['picks'] * 100)
-                        role_list.append({"champion": champ, "games": data['picks'], "win_rate": round(win_r,1),
-                                          "icon_html": get_champion_icon_html(champ, champion_data, ICON_SIZE_PICKS_BANS,ICON_SIZE_PICKS_BANS)})
-                stats["overall_picks_by_role_formatted"][role] = sorted(role_list, key=lambda x: x['games'], reverse=True)
-            stats["overall_picks_by_role_formatted"] = dict(stats["overall_picks_by_role_formatted"])
-
-            for (r1_cfg, r2_cfg), duo_title_cfg in duo_roles_config.items():
-                stats["overall_duo_picks"][duo_title_cfg]["title"] = duo_title_cfg
-
-            for duo_key, data in stats["temp_overall_duo_stats"].items():
-                if data['games'] > 0:
-                    (role1_s, champ1_s), (role2_s, champ2_s) = duo_key
-                    orig_r1, orig_r2 = data['roles']
-                    current_duo_title = None
-                    target_r1_map, target_r2_map = None, None
-                    for (map_r1, map_r2), title_map in duo_roles_config.items():
-                        if orig_r1 in (map_r1, map_r2) and orig_r2 in (map_r1, map_r2):
-                            current_duo_title = title_map
-                            target_r1_map, target_r2_map = map_r1, map_r2
-                            break
-                    if not current_duo_title: continue
-                    win_r = (data['wins'] / data['games'] * 100)
-                    display_c1, display_c2 = (champ1_s, champ2_s) if role1_s == target_r1_map else (champ2_s, champ1_s)
-                    stats["overall_duo_picks"][current_duo_title]["stats"].append({
-                        "champ1": display_c1, "champ2": display_c2,
-                        "icon1_html": get_champion_icon_html(display_c1, champion_data, ICON_SIZE_DUOS,ICON_SIZE_DUOS),
-                        "icon2_html": get_champion_icon_html(display_c2, champion_data, ICON_SIZE_DUOS,ICON_SIZE_DUOS),
-                        "games": data['games'], "win_rate": round(win_r,1)
-                    })
-            for title in stats["overall_duo_picks"]:
-                stats["overall_duo_picks"][title]["stats"].sort(key=lambda x: x['games'], reverse=True)
-            stats["overall_duo_picks"] = dict(stats["overall_duo_picks"])
-            del stats["overall_champ_stats"], stats["overall_picks_by_role"], stats["overall_bans_ids"], stats["temp_overall_duo_stats"]
-        
+                for champ, (picks, wins) in champs.items():
+                    role_list.append({"champion": champ, "games": picks, "win_rate": round(wins / picks * 100, 1),
+                                      "icon_html": get_champion_icon_html(champ, champion_data, ICON_SIZE_PICKS_BANS,ICON_SIZE_PICKS_BANS)})
+                stats["overall_picks_by_role_formatted"][role] = sorted(role_list, key=lambda x: (-x['games'], x['champion']))
+
         else:
+            team_draft = team_draft_stats(draft_table, selected_team_tag, filter_side_norm)
+            stats.update({key: team_draft[key] for key in (
+                "games_played", "wins", "losses", "games_blue", "wins_blue", "losses_blue",
+                "games_red", "wins_red", "losses_red")})
             stats.update({
-                "picks": defaultdict(lambda: defaultdict(lambda: {'games': 0, 'wins': 0})),
-                "bans": {},
-                "games_played": 0, "wins": 0, "losses": 0,
-                "duo_picks": defaultdict(lambda: {"title": "", "stats": []}),
-                "games_blue": 0, "wins_blue": 0, "losses_blue": 0,
-                "games_red": 0, "wins_red": 0, "losses_red": 0,
+                "picks": {}, "bans": {}, "duo_picks": {},
                 "draft_patterns": {'Blue': {}, 'Red': {}},
                 "detailed_picks": {},
                 "priority_picks": {}
             })
-            
-            temp_bans_ids_team = {
-                "by_team_blue_rot1": defaultdict(int), "by_team_blue_rot2": defaultdict(int),
-                "by_team_red_rot1": defaultdict(int), "by_team_red_rot2": defaultdict(int),
-                "vs_team_blue_rot1": defaultdict(int), "vs_team_blue_rot2": defaultdict(int),
-                "vs_team_red_rot1": defaultdict(int), "vs_team_red_rot2": defaultdict(int),
-            }
-            temp_detailed_picks = {
-                "blue_rot1": defaultdict(lambda: {'games': 0, 'wins': 0}),
-                "blue_rot2": defaultdict(lambda: {'games': 0, 'wins': 0}),
-                "red_rot1": defaultdict(lambda: {'games': 0, 'wins': 0}),
-                "red_rot2": defaultdict(lambda: {'games': 0, 'wins': 0})
-            }
-            temp_priority_picks = {
-                'Blue': defaultdict(lambda: defaultdict(int)),
-                'Red': defaultdict(lambda: defaultdict(int))
-            }
-
-            temp_duo_stats_team = defaultdict(lambda: {'games': 0, 'wins': 0, 'roles': None})
-            draft_patterns_counters = {'Blue': {k: defaultdict(int) for k in ['B1', 'B2_B3', 'B4_B5']}, 'Red': {k: defaultdict(int) for k in ['R1_R2', 'R3', 'R4', 'R5']}}
-            games_played_on_blue_by_team = 0
-            games_played_on_red_by_team = 0
             game_ids_for_team_view = []
 
-            blue_pick_seq_to_phase = { 7: 'B1', 10: 'B2-3', 11: 'B2-3', 18: 'B4-5', 19: 'B4-5' }
-            red_pick_seq_to_phase = { 8: 'R1-2', 9: 'R1-2', 12: 'R3', 17: 'R4', 20: 'R5' }
+            drafts_by_game = defaultdict(dict)
+            cursor.execute(f"""
+                SELECT d.game_id, d.seq, d.action_type, d.drafter_team_id, d.champion_name
+                FROM draft_actions d JOIN tournament_games ON tournament_games.Game_ID = d.game_id
+                WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql} AND d.drafter_team_id IS NOT NULL
+            """, team_params)
+            for row in cursor.fetchall():
+                drafts_by_game[row['game_id']][row['seq']] = {
+                    "Action_Type": row['action_type'], "Drafter_Team_ID": row['drafter_team_id'], "Champion_Name": row['champion_name'],
+                }
 
             for game_row in games_rows:
                 game = dict(game_row); game_db_id = game.get("Game_ID")
@@ -1822,147 +2156,12 @@ def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
                 winner_side = game.get("Winner_Side")
                 is_win = (is_blue and winner_side == "Blue") or (is_red and winner_side == "Red")
 
-                stats["games_played"] += 1
-                if is_blue:
-                    stats["games_blue"] += 1; games_played_on_blue_by_team +=1
-                    if is_win: stats["wins_blue"] +=1
-                    elif winner_side == "Red": stats["losses_blue"] +=1
-                elif is_red:
-                    stats["games_red"] += 1; games_played_on_red_by_team +=1
-                    if is_win: stats["wins_red"] +=1
-                    elif winner_side == "Blue": stats["losses_red"] +=1
-                if is_win: stats["wins"] +=1
-                elif winner_side != "Unknown": stats["losses"] +=1
-
                 current_team_prefix = "Blue" if is_blue else "Red"
                 opponent_prefix = "Red" if is_blue else "Blue"
-                
-                ban_keys = {
-                    "team_rot1": temp_bans_ids_team["by_team_blue_rot1"] if is_blue else temp_bans_ids_team["by_team_red_rot1"],
-                    "team_rot2": temp_bans_ids_team["by_team_blue_rot2"] if is_blue else temp_bans_ids_team["by_team_red_rot2"],
-                    "opp_rot1": temp_bans_ids_team["vs_team_blue_rot1"] if is_blue else temp_bans_ids_team["vs_team_red_rot1"],
-                    "opp_rot2": temp_bans_ids_team["vs_team_blue_rot2"] if is_blue else temp_bans_ids_team["vs_team_red_rot2"],
-                }
-
-                for i in range(1, 6):
-                    team_ban_id = game.get(f"{current_team_prefix}_Ban_{i}_ID")
-                    opp_ban_id = game.get(f"{opponent_prefix}_Ban_{i}_ID")
-                    
-                    if team_ban_id and team_ban_id != "N/A":
-                        target_dict = ban_keys["team_rot1"] if i <= 3 else ban_keys["team_rot2"]
-                        target_dict[team_ban_id] += 1
-                    
-                    if opp_ban_id and opp_ban_id != "N/A":
-                        target_dict = ban_keys["opp_rot1"] if i <= 3 else ban_keys["opp_rot2"]
-                        target_dict[opp_ban_id] += 1
-
-                should_process_this_game_picks = (filter_side_norm == 'all') or \
-                                                 (filter_side_norm == 'blue' and is_blue) or \
-                                                 (filter_side_norm == 'red' and is_red)
-                if should_process_this_game_picks:
-                    picks_in_game_team = {}
-                    for role in ROLE_ORDER_FOR_SHEET:
-                        role_abbr = role_to_abbr.get(role)
-                        if not role_abbr: continue
-                        champ = game.get(f"{current_team_prefix}_{role_abbr}_Champ")
-                        if champ and champ != "N/A":
-                            picks_in_game_team[role] = champ
-                            stats["picks"][role][champ]['games'] +=1
-                            if is_win: stats["picks"][role][champ]['wins'] +=1
-                    for (r1_cfg, r2_cfg), duo_title in duo_roles_config.items():
-                        c1 = picks_in_game_team.get(r1_cfg); c2 = picks_in_game_team.get(r2_cfg)
-                        if c1 and c2:
-                            duo_key = tuple(sorted([(r1_cfg, c1), (r2_cfg, c2)]))
-                            temp_duo_stats_team[duo_key]['games'] +=1
-                            if is_win: temp_duo_stats_team[duo_key]['wins'] +=1
-                            if temp_duo_stats_team[duo_key]['roles'] is None: temp_duo_stats_team[duo_key]['roles'] = (r1_cfg, r2_cfg)
-
-                reconstructed_draft = {}
-                action_found_in_game = False
-                draft_blue_id, draft_red_id = None, None
-                for i in range(1,21):
-                    action_type = game.get(f"Draft_Action_{i}_Type")
-                    team_id_draft = game.get(f"Draft_Action_{i}_TeamID")
-                    if action_type and action_type != "N/A" and team_id_draft and team_id_draft != "N/A":
-                        reconstructed_draft[i] = {
-                            "Action_Type": str(action_type).lower(), "Drafter_Team_ID": str(team_id_draft),
-                            "Champion_Name": game.get(f"Draft_Action_{i}_ChampName", "N/A"),
-                        }
-                        action_found_in_game = True
-                        if not draft_blue_id and i in [1,3,5,7,10,11,14,16,18,19]: draft_blue_id = str(team_id_draft)
-                        if not draft_red_id and i in [2,4,6,8,9,12,13,15,17,20] and str(team_id_draft) != draft_blue_id: draft_red_id = str(team_id_draft)
 
-                if action_found_in_game:
-                    blue_picks_seq = {s: reconstructed_draft[s] for s in [7, 10, 11, 18, 19] if s in reconstructed_draft}
-                    red_picks_seq = {s: reconstructed_draft[s] for s in [8, 9, 12, 17, 20] if s in reconstructed_draft}
-                    
-                    our_team_picks_seq = blue_picks_seq if is_blue else red_picks_seq
-                    
-                    if should_process_this_game_picks:
-                        rot1_keys = [7, 10, 11] if is_blue else [8, 9, 12]
-                        rot2_keys = [18, 19] if is_blue else [17, 20]
-                        target_pick_dict_rot1 = temp_detailed_picks['blue_rot1'] if is_blue else temp_detailed_picks['red_rot1']
-                        target_pick_dict_rot2 = temp_detailed_picks['blue_rot2'] if is_blue else temp_detailed_picks['red_rot2']
-                        
-                        for seq, pick_data in our_team_picks_seq.items():
-                            champ_name = pick_data.get("Champion_Name")
-                            if champ_name and champ_name != "N/A":
-                                if seq in rot1_keys:
-                                    target_pick_dict_rot1[champ_name]['games'] += 1
-                                    if is_win: target_pick_dict_rot1[champ_name]['wins'] += 1
-                                elif seq in rot2_keys:
-                                    target_pick_dict_rot2[champ_name]['games'] += 1
-                                    if is_win: target_pick_dict_rot2[champ_name]['wins'] += 1
-
-                    if is_blue:
-                        for seq, pick_data in blue_picks_seq.items():
-                            champ = pick_data.get("Champion_Name")
-                            phase = blue_pick_seq_to_phase.get(seq)
-                            if champ and champ != "N/A" and phase:
-                                temp_priority_picks['Blue'][champ][phase] += 1
-                    elif is_red:
-                        for seq, pick_data in red_picks_seq.items():
-                            champ = pick_data.get("Champion_Name")
-                            phase = red_pick_seq_to_phase.get(seq)
-                            if champ and champ != "N/A" and phase:
-                                temp_priority_picks['Red'][champ][phase] += 1
-
-
-                    roles_played_game = {'Blue': {}, 'Red': {}}
-                    for r in ROLE_ORDER_FOR_SHEET:
-                        r_abbr = role_to_abbr.get(r)
-                        if not r_abbr: continue
-                        b_c = game.get(f"Blue_{r_abbr}_Champ"); r_c = game.get(f"Red_{r_abbr}_Champ")
-                        if b_c and b_c != "N/A": roles_played_game['Blue'][r] = b_c
-                        if r_c and r_c != "N/A": roles_played_game['Red'][r] = r_c
-
-                    our_team_draft_side = None
-                    our_team_draft_actual_id = None
-
-                    if is_blue and draft_blue_id: our_team_draft_side = 'Blue'; our_team_draft_actual_id = draft_blue_id
-                    elif is_red and draft_red_id: our_team_draft_side = 'Red'; our_team_draft_actual_id = draft_red_id
-
-                    if our_team_draft_side and our_team_draft_actual_id:
-                        for seq, action_data in reconstructed_draft.items():
-                            if action_data['Action_Type'] == 'pick' and action_data['Drafter_Team_ID'] == our_team_draft_actual_id:
-                                picked_champ_name = action_data['Champion_Name']
-                                actual_role_for_pick = None
-                                for role_key, champ_in_role in roles_played_game.get(our_team_draft_side, {}).items():
-                                    if champ_in_role == picked_champ_name: actual_role_for_pick = role_key; break
-
-                                if actual_role_for_pick:
-                                    pattern_slot_key = None
-                                    if our_team_draft_side == 'Blue':
-                                        if seq == 7: pattern_slot_key = 'B1'
-                                        elif seq in [10,11]: pattern_slot_key = 'B2_B3'
-                                        elif seq in [18,19]: pattern_slot_key = 'B4_B5'
-                                    elif our_team_draft_side == 'Red':
-                                        if seq in [8,9]: pattern_slot_key = 'R1_R2'
-                                        elif seq == 12: pattern_slot_key = 'R3'
-                                        elif seq == 17: pattern_slot_key = 'R4'
-                                        elif seq == 20: pattern_slot_key = 'R5'
-                                    if pattern_slot_key:
-                                        draft_patterns_counters[our_team_draft_side][pattern_slot_key][actual_role_for_pick] +=1
+                # Драфт игры нужен только для карточки матча; статистика драфта - из team_draft
+                reconstructed_draft = dict(sorted(drafts_by_game.get(game_db_id, {}).items()))
+                draft_blue_id, draft_red_id = draft_team_ids({seq: action["Drafter_Team_ID"] for seq, action in reconstructed_draft.items()})
 
                 opponent_tag_game = red_team_tag if is_blue else blue_team_tag
                 current_team_role_puuids = {}
@@ -1976,7 +2175,7 @@ def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
                     "sequence_number": game.get("Sequence_Number", 0),
                     "blue_team_tag": blue_team_tag, "red_team_tag": red_team_tag,
                     "winner_side": winner_side, "is_win_for_selected": is_win,
-                    "draft_actions_dict": reconstructed_draft if action_found_in_game else {},
+                    "draft_actions_dict": reconstructed_draft,
                     "blue_team_draft_id": draft_blue_id, "red_team_draft_id": draft_red_id,
                     "our_jungler_champ": game.get(f"{current_team_prefix}_JGL_Champ", "N/A"),
                     "enemy_jungler_champ": game.get(f"{opponent_prefix}_JGL_Champ", "N/A"),
@@ -2060,118 +2259,69 @@ def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
                         if ward['player_puuid'] in current_game_selected_team_puuids
                     ]
                     if detail_entry['first_wards']:
-                         log_message(f"[Aggregate] G:{gid} Found {len(detail_entry['first_wards'])} wards for selected team.")
+                         log_message("[Aggregate] G:%s Found %d wards for selected team.", gid, len(detail_entry['first_wards']), level="debug")
 
                 if 'jungler_puuid_for_path_lookup' in detail_entry:
                     del detail_entry['jungler_puuid_for_path_lookup']
                 if 'selected_team_puuids_in_game' in detail_entry:
                     del detail_entry['selected_team_puuids_in_game']
 
-            formatted_picks_team = defaultdict(dict)
-            for role, champs in stats["picks"].items():
-                 for champ_name, data in sorted(champs.items(), key=lambda x: x[1]['games'], reverse=True):
-                    if data['games'] > 0:
-                        win_r = (data['wins'] / data['games'] * 100)
-                        formatted_picks_team[role][champ_name] = {
-                            'games': data['games'], 'wins': data['wins'], 'win_rate': round(win_r,1),
-                            'icon_html': get_champion_icon_html(champ_name, champion_data, ICON_SIZE_PICKS_BANS,ICON_SIZE_PICKS_BANS)
-                        }
-            stats["picks"] = dict(formatted_picks_team)
-            
-            stats["bans"] = {
-                "by_team_blue_rot1_formatted": format_bans_agg(temp_bans_ids_team["by_team_blue_rot1"], champion_data, ICON_SIZE_PICKS_BANS),
-                "by_team_blue_rot2_formatted": format_bans_agg(temp_bans_ids_team["by_team_blue_rot2"], champion_data, ICON_SIZE_PICKS_BANS),
-                "by_team_red_rot1_formatted": format_bans_agg(temp_bans_ids_team["by_team_red_rot1"], champion_data, ICON_SIZE_PICKS_BANS),
-                "by_team_red_rot2_formatted": format_bans_agg(temp_bans_ids_team["by_team_red_rot2"], champion_data, ICON_SIZE_PICKS_BANS),
-                "vs_team_blue_rot1_formatted": format_bans_agg(temp_bans_ids_team["vs_team_blue_rot1"], champion_data, ICON_SIZE_PICKS_BANS),
-                "vs_team_blue_rot2_formatted": format_bans_agg(temp_bans_ids_team["vs_team_blue_rot2"], champion_data, ICON_SIZE_PICKS_BANS),
-                "vs_team_red_rot1_formatted": format_bans_agg(temp_bans_ids_team["vs_team_red_rot1"], champion_data, ICON_SIZE_PICKS_BANS),
-                "vs_team_red_rot2_formatted": format_bans_agg(temp_bans_ids_team["vs_team_red_rot2"], champion_data, ICON_SIZE_PICKS_BANS),
-            }
-            
+            stage("format")
+            for role, champs in team_draft["picks"].items():
+                stats["picks"][role] = {
+                    champ_name: {
+                        'games': games, 'wins': wins, 'win_rate': round(wins / games * 100, 1),
+                        'icon_html': get_champion_icon_html(champ_name, champion_data, ICON_SIZE_PICKS_BANS,ICON_SIZE_PICKS_BANS)
+                    }
+                    for champ_name, (games, wins) in sorted(champs.items(), key=lambda x: x[1][0], reverse=True)
+                }
+
+            stats["bans"] = {f"{ban_key}_formatted": format_bans_agg(ban_counts, champion_data, ICON_SIZE_PICKS_BANS)
+                             for ban_key, ban_counts in team_draft["bans"].items()}
+
             def format_detailed_picks(picks_dict):
-                formatted_list = []
-                for champ, data in sorted(picks_dict.items(), key=lambda x: x[1]['games'], reverse=True):
-                    if data['games'] > 0:
-                        win_r = (data['wins'] / data['games'] * 100)
-                        formatted_list.append({
-                            "champion": champ, "games": data['games'], "win_rate": round(win_r,1),
-                            "icon_html": get_champion_icon_html(champ, champion_data, ICON_SIZE_PICKS_BANS, ICON_SIZE_PICKS_BANS)
-                        })
-                return formatted_list
+                return [{
+                    "champion": champ, "games": games, "win_rate": round(wins / games * 100, 1),
+                    "icon_html": get_champion_icon_html(champ, champion_data, ICON_SIZE_PICKS_BANS, ICON_SIZE_PICKS_BANS)
+                } for champ, (games, wins) in sorted(picks_dict.items(), key=lambda x: x[1][0], reverse=True)]
+
+            stats["detailed_picks"] = {key: format_detailed_picks(picks) for key, picks in team_draft["detailed_picks"].items()}
 
-            stats["detailed_picks"] = {
-                "blue_rot1": format_detailed_picks(temp_detailed_picks["blue_rot1"]),
-                "blue_rot2": format_detailed_picks(temp_detailed_picks["blue_rot2"]),
-                "red_rot1": format_detailed_picks(temp_detailed_picks["red_rot1"]),
-                "red_rot2": format_detailed_picks(temp_detailed_picks["red_rot2"]),
-            }
-            
             def format_priority_picks(priority_dict):
-                 priority_list = []
-                 max_picks_in_phase = 0
-                 for champ, phase_counts in priority_dict.items():
-                     current_max = max(phase_counts.values()) if phase_counts else 0
-                     if current_max > max_picks_in_phase:
-                         max_picks_in_phase = current_max
-
-                 for champ, phase_counts in priority_dict.items():
-                     total_picks = sum(phase_counts.values())
-                     entry = {
-                         "champion": champ,
-                         "total_picks": total_picks,
-                         "icon_html": get_champion_icon_html(champ, champion_data, ICON_SIZE_PICKS_BANS, ICON_SIZE_PICKS_BANS),
-                         "phases": {phase: count for phase, count in phase_counts.items()}
-                     }
-                     priority_list.append(entry)
-                 
+                 priority_list = [{
+                     "champion": champ,
+                     "total_picks": sum(phase_counts.values()),
+                     "icon_html": get_champion_icon_html(champ, champion_data, ICON_SIZE_PICKS_BANS, ICON_SIZE_PICKS_BANS),
+                     "phases": dict(phase_counts)
+                 } for champ, phase_counts in priority_dict.items()]
+                 max_picks_in_phase = max((max(entry["phases"].values()) for entry in priority_list), default=0)
                  return sorted(priority_list, key=lambda x: x['total_picks'], reverse=True), max_picks_in_phase if max_picks_in_phase > 0 else 1
 
-            blue_prio_list, blue_max_val = format_priority_picks(temp_priority_picks["Blue"])
-            red_prio_list, red_max_val = format_priority_picks(temp_priority_picks["Red"])
+            blue_prio_list, blue_max_val = format_priority_picks(team_draft["priority"]["Blue"])
+            red_prio_list, red_max_val = format_priority_picks(team_draft["priority"]["Red"])
 
             stats["priority_picks"] = {
                 "blue": blue_prio_list,
                 "red": red_prio_list,
                 "blue_max_picks": blue_max_val,
                 "red_max_picks": red_max_val,
-                "blue_phases": sorted(list(set(blue_pick_seq_to_phase.values())), key=lambda x: int(x.split('-')[0][1:])),
-                "red_phases": sorted(list(set(red_pick_seq_to_phase.values())), key=lambda x: int(x.split('-')[0][1:])),
+                "blue_phases": [phase for phase in PRIORITY_PHASES if phase.startswith("B")],
+                "red_phases": [phase for phase in PRIORITY_PHASES if phase.startswith("R")],
             }
 
-            for (r1_cfg, r2_cfg), duo_title_cfg in duo_roles_config.items():
-                 stats["duo_picks"][duo_title_cfg]["title"] = duo_title_cfg
-            for duo_key, data in temp_duo_stats_team.items():
-                if data['games'] > 0:
-                    (role1_s, champ1_s), (role2_s, champ2_s) = duo_key
-                    orig_r1, orig_r2 = data['roles']
-                    current_duo_title = None; target_r1_map, target_r2_map = None,None
-                    for (map_r1, map_r2), title_map in duo_roles_config.items():
-                        if orig_r1 in (map_r1, map_r2) and orig_r2 in (map_r1, map_r2):
-                            current_duo_title = title_map; target_r1_map,target_r2_map = map_r1,map_r2; break
-                    if not current_duo_title: continue
-                    win_r = (data['wins'] / data['games'] * 100)
-                    display_c1, display_c2 = (champ1_s, champ2_s) if role1_s == target_r1_map else (champ2_s, champ1_s)
-                    stats["duo_picks"][current_duo_title]["stats"].append({
-                        "champ1": display_c1, "champ2": display_c2,
-                        "icon1_html": get_champion_icon_html(display_c1, champion_data, ICON_SIZE_DUOS,ICON_SIZE_DUOS),
-                        "icon2_html": get_champion_icon_html(display_c2, champion_data, ICON_SIZE_DUOS,ICON_SIZE_DUOS),
-                        "games": data['games'], "win_rate": round(win_r,1)
-                    })
-            for title in stats["duo_picks"]: stats["duo_picks"][title]["stats"].sort(key=lambda x: x['games'], reverse=True)
-            stats["duo_picks"] = dict(stats["duo_picks"])
+            stats["duo_picks"] = format_duos(team_draft["duos"])
 
             pattern_map_labels = { 'Blue': [('B1', 'First Pick'), ('B2_B3', 'Phase Two'), ('B4_B5', 'Phase Three')],
                                    'Red': [('R1_R2', 'Phase One'), ('R3', 'Pick 3'), ('R4', 'Pick 4'), ('R5', 'Last Pick')] }
-            for side_color, games_on_side_count in [('Blue', games_played_on_blue_by_team), ('Red', games_played_on_red_by_team)]:
+            for side_color, games_on_side_count in [('Blue', stats["games_blue"]), ('Red', stats["games_red"])]:
                 if games_on_side_count > 0:
                     for pattern_key, display_name in pattern_map_labels[side_color]:
-                        stats['draft_patterns'][side_color][display_name] = {}
-                        for role_name_pattern in roles_for_pattern:
-                            count = draft_patterns_counters[side_color][pattern_key].get(role_name_pattern, 0)
-                            percentage = round((count / games_on_side_count) * 100)
-                            stats['draft_patterns'][side_color][display_name][role_name_pattern] = percentage
-            
+                        pattern_counts = team_draft["patterns"][side_color].get(pattern_key, {})
+                        stats['draft_patterns'][side_color][display_name] = {
+                            role_name_pattern: round((pattern_counts.get(role_name_pattern, 0) / games_on_side_count) * 100)
+                            for role_name_pattern in roles_for_pattern
+                        }
+
             grouped_matches = defaultdict(list)
             for detail in all_game_details_list:
                 grouped_matches[detail["series_id"]].append(detail)
@@ -2190,8 +2340,8 @@ def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
             grouped_matches = dict(sorted_grouped_matches)
 
     except Exception as e:
-        log_message(f"!!! CRITICAL Error during tournament data aggregation: {e}")
-        log_message(traceback.format_exc())
+        log_message(f"!!! CRITICAL Error during tournament data aggregation: {e}", level="error")
+        log_message(traceback.format_exc(), level="error")
         stats["error"] = "An critical error occurred during data aggregation. Check logs."
         all_teams_display = []
         grouped_matches = {}
@@ -2199,18 +2349,98 @@ def aggregate_tournament_data(selected_team_full_name=None, side_filter="all"):
     finally:
         if cursor is not None:
             try: cursor.close()
-            except Exception as ce: log_message(f"Error closing cursor: {ce}")
+            except Exception as ce: log_message(f"Error closing cursor: {ce}", level="error")
         if conn is not None:
             try: conn.close();
-            except Exception as ce: log_message(f"Error closing connection: {ce}")
+            except Exception as ce: log_message(f"Error closing connection: {ce}", level="error")
 
     return all_teams_display, stats, grouped_matches, all_game_details_list
 
-def get_all_wards_data(selected_team_full_name, selected_role, games_filter, selected_champion):
+def _build_ward_interval_labels(total_seconds=50 * 60):
+    """Подписи интервалов вардов "MM:SS - MM:SS"; индекс подписи = all_wards_data.time_bucket."""
+    labels = []
+    for i in range(0, int(total_seconds / WARD_BUCKET_SECONDS)):
+        start_min, start_s = divmod(i * WARD_BUCKET_SECONDS, 60)
+        end_min, end_s = divmod((i + 1) * WARD_BUCKET_SECONDS, 60)
+        labels.append(f"{start_min:02d}:{start_s:02d} - {end_min:02d}:{end_s:02d}")
+    return labels
+
+
+WARD_INTERVAL_LABELS = _build_ward_interval_labels()
+
+
+def get_team_champion_options(cursor, selected_team_tag, tournament_id=None):
+    """Чемпионы, которых играла команда (для фильтра), по алфавиту."""
+    scope = ' AND "Tournament_ID" = :tournament_id' if tournament_id else ""
+    champs_query = f"""
+        SELECT DISTINCT champ FROM (
+            SELECT Blue_TOP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+            SELECT Blue_JGL_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+            SELECT Blue_MID_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+            SELECT Blue_BOT_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+            SELECT Blue_SUP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag{scope} UNION ALL
+            SELECT Red_TOP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+            SELECT Red_JGL_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+            SELECT Red_MID_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+            SELECT Red_BOT_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope} UNION ALL
+            SELECT Red_SUP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag{scope}
+        ) WHERE champ IS NOT NULL AND champ != 'N/A' ORDER BY champ ASC
+    """
+    cursor.execute(champs_query, {'tag': selected_team_tag, 'tournament_id': tournament_id})
+    return [row['champ'] for row in cursor.fetchall()]
+
+
+def select_team_ward_games(cursor, selected_team_tag, selected_role, games_filter, tournament_id=None):
+    """
+    Последние игры команды -> (число найденных игр, [(game_id, сторона команды, PUUID роли или None)]).
+    Игры, где для выбранной роли нет PUUID, пропускаются.
+    """
+    role_to_abbr = {"TOP": "TOP", "JGL": "JGL", "MID": "MID", "BOT": "BOT", "SUP": "SUP"}
+    scope_sql, scope_params = tournament_scope_sql(tournament_id)
+    query_games = f'SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql} ORDER BY "Date" DESC'
+    if games_filter != 'All' and games_filter.isdigit():
+        query_games += f" LIMIT {int(games_filter)}"
+    cursor.execute(query_games, [selected_team_tag, selected_team_tag, *scope_params])
+    game_rows = [dict(row) for row in cursor.fetchall()]
+
+    role_abbr_val = None if selected_role == "All" else role_to_abbr.get(selected_role.upper())
+    selected_games = []
+    for game in game_rows:
+        prefix = "Blue" if game.get("Blue_Team_Name") == selected_team_tag else "Red"
+        puuid = game.get(f"{prefix}_{role_abbr_val}_PUUID") if role_abbr_val else None
+        if role_abbr_val and not puuid:
+            continue
+        selected_games.append((game["Game_ID"], prefix, puuid))
+    return len(game_rows), selected_games
+
+
+def query_team_wards(cursor, selected_games, selected_champion, columns="w.*"):
+    """Варды выбранных игр/стороны/игрока, отсортированные по time_bucket (индекс game_id, time_bucket)."""
+    if not selected_games:
+        return []
+    values_sql = ", ".join(["(?, ?, ?)"] * len(selected_games))
+    wards_params = [value for selected_game in selected_games for value in selected_game]
+    wards_query = f"""
+        WITH selected_games(game_id, team_side, player_puuid) AS (VALUES {values_sql})
+        SELECT {columns} FROM selected_games s
+        JOIN all_wards_data w ON w.game_id = s.game_id AND w.team_side = s.team_side
+        WHERE w.time_bucket BETWEEN 0 AND ? AND (s.player_puuid IS NULL OR w.player_puuid = s.player_puuid)
+    """
+    wards_params.append(len(WARD_INTERVAL_LABELS) - 1)
+    if selected_champion and selected_champion != "All":
+        wards_query += " AND w.champion_name = ?"
+        wards_params.append(selected_champion)
+    wards_query += " ORDER BY w.time_bucket, w.id"
+    cursor.execute(wards_query, wards_params)
+    return cursor.fetchall()
+
+
+@traced("aggregate")
+def get_all_wards_data(selected_team_full_name, selected_role, games_filter, selected_champion, tournament_id=None):
     """
     Извлекает и агрегирует данные о всех вардах на основе фильтров для новой страницы.
     """
-    conn = get_db_connection()
+    conn = get_db_connection(tournament_id)
     if not conn:
         return [], {}, {"error": "Database connection failed"}, []
 
@@ -2221,110 +2451,32 @@ def get_all_wards_data(selected_team_full_name, selected_role, games_filter, sel
 
     try:
         cursor = conn.cursor()
-        cursor.execute(f"""
-            SELECT DISTINCT Blue_Team_Name as team_tag FROM tournament_games
-            WHERE Blue_Team_Name NOT IN ('{UNKNOWN_BLUE_TAG}', 'Blue Team')
-            UNION
-            SELECT DISTINCT Red_Team_Name as team_tag FROM tournament_games
-            WHERE Red_Team_Name NOT IN ('{UNKNOWN_RED_TAG}', 'Red Team')
-        """)
-        all_teams_tags = {row['team_tag'] for row in cursor.fetchall() if row['team_tag']}
-        all_teams_display = sorted(list(set([TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in all_teams_tags])))
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
 
         if not selected_team_full_name:
             stats_or_error = {"message": "Please select a team to view warding patterns."}
             return all_teams_display, wards_by_interval, stats_or_error, available_champions
 
-        role_to_abbr = {"TOP": "TOP", "JGL": "JGL", "MID": "MID", "BOT": "BOT", "SUP": "SUP"}
-        selected_team_tag = None
-        for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
-            if full_name == selected_team_full_name: selected_team_tag = tag; break
-        if not selected_team_tag and selected_team_full_name in all_teams_tags:
-            selected_team_tag = selected_team_full_name
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
         
         if not selected_team_tag:
             stats_or_error = {"error": f"Team tag not found for '{selected_team_full_name}'."}
             return all_teams_display, wards_by_interval, stats_or_error, available_champions
 
-        champs_query = """
-            SELECT DISTINCT champ FROM (
-                SELECT Blue_TOP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_JGL_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_MID_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_BOT_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Blue_SUP_Champ as champ FROM tournament_games WHERE Blue_Team_Name = :tag UNION ALL
-                SELECT Red_TOP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_JGL_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_MID_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_BOT_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag UNION ALL
-                SELECT Red_SUP_Champ as champ FROM tournament_games WHERE Red_Team_Name = :tag
-            ) WHERE champ IS NOT NULL AND champ != 'N/A' ORDER BY champ ASC
-        """
-        cursor.execute(champs_query, {'tag': selected_team_tag})
-        available_champions.extend([row['champ'] for row in cursor.fetchall()])
-
-        query_games = 'SELECT * FROM tournament_games WHERE Blue_Team_Name = ? OR Red_Team_Name = ? ORDER BY "Date" DESC'
-        params_games = [selected_team_tag, selected_team_tag]
-        if games_filter != 'All' and games_filter.isdigit():
-            query_games += f" LIMIT {int(games_filter)}"
-        
-        cursor.execute(query_games, params_games)
-        game_rows = [dict(row) for row in cursor.fetchall()]
+        available_champions.extend(get_team_champion_options(cursor, selected_team_tag, tournament_id))
 
-        if not game_rows:
+        games_found, selected_games = select_team_ward_games(cursor, selected_team_tag, selected_role, games_filter, tournament_id)
+        if not games_found:
             stats_or_error = {"message": "No games found for the selected team."}
             return all_teams_display, wards_by_interval, stats_or_error, available_champions
 
-        game_ids_to_query = [row["Game_ID"] for row in game_rows]
-        puuids_to_query = set()
-        if selected_role == "All":
-            for game in game_rows:
-                is_blue = game.get("Blue_Team_Name") == selected_team_tag
-                prefix = "Blue" if is_blue else "Red"
-                for role_abbr_val in role_to_abbr.values():
-                    puuid = game.get(f"{prefix}_{role_abbr_val}_PUUID")
-                    if puuid: puuids_to_query.add(puuid)
-        else:
-            role_abbr_val = role_to_abbr.get(selected_role.upper())
-            if role_abbr_val:
-                for game in game_rows:
-                    is_blue = game.get("Blue_Team_Name") == selected_team_tag
-                    prefix = "Blue" if is_blue else "Red"
-                    puuid = game.get(f"{prefix}_{role_abbr_val}_PUUID")
-                    if puuid: puuids_to_query.add(puuid)
-        
-        all_wards = []
-        if game_ids_to_query:
-            wards_query = 'SELECT * FROM all_wards_data WHERE "Game_ID" IN ({})'.format(','.join(['?'] * len(game_ids_to_query)))
-            wards_params = list(game_ids_to_query)
-            if puuids_to_query:
-                wards_query += ' AND "player_puuid" IN ({})'.format(','.join(['?'] * len(puuids_to_query)))
-                wards_params.extend(list(puuids_to_query))
-            if selected_champion and selected_champion != "All":
-                 wards_query += ' AND "champion_name" = ?'
-                 wards_params.append(selected_champion)
-            cursor.execute(wards_query, wards_params)
-            all_wards = [dict(row) for row in cursor.fetchall()]
-
-        time_intervals = []
-        for i in range(0, int(50 * 60 / 90)):
-            start_sec = i * 90
-            end_sec = (i + 1) * 90
-            start_min, start_s = divmod(start_sec, 60)
-            end_min, end_s = divmod(end_sec, 60)
-            label = f"{start_min:02d}:{start_s:02d} - {end_min:02d}:{end_s:02d}"
-            time_intervals.append((label, start_sec, end_sec))
-
-        wards_by_interval = {label: [] for label, _, _ in time_intervals}
-        for ward in all_wards:
-            ts = ward['timestamp_seconds']
-            for label, start, end in time_intervals:
-                if start <= ts < end:
-                    wards_by_interval[label].append(ward)
-                    break
+        wards_by_interval = {label: [] for label in WARD_INTERVAL_LABELS}
+        # Варды уже разложены по time_bucket при сохранении - SQL отдаёт их сгруппированными по интервалу
+        for row in query_team_wards(cursor, selected_games, selected_champion):
+            wards_by_interval[WARD_INTERVAL_LABELS[row['time_bucket']]].append(dict(row))
     
     except sqlite3.Error as e:
-        log_message(f"DB Error in get_all_wards_data: {e}")
+        log_message(f"DB Error in get_all_wards_data: {e}", level="error")
         stats_or_error = {"error": "A database error occurred."}
     finally:
         if conn: conn.close()
@@ -2332,11 +2484,12 @@ def get_all_wards_data(selected_team_full_name, selected_role, games_filter, sel
     return all_teams_display, wards_by_interval, stats_or_error, available_champions
 
 # --- НОВАЯ ФУНКЦИЯ ДЛЯ СТРАНИЦЫ PROXIMITY ---
-def get_proximity_data(selected_team_full_name, selected_role, games_filter):
+@traced("aggregate")
+def get_proximity_data(selected_team_full_name, selected_role, games_filter, tournament_id=None):
     """
     Извлекает и агрегирует данные о близости игроков для страницы Proximity.
     """
-    conn = get_db_connection()
+    conn = get_db_connection(tournament_id)
     if not conn:
         return [], {"error": "Database connection failed"}, []
 
@@ -2347,28 +2500,14 @@ def get_proximity_data(selected_team_full_name, selected_role, games_filter):
     try:
         cursor = conn.cursor()
         # 1. Получаем список всех команд
-        cursor.execute(f"""
-            SELECT DISTINCT Blue_Team_Name as team_tag FROM tournament_games
-            WHERE Blue_Team_Name NOT IN ('{UNKNOWN_BLUE_TAG}', 'Blue Team')
-            UNION
-            SELECT DISTINCT Red_Team_Name as team_tag FROM tournament_games
-            WHERE Red_Team_Name NOT IN ('{UNKNOWN_RED_TAG}', 'Red Team')
-        """)
-        all_teams_tags = {row['team_tag'] for row in cursor.fetchall() if row['team_tag']}
-        all_teams_display = sorted(list(set([TEAM_TAG_TO_FULL_NAME.get(tag, tag) for tag in all_teams_tags])))
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
 
         if not selected_team_full_name:
             stats["message"] = "Please select a team to view proximity stats."
             return all_teams_display, stats, players_in_role
 
         # 2. Определяем тег команды и роли для анализа
-        selected_team_tag = None
-        for tag, full_name in TEAM_TAG_TO_FULL_NAME.items():
-            if full_name == selected_team_full_name:
-                selected_team_tag = tag
-                break
-        if not selected_team_tag and selected_team_full_name in all_teams_tags:
-            selected_team_tag = selected_team_full_name
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
         
         if not selected_team_tag:
             stats["error"] = f"Team tag not found for '{selected_team_full_name}'."
@@ -2384,8 +2523,9 @@ def get_proximity_data(selected_team_full_name, selected_role, games_filter):
             ally_roles = [r for r in role_to_abbr.keys() if r != selected_role]
 
         # 3. Получаем последние игры для команды
-        query_games = 'SELECT * FROM tournament_games WHERE Blue_Team_Name = ? OR Red_Team_Name = ? ORDER BY "Date" DESC'
-        params_games = [selected_team_tag, selected_team_tag]
+        scope_sql, scope_params = tournament_scope_sql(tournament_id)
+        query_games = f'SELECT * FROM tournament_games WHERE (Blue_Team_Name = ? OR Red_Team_Name = ?){scope_sql} ORDER BY "Date" DESC'
+        params_games = [selected_team_tag, selected_team_tag, *scope_params]
         if games_filter != 'All' and games_filter.isdigit():
             query_games += f" LIMIT {int(games_filter)}"
         
@@ -2496,6 +2636,7 @@ def get_proximity_data(selected_team_full_name, selected_role, games_filter):
                             champ_stats[champion]["proximity_seconds"][ally_role]['Overall'] += 1
 
         # 8. Форматирование результатов
+        stage("format")
         all_intervals = ['Overall'] + list(time_intervals.keys())
         total_averages_agg = {ally: {interval: {"prox_sum": 0, "count": 0} for interval in all_intervals} for ally in ally_roles}
         
@@ -2530,11 +2671,11 @@ def get_proximity_data(selected_team_full_name, selected_role, games_filter):
         stats["data_by_champion"].sort(key=lambda x: x["games"], reverse=True)
 
     except sqlite3.Error as e:
-        log_message(f"DB Error in get_proximity_data: {e}")
+        log_message(f"DB Error in get_proximity_data: {e}", level="error")
         stats["error"] = "A database error occurred."
     except Exception as e:
-        log_message(f"!!! CRITICAL Error during proximity data aggregation: {e}")
-        log_message(traceback.format_exc())
+        log_message(f"!!! CRITICAL Error during proximity data aggregation: {e}", level="error")
+        log_message(traceback.format_exc(), level="error")
         stats["error"] = "An critical error occurred during data aggregation."
     finally:
         if conn: conn.close()
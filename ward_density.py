@@ -0,0 +1,236 @@
+# lol_app_LTA_2/ward_density.py
+"""
+Тепловые карты вардов на сервере.
+
+Вместо отрисовки каждого варда отдельным DOM элементом считаем 2D гистограммы
+позиций (NumPy) по временному интервалу (all_wards_data.time_bucket) и типу
+варда для выбранной команды/роли/чемпиона. Гистограммы кэшируются до смены
+data generation и отдаются либо компактно (разреженные [x, y, count]), либо
+готовым PNG оверлеем поверх миникарты со сглаживанием (гауссово ядро).
+NumPy импортируется внутри функций, чтобы не замедлять старт приложения.
+"""
+
+import struct
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+
+from scrims_logic import log_message
+from database import get_db_connection, get_data_generation
+from request_timing import traced
+from tournament_logic import (
+    WARD_INTERVAL_LABELS,
+    get_team_registry,
+    resolve_team_tag,
+    get_team_champion_options,
+    select_team_ward_games,
+    query_team_wards
+)
+
+# Координаты карты Summoner's Rift (как в шаблоне wards.html)
+MAP_MAX_COORD = 15000.0
+DENSITY_GRID_SIZE = 64
+# Категории вардов - совпадают с классами иконок на странице
+WARD_CATEGORIES = ("Stealth", "Control", "Farsight")
+# Сглаживание для PNG (в клетках сетки) и масштаб картинки
+HEATMAP_SIGMA_CELLS = 1.5
+HEATMAP_PIXELS_PER_CELL = 4
+DENSITY_CACHE_MAX_ENTRIES = 64
+
+_density_cache = {"generation": None, "entries": OrderedDict()}
+_density_cache_lock = threading.Lock()
+
+
+def _ward_category_index(ward_type):
+    if ward_type and 'Control' in ward_type:
+        return 1
+    if ward_type and 'Farsight' in ward_type:
+        return 2
+    return 0
+
+
+def _build_histograms(rows, grid_size=DENSITY_GRID_SIZE):
+    """rows (time_bucket, ward_type, pos_x, pos_z) -> uint32 [bucket, category, y, x]; y=0 - верх карты."""
+    import numpy as np
+    n_buckets, n_categories = len(WARD_INTERVAL_LABELS), len(WARD_CATEGORIES)
+    rows = [row for row in rows if row[2] is not None and row[3] is not None]
+    if not rows:
+        return np.zeros((n_buckets, n_categories, grid_size, grid_size), dtype=np.uint32)
+
+    buckets = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    categories = np.fromiter((_ward_category_index(row[1]) for row in rows), dtype=np.int64, count=len(rows))
+    xs = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    zs = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+
+    ix = np.clip((xs / MAP_MAX_COORD * grid_size).astype(np.int64), 0, grid_size - 1)
+    iy = np.clip(((1.0 - zs / MAP_MAX_COORD) * grid_size).astype(np.int64), 0, grid_size - 1)
+    flat_index = ((buckets * n_categories + categories) * grid_size + iy) * grid_size + ix
+    counts = np.bincount(flat_index, minlength=n_buckets * n_categories * grid_size * grid_size)
+    return counts.astype(np.uint32).reshape(n_buckets, n_categories, grid_size, grid_size)
+
+
+def _load_histograms(conn, selected_team_tag, selected_role, games_filter, selected_champion, tournament_id=None):
+    """Гистограммы для фильтров из кэша (сбрасывается при смене data generation) или из БД."""
+    generation = get_data_generation(conn)
+    cache_key = (tournament_id, selected_team_tag, selected_role, games_filter, selected_champion or "All")
+    with _density_cache_lock:
+        if _density_cache["generation"] != generation:
+            _density_cache["generation"] = generation
+            _density_cache["entries"].clear()
+        cached = _density_cache["entries"].get(cache_key)
+        if cached is not None:
+            _density_cache["entries"].move_to_end(cache_key)
+            return cached
+
+    cursor = conn.cursor()
+    games_found, selected_games = select_team_ward_games(cursor, selected_team_tag, selected_role, games_filter, tournament_id)
+    rows = query_team_wards(cursor, selected_games, selected_champion,
+                            columns="w.time_bucket, w.ward_type, w.pos_x, w.pos_z")
+    entry = {"games_found": games_found, "histograms": _build_histograms(rows)}
+
+    with _density_cache_lock:
+        if _density_cache["generation"] == generation:
+            _density_cache["entries"][cache_key] = entry
+            while len(_density_cache["entries"]) > DENSITY_CACHE_MAX_ENTRIES:
+                _density_cache["entries"].popitem(last=False)
+    return entry
+
+
+def _sparse_cells(grid):
+    """2D массив -> [[x, y, count], ...] только для непустых клеток."""
+    import numpy as np
+    ys, xs = np.nonzero(grid)
+    return np.stack([xs, ys, grid[ys, xs]], axis=1).tolist()
+
+
+def _summarize_intervals(histograms, include_cells=False):
+    intervals = []
+    for bucket, label in enumerate(WARD_INTERVAL_LABELS):
+        by_category = histograms[bucket].sum(axis=(1, 2))
+        total = int(by_category.sum())
+        if not total:
+            continue
+        interval = {
+            "bucket": bucket,
+            "label": label,
+            "count": total,
+            "by_type": {name: int(count) for name, count in zip(WARD_CATEGORIES, by_category)}
+        }
+        if include_cells:
+            interval["cells"] = {name: _sparse_cells(histograms[bucket, i])
+                                 for i, name in enumerate(WARD_CATEGORIES) if by_category[i]}
+        intervals.append(interval)
+    return intervals
+
+
+@traced("aggregate")
+def get_ward_density_data(selected_team_full_name, selected_role, games_filter, selected_champion, include_cells=False,
+                          tournament_id=None):
+    """
+    Плотность вардов по интервалам для страницы /wards и API.
+    Возвращает (all_teams_display, intervals, stats_or_error, available_champions), где
+    intervals - [{bucket, label, count, by_type[, cells]}] только для непустых интервалов.
+    """
+    conn = get_db_connection(tournament_id)
+    if not conn:
+        return [], [], {"error": "Database connection failed"}, []
+
+    all_teams_display = []
+    stats_or_error = {}
+    intervals = []
+    available_champions = ["All"]
+
+    try:
+        all_teams_display, _ = get_team_registry(conn, tournament_id)
+        if not selected_team_full_name:
+            stats_or_error = {"message": "Please select a team to view warding patterns."}
+            return all_teams_display, intervals, stats_or_error, available_champions
+
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
+        if not selected_team_tag:
+            stats_or_error = {"error": f"Team tag not found for '{selected_team_full_name}'."}
+            return all_teams_display, intervals, stats_or_error, available_champions
+
+        available_champions.extend(get_team_champion_options(conn.cursor(), selected_team_tag, tournament_id))
+        entry = _load_histograms(conn, selected_team_tag, selected_role, games_filter, selected_champion, tournament_id)
+        if not entry["games_found"]:
+            stats_or_error = {"message": "No games found for the selected team."}
+            return all_teams_display, intervals, stats_or_error, available_champions
+
+        intervals = _summarize_intervals(entry["histograms"], include_cells=include_cells)
+        stats_or_error = {"grid_size": DENSITY_GRID_SIZE, "map_size": MAP_MAX_COORD, "ward_types": list(WARD_CATEGORIES)}
+    except sqlite3.Error as e:
+        log_message(f"DB Error in get_ward_density_data: {e}", level="error")
+        stats_or_error = {"error": "A database error occurred."}
+    finally:
+        conn.close()
+
+    return all_teams_display, intervals, stats_or_error, available_champions
+
+
+# --- PNG оверлей ---
+def _gaussian_matrix(size, sigma):
+    """Матрица сглаживания K: K @ grid @ K.T - сепарабельная гауссова свёртка."""
+    import numpy as np
+    positions = np.arange(size)
+    kernel = np.exp(-0.5 * ((positions[:, None] - positions[None, :]) / sigma) ** 2)
+    return kernel / kernel.sum(axis=1, keepdims=True)
+
+
+def _heatmap_rgba(grid):
+    """Плотность -> RGBA: прозрачный фон, зелёный -> жёлтый -> красный."""
+    import numpy as np
+    smoothing = _gaussian_matrix(grid.shape[0], HEATMAP_SIGMA_CELLS)
+    density = smoothing @ grid.astype(np.float64) @ smoothing.T
+    peak = density.max()
+    t = density / peak if peak > 0 else density
+
+    rgba = np.zeros(grid.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = (np.clip(2.0 * t, 0.0, 1.0) * 255).astype(np.uint8)
+    rgba[..., 1] = (np.clip(2.0 - 2.0 * t, 0.0, 1.0) * 255).astype(np.uint8)
+    rgba[..., 3] = np.where(t < 0.03, 0, np.clip(0.25 + t, 0.0, 0.85) * 255).astype(np.uint8)
+    scale = HEATMAP_PIXELS_PER_CELL
+    return rgba.repeat(scale, axis=0).repeat(scale, axis=1)
+
+
+def _encode_png(rgba):
+    """Минимальный PNG encoder (RGBA, 8 бит), чтобы не тянуть Pillow."""
+    import numpy as np
+    height, width = rgba.shape[:2]
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)]).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+
+@traced("aggregate")
+def get_ward_heatmap_png(selected_team_full_name, selected_role, games_filter, selected_champion, bucket, ward_type="All",
+                         tournament_id=None):
+    """PNG оверлей плотности вардов для одного интервала; None, если команда/интервал не найдены."""
+    if bucket is None or not 0 <= bucket < len(WARD_INTERVAL_LABELS):
+        return None
+    conn = get_db_connection(tournament_id)
+    if not conn:
+        return None
+    try:
+        selected_team_tag = resolve_team_tag(conn, selected_team_full_name, tournament_id)
+        if not selected_team_tag:
+            return None
+        histograms = _load_histograms(conn, selected_team_tag, selected_role, games_filter, selected_champion, tournament_id)["histograms"]
+    except sqlite3.Error as e:
+        log_message(f"DB Error in get_ward_heatmap_png: {e}", level="error")
+        return None
+    finally:
+        conn.close()
+
+    if ward_type in WARD_CATEGORIES:
+        grid = histograms[bucket, WARD_CATEGORIES.index(ward_type)]
+    else:
+        grid = histograms[bucket].sum(axis=0)
+    return _encode_png(_heatmap_rgba(grid))